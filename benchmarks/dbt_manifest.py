@@ -0,0 +1,102 @@
+"""
+Compare the time & peak memory to load and parse a synthetic large dbt
+manifest, with the default, lean and streamed manifest loading.
+
+The manifest is generated by replicating the nodes, docs & semantic models of
+the jaffle_v11 test manifest, so it looks like the manifest of a large project.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from copy import deepcopy
+from typing import Dict
+
+from metaphor.common.base_config import OutputConfig
+from metaphor.dbt.config import DbtRunConfig
+from metaphor.dbt.extractor import DbtExtractor
+
+BASE_MANIFEST = "tests/dbt/data/jaffle_v11/manifest.json"
+
+
+def _replicate(section: Dict, copies: int) -> Dict:
+    replicated = {}
+    for copy in range(copies):
+        for key, value in section.items():
+            value = deepcopy(value)
+            if isinstance(value, dict) and "unique_id" in value:
+                value["unique_id"] = f"{key}_{copy}"
+            replicated[f"{key}_{copy}"] = value
+    return replicated
+
+
+def generate_manifest(path: str, copies: int) -> None:
+    with open(BASE_MANIFEST) as file:
+        manifest = json.load(file)
+
+    # The macros mostly come from packages, so don't grow with the project
+    for section in ("nodes", "docs", "semantic_models"):
+        manifest[section] = _replicate(manifest[section], copies)
+
+    # Keep the dependencies between the copies of the nodes
+    for key, node in manifest["nodes"].items():
+        copy = key.rsplit("_", 1)[1]
+        depends_on = node.get("depends_on", {})
+        if "nodes" in depends_on:
+            depends_on["nodes"] = [f"{n}_{copy}" for n in depends_on["nodes"]]
+        if node.get("attached_node"):
+            node["attached_node"] = f"{node['attached_node']}_{copy}"
+    manifest["parent_map"] = _replicate(manifest["parent_map"], copies)
+    manifest["child_map"] = _replicate(manifest["child_map"], copies)
+
+    with open(path, "w") as file:
+        json.dump(manifest, file)
+
+
+def measure(name: str, manifest: str, lean: bool, stream: bool) -> float:
+    config = DbtRunConfig(
+        output=OutputConfig(),
+        manifest=manifest,
+        lean_manifest=lean,
+        stream_manifest=stream,
+    )
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    entities = asyncio.run(DbtExtractor(config).extract())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{name:>8}: {elapsed:8.2f}s, peak {peak / 2**20:8.1f} MiB, "
+        f"{len(entities)} entities"
+    )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--copies", type=int, default=100, help="number of copies of the nodes"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = os.path.join(directory, "manifest.json")
+        generate_manifest(manifest, args.copies)
+        print(f"manifest: {os.path.getsize(manifest) / 2**20:.1f} MiB")
+
+        baseline = measure("default", manifest, lean=False, stream=False)
+        lean = measure("lean", manifest, lean=True, stream=False)
+        streamed = measure("streamed", manifest, lean=True, stream=True)
+        print(f"{'speedup':>8}: {baseline / lean:8.1f}x lean")
+        print(f"{'speedup':>8}: {baseline / streamed:8.1f}x streamed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Compare the time to match many tables against a DatasetFilter, and many S3
+keys & directories against a PathSpec, with compiled matchers and with
+fnmatch, as they used to be matched.
+
+Both produce the same results, which are checked along the way.
+"""
+
+import argparse
+import random
+import time
+from fnmatch import fnmatch
+from typing import Callable, List, Optional, Sequence
+
+from metaphor.common.filter import DatabaseFilter, DatasetFilter
+from metaphor.common.logger import get_logger
+from metaphor.s3.path_spec import PathSpec
+
+logger = get_logger()
+
+
+def fnmatch_accepted(
+    database: str, schema: str, table: str, database_filter: DatabaseFilter
+) -> bool:
+    for database_pattern, schema_filter in database_filter.items():
+        if not fnmatch(database, database_pattern):
+            continue
+        if schema_filter is None:
+            return True
+        for schema_pattern, table_filter in schema_filter.items():
+            if not fnmatch(schema, schema_pattern):
+                continue
+            if table_filter is None:
+                return True
+            if any(fnmatch(table, pattern) for pattern in table_filter):
+                return True
+    return False
+
+
+def fnmatch_include_table(
+    filter: DatasetFilter, database: str, schema: str, table: str
+) -> bool:
+    if filter.includes is not None and not fnmatch_accepted(
+        database, schema, table, filter.includes
+    ):
+        return False
+    if filter.excludes is not None and fnmatch_accepted(
+        database, schema, table, filter.excludes
+    ):
+        return False
+    return True
+
+
+def fnmatch_allow_key(path_spec: PathSpec, key: str) -> bool:
+    pattern = path_spec.object_path
+    for match in path_spec.labels + path_spec.partitions:
+        pattern = pattern.replace(match, "*", 1)
+    return fnmatch(key, pattern) and key.rsplit(".", 1)[-1] in path_spec.file_types
+
+
+def fnmatch_allow_path(path_spec: PathSpec, path: str) -> bool:
+    path_slash = path.count("/")
+    uri_slash = path_spec.uri.count("/")
+    if path_slash > uri_slash:
+        return False
+
+    pattern = path_spec.uri.rsplit("/", (uri_slash - path_slash) + 1)[0]
+    for match in path_spec.labels:
+        pattern = pattern.replace(match, "*", 1)
+    if not fnmatch(path, pattern):
+        logger.debug(f"Unmatched path: {path}")
+        return False
+
+    for exclude in path_spec.excludes:
+        exclude_slash = exclude.count("/")
+        if path_slash < exclude_slash:
+            continue
+        truncated = path.rsplit("/", (path_slash - exclude_slash) + 1)[0]
+        if fnmatch(truncated, exclude[:-1] if exclude[-1] == "/" else exclude):
+            logger.debug(f"Path {path} excluded by pattern: {exclude}")
+            return False
+
+    return True
+
+
+def measure(name: str, items: Sequence, match: Callable) -> List[bool]:
+    start = time.perf_counter()
+    results = [match(*item) for item in items]
+    elapsed = time.perf_counter() - start
+    print(f"{name:>24}: {elapsed:8.3f}s, {len(items) / elapsed:12.0f}/s")
+    return results
+
+
+def compare(name: str, items: Sequence, compiled: Callable, baseline: Callable):
+    expected = measure(f"{name} (fnmatch)", items, baseline)
+    actual = measure(f"{name} (compiled)", items, compiled)
+    assert actual == expected, f"{name} results differ"
+
+
+def benchmark_filter(tables: int, patterns: int) -> None:
+    random.seed(0)
+    filter = DatasetFilter(
+        includes={
+            f"db_{d}": {
+                f"schema_{s}*": {f"table_{t}_*" for t in range(patterns)}
+                for s in range(patterns)
+            }
+            for d in range(10)
+        },
+        excludes={"db_*": {f"schema_{s}_tmp": None for s in range(patterns)}},
+    )
+    items = [
+        (
+            f"db_{random.randrange(12)}",
+            f"schema_{random.randrange(patterns * 2)}_{random.choice(['x', 'tmp'])}",
+            f"table_{random.randrange(patterns * 2)}_{i}",
+        )
+        for i in range(tables)
+    ]
+
+    compare(
+        "include_table",
+        items,
+        filter.include_table,
+        lambda *item: fnmatch_include_table(filter, *item),
+    )
+
+
+def benchmark_path_spec(keys: int, excludes: int) -> None:
+    random.seed(0)
+    path_spec = PathSpec(
+        uri="s3://bucket/*/{dept}/{table}/{partition_key[0]}={partition[0]}/*.parquet",
+        excludes=[f"s3://bucket/*/dept_{i}/" for i in range(excludes)],
+    )
+
+    def key(i: int, depth: Optional[int] = None) -> str:
+        parts = [
+            f"area_{random.randrange(10)}",
+            f"dept_{random.randrange(excludes * 2)}",
+            f"table_{random.randrange(100)}",
+            f"date={i}",
+            f"{i}.{random.choice(['parquet', 'csv'])}",
+        ]
+        return "/".join(parts[:depth])
+
+    compare(
+        "allow_key",
+        [(key(i),) for i in range(keys)],
+        path_spec.allow_key,
+        lambda key: fnmatch_allow_key(path_spec, key),
+    )
+    compare(
+        "allow_path",
+        [(f"s3://bucket/{key(i, i % 4 + 1)}/",) for i in range(keys)],
+        path_spec.allow_path,
+        lambda path: fnmatch_allow_path(path_spec, path),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--count", type=int, default=100000, help="number of tables & keys"
+    )
+    parser.add_argument(
+        "--patterns", type=int, default=50, help="number of patterns per level"
+    )
+    args = parser.parse_args()
+
+    benchmark_filter(args.count, args.patterns)
+    benchmark_path_spec(args.count, args.patterns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Compare the jsonschema & compiled MCE validators on synthetic Dataset and
+QueryLogs events.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, List
+
+from metaphor.common.event_util import EventUtil
+from metaphor.models.metadata_change_event import (
+    DataPlatform,
+    Dataset,
+    DatasetLogicalID,
+    DatasetSchema,
+    DatasetStatistics,
+    MetadataChangeEvent,
+    QueriedDataset,
+    QueryLog,
+    QueryLogs,
+    SchemaField,
+    SchemaType,
+    SQLSchema,
+)
+
+
+def dataset_event(i: int) -> MetadataChangeEvent:
+    return MetadataChangeEvent(
+        dataset=Dataset(
+            logical_id=DatasetLogicalID(
+                name=f"db.schema.table_{i}", platform=DataPlatform.SNOWFLAKE
+            ),
+            schema=DatasetSchema(
+                schema_type=SchemaType.SQL,
+                description=f"Table {i}",
+                fields=[
+                    SchemaField(
+                        field_path=f"col_{c}",
+                        field_name=f"col_{c}",
+                        native_type="VARCHAR",
+                        nullable=True,
+                        precision=10.0,
+                    )
+                    for c in range(20)
+                ],
+                sql_schema=SQLSchema(table_schema=f"CREATE TABLE table_{i} (...)"),
+            ),
+            statistics=DatasetStatistics(
+                record_count=1000.0,
+                data_size_bytes=1024.0,
+                last_updated=datetime(2023, 1, 1, tzinfo=timezone.utc),
+            ),
+        )
+    )
+
+
+def query_logs_event(i: int) -> MetadataChangeEvent:
+    return MetadataChangeEvent(
+        query_logs=QueryLogs(
+            logs=[
+                QueryLog(
+                    id=f"SNOWFLAKE:{i}-{q}",
+                    query_id=f"{i}-{q}",
+                    platform=DataPlatform.SNOWFLAKE,
+                    start_time=datetime(2023, 1, 1, tzinfo=timezone.utc),
+                    duration=1.5,
+                    user_id="user",
+                    sql="SELECT * FROM db.schema.table",
+                    sql_hash="hash",
+                    sources=[
+                        QueriedDataset(
+                            id=f"DATASET~{q}", database="db", schema="schema"
+                        )
+                    ],
+                )
+                for q in range(100)
+            ]
+        )
+    )
+
+
+def run_jsonschema(records: List[dict]) -> List:
+    # The validation path prior to the compiled validator
+    event_util = EventUtil()
+    with ThreadPoolExecutor() as tpe:
+        return [r for r in tpe.map(event_util.validate_message, records) if r]
+
+
+def run_compiled(records: List[dict]) -> List:
+    event_util = EventUtil("compiled")
+    return [r for r in map(event_util.validate_message, records) if r]
+
+
+def measure(name: str, func: Callable[[List[dict]], List], records: List[dict]):
+    start = time.perf_counter()
+    valid = func(records)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>12}: {elapsed:8.2f}s for {len(records)} records ({len(valid)} valid)"
+    )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10000, help="number of MCEs")
+    args = parser.parse_args()
+
+    records = [
+        EventUtil.trim_event(dataset_event(i) if i % 2 else query_logs_event(i))
+        for i in range(args.count)
+    ]
+
+    # Warm up the cached validators
+    EventUtil("compiled")
+
+    baseline = measure("jsonschema", run_jsonschema, records)
+    compiled = measure("compiled", run_compiled, records)
+    print(f"{'speedup':>12}: {baseline / compiled:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import google.cloud.bigquery as bigquery
+    from google.api_core import exceptions
+    from google.cloud import logging_v2
+except ImportError:
+    print("Please install metaphor[bigquery] extra\n")
+    raise
+
+from metaphor.bigquery.utils import LogEntry
+from metaphor.common.logger import get_logger
+
+logger = get_logger()
+
+# Reasons of the 403 errors caused by exceeding the API quota
+# See https://cloud.google.com/bigquery/docs/error-messages
+_QUOTA_ERROR_REASONS = {"quotaExceeded", "rateLimitExceeded"}
+
+
+def split_time_range(
+    start: datetime, end: datetime, count: int
+) -> List[Tuple[datetime, datetime]]:
+    """Split [start, end) into count contiguous slices of equal length"""
+    count = max(count, 1)
+    step = (end - start) / count
+    bounds = [start + step * i for i in range(count)] + [end]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class _ReaderDone:
+    """Put on the queue by a reader when it's done, with the error if it failed"""
+
+    def __init__(self, error: Optional[Exception] = None):
+        self.error = error
+
+
+class _EntryQueue:
+    """A bounded queue of log entries, whose readers stop once the consumer does"""
+
+    def __init__(self, maxsize: int):
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=maxsize)
+        self.stopped = threading.Event()
+
+    def put(self, item: object) -> None:
+        while not self.stopped.is_set():
+            try:
+                self._queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def get(self) -> object:
+        return self._queue.get()
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+
+def _read_entries(
+    logging_client: logging_v2.Client,
+    log_filter: str,
+    time_slice: Tuple[datetime, datetime],
+    page_size: int,
+    entries: _EntryQueue,
+    max_retries: int,
+    initial_backoff: float,
+) -> None:
+    """
+    Read the entries of a time slice, retrying with exponential backoff on quota
+    errors. A retry resumes from the timestamp of the last entry read, skipping
+    the entries with that timestamp already read, as entries are listed in
+    ascending timestamp order.
+    """
+    slice_start, slice_end = time_slice
+    last_timestamp: Optional[datetime] = None
+    last_insert_ids: Set[str] = set()
+    retries = 0
+    backoff = initial_backoff
+
+    while True:
+        resume_from = last_timestamp or slice_start
+        try:
+            for entry in logging_client.list_entries(
+                page_size=page_size,
+                filter_=f"""{log_filter} AND
+                timestamp>="{resume_from.isoformat()}" AND
+                timestamp<"{slice_end.isoformat()}"
+                """,
+            ):
+                if entries.stopped.is_set():
+                    break
+                if entry.timestamp != last_timestamp:
+                    last_timestamp = entry.timestamp
+                    last_insert_ids = set()
+                elif entry.insert_id in last_insert_ids:
+                    continue
+
+                last_insert_ids.add(entry.insert_id)
+                entries.put(entry)
+
+                # Only consecutive failures count towards max_retries
+                retries = 0
+                backoff = initial_backoff
+        except Exception as error:
+            if not is_quota_error(error) or retries == max_retries:
+                entries.put(_ReaderDone(error))
+                return
+
+            retries += 1
+            logger.info(
+                f"Quota exceeded listing log entries from {resume_from}, "
+                f"retry in {backoff}s"
+            )
+            time.sleep(backoff)
+            backoff *= 2
+            continue
+
+        entries.put(_ReaderDone())
+        return
+
+
+def list_entries(
+    logging_client: logging_v2.Client,
+    log_filter: str,
+    start: datetime,
+    end: datetime,
+    page_size: int,
+    max_workers: int,
+    max_retries: int = 5,
+    initial_backoff: float = 1.0,
+) -> Iterator[LogEntry]:
+    """
+    List the log entries matching the filter with timestamp in [start, end)
+
+    The time range is split into max_workers slices, which are read in parallel.
+    Entries are yielded as soon as they are read, i.e. not in timestamp order.
+    A slice failing with a quota error is retried up to max_retries times.
+    """
+    slices = split_time_range(start, end, max_workers)
+
+    # Bound the number of entries read ahead of the consumer
+    entries = _EntryQueue(maxsize=page_size * len(slices))
+
+    with ThreadPoolExecutor(max_workers=len(slices)) as executor:
+        for time_slice in slices:
+            executor.submit(
+                _read_entries,
+                logging_client,
+                log_filter,
+                time_slice,
+                page_size,
+                entries,
+                max_retries,
+                initial_backoff,
+            )
+
+        try:
+            remaining = len(slices)
+            while remaining > 0:
+                item = entries.get()
+                if not isinstance(item, _ReaderDone):
+                    yield item
+                    continue
+
+                remaining -= 1
+                if item.error is not None:
+                    raise item.error
+        finally:
+            # Unblock the readers if the consumer stops early
+            entries.stop()
+
+
+def is_quota_error(error: Exception) -> bool:
+    if isinstance(
+        error,
+        (
+            exceptions.TooManyRequests,
+            exceptions.ServiceUnavailable,
+            exceptions.InternalServerError,
+        ),
+    ):
+        return True
+
+    return isinstance(error, exceptions.Forbidden) and any(
+        e.get("reason") in _QUOTA_ERROR_REASONS for e in error.errors
+    )
+
+
+class JobQueryFetcher:
+    """
+    Fetch the full SQL of query jobs, whose query is truncated in the audit
+    logs, from the jobs API
+
+    Jobs are fetched concurrently, with exponential backoff on quota errors.
+    Each job is only fetched once.
+    """
+
+    def __init__(
+        self,
+        client: bigquery.Client,
+        max_workers: int,
+        max_retries: int = 5,
+        initial_backoff: float = 1.0,
+    ):
+        self._client = client
+        self._max_workers = max(max_workers, 1)
+        self._max_retries = max_retries
+        self._initial_backoff = initial_backoff
+        self._queries: Dict[str, Optional[str]] = {}
+
+    def fetch(self, job_names: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Returns the queries of the jobs, None if a query can't be fetched"""
+        job_names = list(dict.fromkeys(job_names))
+        new_job_names = [name for name in job_names if name not in self._queries]
+
+        if new_job_names:
+            logger.info(f"Fetching {len(new_job_names)} truncated queries")
+            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                for job_name, query in zip(
+                    new_job_names, executor.map(self._fetch_query, new_job_names)
+                ):
+                    self._queries[job_name] = query
+
+        return {job_name: self._queries[job_name] for job_name in job_names}
+
+    def _fetch_query(self, job_name: str) -> Optional[str]:
+        match = re.match(r"^projects/([^/]+)/jobs/([^/]+)$", job_name)
+        if not match:
+            return None
+
+        project, job_id = match.group(1), match.group(2)
+        backoff = self._initial_backoff
+        for attempt in range(self._max_retries + 1):
+            try:
+                job = self._client.get_job(job_id, project)
+                return job.query if isinstance(job, bigquery.QueryJob) else None
+            except Exception as e:
+                if not is_quota_error(e) or attempt == self._max_retries:
+                    logger.warning(f"Failed to get job information: {e}")
+                    return None
+
+                logger.info(f"Quota exceeded getting {job_name}, retry in {backoff}s")
+                time.sleep(backoff)
+                backoff *= 2
+
+        return None
@@ -74,6 +74,10 @@ class BigQueryRunConfig(BaseConfig):
     # Max number of concurrent requests to bigquery or logging API, default is 5
     max_concurrency: int = 5
 
+    # Fetch table metadata in bulk from the region-level INFORMATION_SCHEMA views,
+    # instead of calling the tables API for each table
+    bulk_metadata: bool = False
+
     # Include or exclude specific databases/schemas/tables
     filter: DatasetFilter = field(default_factory=lambda: DatasetFilter())
 
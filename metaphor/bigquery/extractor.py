@@ -1,4 +1,3 @@
-import re
 from concurrent.futures import ThreadPoolExecutor
 from typing import (
     Any,
@@ -19,7 +18,13 @@ except ImportError:
     print("Please install metaphor[bigquery] extra\n")
     raise
 
+from metaphor.bigquery.audit_log import JobQueryFetcher, list_entries
 from metaphor.bigquery.config import BigQueryRunConfig
+from metaphor.bigquery.information_schema import (
+    TableMetadata,
+    dataset_locations,
+    fetch_tables,
+)
 from metaphor.bigquery.logEvent import JobChangeEvent
 from metaphor.bigquery.utils import (
     BigQueryResource,
@@ -56,6 +61,9 @@ from metaphor.models.metadata_change_event import (
 
 logger = get_logger()
 
+# Number of job change logs to fetch the truncated queries for at a time
+JOB_QUERY_FETCH_BATCH_SIZE = 1000
+
 
 class BigQueryExtractor(BaseExtractor):
     """BigQuery metadata extractor"""
@@ -75,6 +83,7 @@ class BigQueryExtractor(BaseExtractor):
         self._job_project_id = config.job_project_id or self._credentials.project_id
         self._dataset_filter = config.filter.normalize()
         self._max_concurrency = config.max_concurrency
+        self._bulk_metadata = config.bulk_metadata
         self._tag_matchers = config.tag_matchers
         self._query_log_lookback_days = config.query_log.lookback_days
         self._query_log_excluded_usernames = config.query_log.excluded_usernames
@@ -101,44 +110,16 @@ class BigQueryExtractor(BaseExtractor):
         client = build_client(project_id, self._credentials)
         logging_client = build_logging_client(project_id, self._credentials)
 
-        fetched_tables: List[Dataset] = []
-        for dataset_ref in BigQueryExtractor._list_datasets_with_filter(
-            client, self._dataset_filter
-        ):
-            logger.info(f"Fetching tables for {dataset_ref}")
-
-            with ThreadPoolExecutor(max_workers=self._max_concurrency) as executor:
-
-                def get_table(table: bigquery.TableReference) -> Dataset:
-                    logger.info(f"Getting table {table.table_id}")
-                    bq_table = client.get_table(table)
-                    return self._parse_table(client.project, bq_table)
-
-                # map of table name to Dataset
-                tables: Dict[str, Dataset] = {
-                    d.logical_id.name.split(".")[-1]: d
-                    for d in executor.map(
-                        get_table,
-                        BigQueryExtractor._list_tables_with_filter(
-                            dataset_ref, client, self._dataset_filter
-                        ),
-                    )
-                }
-
-            logger.info(f"Getting table DDL for {dataset_ref}")
-            table_ddl = client.query(
-                f"select table_name, ddl from `{dataset_ref.project}.{dataset_ref.dataset_id}.INFORMATION_SCHEMA.TABLES`",
-                project=self._job_project_id,
-            ).result()
-
-            for table_name, ddl in table_ddl:
-                table = tables.get(str(table_name).lower())
-                if table is None:
-                    logger.error(f"table {table_name} not found for DDL")
-                    continue
-                table.schema.sql_schema.table_schema = ddl
+        dataset_refs = list(
+            BigQueryExtractor._list_datasets_with_filter(client, self._dataset_filter)
+        )
 
-            fetched_tables.extend(tables.values())
+        fetched_tables: List[Dataset] = []
+        if self._bulk_metadata:
+            fetched_tables = self._fetch_tables_bulk(client, dataset_refs)
+        else:
+            for dataset_ref in dataset_refs:
+                fetched_tables.extend(self._fetch_tables(client, dataset_ref))
 
         logger.info("Fetching BigQueryAuditMetadata")
         query_logs = self._fetch_query_logs(logging_client, client)
@@ -148,6 +129,102 @@ class BigQueryExtractor(BaseExtractor):
         self._datasets.extend(fetched_tables)
         self._query_logs.extend(chunk_query_logs(query_logs))
 
+    def _fetch_tables(
+        self, client: bigquery.Client, dataset_ref: bigquery.DatasetReference
+    ) -> List[Dataset]:
+        logger.info(f"Fetching tables for {dataset_ref}")
+
+        with ThreadPoolExecutor(max_workers=self._max_concurrency) as executor:
+
+            def get_table(table: bigquery.TableReference) -> Dataset:
+                logger.info(f"Getting table {table.table_id}")
+                bq_table = client.get_table(table)
+                return self._parse_table(client.project, bq_table)
+
+            # map of table name to Dataset
+            tables: Dict[str, Dataset] = {
+                d.logical_id.name.split(".")[-1]: d
+                for d in executor.map(
+                    get_table,
+                    BigQueryExtractor._list_tables_with_filter(
+                        dataset_ref, client, self._dataset_filter
+                    ),
+                )
+            }
+
+        logger.info(f"Getting table DDL for {dataset_ref}")
+        table_ddl = client.query(
+            f"select table_name, ddl from `{dataset_ref.project}.{dataset_ref.dataset_id}.INFORMATION_SCHEMA.TABLES`",
+            project=self._job_project_id,
+        ).result()
+
+        for table_name, ddl in table_ddl:
+            table = tables.get(str(table_name).lower())
+            if table is None:
+                logger.error(f"table {table_name} not found for DDL")
+                continue
+            table.schema.sql_schema.table_schema = ddl
+
+        return list(tables.values())
+
+    def _fetch_tables_bulk(
+        self,
+        client: bigquery.Client,
+        dataset_refs: List[bigquery.DatasetReference],
+    ) -> List[Dataset]:
+        """
+        Fetch the tables of all datasets from INFORMATION_SCHEMA, with a few
+        queries per location instead of one get_table call per table
+        """
+        fetched_tables: List[Dataset] = []
+        for location, dataset_ids in dataset_locations(client, dataset_refs).items():
+            logger.info(f"Fetching tables in {location} for {dataset_ids}")
+            tables = fetch_tables(client, self._job_project_id, location, dataset_ids)
+
+            incomplete_tables: List[TableMetadata] = []
+            for (dataset_id, table_name), table in tables.items():
+                if not self._dataset_filter.include_table(
+                    client.project, dataset_id, table_name
+                ):
+                    logger.info(f"Skipped table: {dataset_id}.{table_name}")
+                    continue
+
+                if table.complete:
+                    fetched_tables.append(self._parse_table_metadata(client, table))
+                else:
+                    incomplete_tables.append(table)
+
+            # Fall back to get_table for the properties missing in INFORMATION_SCHEMA
+            with ThreadPoolExecutor(max_workers=self._max_concurrency) as executor:
+
+                def get_table(table: TableMetadata) -> Dataset:
+                    logger.info(f"Getting table {table.dataset_id}.{table.table_id}")
+                    return self._parse_table_metadata(client, table, fetch=True)
+
+                fetched_tables.extend(executor.map(get_table, incomplete_tables))
+
+        return fetched_tables
+
+    def _parse_table_metadata(
+        self, client: bigquery.Client, table: TableMetadata, fetch: bool = False
+    ) -> Dataset:
+        bq_table: Union[bigquery.table.Table, TableMetadata] = (
+            client.get_table(
+                bigquery.DatasetReference(client.project, table.dataset_id).table(
+                    table.table_id
+                )
+            )
+            if fetch
+            else table
+        )
+        dataset = self._parse_table(client.project, bq_table)
+
+        if table.ddl is not None:
+            assert dataset.schema is not None and dataset.schema.sql_schema is not None
+            dataset.schema.sql_schema.table_schema = table.ddl
+
+        return dataset
+
     @staticmethod
     def _list_datasets_with_filter(
         client: bigquery.Client, dataset_filter: DatasetFilter
@@ -179,7 +256,9 @@ class BigQueryExtractor(BaseExtractor):
 
     # See https://googleapis.dev/python/bigquery/latest/generated/google.cloud.bigquery.table.Table.html#google.cloud.bigquery.table.Table
     @staticmethod
-    def _parse_table(project_id, bq_table: bigquery.table.Table) -> Dataset:
+    def _parse_table(
+        project_id, bq_table: Union[bigquery.table.Table, TableMetadata]
+    ) -> Dataset:
         dataset_id = DatasetLogicalID(
             platform=DataPlatform.BIGQUERY,
             name=dataset_normalized_name(
@@ -203,7 +282,9 @@ class BigQueryExtractor(BaseExtractor):
 
     # See https://googleapis.dev/python/bigquery/latest/generated/google.cloud.bigquery.table.Table.html#google.cloud.bigquery.table.Table
     @staticmethod
-    def parse_schema(bq_table: bigquery.table.Table) -> DatasetSchema:
+    def parse_schema(
+        bq_table: Union[bigquery.table.Table, TableMetadata]
+    ) -> DatasetSchema:
         schema = DatasetSchema(
             description=bq_table.description, schema_type=SchemaType.SQL
         )
@@ -280,44 +361,40 @@ class BigQueryExtractor(BaseExtractor):
     def _fetch_query_logs(
         self, logging_client: logging_v2.Client, client: bigquery.Client
     ) -> List[QueryLog]:
-        logs: List[Optional[QueryLog]] = []
-        log_filter = self._build_job_change_filter()
-
-        for entry in logging_client.list_entries(
-            page_size=self._query_log_fetch_size, filter_=log_filter
+        logs: List[QueryLog] = []
+        job_changes: List[JobChangeEvent] = []
+        fetcher = JobQueryFetcher(client, self._max_concurrency)
+        fetched = 0
+
+        for entry in list_entries(
+            logging_client,
+            self._build_job_change_filter(),
+            start_of_day(self._query_log_lookback_days),
+            start_of_day(),
+            self._query_log_fetch_size,
+            self._max_concurrency,
         ):
+            fetched += 1
             if JobChangeEvent.can_parse(entry):
-                logs.append(self._parse_job_change_entry(entry, client))
+                job_change = self._parse_job_change_entry(entry)
+                if job_change is not None:
+                    job_changes.append(job_change)
 
-            if len(logs) % 1000 == 0:
-                logger.info(f"Fetched {len(logs)} audit logs")
+            # Fetch the truncated queries in batches
+            if len(job_changes) >= JOB_QUERY_FETCH_BATCH_SIZE:
+                logs.extend(self._build_query_logs(job_changes, fetcher))
+                job_changes = []
 
-        logger.info(f"Number of audit log entries fetched: {len(logs)}")
+            if fetched % 1000 == 0:
+                logger.info(f"Fetched {fetched} audit logs")
 
-        return [log for log in logs if log is not None]
+        logs.extend(self._build_query_logs(job_changes, fetcher))
 
-    @staticmethod
-    def _fetch_job_query(client: bigquery.Client, job_name: str) -> Optional[str]:
-        logger.info(f"Query {job_name}")
-        match = re.match(r"^projects/([^/]+)/jobs/([^/]+)$", job_name)
-        if match:
-            project = match.group(1)
-            job_id = match.group(2)
-
-            try:
-                job = client.get_job(job_id, project)
-            except Exception as e:
-                logger.warning(f"Failed to get job information: {e}")
-                return None
-
-            if isinstance(job, bigquery.QueryJob):
-                return job.query
-
-        return None
-
-    def _parse_job_change_entry(
-        self, entry: LogEntry, client: bigquery.Client
-    ) -> Optional[QueryLog]:
+        logger.info(f"Number of audit log entries fetched: {fetched}")
+
+        return logs
+
+    def _parse_job_change_entry(self, entry: LogEntry) -> Optional[JobChangeEvent]:
         job_change = JobChangeEvent.from_entry(entry)
         if job_change is None or job_change.query is None:
             return None
@@ -326,6 +403,34 @@ class BigQueryExtractor(BaseExtractor):
             logger.debug(f"Skipped query issued by {job_change.user_email}")
             return None
 
+        return job_change
+
+    def _build_query_logs(
+        self, job_changes: List[JobChangeEvent], fetcher: JobQueryFetcher
+    ) -> List[QueryLog]:
+        # if query SQL is truncated, fetch full SQL from job API
+        full_queries = (
+            fetcher.fetch(
+                job_change.job_name
+                for job_change in job_changes
+                if job_change.job_type == "QUERY" and job_change.query_truncated
+            )
+            if self._fetch_job_query_if_truncated
+            else {}
+        )
+
+        return [
+            self._build_query_log(
+                job_change, full_queries.get(job_change.job_name) or job_change.query
+            )
+            for job_change in job_changes
+        ]
+
+    def _build_query_log(
+        self, job_change: JobChangeEvent, query: Optional[str]
+    ) -> QueryLog:
+        assert job_change.query is not None
+
         sources: List[QueriedDataset] = [
             self._convert_resource_to_queried_dataset(d)
             for d in job_change.source_tables
@@ -339,15 +444,6 @@ class BigQueryExtractor(BaseExtractor):
         if job_change.default_dataset and job_change.default_dataset.count(".") == 1:
             default_database, default_schema = job_change.default_dataset.split(".")
 
-        query: Optional[str] = job_change.query
-        # if query SQL is truncated, fetch full SQL from job API
-        if (
-            job_change.job_type == "QUERY"
-            and job_change.query_truncated
-            and self._fetch_job_query_if_truncated
-        ):
-            query = self._fetch_job_query(client, job_change.job_name) or query
-
         elapsed_time = (
             (job_change.end_time - job_change.start_time).total_seconds()
             if job_change.start_time and job_change.end_time
@@ -425,12 +521,11 @@ class BigQueryExtractor(BaseExtractor):
         return BigQueryExtractor._query_type_map.get(query_type.upper(), TypeEnum.OTHER)
 
     def _build_job_change_filter(self) -> str:
-        start_time = start_of_day(self._query_log_lookback_days).isoformat()
-        end_time = start_of_day().isoformat()
+        """The filter for the job change logs, except the time range"""
 
         # Filter for service account
         service_account_filter = (
-            "NOT protoPayload.authenticationInfo.principalEmail:gserviceaccount.com AND"
+            "AND NOT protoPayload.authenticationInfo.principalEmail:gserviceaccount.com"
             if self._query_log_exclude_service_accounts
             else ""
         )
@@ -441,8 +536,6 @@ class BigQueryExtractor(BaseExtractor):
         protoPayload.serviceName="bigquery.googleapis.com" AND
         protoPayload.metadata.jobChange.after="DONE" AND
         NOT protoPayload.metadata.jobChange.job.jobStatus.errorResult.code:* AND
-        protoPayload.metadata.jobChange.job.jobConfig.type=("COPY" OR "QUERY") AND
+        protoPayload.metadata.jobChange.job.jobConfig.type=("COPY" OR "QUERY")
         {service_account_filter}
-        timestamp>="{start_time}" AND
-        timestamp<"{end_time}"
         """
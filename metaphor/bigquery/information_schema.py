@@ -0,0 +1,352 @@
+import json
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import google.cloud.bigquery as bigquery
+except ImportError:
+    print("Please install metaphor[bigquery] extra\n")
+    raise
+
+from metaphor.common.logger import get_logger
+
+logger = get_logger()
+
+
+@dataclass
+class TableMetadata:
+    """
+    The subset of bigquery.table.Table's properties that can be fetched in bulk
+    from the region-level INFORMATION_SCHEMA views, under the same names
+    """
+
+    dataset_id: str
+    table_id: str
+    table_type: str
+    ddl: Optional[str] = None
+    description: Optional[str] = None
+    view_query: Optional[str] = None
+    mview_query: Optional[str] = None
+    schema: List[bigquery.SchemaField] = field(default_factory=list)
+    num_rows: Optional[int] = None
+    num_bytes: Optional[int] = None
+    modified: Optional[datetime] = None
+
+    # False if some properties are not available in INFORMATION_SCHEMA,
+    # i.e. the table should be fetched using get_table instead
+    complete: bool = True
+
+
+# INFORMATION_SCHEMA.TABLES table types in terms of bigquery.table.Table
+_TABLE_TYPES = {
+    "BASE TABLE": "TABLE",
+    "CLONE": "TABLE",
+    "EXTERNAL": "EXTERNAL",
+    "MATERIALIZED VIEW": "MATERIALIZED_VIEW",
+    "SNAPSHOT": "SNAPSHOT",
+    "VIEW": "VIEW",
+}
+
+# Table types whose properties are all available in INFORMATION_SCHEMA
+_COMPLETE_TABLE_TYPES = {"TABLE", "VIEW", "EXTERNAL"}
+
+# Standard SQL types in terms of bigquery.SchemaField's (legacy) field types
+_FIELD_TYPES = {
+    "BOOL": "BOOLEAN",
+    "FLOAT64": "FLOAT",
+    "INT64": "INTEGER",
+    "STRUCT": "RECORD",
+}
+
+_TYPE_TOKEN = re.compile(r"\s*(`[^`]*`|[A-Za-z_][A-Za-z_0-9]*|\d+|[<>(),])")
+
+
+def dataset_locations(
+    client: bigquery.Client, dataset_refs: Iterable[bigquery.DatasetReference]
+) -> Dict[str, List[str]]:
+    """Group the datasets by their location, as INFORMATION_SCHEMA is regional"""
+    locations: Dict[str, List[str]] = defaultdict(list)
+    for dataset_ref in dataset_refs:
+        location = client.get_dataset(dataset_ref).location
+        locations[location].append(dataset_ref.dataset_id)
+    return locations
+
+
+def fetch_tables(
+    client: bigquery.Client,
+    job_project_id: Optional[str],
+    location: str,
+    dataset_ids: List[str],
+    include_storage: bool = True,
+    include_columns: bool = True,
+) -> Dict[Tuple[str, str], TableMetadata]:
+    """
+    Fetch the metadata of all tables in the datasets of a location, keyed by
+    (dataset ID, table name), in a few queries regardless of the number of tables
+    """
+    tables: Dict[Tuple[str, str], TableMetadata] = {}
+    for dataset_id, table_name, table_type, ddl, description, view_query in _query(
+        client,
+        job_project_id,
+        location,
+        dataset_ids,
+        """
+        SELECT t.table_schema, t.table_name, t.table_type, t.ddl, o.option_value,
+          v.view_definition
+        FROM {region}.TABLES t
+        LEFT JOIN {region}.TABLE_OPTIONS o
+          ON o.table_schema = t.table_schema AND o.table_name = t.table_name
+          AND o.option_name = 'description'
+        LEFT JOIN {region}.VIEWS v
+          ON v.table_schema = t.table_schema AND v.table_name = t.table_name
+        WHERE t.table_schema IN UNNEST(@datasets)
+        """,
+    ):
+        table_type = _TABLE_TYPES.get(table_type, table_type)
+        tables[(dataset_id, table_name)] = TableMetadata(
+            dataset_id=dataset_id,
+            table_id=table_name,
+            table_type=table_type,
+            ddl=ddl,
+            description=_parse_option_value(description),
+            view_query=view_query,
+            complete=table_type in _COMPLETE_TABLE_TYPES,
+        )
+
+    if include_storage:
+        _fetch_table_storage(client, job_project_id, location, dataset_ids, tables)
+
+    if include_columns:
+        _fetch_columns(client, job_project_id, location, dataset_ids, tables)
+
+    logger.info(f"Fetched {len(tables)} tables in {location} from INFORMATION_SCHEMA")
+    return tables
+
+
+def _fetch_table_storage(
+    client: bigquery.Client,
+    job_project_id: Optional[str],
+    location: str,
+    dataset_ids: List[str],
+    tables: Dict[Tuple[str, str], TableMetadata],
+) -> None:
+    for dataset_id, table_name, num_rows, num_bytes, modified in _query(
+        client,
+        job_project_id,
+        location,
+        dataset_ids,
+        """
+        SELECT table_schema, table_name, total_rows, total_logical_bytes,
+          storage_last_modified_time
+        FROM {region}.TABLE_STORAGE
+        WHERE table_schema IN UNNEST(@datasets) AND NOT deleted
+        """,
+    ):
+        table = tables.get((dataset_id, table_name))
+        if table is not None:
+            table.num_rows = num_rows
+            table.num_bytes = num_bytes
+            table.modified = modified
+
+
+def _fetch_columns(
+    client: bigquery.Client,
+    job_project_id: Optional[str],
+    location: str,
+    dataset_ids: List[str],
+    tables: Dict[Tuple[str, str], TableMetadata],
+) -> None:
+    # Descriptions of the columns & nested fields are only in COLUMN_FIELD_PATHS
+    descriptions: Dict[Tuple[str, str], Dict[str, str]] = defaultdict(dict)
+    columns = []
+    for (
+        dataset_id,
+        table_name,
+        column_name,
+        field_path,
+        data_type,
+        is_nullable,
+        description,
+    ) in _query(
+        client,
+        job_project_id,
+        location,
+        dataset_ids,
+        """
+        SELECT p.table_schema, p.table_name, p.column_name, p.field_path, c.data_type,
+          c.is_nullable, p.description
+        FROM {region}.COLUMN_FIELD_PATHS p
+        LEFT JOIN {region}.COLUMNS c
+          ON c.table_schema = p.table_schema AND c.table_name = p.table_name
+          AND c.column_name = p.field_path
+        WHERE p.table_schema IN UNNEST(@datasets)
+        ORDER BY p.table_schema, p.table_name, c.ordinal_position
+        """,
+    ):
+        if description:
+            descriptions[(dataset_id, table_name)][field_path] = description
+
+        # Nested fields are parsed from the column's data type
+        if data_type is not None:
+            columns.append(
+                (dataset_id, table_name, column_name, data_type, is_nullable)
+            )
+
+    for dataset_id, table_name, column_name, data_type, is_nullable in columns:
+        table = tables.get((dataset_id, table_name))
+        if table is None:
+            continue
+
+        try:
+            table.schema.append(
+                parse_column(
+                    column_name,
+                    data_type,
+                    is_nullable == "YES",
+                    descriptions[(dataset_id, table_name)],
+                )
+            )
+        except ValueError as error:
+            # Let the table be fetched using get_table instead
+            logger.warning(f"Failed to parse {dataset_id}.{table_name}: {error}")
+            table.complete = False
+
+
+def _query(
+    client: bigquery.Client,
+    job_project_id: Optional[str],
+    location: str,
+    dataset_ids: List[str],
+    query: str,
+) -> Iterable[Tuple]:
+    region = f"`{client.project}`.`region-{location.lower()}`.INFORMATION_SCHEMA"
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ArrayQueryParameter("datasets", "STRING", dataset_ids)
+        ]
+    )
+    return client.query(
+        query.format(region=region),
+        job_config=job_config,
+        location=location,
+        project=job_project_id,
+    ).result()
+
+
+def _parse_option_value(value: Optional[str]) -> Optional[str]:
+    """Option values are string literals, e.g. "description\\nwith escapes\" """
+    if value is None:
+        return None
+    try:
+        parsed = json.loads(value)
+        return parsed if isinstance(parsed, str) else value
+    except ValueError:
+        return value.strip('"')
+
+
+def parse_column(
+    name: str, data_type: str, nullable: bool, descriptions: Dict[str, str]
+) -> bigquery.SchemaField:
+    """
+    Build a SchemaField, as returned by get_table, from a column's standard SQL
+    data type, e.g. "ARRAY<STRUCT<a INT64, b STRING>>"
+    """
+    tokens = _TYPE_TOKEN.findall(data_type)
+    position, column = _parse_field(tokens, 0, name, name, descriptions)
+    if position != len(tokens):
+        raise ValueError(f"Unexpected data type {data_type}")
+
+    if column["mode"] == "NULLABLE" and not nullable:
+        column["mode"] = "REQUIRED"
+    return bigquery.SchemaField.from_api_repr(column)
+
+
+def _parse_field(
+    tokens: List[str],
+    position: int,
+    name: str,
+    field_path: str,
+    descriptions: Dict[str, str],
+) -> Tuple[int, Dict[str, Any]]:
+    """Parse a field's type into its API representation, i.e. TableFieldSchema"""
+    type_name = _token(tokens, position).upper()
+    position += 1
+    mode = "NULLABLE"
+
+    if type_name == "ARRAY":
+        mode = "REPEATED"
+        position = _expect(tokens, position, "<")
+        type_name = _token(tokens, position).upper()
+        position += 1
+
+    fields: List[Dict[str, Any]] = []
+    if type_name == "STRUCT":
+        position = _expect(tokens, position, "<")
+        while True:
+            subfield_name = _token(tokens, position).strip("`")
+            position, subfield = _parse_field(
+                tokens,
+                position + 1,
+                subfield_name,
+                f"{field_path}.{subfield_name}",
+                descriptions,
+            )
+            fields.append(subfield)
+
+            separator = _token(tokens, position)
+            position += 1
+            if separator == ">":
+                break
+            if separator != ",":
+                raise ValueError(f"Unexpected {separator}")
+    else:
+        position = _skip_parameters(tokens, position)
+
+    if mode == "REPEATED":
+        position = _expect(tokens, position, ">")
+
+    # Nested fields can be NOT NULL
+    if (
+        position + 1 < len(tokens)
+        and tokens[position].upper() == "NOT"
+        and tokens[position + 1].upper() == "NULL"
+    ):
+        position += 2
+        mode = "REQUIRED" if mode == "NULLABLE" else mode
+
+    schema_field: Dict[str, Any] = {
+        "name": name,
+        "type": _FIELD_TYPES.get(type_name, type_name),
+        "mode": mode,
+    }
+    if field_path in descriptions:
+        schema_field["description"] = descriptions[field_path]
+    if fields:
+        schema_field["fields"] = fields
+    return position, schema_field
+
+
+def _skip_parameters(tokens: List[str], position: int) -> int:
+    """Skip the parameters of a type, e.g. STRING(10) or RANGE<DATE>"""
+    if position >= len(tokens) or tokens[position] not in ("(", "<"):
+        return position
+
+    close = ")" if tokens[position] == "(" else ">"
+    while _token(tokens, position) != close:
+        position += 1
+    return position + 1
+
+
+def _token(tokens: List[str], position: int) -> str:
+    if position >= len(tokens):
+        raise ValueError("Unexpected end of data type")
+    return tokens[position]
+
+
+def _expect(tokens: List[str], position: int, token: str) -> int:
+    if _token(tokens, position) != token:
+        raise ValueError(f"Expected {token} but got {tokens[position]}")
+    return position + 1
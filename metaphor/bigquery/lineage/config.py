@@ -1,7 +1,10 @@
+from dataclasses import field
+
 from pydantic.dataclasses import dataclass
 
 from metaphor.bigquery.config import BigQueryRunConfig
 from metaphor.common.dataclass import ConnectorConfig
+from metaphor.common.sql_parser import SQLParserConfig
 
 
 @dataclass(config=ConnectorConfig)
@@ -20,3 +23,6 @@ class BigQueryLineageRunConfig(BigQueryRunConfig):
 
     # The number of access logs fetched in a batch, default to 1000
     batch_size: int = 1000
+
+    # How to parse the view queries for lineage
+    sql_parser: SQLParserConfig = field(default_factory=lambda: SQLParserConfig())
@@ -1,5 +1,5 @@
 from datetime import timedelta
-from typing import Collection, Dict
+from typing import Collection, Dict, List, Union
 
 try:
     import google.cloud.bigquery as bigquery
@@ -10,6 +10,12 @@ except ImportError:
 
 from sql_metadata import Parser
 
+from metaphor.bigquery.audit_log import list_entries
+from metaphor.bigquery.information_schema import (
+    TableMetadata,
+    dataset_locations,
+    fetch_tables,
+)
 from metaphor.bigquery.lineage.config import BigQueryLineageRunConfig
 from metaphor.bigquery.logEvent import JobChangeEvent
 from metaphor.bigquery.utils import (
@@ -22,6 +28,7 @@ from metaphor.common.base_extractor import BaseExtractor
 from metaphor.common.entity_id import dataset_normalized_name, to_dataset_entity_id
 from metaphor.common.event_util import ENTITY_TYPES
 from metaphor.common.logger import get_logger
+from metaphor.common.sql_parser import SQLParser
 from metaphor.common.utils import start_of_day
 from metaphor.models.crawler_run_metadata import Platform
 from metaphor.models.metadata_change_event import (
@@ -34,6 +41,11 @@ from metaphor.models.metadata_change_event import (
 logger = get_logger()
 
 
+def parse_tables(sql: str) -> List[str]:
+    """The tables referred to by a query"""
+    return Parser(sql).tables
+
+
 class BigQueryLineageExtractor(BaseExtractor):
     """BigQuery lineage metadata extractor"""
 
@@ -52,17 +64,22 @@ class BigQueryLineageExtractor(BaseExtractor):
         self._credentials = get_credentials(config)
         self._project_ids = config.project_ids
         self._dataset_filter = config.filter.normalize()
+        self._job_project_id = config.job_project_id or self._credentials.project_id
+        self._bulk_metadata = config.bulk_metadata
         self._enable_view_lineage = config.enable_view_lineage
         self._enable_lineage_from_log = config.enable_lineage_from_log
         self._include_self_lineage = config.include_self_lineage
         self._lookback_days = config.lookback_days
         self._batch_size = config.batch_size
+        self._max_concurrency = config.max_concurrency
+        self._sql_parser = SQLParser(parse_tables, config.sql_parser)
 
         self._datasets: Dict[str, Dataset] = {}
 
     async def extract(self) -> Collection[ENTITY_TYPES]:
-        for project_id in self._project_ids:
-            self._extract_project(project_id)
+        with self._sql_parser:
+            for project_id in self._project_ids:
+                self._extract_project(project_id)
 
         return self._datasets.values()
 
@@ -79,6 +96,10 @@ class BigQueryLineageExtractor(BaseExtractor):
             self._fetch_audit_log(logging_client)
 
     def _fetch_view_upstream(self, client: bigquery.Client, project_id: str) -> None:
+        if self._bulk_metadata:
+            self._fetch_view_upstream_bulk(client, project_id)
+            return
+
         logger.info("Fetching lineage info from BigQuery API")
 
         for bq_dataset in client.list_datasets():
@@ -109,7 +130,68 @@ class BigQueryLineageExtractor(BaseExtractor):
                 except Exception as ex:
                     logger.exception(ex)
 
-    def _parse_view_lineage(self, project_id, bq_table: bigquery.table.Table) -> None:
+    def _fetch_view_upstream_bulk(
+        self, client: bigquery.Client, project_id: str
+    ) -> None:
+        logger.info("Fetching lineage info from INFORMATION_SCHEMA")
+
+        dataset_refs = []
+        for bq_dataset in client.list_datasets():
+            if not self._dataset_filter.include_schema(
+                project_id, bq_dataset.dataset_id
+            ):
+                logger.info(f"Skipped dataset {bq_dataset.dataset_id}")
+                continue
+            dataset_refs.append(
+                bigquery.DatasetReference(client.project, bq_dataset.dataset_id)
+            )
+
+        for location, dataset_ids in dataset_locations(client, dataset_refs).items():
+            tables = fetch_tables(
+                client,
+                self._job_project_id,
+                location,
+                dataset_ids,
+                include_storage=False,
+                include_columns=False,
+            )
+
+            # Parse the view queries all at once, in parallel if configured
+            self._sql_parser.parse_all(
+                table.view_query
+                for (dataset_id, table_name), table in tables.items()
+                if table.view_query
+                and self._dataset_filter.include_table(
+                    project_id, dataset_id, table_name
+                )
+            )
+
+            for (dataset_id, table_name), table in tables.items():
+                if not self._dataset_filter.include_table(
+                    project_id, dataset_id, table_name
+                ):
+                    logger.info(f"Skipped table: {dataset_id}.{table_name}")
+                    continue
+
+                try:
+                    # Materialized view definitions are only available from the API
+                    if table.table_type == "MATERIALIZED_VIEW":
+                        self._parse_view_lineage(
+                            client.project,
+                            client.get_table(
+                                bigquery.DatasetReference(
+                                    client.project, dataset_id
+                                ).table(table_name)
+                            ),
+                        )
+                    else:
+                        self._parse_view_lineage(client.project, table)
+                except Exception as ex:
+                    logger.exception(ex)
+
+    def _parse_view_lineage(
+        self, project_id, bq_table: Union[bigquery.table.Table, TableMetadata]
+    ) -> None:
         view_query = bq_table.view_query or bq_table.mview_query
         if not view_query:
             return
@@ -119,7 +201,9 @@ class BigQueryLineageExtractor(BaseExtractor):
         )
         logger.info(f"Found view {view_name}")
 
-        tables = Parser(view_query).tables
+        tables = self._sql_parser.parse(view_query)
+        if tables is None:
+            return
 
         dataset_ids = set()
         for table in tables:
@@ -152,10 +236,15 @@ class BigQueryLineageExtractor(BaseExtractor):
     def _fetch_audit_log(self, logging_client: logging_v2.Client):
         logger.info("Fetching lineage info from BigQuery Audit log")
 
-        log_filter = self._build_job_change_filter()
+        end = start_of_day()
         fetched, parsed = 0, 0
-        for entry in logging_client.list_entries(
-            page_size=self._batch_size, filter_=log_filter
+        for entry in list_entries(
+            logging_client,
+            self._build_job_change_filter(),
+            end - timedelta(days=self._lookback_days),
+            end,
+            self._batch_size,
+            self._max_concurrency,
         ):
             fetched += 1
             try:
@@ -204,20 +293,16 @@ class BigQueryLineageExtractor(BaseExtractor):
         )
 
     def _build_job_change_filter(self):
-        end_time = start_of_day()
-        start = (end_time - timedelta(days=self._lookback_days)).isoformat()
-        end = end_time.isoformat()
+        """The filter for the job change logs, except the time range"""
 
         # See https://cloud.google.com/logging/docs/view/logging-query-language for query syntax
-        return f"""
+        return """
         resource.type="bigquery_project" AND
         protoPayload.serviceName="bigquery.googleapis.com" AND
         protoPayload.metadata.jobChange.after="DONE" AND
         NOT protoPayload.metadata.jobChange.job.jobStatus.errorResult.code:* AND
         protoPayload.metadata.jobChange.job.jobConfig.type=("COPY" OR "QUERY") AND
-        NOT protoPayload.metadata.jobChange.job.jobConfig.queryConfig.destinationTable:"/datasets/_" AND
-        timestamp >= "{start}" AND
-        timestamp < "{end}"
+        NOT protoPayload.metadata.jobChange.job.jobConfig.queryConfig.destinationTable:"/datasets/_"
         """
 
     def _init_dataset(self, table_name: str) -> Dataset:
@@ -1,13 +1,25 @@
 from dataclasses import field
+from typing import Optional
 
 from pydantic.dataclasses import dataclass
 
 from metaphor.bigquery.config import BigQueryRunConfig
 from metaphor.common.column_statistics import ColumnStatistics
 from metaphor.common.dataclass import ConnectorConfig
+from metaphor.common.profile_batch import ProfileBatchConfig
 from metaphor.common.sampling import SamplingConfig
 
 
+@dataclass(config=ConnectorConfig)
+class ScanBudgetConfig:
+    # Skip the tables (or batches of tables) whose profiling query is estimated to scan more bytes than this
+    max_bytes_per_table: Optional[int] = None
+
+    # Max number of bytes estimated to be scanned by all profiling queries.
+    # Tables are profiled from the cheapest until the budget runs out.
+    max_total_bytes: Optional[int] = None
+
+
 @dataclass(config=ConnectorConfig)
 class BigQueryProfileRunConfig(BigQueryRunConfig):
     # Compute specific types of statistics for each column
@@ -16,3 +28,9 @@ class BigQueryProfileRunConfig(BigQueryRunConfig):
     )
 
     sampling: SamplingConfig = field(default_factory=lambda: SamplingConfig())
+
+    # Limit the bytes scanned, using the estimates from dry runs
+    scan_budget: ScanBudgetConfig = field(default_factory=lambda: ScanBudgetConfig())
+
+    # Profile small tables in batches
+    batch: ProfileBatchConfig = field(default_factory=lambda: ProfileBatchConfig())
@@ -1,7 +1,5 @@
 from concurrent.futures import ThreadPoolExecutor
-from functools import partial
-from time import sleep
-from typing import Collection, List, Set, Union
+from typing import Collection, List, Tuple, Union
 
 try:
     import google.cloud.bigquery as bigquery
@@ -13,6 +11,11 @@ except ImportError:
 
 from metaphor.bigquery.extractor import BigQueryExtractor
 from metaphor.bigquery.profile.config import BigQueryProfileRunConfig, SamplingConfig
+from metaphor.bigquery.profile.scheduler import (
+    ProfiledTable,
+    ProfileJob,
+    ProfileJobScheduler,
+)
 from metaphor.bigquery.utils import build_client, get_credentials
 from metaphor.common.base_extractor import BaseExtractor
 from metaphor.common.column_statistics import ColumnStatistics
@@ -20,6 +23,7 @@ from metaphor.common.entity_id import dataset_normalized_name
 from metaphor.common.event_util import ENTITY_TYPES
 from metaphor.common.filter import DatasetFilter
 from metaphor.common.logger import get_logger
+from metaphor.common.profile_batch import build_batch_query, split_batch_result
 from metaphor.common.utils import safe_float
 from metaphor.models.crawler_run_metadata import Platform
 from metaphor.models.metadata_change_event import (
@@ -56,6 +60,8 @@ class BigQueryProfileExtractor(BaseExtractor):
         self._filter = DatasetFilter.normalize(config.filter)
         self._column_statistics = config.column_statistics
         self._sampling = config.sampling
+        self._scan_budget = config.scan_budget
+        self._batch = config.batch
         self._datasets: List[Dataset] = []
 
     async def extract(self) -> Collection[ENTITY_TYPES]:
@@ -96,90 +102,106 @@ class BigQueryProfileExtractor(BaseExtractor):
         return tables
 
     def profile(self, tables: List[TableReference]):
-        jobs: Set[QueryJob] = set()
+        with ThreadPoolExecutor(max_workers=self._max_concurrency) as executor:
+            profiled_tables = list(executor.map(self._fetch_profiled_table, tables))
 
-        def profile(table: TableReference):
-            return self._profile_table(table, jobs)
+        scheduler = ProfileJobScheduler(
+            self._client, self._job_project_id, self._max_concurrency, self._scan_budget
+        )
+        done = scheduler.run(
+            self._build_profile_jobs(profiled_tables), self._process_result
+        )
 
-        with ThreadPoolExecutor(max_workers=self._max_concurrency) as executor:
-            datasets = [dataset for dataset in executor.map(profile, tables)]
-
-        counter = 0
-        while jobs:
-            finished = len(datasets) - len(jobs)
-            if counter % 10 == 0:
-                logger.info(
-                    f"{finished} jobs done, waiting for {len(jobs)} jobs to finish ..."
+        self._datasets.extend(
+            table.dataset for job in done for table in job.tables if table.profiled
+        )
+
+    def _fetch_profiled_table(self, table: TableReference) -> ProfiledTable:
+        bq_table = self._client.get_table(table)
+        return ProfiledTable(
+            table=table,
+            schema=BigQueryExtractor.parse_schema(bq_table),
+            dataset=BigQueryProfileExtractor._init_dataset(
+                dataset_normalized_name(
+                    db=table.project, schema=table.dataset_id, table=table.table_id
                 )
-            counter += 1
-            sleep(1)
-
-        self._datasets.extend(datasets)
-
-    def _profile_table(
-        self,
-        table: TableReference,
-        jobs: Set[QueryJob],
-    ) -> Dataset:
-        def job_callback(job: QueryJob, schema: DatasetSchema, dataset: Dataset):
-            exception = job.exception()
-            if exception:
-                logger.error(f"Skip {table}, Google Client error: {exception}")
-            # The profiling result should only have one row
-            elif job.result().total_rows != 1:
-                logger.warning(
-                    f"Skip {table}, the profiling result has more than one row"
+            ),
+            row_count=bq_table.num_rows,
+        )
+
+    def _build_profile_jobs(self, tables: List[ProfiledTable]) -> List[ProfileJob]:
+        jobs: List[ProfileJob] = []
+        batched: List[ProfiledTable] = []
+        for table in tables:
+            if self._batch.should_batch(
+                table.row_count, len(table.schema.fields or []), self._sampling
+            ):
+                batched.append(table)
+                continue
+
+            logger.debug(f"building query for {table.table}")
+            sql = self._build_profiling_query(
+                table.schema,
+                table.table,
+                table.row_count,
+                self._column_statistics,
+                self._sampling,
+            )
+            jobs.append(ProfileJob(sql=sql, tables=[table]))
+
+        for batch in self._batch.batches(batched):
+            sql = self._build_batch_profiling_query(
+                [(table.schema, table.table) for table in batch],
+                self._column_statistics,
+            )
+            jobs.append(ProfileJob(sql=sql, tables=batch, batched=True))
+
+        return jobs
+
+    def _process_result(self, job: ProfileJob, query_job: QueryJob) -> bool:
+        rows = [tuple(row) for row in query_job.result()]
+
+        if job.batched:
+            widths = [
+                len(
+                    self._build_profiling_columns(table.schema, self._column_statistics)
                 )
-            else:
-                try:
-                    results = [res for res in next(job.result())]
-                    BigQueryProfileExtractor._parse_result(
-                        results, schema, dataset, self._column_statistics
-                    )
-                except AssertionError as error:
-                    logger.error(f"Assertion failed during process results, {error}")
-                except StopIteration as error:
-                    logger.error(f"Invalid result, {error}")
-                except (IndexError, ValueError, TypeError) as error:
-                    logger.error(f"Unknown error during process results, {error}")
-                except BaseException as error:
-                    jobs.remove(job.job_id)
-                    raise error
-
-            # Always remove job from the set, because the job(future) is fulfill
-            jobs.remove(job.job_id)
-
-        dataset = BigQueryProfileExtractor._init_dataset(
-            dataset_normalized_name(
-                db=table.project, schema=table.dataset_id, table=table.table_id
+                for table in job.tables
+            ]
+            for index, results in split_batch_result(rows, widths):
+                self._parse_table_result(job.tables[index], list(results))
+            return any(table.profiled for table in job.tables)
+
+        # The profiling result should only have one row
+        if len(rows) != 1:
+            logger.warning(
+                f"Skip {job.name}, the profiling result has more than one row"
             )
-        )
-        bq_table = self._client.get_table(table)
-        row_count = bq_table.num_rows
-        schema = BigQueryExtractor.parse_schema(bq_table)
+            return False
 
-        logger.debug(f"building query for {table}")
-        sql = self._build_profiling_query(
-            schema, table, row_count, self._column_statistics, self._sampling
-        )
-        job = self._client.query(sql, project=self._job_project_id)
+        self._parse_table_result(job.tables[0], list(rows[0]))
+        return job.tables[0].profiled
 
-        jobs.add(job.job_id)
-        job.add_done_callback(partial(job_callback, schema=schema, dataset=dataset))
-        logger.info(f"Job dispatched for {table}")
-        return dataset
+    def _parse_table_result(self, table: ProfiledTable, results: List) -> None:
+        try:
+            BigQueryProfileExtractor._parse_result(
+                results, table.schema, table.dataset, self._column_statistics
+            )
+            table.profiled = True
+        except AssertionError as error:
+            logger.error(f"Assertion failed during process results, {error}")
+        except (IndexError, ValueError, TypeError) as error:
+            logger.error(f"Unknown error during process results, {error}")
 
     @staticmethod
-    def _build_profiling_query(
+    def _build_profiling_columns(
         schema: DatasetSchema,
-        table_ref: TableReference,
-        row_count: Union[int, None],
         column_statistics: ColumnStatistics,
-        sampling: SamplingConfig,
-    ) -> str:
-        query = ["SELECT COUNT(1)"]
+    ) -> List[str]:
+        """The select expressions to profile the columns"""
+        expressions = ["COUNT(1)"]
 
-        for field in schema.fields:
+        for field in schema.fields or []:
             column = field.field_path
             data_type = field.native_type
 
@@ -187,22 +209,35 @@ class BigQueryProfileExtractor(BaseExtractor):
                 column_statistics.unique_count
                 and not BigQueryProfileExtractor._is_complex(data_type)
             ):
-                query.append(f", COUNT(DISTINCT `{column}`)")
+                expressions.append(f"COUNT(DISTINCT `{column}`)")
 
             if column_statistics.null_count:
-                query.append(f", COUNTIF(`{column}` is NULL)")
+                expressions.append(f"COUNTIF(`{column}` is NULL)")
 
             if BigQueryProfileExtractor._is_numeric(data_type):
                 if column_statistics.min_value:
-                    query.append(f", MIN(`{column}`)")
+                    expressions.append(f"MIN(`{column}`)")
                 if column_statistics.max_value:
-                    query.append(f", MAX(`{column}`)")
+                    expressions.append(f"MAX(`{column}`)")
                 if column_statistics.avg_value:
-                    query.append(f", AVG(`{column}`)")
+                    expressions.append(f"AVG(`{column}`)")
                 if column_statistics.std_dev:
-                    query.append(f", STDDEV(`{column}`)")
+                    expressions.append(f"STDDEV(`{column}`)")
 
-        query.append(f" FROM `{table_ref}`")
+        return expressions
+
+    @staticmethod
+    def _build_profiling_query(
+        schema: DatasetSchema,
+        table_ref: TableReference,
+        row_count: Union[int, None],
+        column_statistics: ColumnStatistics,
+        sampling: SamplingConfig,
+    ) -> str:
+        expressions = BigQueryProfileExtractor._build_profiling_columns(
+            schema, column_statistics
+        )
+        query = [f"SELECT {', '.join(expressions)} FROM `{table_ref}`"]
 
         if row_count and sampling.percentage < 100 and row_count >= sampling.threshold:
             logger.info(f"Enable table sampling for table: {table_ref}")
@@ -211,6 +246,25 @@ class BigQueryProfileExtractor(BaseExtractor):
         logger.debug(query)
         return "".join(query)
 
+    @staticmethod
+    def _build_batch_profiling_query(
+        tables: List[Tuple[DatasetSchema, TableReference]],
+        column_statistics: ColumnStatistics,
+    ) -> str:
+        """Profile multiple tables, each of (schema, table), in a single query"""
+        return build_batch_query(
+            [
+                (
+                    BigQueryProfileExtractor._build_profiling_columns(
+                        schema, column_statistics
+                    ),
+                    f"FROM `{table_ref}`",
+                )
+                for schema, table_ref in tables
+            ],
+            "CAST({} AS STRING)",
+        )
+
     @staticmethod
     def _parse_result(
         results: List,
@@ -0,0 +1,181 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+try:
+    import google.cloud.bigquery as bigquery
+    from google.cloud.bigquery import QueryJob, TableReference
+except ImportError:
+    print("Please install metaphor[bigquery] extra\n")
+    raise
+
+from metaphor.bigquery.profile.config import ScanBudgetConfig
+from metaphor.common.logger import get_logger
+from metaphor.models.metadata_change_event import Dataset, DatasetSchema
+
+logger = get_logger()
+
+
+@dataclass
+class ProfiledTable:
+    """A table to profile"""
+
+    table: TableReference
+    schema: DatasetSchema
+    dataset: Dataset
+    row_count: Optional[int] = None
+
+    # Set once the table's profiling result is parsed
+    profiled: bool = False
+
+
+@dataclass
+class ProfileJob:
+    """A profiling query to run for a table, or a batch of tables"""
+
+    sql: str
+    tables: List[ProfiledTable]
+
+    # The query profiles a batch of tables, see build_batch_query
+    batched: bool = False
+
+    # Number of bytes the query would scan, estimated by a dry run
+    estimated_bytes: Optional[int] = None
+
+    # Set once the job is done
+    slot_millis: Optional[int] = None
+    bytes_billed: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        if self.batched:
+            return f"batch of {len(self.tables)} tables from {self.tables[0].table}"
+        return str(self.tables[0].table)
+
+
+class ProfileJobScheduler:
+    """
+    Run profiling queries with at most max_jobs BigQuery jobs in flight
+
+    If a scan budget is configured, every query is dry-run first to estimate
+    the bytes it would scan. Queries over the per-query budget are skipped,
+    and the rest are run from the cheapest, until the total budget runs out.
+    """
+
+    def __init__(
+        self,
+        client: bigquery.Client,
+        job_project_id: Optional[str],
+        max_jobs: int,
+        scan_budget: ScanBudgetConfig,
+    ):
+        self._client = client
+        self._job_project_id = job_project_id
+        self._max_jobs = max(max_jobs, 1)
+        self._scan_budget = scan_budget
+
+    def run(
+        self,
+        jobs: List[ProfileJob],
+        process_result: Callable[[ProfileJob, QueryJob], bool],
+    ) -> List[ProfileJob]:
+        """
+        Run the jobs, passing each finished query job to process_result.
+        Returns the jobs that finished and whose results were processed.
+        """
+        jobs = self._plan(jobs)
+
+        with ThreadPoolExecutor(max_workers=self._max_jobs) as executor:
+            # Each worker waits for its own job, so at most max_jobs are running
+            finished = list(
+                executor.map(lambda job: self._run_job(job, process_result), jobs)
+            )
+
+        done = [job for job, ok in zip(jobs, finished) if ok]
+        logger.info(
+            f"{len(done)} profiling jobs done, "
+            f"{sum(job.slot_millis or 0 for job in done)} slot-ms, "
+            f"{sum(job.bytes_billed or 0 for job in done)} bytes billed"
+        )
+        return done
+
+    def _plan(self, jobs: List[ProfileJob]) -> List[ProfileJob]:
+        """Estimate the cost of the jobs, and drop those over the budget"""
+        if (
+            self._scan_budget.max_bytes_per_table is None
+            and self._scan_budget.max_total_bytes is None
+        ):
+            return jobs
+
+        with ThreadPoolExecutor(max_workers=self._max_jobs) as executor:
+            for job, estimated_bytes in zip(jobs, executor.map(self._dry_run, jobs)):
+                job.estimated_bytes = estimated_bytes
+
+        planned: List[ProfileJob] = []
+        total_bytes = 0
+        # Unknown estimates last
+        for job in sorted(
+            jobs,
+            key=lambda job: (job.estimated_bytes is None, job.estimated_bytes or 0),
+        ):
+            if job.estimated_bytes is None:
+                logger.warning(f"Skip {job.name}, failed to estimate bytes scanned")
+                continue
+
+            if (
+                self._scan_budget.max_bytes_per_table is not None
+                and job.estimated_bytes > self._scan_budget.max_bytes_per_table
+            ):
+                logger.warning(
+                    f"Skip {job.name}, estimated to scan {job.estimated_bytes} bytes"
+                )
+                continue
+
+            if (
+                self._scan_budget.max_total_bytes is not None
+                and total_bytes + job.estimated_bytes
+                > self._scan_budget.max_total_bytes
+            ):
+                logger.warning(f"Skip {job.name}, total scan budget exceeded")
+                continue
+
+            total_bytes += job.estimated_bytes
+            planned.append(job)
+
+        logger.info(
+            f"Running {len(planned)} of {len(jobs)} profiling jobs, "
+            f"estimated to scan {total_bytes} bytes"
+        )
+        return planned
+
+    def _dry_run(self, job: ProfileJob) -> Optional[int]:
+        try:
+            query_job = self._client.query(
+                job.sql,
+                job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False),
+                project=self._job_project_id,
+            )
+            return query_job.total_bytes_processed
+        except Exception as error:
+            logger.error(f"Dry run failed for {job.name}: {error}")
+            return None
+
+    def _run_job(
+        self, job: ProfileJob, process_result: Callable[[ProfileJob, QueryJob], bool]
+    ) -> bool:
+        try:
+            query_job = self._client.query(job.sql, project=self._job_project_id)
+            logger.info(f"Job dispatched for {job.name}")
+            query_job.result()
+        except Exception as error:
+            logger.error(f"Skip {job.name}, Google Client error: {error}")
+            return False
+
+        job.slot_millis = query_job.slot_millis
+        job.bytes_billed = query_job.total_bytes_billed
+        logger.info(
+            f"Profiled {job.name}: {job.slot_millis} slot-ms, "
+            f"{job.bytes_billed} bytes billed"
+        )
+
+        return process_result(job, query_job)
@@ -1,17 +1,46 @@
+import atexit
+import functools
 import json
+import os
 import secrets
 import tempfile
-from typing import Any, Callable, Dict, Type, TypeVar
+import threading
+import time
+from dataclasses import field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Optional,
+    Type,
+    TypeVar,
+    cast,
+)
 from urllib.parse import urlparse
+from zipfile import ZIP_DEFLATED, ZipFile
 
 import requests
-from pydantic import TypeAdapter, ValidationError
+from pydantic import Field, TypeAdapter, ValidationError
+from pydantic.dataclasses import dataclass
+from requests.adapters import HTTPAdapter
 
-from metaphor.common.logger import debug_files, get_logger
+from metaphor.common.dataclass import ConnectorConfig
+from metaphor.common.logger import add_debug_file, get_logger
 
 logger = get_logger()
 T = TypeVar("T")
 
+# Max number of connections kept alive per host
+POOL_SIZE = 20
+
+# The archives of the responses captured in log.zip
+DEBUG_ARCHIVE = "api_responses.zip"
+PREVIOUS_DEBUG_ARCHIVE = "api_responses.1.zip"
+
 
 class ApiError(Exception):
     def __init__(self, url: str, status_code: int, error_msg: str) -> None:
@@ -20,37 +49,237 @@ class ApiError(Exception):
         super().__init__(f"call {url} api failed: {status_code}\n{error_msg}")
 
 
+@dataclass(config=ConnectorConfig)
+class RetryPolicy:
+    """How to retry the requests failed with a transient error"""
+
+    # Max number of retries of a request, 0 to not retry
+    max_retries: int = Field(default=3, ge=0)
+
+    # The delay before the n-th retry is backoff_factor * 2 ** (n - 1) seconds,
+    # unless the response has a Retry-After header
+    backoff_factor: float = Field(default=1.0, ge=0)
+
+    # Max delay before a retry without a Retry-After header, in seconds
+    max_backoff: float = Field(default=60.0, ge=0)
+
+    # The status codes of the responses to retry
+    status_codes: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+
+    def delay(self, retries: int, response: Optional[requests.Response]) -> float:
+        """The seconds to wait before retrying, after the given number of retries"""
+        retry_after = (
+            response.headers.get("Retry-After") if response is not None else None
+        )
+        if retry_after:
+            try:
+                return max(float(retry_after), 0)
+            except ValueError:
+                pass
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+            except (TypeError, ValueError):
+                logger.warning(f"Invalid Retry-After header: {retry_after}")
+
+        return min(self.backoff_factor * 2**retries, self.max_backoff)
+
+
+@dataclass(config=ConnectorConfig)
+class DebugCapturePolicy:
+    """Which successful responses to add to log.zip, to debug the connectors"""
+
+    # Fraction of the responses to capture, evenly spaced, 0 to capture none
+    sample_rate: float = Field(default=1.0, ge=0, le=1)
+
+    # Max bytes captured from a response, the rest is dropped
+    max_response_bytes: int = Field(default=10 * 1024 * 1024, ge=0)
+
+    # Max bytes of the responses in an archive, before rolling over to a new
+    # one. Only the previous archive is kept.
+    max_archive_bytes: int = Field(default=100 * 1024 * 1024, ge=0)
+
+
+@dataclass(config=ConnectorConfig)
+class ApiRequestConfig:
+    """Config for the API requests of get_request, see `configure`"""
+
+    retry: RetryPolicy = field(default_factory=lambda: RetryPolicy())
+
+    debug_capture: DebugCapturePolicy = field(
+        default_factory=lambda: DebugCapturePolicy()
+    )
+
+
+class _DebugArchive:
+    """
+    The responses captured, written to one rolling zip archive. The archive is
+    kept open, as reopening it reads its whole central directory, and closed
+    when rolling over, before writing log.zip or at exit.
+    """
+
+    def __init__(self, policy: DebugCapturePolicy):
+        self.policy = policy
+        self.lock = threading.Lock()
+        self.responses = 0
+        self.directory: Optional[str] = None
+        self.archive: Optional[ZipFile] = None
+        self.size = 0
+
+    def capture(self, url: str, content: bytes) -> None:
+        with self.lock:
+            self.responses += 1
+            rate = self.policy.sample_rate
+            if int(self.responses * rate) == int((self.responses - 1) * rate):
+                return
+
+            content = content[: self.policy.max_response_bytes]
+            if self.directory is None:
+                self.directory = tempfile.mkdtemp()
+                add_debug_file(f"{self.directory}/{DEBUG_ARCHIVE}")
+            elif self.size > 0 and self.size + len(content) > (
+                self.policy.max_archive_bytes
+            ):
+                self._close()
+                previous = f"{self.directory}/{PREVIOUS_DEBUG_ARCHIVE}"
+                if not os.path.exists(previous):
+                    add_debug_file(previous)
+                os.replace(f"{self.directory}/{DEBUG_ARCHIVE}", previous)
+                self.size = 0
+
+            if self.archive is None:
+                self.archive = ZipFile(
+                    f"{self.directory}/{DEBUG_ARCHIVE}", "a", ZIP_DEFLATED
+                )
+            self.archive.writestr(_debug_file_name(url), content)
+            self.size += len(content)
+
+    def close(self) -> None:
+        with self.lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
+
+def _debug_file_name(url: str) -> str:
+    file_name = f"{urlparse(url).path[1:].replace('/', u'__')}_{secrets.token_hex(4)}"
+    # Avoid file name too long error and truncate prefix to avoid duplicate file name
+    # 250 is the lowest default maximum charactors file name length limit acrocess major file systems
+    file_name = file_name[len(file_name) - 245 :] if len(file_name) > 245 else file_name
+    return f"{file_name}.json"
+
+
+_retry_policy = RetryPolicy()
+_debug_archive = _DebugArchive(DebugCapturePolicy())
+atexit.register(lambda: _debug_archive.close())
+
+# The sessions by host, to reuse their connections
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def configure(
+    retry_policy: Optional[RetryPolicy] = None,
+    debug_capture_policy: Optional[DebugCapturePolicy] = None,
+) -> None:
+    """Set the default retry policy, or how the responses are captured"""
+    global _retry_policy, _debug_archive
+    if retry_policy is not None:
+        _retry_policy = retry_policy
+    if debug_capture_policy is not None:
+        _debug_archive.close()
+        _debug_archive = _DebugArchive(debug_capture_policy)
+
+
+def close_debug_archive() -> None:
+    """Finish writing the captured responses, before they're added to log.zip"""
+    _debug_archive.close()
+
+
+def get_session(url: str) -> requests.Session:
+    """The session of the url's host, sharing a pool of connections"""
+    parsed = urlparse(url)
+    host = f"{parsed.scheme}://{parsed.netloc}"
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+        return session
+
+
+@functools.lru_cache(maxsize=None)
+def _type_adapter(type_: Any) -> TypeAdapter:
+    # Building the validator of a type is expensive
+    return TypeAdapter(type_)
+
+
+def _get(
+    url: str,
+    headers: Dict[str, str],
+    timeout: int,
+    retry_policy: RetryPolicy,
+    **kwargs,
+) -> requests.Response:
+    session = get_session(url)
+    retries = 0
+    while True:
+        response: Optional[requests.Response] = None
+        try:
+            response = session.get(url, headers=headers, timeout=timeout, **kwargs)
+            if (
+                response.status_code not in retry_policy.status_codes
+                or retries >= retry_policy.max_retries
+            ):
+                return response
+            reason = f"status {response.status_code}"
+        except (requests.ConnectionError, requests.Timeout) as error:
+            if retries >= retry_policy.max_retries:
+                raise
+            reason = str(error)
+
+        delay = retry_policy.delay(retries, response)
+        retries += 1
+        logger.warning(
+            f"GET {url} failed ({reason}), retry {retries} in {delay:.1f} seconds"
+        )
+        time.sleep(delay)
+
+
 def get_request(
     url: str,
     headers: Dict[str, str],
     type_: Type[T],
     transform_response: Callable[[requests.Response], Any] = lambda r: r.json(),
     timeout: int = 600,  # default request timeout 600s
+    retry_policy: Optional[RetryPolicy] = None,
     **kwargs,
 ) -> T:
-    """Generic get api request to make third part api call and return with customized data class"""
-    result = requests.get(url, headers=headers, timeout=timeout, **kwargs)
-    if result.status_code == 200:
-        # Add JSON response to log.zip
-        file_name = (
-            f"{urlparse(url).path[1:].replace('/', u'__')}_{secrets.token_hex(4)}"
-        )
-        # Avoid file name too long error and truncate prefix to avoid duplicate file name
-        # 250 is the lowest default maximum charactors file name length limit acrocess major file systems
-        file_name = (
-            file_name[len(file_name) - 245 :] if len(file_name) > 245 else file_name
-        )
-        file_name = f"{file_name}.json"
-        out_file = f"{tempfile.mkdtemp()}/{file_name}"
-        with open(out_file, "w") as fp:
-            json.dump(result.json(), fp, indent=2)
-        debug_files.append(out_file)
-        try:
-            return TypeAdapter(type_).validate_python(transform_response(result))
-        except ValidationError as error:
-            logger.error(
-                f"url: {url}, result: {json.dumps(result.json())}, error: {error}"
-            )
-            raise ApiError(url, result.status_code, "cannot parse result")
-    else:
+    """
+    Generic get api request to make third part api call and return with customized data class.
+
+    The connections to each host are pooled, and the requests failed with a
+    transient error are retried, with the default retry policy unless one is
+    given. See `configure`.
+    """
+    result = _get(url, headers, timeout, retry_policy or _retry_policy, **kwargs)
+    if result.status_code != 200:
         raise ApiError(url, result.status_code, result.content.decode())
+
+    # Add JSON response to log.zip
+    _debug_archive.capture(url, result.content)
+
+    response = transform_response(result)
+    try:
+        return _type_adapter(cast(Hashable, type_)).validate_python(response)
+    except ValidationError as error:
+        logger.error(
+            f"url: {url}, result: {json.dumps(response, default=str)}, error: {error}"
+        )
+        raise ApiError(url, result.status_code, "cannot parse result")
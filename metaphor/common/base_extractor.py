@@ -1,7 +1,7 @@
 import asyncio
 import traceback
 from abc import ABC, abstractmethod
-from typing import Collection, Optional
+from typing import AsyncIterator, Callable, Collection, Optional
 
 from metaphor.common.base_config import BaseConfig
 from metaphor.common.event_util import ENTITY_TYPES
@@ -23,6 +23,23 @@ class BaseExtractor(ABC):
     async def extract(self) -> Collection[ENTITY_TYPES]:
         """Extract metadata and build messages, should be overridden"""
 
+    async def extract_stream(self) -> AsyncIterator[ENTITY_TYPES]:
+        """Extract metadata as a stream of entities
+
+        Defaults to yielding the result of extract(). Extractors can override
+        this to emit entities as soon as they are ready, so the file sink can
+        flush them without materializing the whole catalog in memory.
+        """
+        for entity in await self.extract():
+            yield entity
+
+    def commit_state(self) -> None:
+        """Called after a successful run, once the output has been written
+
+        Extractors that keep state between runs, e.g. a query log watermark,
+        should persist it here, so a failed run is retried from the same state.
+        """
+
     def __init__(self, config: BaseConfig) -> None:
         self._output = config.output
         self.error_message: Optional[str] = None
@@ -37,6 +54,24 @@ class BaseExtractor(ABC):
     def run_async(self) -> Collection[ENTITY_TYPES]:
         return asyncio.run(self.extract())
 
+    def run_stream_async(self, handler: Callable[[ENTITY_TYPES], None]) -> int:
+        """Run extract_stream() and pass each entity to the handler
+
+        The handler is called in a worker thread, one entity at a time, so
+        blocking I/O in the handler (e.g. writing a file to S3) doesn't stall
+        the event loop. Returns the number of entities extracted.
+        """
+
+        async def consume() -> int:
+            loop = asyncio.get_running_loop()
+            count = 0
+            async for entity in self.extract_stream():
+                await loop.run_in_executor(None, handler, entity)
+                count += 1
+            return count
+
+        return asyncio.run(consume())
+
     def extend_errors(self, e: Exception) -> None:
         error_message = str(e)
         stacktrace = traceback.format_exc()
@@ -1,12 +1,14 @@
 import json
 import logging
+from functools import lru_cache
 from importlib import resources
-from typing import Optional, Union
+from typing import Any, Callable, Dict, Literal, Optional, Union
 
 from jsonschema import ValidationError
 from jsonschema.validators import validator_for
 
 from metaphor import models  # type: ignore
+from metaphor.common.schema_compiler import compile_schema
 from metaphor.models.metadata_change_event import (
     Dashboard,
     Dataset,
@@ -37,17 +39,44 @@ ENTITY_TYPES = Union[
     VirtualView,
 ]
 
+# How MCEs are validated against the JSON schema:
+# - jsonschema: use the generic jsonschema validator
+# - compiled: use validation functions compiled from the schema, and only fall back
+#   to jsonschema to report the errors of invalid MCEs
+MceValidatorType = Literal["jsonschema", "compiled"]
+
+
+@lru_cache(maxsize=None)
+def _mce_schema() -> Dict[str, Any]:
+    with resources.open_text(models, "metadata_change_event.json") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def _jsonschema_validator():
+    mce_schema = _mce_schema()
+    validator_class = validator_for(mce_schema)
+    validator_class.check_schema(mce_schema)
+    return validator_class(mce_schema)
+
+
+@lru_cache(maxsize=None)
+def _compiled_validator() -> Optional[Callable[[Any], bool]]:
+    try:
+        return compile_schema(_mce_schema())
+    except NotImplementedError as e:
+        logger.warning(f"Unable to compile MCE schema, using jsonschema instead: {e}")
+        return None
+
 
 class EventUtil:
     """Event utilities"""
 
-    def __init__(self):
-        with resources.open_text(models, "metadata_change_event.json") as f:
-            mce_schema = json.load(f)
-
-        validator_class = validator_for(mce_schema)
-        validator_class.check_schema(mce_schema)
-        self._validator = validator_class(mce_schema)
+    def __init__(self, validator: MceValidatorType = "jsonschema"):
+        self._validator = _jsonschema_validator()
+        self._compiled_validator = (
+            _compiled_validator() if validator == "compiled" else None
+        )
 
     @staticmethod
     def _build_event(**kwargs) -> MetadataChangeEvent:
@@ -82,6 +111,9 @@ class EventUtil:
 
     def validate_message(self, message: dict) -> Optional[dict]:
         """Validate message against json schema"""
+        if self._compiled_validator is not None and self._compiled_validator(message):
+            return message
+
         try:
             self._validator.validate(message)
         except ValidationError as e:
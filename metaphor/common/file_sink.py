@@ -1,16 +1,31 @@
+import gzip
 import json
 import logging
+import shutil
 import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import field
 from datetime import datetime, timezone
 from os import path
-from typing import List, Optional
+from typing import Deque, Iterable, List, Literal, Optional
 from zipfile import ZIP_DEFLATED, ZipFile
 
 from pydantic.dataclasses import dataclass
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore
+
+from metaphor.common.api_request import close_debug_archive
 from metaphor.common.dataclass import ConnectorConfig
-from metaphor.common.event_util import EventUtil
+from metaphor.common.event_util import EventUtil, MceValidatorType
 from metaphor.common.logger import LOG_FILE, debug_files, get_logger
 from metaphor.common.sink import Sink
 from metaphor.common.storage import (
@@ -21,10 +36,47 @@ from metaphor.common.storage import (
 )
 from metaphor.common.utils import chunk_by_size
 from metaphor.models.crawler_run_metadata import CrawlerRunMetadata
+from metaphor.models.metadata_change_event import MetadataChangeEvent
 
 logger = get_logger()
 
 
+# JSON encoder for the MCE files. orjson (requires metaphor[orjson]) is
+# considerably faster, but unlike json.dumps it writes non-ASCII characters as
+# raw UTF-8 (so files may be split differently) and NaN as null.
+JsonEncoderType = Literal["json", "orjson"]
+
+
+def encode_record(record: dict, encoder: JsonEncoderType = "json") -> bytes:
+    """Encode a MCE record as JSON with the chosen encoder"""
+    if encoder == "orjson":
+        try:
+            return orjson.dumps(record, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # orjson can't encode integers beyond 64 bits, unlike json.dumps
+            pass
+    return json.dumps(record).encode()
+
+
+def join_records(encoded_records: Iterable[bytes]) -> bytes:
+    """Join encoded MCE records into a JSON array"""
+    return b"[" + b", ".join(encoded_records) + b"]"
+
+
+# Compression of the MCE files. The values double as the Content-Encoding of the files.
+CompressionType = Literal["gzip", "zstd"]
+
+COMPRESSION_SUFFIXES = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+
+# Streamed MCE files are staged here until the stream is closed, so partial
+# outputs are never mistaken for MCE files
+STAGING_DIRECTORY = ".staging"
+
+
 @dataclass(config=ConnectorConfig)
 class FileSinkConfig:
     # Location of the sink directory, where the MCE file and logs will be output to.
@@ -40,6 +92,22 @@ class FileSinkConfig:
     # Limit each file to < 100 MB in size
     batch_size_bytes: int = 100 * 1000 * 1000
 
+    # Write MCE files as the extractor emits entities, instead of collecting
+    # all of them in memory before writing
+    streaming: bool = False
+
+    # How to validate MCE records, "jsonschema" or "compiled"
+    mce_validator: MceValidatorType = "jsonschema"
+
+    # How to encode MCE records, "json" or "orjson" (requires orjson package)
+    json_encoder: JsonEncoderType = "json"
+
+    # Compress the MCE files, "gzip" or "zstd" (requires zstandard package)
+    compression: Optional[CompressionType] = None
+
+    # Max number of MCE files to write concurrently
+    upload_concurrency: int = 1
+
     # IAM role to assume before writing to file
     assume_role_arn: Optional[str] = None
 
@@ -52,11 +120,28 @@ class FileSink(Sink):
 
     def __init__(self, config: FileSinkConfig):
         self.path = f'{config.directory.rstrip("/")}/{int(datetime.now().timestamp())}'
+        self.staging_path = f"{self.path}/{STAGING_DIRECTORY}"
         self.write_logs = config.write_logs
         self.batch_size_count = config.batch_size_count
         self.batch_size_bytes = config.batch_size_bytes
+        self.mce_validator = config.mce_validator
+        self.json_encoder = config.json_encoder
+        self.compression = config.compression
+        self.upload_concurrency = max(config.upload_concurrency, 1)
+        self._stream_event_util: Optional[EventUtil] = None
+        self._stream_buffer: List[bytes] = []
+        self._stream_buffer_size = 0
+        self._stream_parts: List[str] = []
+        self._stream_executor: Optional[ThreadPoolExecutor] = None
+        self._stream_uploads: Deque[Future] = deque()
         logger.info(f"Write files to {self.path}")
 
+        if self.json_encoder == "orjson" and orjson is None:
+            raise ValueError("orjson encoder requires the orjson package")
+
+        if self.compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+
         if config.directory.startswith("s3://"):
             self._storage: BaseStorage = S3Storage(
                 config.assume_role_arn, config.s3_auth_config
@@ -67,32 +152,178 @@ class FileSink(Sink):
     def _sink(self, messages: List[dict]) -> bool:
         """Write records to file with auto-splitting"""
 
+        # Encode each record exactly once, and reuse it for both chunking & writing
+        encoded_records = [
+            encode_record(message, self.json_encoder) for message in messages
+        ]
+
         logger.info("Split MCE records into chunks")
         slices = chunk_by_size(
-            messages,
-            self.batch_size_count,
-            self.batch_size_bytes,
-            lambda item: len(json.dumps(item)),
+            encoded_records, self.batch_size_count, self.batch_size_bytes, len
         )
 
-        for part, slice in enumerate(slices):
-            file_name = f"{part+1}-of-{len(slices)}.json"
-            logger.info(f"Writing {file_name} ({slice.stop - slice.start} records)")
-            self._storage.write_file(
-                f"{self.path}/{file_name}",
-                json.dumps(messages[slice]),
-            )
+        with ThreadPoolExecutor(max_workers=self.upload_concurrency) as executor:
+            uploads = []
+            for part, slice in enumerate(slices):
+                file_name = f"{part+1}-of-{len(slices)}.json"
+                logger.info(f"Writing {file_name} ({slice.stop - slice.start} records)")
+                uploads.append(
+                    executor.submit(
+                        self._write_records,
+                        f"{self.path}/{self._mce_file_name(file_name)}",
+                        encoded_records[slice],
+                    )
+                )
+
+            for upload in uploads:
+                upload.result()
 
         logger.info(f"Written {len(slices)} MCE files")
 
         return True
 
+    def _mce_file_name(self, file_name: str) -> str:
+        """Add compression suffix to the file name if needed"""
+        if self.compression is None:
+            return file_name
+        return file_name + COMPRESSION_SUFFIXES[self.compression]
+
+    def _write_records(self, file_path: str, encoded_records: List[bytes]) -> None:
+        payload = join_records(encoded_records)
+
+        if self.compression == "gzip":
+            payload = gzip.compress(payload, compresslevel=6)
+        elif self.compression == "zstd":
+            payload = zstandard.ZstdCompressor().compress(payload)
+
+        self._storage.write_file(file_path, payload, True, self.compression)
+
+    def open_stream(self) -> None:
+        """Start writing MCE records as they arrive
+
+        Records are buffered until the batch limits are reached, then flushed
+        into a staging file under the ".staging" directory. Staging files are
+        moved to the usual "N-of-M.json" names once the total number of files
+        is known, i.e. in close_stream().
+        """
+        self._stream_event_util = EventUtil(self.mce_validator)
+        self._stream_buffer = []
+        self._stream_buffer_size = 0
+        self._stream_parts = []
+        self._stream_executor = ThreadPoolExecutor(max_workers=self.upload_concurrency)
+        self._stream_uploads = deque()
+
+    def write_event(self, event: MetadataChangeEvent) -> bool:
+        """Trim, validate & buffer a single MCE, flushing it to a file if needed
+
+        Returns False if the event was dropped due to validation error.
+        """
+        assert self._stream_event_util is not None, "Stream is not opened"
+
+        record = self._stream_event_util.validate_message(EventUtil.trim_event(event))
+        if record is None:
+            return False
+
+        # Same splitting logic as chunk_by_size()
+        item = encode_record(record, self.json_encoder)
+        item_size = len(item)
+        if len(self._stream_buffer) >= self.batch_size_count or (
+            self._stream_buffer
+            and self._stream_buffer_size + item_size > self.batch_size_bytes
+        ):
+            self._flush_stream()
+
+        self._stream_buffer.append(item)
+        self._stream_buffer_size += item_size
+
+        # Put an item into its own file if it exceeds the batch size
+        if self._stream_buffer_size > self.batch_size_bytes:
+            self._flush_stream()
+
+        return True
+
+    def close_stream(self) -> bool:
+        """Flush the remaining records and finalize the MCE files
+
+        Returns False if no record was written.
+        """
+        self._flush_stream()
+        self._wait_for_stream_uploads(0)
+        self._shutdown_stream()
+
+        total = len(self._stream_parts)
+        for part, staging_file in enumerate(self._stream_parts):
+            file_name = self._mce_file_name(f"{part+1}-of-{total}.json")
+            self._storage.move_file(staging_file, f"{self.path}/{file_name}")
+
+        logger.info(f"Written {total} MCE files")
+        self._stream_parts = []
+        self._remove_staging_directory()
+
+        return total > 0
+
+    def abort_stream(self) -> None:
+        """Discard all the records written since open_stream()"""
+        try:
+            self._wait_for_stream_uploads(0)
+        except Exception:
+            logger.exception("Failed to write MCE file")
+        self._shutdown_stream()
+
+        if self._stream_parts:
+            self._storage.delete_files(self._stream_parts)
+
+        self._stream_buffer = []
+        self._stream_buffer_size = 0
+        self._stream_parts = []
+        self._remove_staging_directory()
+
+    def _flush_stream(self) -> None:
+        if not self._stream_buffer:
+            return
+
+        assert self._stream_executor is not None, "Stream is not opened"
+
+        staging_file = f"{self.staging_path}/{len(self._stream_parts)+1}.json.part"
+        logger.info(
+            f"Writing {path.basename(staging_file)} ({len(self._stream_buffer)} records)"
+        )
+
+        # Limit the number of pending files, so the memory usage stays bounded
+        self._wait_for_stream_uploads(self.upload_concurrency - 1)
+        self._stream_uploads.append(
+            self._stream_executor.submit(
+                self._write_records, staging_file, self._stream_buffer
+            )
+        )
+        self._stream_parts.append(staging_file)
+
+        self._stream_buffer = []
+        self._stream_buffer_size = 0
+
+    def _wait_for_stream_uploads(self, max_pending: int) -> None:
+        while len(self._stream_uploads) > max_pending:
+            self._stream_uploads.popleft().result()
+
+    def _shutdown_stream(self) -> None:
+        if self._stream_executor is not None:
+            self._stream_executor.shutdown()
+        self._stream_executor = None
+        self._stream_event_util = None
+        self._stream_uploads = deque()
+
+    def _remove_staging_directory(self) -> None:
+        # Only local storage has directories to clean up, S3 prefixes are virtual
+        if isinstance(self._storage, LocalStorage):
+            shutil.rmtree(self.staging_path, ignore_errors=True)
+
     def sink_logs(self):
         if not self.write_logs:
             logger.info("Skip writing logs")
             return
 
         logging.shutdown()
+        close_debug_archive()
 
         _, zip_file = tempfile.mkstemp(suffix=".zip")
         dir_name = datetime.now(timezone.utc).strftime("%Y-%m-%d %H-%M-%S")
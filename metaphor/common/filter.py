@@ -1,9 +1,10 @@
-from fnmatch import fnmatch
-from typing import Dict, Optional, Set
+from functools import cached_property
+from typing import Dict, Optional, Set, Tuple
 
 from pydantic.dataclasses import dataclass
 
 from metaphor.common.dataclass import ConnectorConfig
+from metaphor.common.pattern_matcher import PatternMatcher, compile_pattern
 
 TableFilter = Set[str]
 SchemaFilter = Dict[str, Optional[TableFilter]]
@@ -83,94 +84,155 @@ class DatasetFilter:
             else None,
         )
 
-    def _accepted_by_schema_pattern(
-        self,
-        schema_name: str,
-        table_name: str,
-        schema_pattern: str,
-        table_filter: Optional[TableFilter],
-    ):
-        if fnmatch(schema_name, schema_pattern):
-            # None means all tables are accepted
-            if table_filter is None:
-                return True
+    @cached_property
+    def _compiled(self) -> "_CompiledDatasetFilter":
+        return _CompiledDatasetFilter(self.includes, self.excludes)
 
-            for table_pattern in table_filter:
-                if fnmatch(table_name, table_pattern):
-                    return True
+    def include_table_two_level(self, schema: str, table: str) -> bool:
+        return self.include_table(DUMMY_DATABASE_NAME, schema, table)
 
-        return False
+    def include_table(self, database: str, schema: str, table: str) -> bool:
+        return self._compiled.include_table(
+            database.lower(), schema.lower(), table.lower()
+        )
+
+    def include_schema_two_level(self, schema: str) -> bool:
+        return self.include_schema(DUMMY_DATABASE_NAME, schema)
 
-    def _accepted_by_database_pattern(
+    def include_schema(self, database: str, schema: str) -> bool:
+        return self._compiled.include_schema(database.lower(), schema.lower())
+
+    def include_database(
         self,
         database_name: str,
-        schema_name: str,
-        table_name: str,
-        database_pattern: str,
+    ) -> bool:
+        return self._compiled.include_database(database_name.lower())
+
+
+# Patterns of databases, each with the patterns of its schemas if not None,
+# each with the patterns of its tables if not None
+_CompiledTableFilter = PatternMatcher[bool]
+_CompiledSchemaFilter = PatternMatcher[Optional[_CompiledTableFilter]]
+_CompiledDatabaseFilter = PatternMatcher[Optional[_CompiledSchemaFilter]]
+
+
+def _compile_filter(database_filter: DatabaseFilter) -> _CompiledDatabaseFilter:
+    def compile_schema_filter(
         schema_filter: Optional[SchemaFilter],
-    ):
-        if fnmatch(database_name, database_pattern):
-            # None means all schemas are accepted
-            if schema_filter is None:
+    ) -> Optional[_CompiledSchemaFilter]:
+        if schema_filter is None:
+            return None
+        return PatternMatcher(
+            {
+                pattern: None
+                if table_filter is None
+                else PatternMatcher.from_patterns(table_filter)
+                for pattern, table_filter in schema_filter.items()
+            }
+        )
+
+    return PatternMatcher(
+        {
+            pattern: compile_schema_filter(schema_filter)
+            for pattern, schema_filter in database_filter.items()
+        }
+    )
+
+
+def _accepted_by_filter(
+    database_name: str,
+    schema_name: str,
+    table_name: str,
+    database_filter: _CompiledDatabaseFilter,
+) -> bool:
+    for schema_filter in database_filter.matches(database_name):
+        # None means all schemas are accepted
+        if schema_filter is None:
+            return True
+
+        for table_filter in schema_filter.matches(schema_name):
+            # None means all tables are accepted
+            if table_filter is None or table_filter.match(table_name):
                 return True
 
-            for pattern, table_filter in schema_filter.items():
-                if self._accepted_by_schema_pattern(
-                    schema_name, table_name, pattern, table_filter
-                ):
-                    return True
+    return False
 
-        return False
 
-    def _accepted_by_filter(
-        self,
-        database_name: str,
-        schema_name: str,
-        table_name: str,
-        database_filter: DatabaseFilter,
+class _CompiledDatasetFilter:
+    """
+    A DatasetFilter with its patterns compiled, memoizing the tables & schemas
+    it includes. The filter must not be modified once compiled.
+    """
+
+    # Max number of results to memoize
+    MAX_CACHE_SIZE = 100000
+
+    def __init__(
+        self, includes: Optional[DatabaseFilter], excludes: Optional[DatabaseFilter]
     ):
-        for pattern, schema_filter in database_filter.items():
-            if self._accepted_by_database_pattern(
-                database_name, schema_name, table_name, pattern, schema_filter
-            ):
-                return True
+        self._includes = includes
+        self._excludes = excludes
+        self._compiled_includes = (
+            _compile_filter(includes) if includes is not None else None
+        )
+        self._compiled_excludes = (
+            _compile_filter(excludes) if excludes is not None else None
+        )
 
-        return False
+        # Patterns of the databases included, and those entirely excluded
+        self._included_databases = (
+            PatternMatcher.from_patterns(includes) if includes is not None else None
+        )
+        self._excluded_databases = PatternMatcher.from_patterns(
+            pattern
+            for pattern, schema_filter in (excludes or {}).items()
+            if schema_filter is None or len(schema_filter) == 0
+        )
 
-    def include_table_two_level(self, schema: str, table: str) -> bool:
-        return self.include_table(DUMMY_DATABASE_NAME, schema, table)
+        self._tables: Dict[Tuple[str, str, str], bool] = {}
+        self._schemas: Dict[Tuple[str, str], bool] = {}
 
     def include_table(self, database: str, schema: str, table: str) -> bool:
-        database_lower = database.lower()
-        schema_lower = schema.lower()
-        table_lower = table.lower()
-
+        key = (database, schema, table)
+        included = self._tables.get(key)
+        if included is None:
+            included = self._include_table(database, schema, table)
+            if len(self._tables) >= self.MAX_CACHE_SIZE:
+                self._tables.clear()
+            self._tables[key] = included
+        return included
+
+    def _include_table(self, database: str, schema: str, table: str) -> bool:
         # Filtered out by includes
-        if self.includes is not None and not self._accepted_by_filter(
-            database_lower, schema_lower, table_lower, self.includes
+        if self._compiled_includes is not None and not _accepted_by_filter(
+            database, schema, table, self._compiled_includes
         ):
             return False
 
         # Filtered out by excludes
-        if self.excludes is not None and self._accepted_by_filter(
-            database_lower, schema_lower, table_lower, self.excludes
+        if self._compiled_excludes is not None and _accepted_by_filter(
+            database, schema, table, self._compiled_excludes
         ):
             return False
 
         return True
 
-    def include_schema_two_level(self, schema: str) -> bool:
-        return self.include_schema(DUMMY_DATABASE_NAME, schema)
-
     def include_schema(self, database: str, schema: str) -> bool:
-        database_lower = database.lower()
-        schema_lower = schema.lower()
-
+        key = (database, schema)
+        included = self._schemas.get(key)
+        if included is None:
+            included = self._include_schema(database, schema)
+            if len(self._schemas) >= self.MAX_CACHE_SIZE:
+                self._schemas.clear()
+            self._schemas[key] = included
+        return included
+
+    def _include_schema(self, database: str, schema: str) -> bool:
         def covered_by_filter(database_filter: DatabaseFilter, partial: bool):
-            if database_lower not in database_filter:
+            if database not in database_filter:
                 return False
 
-            schema_filter = database_filter[database_lower]
+            schema_filter = database_filter[database]
 
             # empty schema filter
             if schema_filter is None or len(schema_filter) == 0:
@@ -178,7 +240,7 @@ class DatasetFilter:
 
             for schema_pattern, table_filter in schema_filter.items():
                 # got a match
-                if fnmatch(schema_lower, schema_pattern):
+                if compile_pattern(schema_pattern)(schema):
                     # fully covered
                     if table_filter is None or len(table_filter) == 0:
                         return True
@@ -187,37 +249,23 @@ class DatasetFilter:
 
             return False
 
-        if self.includes is not None and not covered_by_filter(self.includes, True):
+        if self._includes is not None and not covered_by_filter(self._includes, True):
             return False
 
         # Filtered out by excludes
-        if self.excludes is not None and covered_by_filter(self.excludes, False):
+        if self._excludes is not None and covered_by_filter(self._excludes, False):
             return False
 
         return True
 
-    def include_database(
-        self,
-        database_name: str,
-    ) -> bool:
-        database_lower = database_name.lower()
-
-        if self.excludes is not None:
-            for pattern, schema_filter in self.excludes.items():
-                # Only exclude if the entire database is excluded
-                if schema_filter is not None and len(schema_filter) > 0:
-                    continue
-
-                if fnmatch(database_lower, pattern):
-                    return False
-
-        if self.includes is not None:
-            for pattern in self.includes:
-                if fnmatch(database_lower, pattern):
-                    return True
+    def include_database(self, database: str) -> bool:
+        # Only exclude if the entire database is excluded
+        if self._excluded_databases.match(database):
+            return False
 
+        if self._included_databases is not None:
             # can't match any include patterns
-            return False
+            return self._included_databases.match(database)
 
         return True
 
@@ -256,17 +304,23 @@ class TopicFilter:
 
         return TopicFilter(includes=includes, excludes=excludes)
 
-    def _accepted_by_filter(self, topic: str, table_filter: TableFilter):
-        for pattern in table_filter:
-            if fnmatch(topic, pattern):
-                return True
-        return False
+    @cached_property
+    def _compiled(
+        self,
+    ) -> Tuple[Optional[PatternMatcher[bool]], Optional[PatternMatcher[bool]]]:
+        return (
+            PatternMatcher.from_patterns(self.includes)
+            if self.includes is not None
+            else None,
+            PatternMatcher.from_patterns(self.excludes)
+            if self.excludes is not None
+            else None,
+        )
 
     def include_topic(self, topic: str) -> bool:
-        if self.includes is not None and not self._accepted_by_filter(
-            topic, self.includes
-        ):
+        includes, excludes = self._compiled
+        if includes is not None and not includes.match(topic):
             return False
-        if self.excludes is not None and self._accepted_by_filter(topic, self.excludes):
+        if excludes is not None and excludes.match(topic):
             return False
         return True
@@ -0,0 +1,112 @@
+import fnmatch
+import functools
+import re
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Mapping,
+    Match,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+_WILDCARDS = re.compile(r"[*?\[]")
+
+
+@functools.lru_cache(maxsize=None)
+def compile_pattern(pattern: str) -> Callable[[str], Optional[Match]]:
+    """Compile a glob pattern, to match names like fnmatch.fnmatchcase"""
+    return re.compile(fnmatch.translate(pattern)).match
+
+
+# A compiled pattern's (index, match, value)
+_CompiledPattern = Tuple[int, Callable[[str], Optional[Match]], T]
+
+
+class PatternMatcher(Generic[T]):
+    """
+    Glob patterns, each with a value, compiled to find the patterns matching a
+    name without trying all of them. Patterns without wildcards are looked up
+    by hash, and the others are indexed by their literal prefix, so only those
+    whose prefix starts the name are matched.
+    """
+
+    def __init__(self, patterns: Mapping[str, T]):
+        self._literals: Dict[str, Tuple[int, T]] = {}
+
+        # The patterns with wildcards, by the length of their literal prefix
+        self._prefixes: Dict[int, Dict[str, List[_CompiledPattern]]] = {}
+
+        # The patterns with the same literal prefix, combined into one regex
+        self._combined: Dict[int, Dict[str, Callable[[str], Optional[Match]]]] = {}
+
+        grouped: Dict[int, Dict[str, List[str]]] = {}
+        for index, (pattern, value) in enumerate(patterns.items()):
+            wildcard = _WILDCARDS.search(pattern)
+            if wildcard is None:
+                self._literals[pattern] = (index, value)
+                continue
+
+            prefix = pattern[: wildcard.start()]
+            self._prefixes.setdefault(len(prefix), {}).setdefault(prefix, []).append(
+                (index, compile_pattern(pattern), value)
+            )
+            grouped.setdefault(len(prefix), {}).setdefault(prefix, []).append(pattern)
+
+        for length, prefixes in grouped.items():
+            self._combined[length] = {
+                prefix: re.compile(
+                    "|".join(fnmatch.translate(pattern) for pattern in patterns)
+                ).match
+                for prefix, patterns in prefixes.items()
+            }
+
+        self._prefix_lengths = sorted(self._prefixes)
+
+    @staticmethod
+    def from_patterns(patterns: Iterable[str]) -> "PatternMatcher[bool]":
+        return PatternMatcher(dict.fromkeys(patterns, True))
+
+    def _matches(self, name: str) -> Iterable[Tuple[int, T]]:
+        literal = self._literals.get(name)
+        if literal is not None:
+            yield literal
+
+        for length in self._prefix_lengths:
+            if length > len(name):
+                break
+
+            for index, match, value in self._prefixes[length].get(name[:length], ()):
+                if match(name):
+                    yield index, value
+
+    def matches(self, name: str, ordered: bool = False) -> Iterable[T]:
+        """
+        The values of the patterns matching the name, in the original order of
+        the patterns if ordered, otherwise in no particular order
+        """
+        matches = self._matches(name)
+        if ordered:
+            matches = iter(sorted(matches, key=lambda match: match[0]))
+        return (value for _, value in matches)
+
+    def match(self, name: str) -> bool:
+        """Whether any pattern matches the name"""
+        if name in self._literals:
+            return True
+
+        for length in self._prefix_lengths:
+            if length > len(name):
+                break
+
+            match = self._combined[length].get(name[:length])
+            if match is not None and match(name):
+                return True
+
+        return False
@@ -0,0 +1,98 @@
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
+from pydantic import Field
+from pydantic.dataclasses import dataclass
+
+from metaphor.common.dataclass import ConnectorConfig
+from metaphor.common.sampling import SamplingConfig
+
+T = TypeVar("T")
+
+
+@dataclass(config=ConnectorConfig)
+class ProfileBatchConfig:
+    """Config for profiling small tables in batches"""
+
+    # Profile the small tables in batches, with a single query per batch
+    enabled: bool = False
+
+    # Only tables with at most this number of rows are profiled in batches
+    max_rows: int = Field(default=10000, ge=0)
+
+    # Only tables with at most this number of columns are profiled in batches
+    max_columns: int = Field(default=50, ge=1)
+
+    # Max number of tables profiled by a single query
+    max_tables: int = Field(default=100, ge=1)
+
+    def should_batch(
+        self, row_count: Optional[int], column_count: int, sampling: SamplingConfig
+    ) -> bool:
+        """Returns True if the table is small, and won't be sampled"""
+        return (
+            self.enabled
+            and row_count is not None
+            and row_count <= self.max_rows
+            and column_count <= self.max_columns
+            and (sampling.percentage >= 100 or row_count < sampling.threshold)
+        )
+
+    def batches(self, tables: Iterable[T]) -> Iterator[List[T]]:
+        """Split the tables into batches of at most max_tables"""
+        batch: List[T] = []
+        for table in tables:
+            batch.append(table)
+            if len(batch) == self.max_tables:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+
+def build_batch_query(selects: Sequence[Tuple[List[str], str]], cast: str) -> str:
+    """
+    Combine the profiling queries of multiple tables, each a list of select
+    expressions and a FROM clause, into a single UNION ALL query.
+
+    Each table's result is a row, whose first column is the table's index in
+    the batch. The rows are padded with NULLs to the same number of columns.
+
+    The tables' expressions share columns, whose types would be coerced to a
+    common supertype, e.g. an integer MAX to a float if another table has an
+    AVG in the same column. To keep the values exact, each expression is cast
+    to a string with the cast template, e.g. "CAST({} AS STRING)", and parsed
+    back by split_batch_result.
+    """
+    width = max(len(expressions) for expressions, _ in selects)
+    return " UNION ALL ".join(
+        "SELECT "
+        + ", ".join(
+            [str(index)]
+            + [cast.format(expression) for expression in expressions]
+            + ["NULL"] * (width - len(expressions))
+        )
+        + f" {from_clause}"
+        for index, (expressions, from_clause) in enumerate(selects)
+    )
+
+
+def _parse_value(value: Optional[str]) -> Union[int, float, None]:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def split_batch_result(
+    rows: Iterable[Sequence], widths: Sequence[int]
+) -> Iterator[Tuple[int, Tuple]]:
+    """
+    Split the result rows of a batch query into (index of table in batch,
+    profiling result of the table), given the number of expressions per table
+    """
+    for row in rows:
+        index = int(row[0])
+        yield index, tuple(_parse_value(value) for value in row[1 : widths[index] + 1])
@@ -37,7 +37,9 @@ def run_connector(
     Returns
     -------
     list
-        a list of MetadataChangeEvent written to the file sink
+        a list of MetadataChangeEvent written to the file sink. Empty if the
+        file sink is in streaming mode, as the events are written as soon as
+        they're extracted.
     """
     start_time = datetime.now()
     logger.info(f"Starting running {name} at {start_time}")
@@ -46,9 +48,20 @@ def run_connector(
     error_message = None
     stacktrace = None
 
+    # In streaming mode, the file sink must be ready before extraction starts
+    file_sink: Optional[FileSink] = None
+    if file_sink_config is not None and file_sink_config.streaming:
+        file_sink = FileSink(file_sink_config)
+
     entities: Collection[ENTITY_TYPES] = []
+    entity_count = 0
     try:
-        entities = connector.run_async()
+        if file_sink is not None:
+            entity_count = _stream_to_sink(connector, file_sink)
+        else:
+            entities = connector.run_async()
+            entity_count = len(entities)
+
         if connector.status is RunStatus.FAILURE:
             logger.warning(f"Some of {name}'s entities cannot be parsed!")
             run_status = connector.status
@@ -58,10 +71,10 @@ def run_connector(
         run_status = RunStatus.FAILURE
         error_message = str(ex)
         stacktrace = traceback.format_exc()
+        entity_count = 0
         logger.exception(ex)
 
     end_time = datetime.now()
-    entity_count = len(entities)
     logger.info(
         f"Ended running with {run_status} at {end_time}, fetched {entity_count} entities, took {format((end_time - start_time).total_seconds(), '.1f')}s"
     )
@@ -81,14 +94,44 @@ def run_connector(
     )
 
     if file_sink_config is not None:
-        file_sink = FileSink(file_sink_config)
-        file_sink.sink(events)
+        if file_sink is None:
+            file_sink = FileSink(file_sink_config)
+            file_sink.sink(events)
         file_sink.sink_metadata(run_metadata)
+
+    if run_status is RunStatus.SUCCESS:
+        try:
+            connector.commit_state()
+        except Exception as ex:
+            logger.exception(f"Failed to commit the state of {name}: {ex}")
+
+    if file_sink is not None:
         file_sink.sink_logs()
 
     return events, run_metadata
 
 
+def _stream_to_sink(connector: BaseExtractor, file_sink: FileSink) -> int:
+    """Write the entities to the file sink as the connector emits them
+
+    All the files written are discarded if the connector fails midway, same as
+    the non-streaming mode.
+    """
+
+    def write_entity(entity: ENTITY_TYPES) -> None:
+        file_sink.write_event(EventUtil.build_event(entity))
+
+    file_sink.open_stream()
+    try:
+        entity_count = connector.run_stream_async(write_entity)
+    except Exception:
+        file_sink.abort_stream()
+        raise
+
+    file_sink.close_stream()
+    return entity_count
+
+
 def metaphor_file_sink_config(
     tenant: str,
     connector_name: str,
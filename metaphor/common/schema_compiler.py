@@ -0,0 +1,238 @@
+import re
+from numbers import Number
+from typing import Any, Callable, Dict, List, Mapping, Union
+
+Validator = Callable[[Any], bool]
+
+# Keywords that don't affect validation
+_ANNOTATIONS = {
+    "$comment",
+    "$schema",
+    "default",
+    "definitions",
+    "description",
+    "examples",
+    "format",  # not asserted unless a format checker is given to jsonschema
+    "title",
+}
+
+_SUPPORTED = _ANNOTATIONS | {
+    "$ref",
+    "additionalProperties",
+    "anyOf",
+    "const",
+    "enum",
+    "items",
+    "oneOf",
+    "patternProperties",
+    "properties",
+    "type",
+}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, Number) and not isinstance(value, bool)
+
+
+def _is_integer(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, float):
+        return value.is_integer()
+    return isinstance(value, int)
+
+
+_TYPE_CHECKERS: Dict[str, Validator] = {
+    "array": lambda value: isinstance(value, list),
+    "boolean": lambda value: isinstance(value, bool),
+    "integer": _is_integer,
+    "null": lambda value: value is None,
+    "number": _is_number,
+    "object": lambda value: isinstance(value, dict),
+    "string": lambda value: isinstance(value, str),
+}
+
+
+def _equal(one: Any, two: Any) -> bool:
+    """Equality as defined by JSON schema, i.e. booleans are not numbers"""
+    if isinstance(one, str) or isinstance(two, str):
+        return one == two
+    if isinstance(one, bool) or isinstance(two, bool):
+        return isinstance(one, bool) and isinstance(two, bool) and one == two
+    if isinstance(one, list) and isinstance(two, list):
+        return len(one) == len(two) and all(_equal(a, b) for a, b in zip(one, two))
+    if isinstance(one, dict) and isinstance(two, dict):
+        return one.keys() == two.keys() and all(_equal(one[k], two[k]) for k in one)
+    return one == two
+
+
+class SchemaCompiler:
+    """
+    Compiles a JSON schema (draft 7) into plain Python validation functions.
+
+    Only a subset of the keywords is supported, enough to cover the MCE schema.
+    Compiling a schema with any other keyword raises NotImplementedError, so the
+    caller can fall back to a full-featured validator.
+
+    The compiled function only tells whether an instance is valid. Use a full
+    validator to find out why it isn't.
+
+    Like jsonschema, patternProperties are matched with Python's re.search
+    rather than ECMA-262 regular expressions, so patterns relying on
+    JavaScript-specific syntax may behave differently.
+    """
+
+    def __init__(self, root: Mapping[str, Any]):
+        self._root = root
+        self._refs: Dict[str, Validator] = {}
+
+    def compile(self) -> Validator:
+        return self._compile(self._root)
+
+    def _compile(self, schema: Union[bool, Mapping[str, Any]]) -> Validator:
+        if schema is True:
+            return lambda _: True
+        if schema is False:
+            return lambda _: False
+
+        assert isinstance(schema, Mapping), f"Invalid schema {schema}"
+
+        unsupported = set(schema.keys()) - _SUPPORTED
+        if unsupported:
+            raise NotImplementedError(f"Unsupported keywords {sorted(unsupported)}")
+
+        # $ref overrides all its sibling keywords in draft 7
+        if "$ref" in schema:
+            return self._compile_ref(schema["$ref"])
+
+        checks = self._compile_keywords(schema)
+        if not checks:
+            return lambda _: True
+        if len(checks) == 1:
+            return checks[0]
+        return lambda value: all(check(value) for check in checks)
+
+    def _compile_keywords(self, schema: Mapping[str, Any]) -> List[Validator]:
+        checks: List[Validator] = []
+        if "type" in schema:
+            checks.append(self._compile_type(schema["type"]))
+        if "enum" in schema:
+            checks.append(self._compile_enum(schema["enum"]))
+        if "const" in schema:
+            const = schema["const"]
+            checks.append(lambda value: _equal(value, const))
+        if "anyOf" in schema:
+            any_of = [self._compile(s) for s in schema["anyOf"]]
+            checks.append(lambda value: any(v(value) for v in any_of))
+        if "oneOf" in schema:
+            one_of = [self._compile(s) for s in schema["oneOf"]]
+            checks.append(lambda value: sum(1 for v in one_of if v(value)) == 1)
+        if "items" in schema:
+            checks.append(self._compile_items(schema["items"]))
+        if (
+            "properties" in schema
+            or "patternProperties" in schema
+            or "additionalProperties" in schema
+        ):
+            checks.append(self._compile_object(schema))
+        return checks
+
+    def _compile_ref(self, ref: str) -> Validator:
+        if not ref.startswith("#"):
+            raise NotImplementedError(f"Unsupported remote reference {ref}")
+
+        if ref not in self._refs:
+            # Register a placeholder first to support recursive references
+            compiled: List[Validator] = []
+            self._refs[ref] = lambda value: compiled[0](value)
+            compiled.append(self._compile(self._resolve(ref)))
+            self._refs[ref] = compiled[0]
+
+        # Look up lazily, as the reference may still be a placeholder
+        refs = self._refs
+        return lambda value: refs[ref](value)
+
+    def _resolve(self, ref: str) -> Any:
+        node: Any = self._root
+        for part in ref.lstrip("#").split("/"):
+            if part == "":
+                continue
+            part = part.replace("~1", "/").replace("~0", "~")
+            node = node[int(part)] if isinstance(node, list) else node[part]
+        return node
+
+    @staticmethod
+    def _compile_type(types: Union[str, List[str]]) -> Validator:
+        if isinstance(types, str):
+            return _TYPE_CHECKERS[types]
+
+        checkers = [_TYPE_CHECKERS[t] for t in types]
+        return lambda value: any(check(value) for check in checkers)
+
+    @staticmethod
+    def _compile_enum(enum: List[Any]) -> Validator:
+        if all(isinstance(e, str) for e in enum):
+            members = frozenset(enum)
+            return lambda value: isinstance(value, str) and value in members
+
+        return lambda value: any(_equal(value, e) for e in enum)
+
+    def _compile_items(self, items: Union[bool, Mapping, List]) -> Validator:
+        if isinstance(items, list):
+            # Tuple validation, extra items are allowed
+            validators = [self._compile(s) for s in items]
+            return lambda value: not isinstance(value, list) or all(
+                v(item) for v, item in zip(validators, value)
+            )
+
+        validator = self._compile(items)
+        return lambda value: not isinstance(value, list) or all(
+            validator(item) for item in value
+        )
+
+    def _compile_object(self, schema: Mapping[str, Any]) -> Validator:
+        properties = {
+            key: self._compile(s) for key, s in schema.get("properties", {}).items()
+        }
+        patterns = [
+            (re.compile(pattern), self._compile(s))
+            for pattern, s in schema.get("patternProperties", {}).items()
+        ]
+        additional = (
+            self._compile(schema["additionalProperties"])
+            if "additionalProperties" in schema
+            else None
+        )
+
+        def validate(value: Any) -> bool:
+            if not isinstance(value, dict):
+                return True
+
+            for key, item in value.items():
+                validator = properties.get(key)
+                if validator is not None and not validator(item):
+                    return False
+
+                matched = False
+                for regex, pattern_validator in patterns:
+                    if regex.search(key):
+                        matched = True
+                        if not pattern_validator(item):
+                            return False
+
+                if (
+                    additional is not None
+                    and validator is None
+                    and not matched
+                    and not additional(item)
+                ):
+                    return False
+
+            return True
+
+        return validate
+
+
+def compile_schema(schema: Mapping[str, Any]) -> Validator:
+    """Compile a JSON schema into a function that tells if an instance is valid"""
+    return SchemaCompiler(schema).compile()
@@ -1,11 +1,10 @@
 import logging
 from abc import ABC, abstractmethod
-from concurrent.futures import ThreadPoolExecutor
 from typing import Generator, List
 
 from metaphor.models.metadata_change_event import MetadataChangeEvent
 
-from .event_util import EventUtil
+from .event_util import EventUtil, MceValidatorType
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -14,18 +13,20 @@ logger.setLevel(logging.INFO)
 class Sink(ABC):
     """Base class for metadata sinks"""
 
+    # How to validate MCE records before sinking
+    mce_validator: MceValidatorType = "jsonschema"
+
     def sink(self, events: List[MetadataChangeEvent]) -> bool:
         """Sink MCE messages to the destination"""
-        event_util = EventUtil()
+        event_util = EventUtil(self.mce_validator)
         records = [event_util.trim_event(e) for e in events]
 
+        # Validation is CPU-bound, so it's done in the current thread as
+        # a thread pool won't help due to GIL
         logger.info("validating MCE records")
-        with ThreadPoolExecutor() as tpe:
-            valid_records = [
-                r
-                for r in tpe.map(event_util.validate_message, records)
-                if r is not None
-            ]
+        valid_records = [
+            r for r in map(event_util.validate_message, records) if r is not None
+        ]
 
         if len(valid_records) == 0:
             return False
@@ -0,0 +1,253 @@
+import json
+import multiprocessing
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from multiprocessing.pool import AsyncResult, Pool
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from pydantic import Field
+from pydantic.dataclasses import dataclass
+
+from metaphor.common.dataclass import ConnectorConfig
+from metaphor.common.logger import get_logger
+from metaphor.common.utils import md5_digest
+
+logger = get_logger()
+
+T = TypeVar("T")
+
+# Cached in place of the result of a query that failed to parse
+_FAILED = object()
+
+
+@dataclass(config=ConnectorConfig)
+class SQLParserConfig:
+    # Number of processes to parse SQL in parallel, 0 to parse in this process
+    max_workers: int = Field(default=0, ge=0)
+
+    # Seconds to wait for a query to be parsed by a process before giving up
+    timeout: float = 30
+
+    # Max number of parse results to keep in memory
+    cache_size: int = Field(default=10000, ge=0)
+
+    # Path of a SQLite file to keep the parse results across runs
+    cache_path: Optional[str] = None
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalize the whitespaces and trailing semicolons, which don't change the
+    tables a query refers to. Line breaks are kept, as they end line comments.
+    """
+    lines = (re.sub(r"[ \t\f\v]+", " ", line).strip() for line in sql.splitlines())
+    return "\n".join(line for line in lines if line).rstrip(";").rstrip()
+
+
+def sql_hash(sql: str) -> str:
+    return md5_digest(normalize_sql(sql).encode("utf-8"))
+
+
+class _DiskCache:
+    """Parse results, keyed by parser & query hash, as JSON in a SQLite file"""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT)"
+        )
+
+    def get(self, key: str) -> Any:
+        row = self._conn.execute(
+            "SELECT value FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _FAILED if row[0] is None else json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?)",
+            (key, None if value is _FAILED else json.dumps(value)),
+        )
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+
+
+class SQLParser(Generic[T]):
+    """
+    Parses SQL with the given function, memoizing the results by the hash of
+    the normalized query, in memory and optionally on disk.
+
+    With max_workers set, queries are parsed by a process pool, so that a
+    query taking longer than the timeout to parse can be given up on. The
+    parse function must be picklable, i.e. a module-level function, and its
+    results must be JSON serializable to be cached on disk.
+
+    A query that fails to parse is logged, and its result is None.
+    """
+
+    def __init__(
+        self, parse: Callable[[str], T], config: Optional[SQLParserConfig] = None
+    ):
+        config = config or SQLParserConfig()
+        self._parse = parse
+        self._name = f"{parse.__module__}.{parse.__qualname__}"
+        self._max_workers = config.max_workers
+        self._timeout = config.timeout
+        self._cache_size = config.cache_size
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._disk_cache = (
+            _DiskCache(config.cache_path) if config.cache_path is not None else None
+        )
+        self._pool: Optional[Pool] = None
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> "SQLParser[T]":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def parse(self, sql: str) -> Optional[T]:
+        return self.parse_all([sql])[0]
+
+    def parse_all(self, sqls: Iterable[str]) -> List[Optional[T]]:
+        """Parse the queries, in parallel if max_workers is set"""
+        with self._lock:
+            queries = [(sql_hash(sql), normalize_sql(sql)) for sql in sqls]
+
+            results: Dict[str, Any] = {}
+            misses: Dict[str, str] = {}
+            for key, sql in queries:
+                if key in results or key in misses:
+                    continue
+
+                cached = self._get_cached(key)
+                if cached is None:
+                    misses[key] = sql
+                else:
+                    results[key] = cached
+
+            if misses:
+                logger.debug(f"Parsing {len(misses)} queries with {self._name}")
+                if self._max_workers == 0:
+                    parsed = {
+                        key: self._parse_in_process(sql) for key, sql in misses.items()
+                    }
+                else:
+                    parsed = self._parse_in_pool(list(misses.items()))
+
+                for key, result in parsed.items():
+                    results[key] = _FAILED if result is None else result
+                    self._put_cached(key, results[key])
+
+            return [
+                None if results[key] is _FAILED else results[key] for key, _ in queries
+            ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._terminate_pool()
+            if self._disk_cache is not None:
+                self._disk_cache.close()
+                self._disk_cache = None
+
+    def _parse_in_process(self, sql: str) -> Any:
+        try:
+            return self._parse(sql)
+        except Exception as error:
+            logger.warning(f"Failed to parse SQL: {_truncate(sql)}, error: {error}")
+            return _FAILED
+
+    def _parse_in_pool(self, queries: List[Tuple[str, str]]) -> Dict[str, Any]:
+        parsed: Dict[str, Any] = {}
+        while queries:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self._max_workers)
+
+            pending = [
+                (key, sql, self._pool.apply_async(self._parse, (sql,)))
+                for key, sql in queries
+            ]
+            queries = []
+
+            for index, (key, sql, result) in enumerate(pending):
+                try:
+                    parsed[key] = self._get_result(sql, result)
+                except multiprocessing.TimeoutError:
+                    logger.warning(f"Timed out parsing SQL: {_truncate(sql)}")
+                    parsed[key] = _FAILED
+
+                    # Kill the worker stuck on the query, and retry the
+                    # unfinished queries with a new pool
+                    for key, sql, result in pending[index + 1 :]:
+                        if result.ready():
+                            parsed[key] = self._get_result(sql, result)
+                        else:
+                            queries.append((key, sql))
+                    self._terminate_pool()
+                    break
+
+        return parsed
+
+    def _get_result(self, sql: str, result: AsyncResult) -> Any:
+        try:
+            return result.get(self._timeout)
+        except multiprocessing.TimeoutError:
+            raise
+        except Exception as error:
+            logger.warning(f"Failed to parse SQL: {_truncate(sql)}, error: {error}")
+            return _FAILED
+
+    def _terminate_pool(self) -> None:
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def _get_cached(self, key: str) -> Any:
+        """Returns the cached result, _FAILED if failed, or None if not cached"""
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        if self._disk_cache is None:
+            return None
+
+        result = self._disk_cache.get(f"{self._name}:{key}")
+        if result is not None:
+            self._put_in_memory(key, result)
+        return result
+
+    def _put_cached(self, key: str, result: Any) -> None:
+        self._put_in_memory(key, result)
+        if self._disk_cache is not None:
+            self._disk_cache.put(f"{self._name}:{key}", result)
+
+    def _put_in_memory(self, key: str, result: Any) -> None:
+        if self._cache_size == 0:
+            return
+
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+
+def _truncate(sql: str, length: int = 200) -> str:
+    return sql if len(sql) <= length else f"{sql[:length]}..."
@@ -1,15 +1,20 @@
 import os
 from abc import ABC, abstractmethod
-from typing import List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 import boto3
 from aws_assume_role_lib import assume_role
 from pydantic.dataclasses import dataclass
 from smart_open import open
+from smart_open.compression import INFER_FROM_EXTENSION, NO_COMPRESSION
 
 from metaphor.common.dataclass import ConnectorConfig
 from metaphor.common.logger import get_logger
+from metaphor.common.utils import chunks
+
+if TYPE_CHECKING:
+    from metaphor.common.file_sink import FileSinkConfig
 
 logger = get_logger()
 
@@ -22,15 +27,31 @@ OWNER_FULL_CONTROL_ACL = {
     }
 }
 
+# Max number of keys in a DeleteObjects request
+# See https://docs.aws.amazon.com/AmazonS3/latest/API/API_DeleteObjects.html
+MAX_KEYS_PER_DELETE = 1000
+
 
 class BaseStorage(ABC):
     """Base class for file storage"""
 
     @abstractmethod
     def write_file(
-        self, path: str, payload: Union[str, bytes], binary_mode=False
+        self,
+        path: str,
+        payload: Union[str, bytes],
+        binary_mode=False,
+        content_encoding: Optional[str] = None,
     ) -> None:
-        """write a file to the given path"""
+        """write a file to the given path
+
+        If content_encoding (e.g. "gzip") is set, the payload is already encoded
+        and will be written as is, regardless of the file extension.
+        """
+
+    @abstractmethod
+    def read_file(self, path: str) -> Optional[bytes]:
+        """read a file from the given path, or None if it doesn't exist"""
 
     @abstractmethod
     def list_files(self, path: str, suffix: Optional[str]) -> List[str]:
@@ -40,19 +61,35 @@ class BaseStorage(ABC):
     def delete_files(self, paths: List[str]) -> None:
         """delete the given file(s)"""
 
+    @abstractmethod
+    def move_file(self, src: str, dst: str) -> None:
+        """move (rename) a file from src to dst"""
+
 
 class LocalStorage(BaseStorage):
     """Storage implementation for local file system"""
 
     def write_file(
-        self, path: str, payload: Union[str, bytes], binary_mode=False
+        self,
+        path: str,
+        payload: Union[str, bytes],
+        binary_mode=False,
+        content_encoding: Optional[str] = None,
     ) -> None:
         os.makedirs(os.path.expanduser(os.path.dirname(path)), exist_ok=True)
 
         mode = "wb" if binary_mode else "w"
-        with open(path, mode) as fp:
+        compression = NO_COMPRESSION if content_encoding else INFER_FROM_EXTENSION
+        with open(path, mode, compression=compression) as fp:
             fp.write(payload)
 
+    def read_file(self, path: str) -> Optional[bytes]:
+        if not os.path.isfile(os.path.expanduser(path)):
+            return None
+
+        with open(path, "rb") as fp:
+            return fp.read()
+
     def list_files(self, path: str, suffix: Optional[str]) -> List[str]:
         directory = os.path.expanduser(path)
         if not os.path.isdir(directory):
@@ -69,6 +106,9 @@ class LocalStorage(BaseStorage):
         for path in paths:
             os.remove(path)
 
+    def move_file(self, src: str, dst: str) -> None:
+        os.replace(src, dst)
+
 
 @dataclass(config=ConnectorConfig)
 class S3StorageConfig:
@@ -102,7 +142,11 @@ class S3Storage(BaseStorage):
         logger.info("Created S3 client")
 
     def write_file(
-        self, path: str, payload: Union[str, bytes], binary_mode=False
+        self,
+        path: str,
+        payload: Union[str, bytes],
+        binary_mode=False,
+        content_encoding: Optional[str] = None,
     ) -> None:
         transport_params = {
             **OWNER_FULL_CONTROL_ACL,
@@ -111,10 +155,28 @@ class S3Storage(BaseStorage):
             "client": self._client,
         }
 
+        compression = INFER_FROM_EXTENSION
+        if content_encoding:
+            compression = NO_COMPRESSION
+            extra_args = {"ContentEncoding": content_encoding}
+            transport_params["client_kwargs"] = {
+                method: {**kwargs, **extra_args}
+                for method, kwargs in OWNER_FULL_CONTROL_ACL["client_kwargs"].items()
+            }
+
         mode = "wb" if binary_mode else "w"
-        with open(path, mode, transport_params=transport_params) as fp:
+        with open(
+            path, mode, compression=compression, transport_params=transport_params
+        ) as fp:
             fp.write(payload)
 
+    def read_file(self, path: str) -> Optional[bytes]:
+        bucket, key = S3Storage.parse_s3_uri(path)
+        try:
+            return self._client.get_object(Bucket=bucket, Key=key)["Body"].read()
+        except self._client.exceptions.NoSuchKey:
+            return None
+
     def list_files(self, path: str, suffix: Optional[str]) -> List[str]:
         bucket, key = S3Storage.parse_s3_uri(path)
 
@@ -139,12 +201,33 @@ class S3Storage(BaseStorage):
         ]
 
     def delete_files(self, paths: List[str]) -> None:
+        keys_by_bucket: Dict[str, List[str]] = {}
         for path in paths:
             bucket, key = S3Storage.parse_s3_uri(path)
-            self._client.delete_object(
-                Bucket=bucket,
-                Key=key,
-            )
+            keys_by_bucket.setdefault(bucket, []).append(key)
+
+        for bucket, keys in keys_by_bucket.items():
+            for batch in chunks(keys, MAX_KEYS_PER_DELETE):
+                resp = self._client.delete_objects(
+                    Bucket=bucket,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+                for error in resp.get("Errors", []):
+                    logger.error(
+                        f"Failed to delete s3://{bucket}/{error.get('Key')}: {error.get('Message')}"
+                    )
+
+    def move_file(self, src: str, dst: str) -> None:
+        # S3 has no rename, do a server-side copy followed by a delete
+        src_bucket, src_key = S3Storage.parse_s3_uri(src)
+        dst_bucket, dst_key = S3Storage.parse_s3_uri(dst)
+        self._client.copy_object(
+            Bucket=dst_bucket,
+            Key=dst_key,
+            CopySource={"Bucket": src_bucket, "Key": src_key},
+            ACL="bucket-owner-full-control",
+        )
+        self._client.delete_object(Bucket=src_bucket, Key=src_key)
 
     @staticmethod
     def parse_s3_uri(uri: str) -> Tuple[str, str]:
@@ -155,3 +238,19 @@ class S3Storage(BaseStorage):
             raise ValueError(f"invalid S3 URI {uri}")
 
         return result.netloc, result.path.strip("/")
+
+
+def storage_for_path(
+    path: str, file_sink_config: Optional["FileSinkConfig"] = None
+) -> BaseStorage:
+    """
+    Storage for a local path or s3:// URI, using the output's S3 credentials
+    if available
+    """
+    if not path.startswith("s3://"):
+        return LocalStorage()
+
+    if file_sink_config is None:
+        return S3Storage()
+
+    return S3Storage(file_sink_config.assume_role_arn, file_sink_config.s3_auth_config)
@@ -1,7 +1,7 @@
 import math
 from datetime import datetime, time, timedelta, timezone
 from hashlib import md5
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
 
 from dateutil.parser import isoparse
 from pydantic import validate_email
@@ -154,6 +154,74 @@ def chunk_by_size(
     return slices
 
 
+def time_slices(
+    start: datetime,
+    end: datetime,
+    bucket_counts: Mapping[int, int],
+    slice_count: int,
+    bucket: timedelta = timedelta(hours=1),
+) -> List[Tuple[datetime, datetime]]:
+    """Split a time range into sub-ranges with roughly the same number of rows
+
+    Successive quiet buckets are merged into one sub-range, while a busy bucket
+    is split evenly, assuming its rows are distributed uniformly. The
+    sub-ranges are contiguous and together cover the whole range, so no row is
+    missed even if the estimate is off.
+
+    Parameters
+    ----------
+    start : datetime
+        Start of the range, inclusive
+    end : datetime
+        End of the range, exclusive
+    bucket_counts : Mapping[int, int]
+        Estimated number of rows in each bucket, keyed by the bucket's index
+        counting from start. Missing buckets are assumed to be empty.
+    slice_count : int
+        The ideal number of rows in each sub-range
+    bucket : timedelta
+        The length of each bucket
+
+    Returns
+    -------
+    list
+        a list of [start, end) tuples
+    """
+    assert slice_count > 0, "slice_count must be positive"
+
+    slices: List[Tuple[datetime, datetime]] = []
+    slice_start = start
+    rows = 0
+    index = 0
+    bucket_start = start
+    while bucket_start < end:
+        bucket_end = min(bucket_start + bucket, end)
+        count = bucket_counts.get(index, 0)
+
+        # Close the current sub-range if the bucket doesn't fit in
+        if rows + count > slice_count and slice_start < bucket_start:
+            slices.append((slice_start, bucket_start))
+            slice_start, rows = bucket_start, 0
+
+        if count > slice_count:
+            parts = math.ceil(count / slice_count)
+            step = (bucket_end - bucket_start) / parts
+            for part in range(parts):
+                part_end = bucket_end if part == parts - 1 else slice_start + step
+                slices.append((slice_start, part_end))
+                slice_start = part_end
+        else:
+            rows += count
+
+        index += 1
+        bucket_start = bucket_end
+
+    if slice_start < end:
+        slices.append((slice_start, end))
+
+    return slices
+
+
 def removesuffix(text: str, suffix: str):
     if text.endswith(suffix):
         return text[: -len(suffix)]
@@ -0,0 +1,127 @@
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from metaphor.common.file_sink import FileSinkConfig
+from metaphor.common.logger import get_logger
+from metaphor.common.storage import BaseStorage, storage_for_path
+
+logger = get_logger()
+
+
+class QueryLogWatermark:
+    """
+    Tracks the start time of the latest query fetched, so the next run only
+    needs to fetch the queries since then.
+
+    As query history can be late, the next run re-fetches the queries that
+    started within `overlap` before the watermark. The IDs of these queries
+    are kept, so they aren't processed twice.
+    """
+
+    def __init__(
+        self,
+        overlap: timedelta,
+        start_time: Optional[datetime] = None,
+        query_ids: Optional[Dict[str, datetime]] = None,
+    ):
+        self.overlap = overlap
+        self.start_time = start_time
+        self._query_ids: Dict[str, datetime] = dict(query_ids or {})
+        self._prune_size = max(len(self._query_ids) * 2, 1000)
+
+    def resume_from(self, default_start: datetime) -> datetime:
+        """Returns where the next fetch should start from"""
+        if self.start_time is None:
+            return default_start
+        return max(default_start, self.start_time - self.overlap)
+
+    def add(self, query_id: str, start_time: datetime) -> bool:
+        """Records a fetched query, returns False if it has been processed before"""
+        if query_id in self._query_ids:
+            return False
+
+        if self.start_time is None or start_time > self.start_time:
+            self.start_time = start_time
+
+        if start_time >= self.start_time - self.overlap:
+            self._query_ids[query_id] = start_time
+            if len(self._query_ids) >= self._prune_size:
+                self._prune()
+
+        return True
+
+    def _prune(self) -> None:
+        """Forget the queries that the next run won't fetch again"""
+        assert self.start_time is not None
+        cutoff = self.start_time - self.overlap
+        self._query_ids = {
+            query_id: start_time
+            for query_id, start_time in self._query_ids.items()
+            if start_time >= cutoff
+        }
+        self._prune_size = max(len(self._query_ids) * 2, 1000)
+
+    def to_dict(self) -> dict:
+        self._prune()
+        assert self.start_time is not None
+        return {
+            "startTime": self.start_time.isoformat(),
+            "queryIds": {
+                query_id: start_time.isoformat()
+                for query_id, start_time in self._query_ids.items()
+            },
+        }
+
+    @staticmethod
+    def from_dict(value: dict, overlap: timedelta) -> "QueryLogWatermark":
+        return QueryLogWatermark(
+            overlap,
+            datetime.fromisoformat(value["startTime"]),
+            {
+                query_id: datetime.fromisoformat(start_time)
+                for query_id, start_time in value.get("queryIds", {}).items()
+            },
+        )
+
+
+class WatermarkStore:
+    """
+    Persists query log watermarks, keyed by e.g. account, in a JSON file on
+    the local file system or S3
+    """
+
+    def __init__(self, path: str, storage: BaseStorage):
+        self._path = path
+        self._storage = storage
+
+    @staticmethod
+    def from_path(
+        path: str, file_sink_config: Optional[FileSinkConfig] = None
+    ) -> "WatermarkStore":
+        """Create a store, using the output's S3 credentials if available"""
+        return WatermarkStore(path, storage_for_path(path, file_sink_config))
+
+    def _load_all(self) -> dict:
+        content = self._storage.read_file(self._path)
+        return json.loads(content) if content else {}
+
+    def load(self, key: str, overlap: timedelta) -> QueryLogWatermark:
+        value = self._load_all().get(key)
+        if value is None:
+            logger.info(f"No watermark found for {key}")
+            return QueryLogWatermark(overlap)
+
+        watermark = QueryLogWatermark.from_dict(value, overlap)
+        logger.info(f"Loaded watermark for {key}: {watermark.start_time}")
+        return watermark
+
+    def save(self, key: str, watermark: QueryLogWatermark) -> None:
+        if watermark.start_time is None:
+            logger.info(f"No query fetched, keep the watermark for {key}")
+            return
+
+        state = self._load_all()
+        state[key] = watermark.to_dict()
+        self._storage.write_file(self._path, json.dumps(state), False)
+        logger.info(f"Saved watermark for {key}: {watermark.start_time}")
@@ -1,5 +1,9 @@
-from copy import deepcopy
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type, Union
+
+from pydantic import ValidationError
+from typing_extensions import Literal, get_args, get_origin
 
 from metaphor.common.entity_id import EntityId
 from metaphor.common.logger import get_logger
@@ -290,6 +294,59 @@ dbt_run_result_output_data_monitor_status_map: Dict[str, DataMonitorStatus] = {
 }
 """Maps a `RunResultOutput.status` to `DataMonitorStatus`."""
 
+# Top-level sections of manifest.json used to extract metadata
+MANIFEST_SECTIONS = ("metadata", "nodes", "sources", "macros", "metrics")
+
+# Resource types of the manifest nodes used to extract metadata
+_NODE_RESOURCE_TYPES = {"model", "snapshot", "test"}
+
+
+@lru_cache(maxsize=None)
+def _node_classes(manifest_class: MANIFEST_CLASS_TYPE) -> Dict[str, List[Type]]:
+    """Maps the resource types to the node classes of the manifest class"""
+    node_type = get_args(manifest_class.model_fields["nodes"].annotation)[1]
+
+    node_classes: Dict[str, List[Type]] = {}
+    for node_class in get_args(node_type):
+        resource_type = node_class.model_fields["resource_type"].annotation
+        if get_origin(resource_type) is Literal:
+            for value in get_args(resource_type):
+                node_classes.setdefault(value, []).append(node_class)
+    return node_classes
+
+
+def validate_nodes(
+    nodes_json: Dict[str, Dict], manifest_class: MANIFEST_CLASS_TYPE
+) -> Dict[str, Any]:
+    """
+    Validate the manifest nodes, each against the node classes of its resource
+    type only, rather than the union of all node classes. As with the union,
+    the first class that validates the node in strict mode, or else in lax
+    mode, is used.
+    """
+    node_classes = _node_classes(manifest_class)
+
+    nodes: Dict[str, Any] = {}
+    for key, node_json in nodes_json.items():
+        candidates = node_classes.get(node_json.get("resource_type", ""), [])
+        error: Optional[ValidationError] = None
+        for strict in (True, False):
+            for node_class in candidates:
+                try:
+                    nodes[key] = node_class.model_validate(node_json, strict=strict)
+                    break
+                except ValidationError as e:
+                    error = e
+            if key in nodes:
+                break
+
+        if key not in nodes:
+            if error is not None:
+                raise error
+            raise ValueError(f"Unknown resource type of node {key}")
+
+    return nodes
+
 
 class ArtifactParser:
     def __init__(
@@ -305,6 +362,7 @@ class ArtifactParser:
         self._project_source_url = config.project_source_url
         self._meta_ownerships = config.meta_ownerships
         self._meta_tags = config.meta_tags
+        self._lean_manifest = config.lean_manifest or config.stream_manifest
         self._datasets = datasets
         self._virtual_views = virtual_views
         self._metrics = metrics
@@ -313,9 +371,49 @@ class ArtifactParser:
         if self._account and platform == DataPlatform.SNOWFLAKE:
             self._account = normalize_snowflake_account(self._account)
 
+    @staticmethod
+    def trim_manifest(manifest_json: Dict, manifest_class: MANIFEST_CLASS_TYPE) -> Dict:
+        """
+        Empty the sections, and drop the nodes & macros, of the manifest that
+        are not used to extract metadata, in place, so they aren't validated
+        """
+        for key, value in manifest_json.items():
+            if key not in MANIFEST_SECTIONS and isinstance(value, dict):
+                manifest_json[key] = {}
+
+        # The unused sections may not be loaded at all, see load_manifest
+        for key, field in manifest_class.model_fields.items():
+            if key not in manifest_json and field.is_required():
+                manifest_json[key] = {}
+
+        nodes = manifest_json.get("nodes")
+        if nodes is not None:
+            manifest_json["nodes"] = nodes = {
+                key: node
+                for key, node in nodes.items()
+                if node.get("resource_type") in _NODE_RESOURCE_TYPES
+            }
+
+        # Only the macros the models, snapshots & metrics depend on are used
+        macros = manifest_json.get("macros")
+        if macros is not None:
+            used_macros: Set[str] = set()
+            for node in chain(
+                (nodes or {}).values(), manifest_json.get("metrics", {}).values()
+            ):
+                if node.get("resource_type") != "test":
+                    depends_on = node.get("depends_on") or {}
+                    used_macros.update(depends_on.get("macros") or [])
+
+            manifest_json["macros"] = {
+                key: macro for key, macro in macros.items() if key in used_macros
+            }
+
+        return manifest_json
+
     @staticmethod
     def sanitize_manifest(manifest_json: Dict, schema_version: str) -> Dict:
-        manifest_json = deepcopy(manifest_json)
+        """Sanitize the manifest in place"""
 
         # It's possible for dbt to generate "docs block" in the manifest that doesn't
         # conform to the JSON schema. Specifically, the "name" field can be None in
@@ -343,7 +441,7 @@ class ArtifactParser:
 
     @staticmethod
     def sanitize_run_results(run_results: Dict, schema_version: str) -> Dict:
-        run_results = deepcopy(run_results)
+        """Sanitize the run results in place"""
 
         # Temporarily strip off all the extra "compiled", "compiled_code",
         # and "relation_name" fields in results until
@@ -393,14 +491,25 @@ class ArtifactParser:
         )
         logger.info(f"parsing manifest.json {schema_version} ...")
 
-        manifest_json = ArtifactParser.sanitize_manifest(manifest_json, schema_version)
-
         dbt_manifest_class = dbt_version_manifest_class_map.get(schema_version)
         if dbt_manifest_class is None:
             raise ValueError(f"unsupported manifest schema '{schema_version}'")
 
+        if self._lean_manifest:
+            manifest_json = ArtifactParser.trim_manifest(
+                manifest_json, dbt_manifest_class
+            )
+        manifest_json = ArtifactParser.sanitize_manifest(manifest_json, schema_version)
+
         try:
-            manifest = dbt_manifest_class.model_validate(manifest_json)
+            if self._lean_manifest:
+                # Validate the nodes separately, see validate_nodes
+                nodes_json = manifest_json.get("nodes", {})
+                manifest_json["nodes"] = {}
+                manifest = dbt_manifest_class.model_validate(manifest_json)
+                manifest.nodes.update(validate_nodes(nodes_json, dbt_manifest_class))
+            else:
+                manifest = dbt_manifest_class.model_validate(manifest_json)
         except Exception as e:
             logger.error(f"Parse manifest json error: {e}")
             raise e
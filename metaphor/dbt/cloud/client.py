@@ -1,10 +1,9 @@
-import json
-import shutil
 import tempfile
 from os import path
 from typing import Dict, List, NamedTuple, Optional, Set
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from metaphor.common.logger import get_logger
 
@@ -32,27 +31,42 @@ class DbtAdminAPIClient:
         account_id: int,
         service_token: str,
         included_env_ids: Set[int] = set(),
+        max_connections: int = 10,
     ):
         self.admin_api_base_url = f"{base_url}/api/v2"
         self.account_id = account_id
         self.service_token = service_token
         self.included_env_ids = included_env_ids
 
-    def _get(self, path: str, params: Optional[Dict] = None):
+        # Reuse the connections across requests, which may be made concurrently
+        self._session = requests.Session()
+        self._session.headers.update(
+            {
+                "Content-Type": "application/json",
+                "Authorization": f"Token {self.service_token}",
+            }
+        )
+        adapter = HTTPAdapter(pool_maxsize=max_connections)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        self._artifact_dir = tempfile.mkdtemp()
+
+    def _request(self, path: str, params: Optional[Dict] = None, stream=False):
         url = f"{self.admin_api_base_url}/accounts/{self.account_id}/{path}"
         logger.debug(f"Sending request to {url}")
-        req = requests.get(
+        req = self._session.get(
             url,
             params=params,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Token {self.service_token}",
-            },
             timeout=600,  # request timeout 600s
+            stream=stream,
         )
 
         assert req.status_code == 200, f"{url} returned {req.status_code}"
-        return req.json()
+        return req
+
+    def _get(self, path: str, params: Optional[Dict] = None):
+        return self._request(path, params).json()
 
     def get_project_jobs(self, project_id: int) -> List[int]:
         offset = 0
@@ -131,17 +145,17 @@ class DbtAdminAPIClient:
         return connection.get("details").get("account")
 
     def get_run_artifact(self, run: DbtRun, artifact: str) -> str:
-        """Write a particular artifact from a run to a temp file."""
+        """Download a particular artifact from a run to a temp file."""
 
         # https://docs.getdbt.com/dbt-cloud/api-v2#operation/getArtifactsByRunId
-        artifact_json = self._get(f"runs/{run.run_id}/artifacts/{artifact}")
-
-        fd, temp_name = tempfile.mkstemp()
-        with open(fd, "w") as fp:
-            json.dump(artifact_json, fp)
+        with self._request(
+            f"runs/{run.run_id}/artifacts/{artifact}", stream=True
+        ) as resp:
+            pretty_name = path.join(
+                self._artifact_dir, f"{run.project_id}-{run.job_id}-{artifact}"
+            )
+            with open(pretty_name, "wb") as fp:
+                for chunk in resp.iter_content(chunk_size=1024 * 1024):
+                    fp.write(chunk)
 
-        pretty_name = (
-            f"{path.dirname(temp_name)}/{run.project_id}-{run.job_id}-{artifact}"
-        )
-        shutil.copyfile(temp_name, pretty_name)
         return pretty_name
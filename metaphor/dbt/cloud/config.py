@@ -1,5 +1,5 @@
 from dataclasses import field as dataclass_field
-from typing import List, Set
+from typing import List, Optional, Set
 
 from pydantic.dataclasses import dataclass
 
@@ -33,3 +33,11 @@ class DbtCloudConfig(BaseConfig):
 
     # Base URL for dbt instance
     base_url: str = "https://cloud.getdbt.com"
+
+    # Max number of concurrent requests to the dbt cloud API
+    max_concurrency: int = 10
+
+    # Local path or s3:// URI of a file to keep the last extracted run of each job
+    # in. If set, the entities of a job whose last successful run hasn't changed
+    # are reused instead of downloading and parsing its artifacts again.
+    run_cache_file: Optional[str] = None
@@ -1,10 +1,14 @@
-from typing import Collection, Dict
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+from typing import Collection, Dict, List, NamedTuple, Optional
 
 from metaphor.common.base_extractor import BaseExtractor
 from metaphor.common.event_util import ENTITY_TYPES
 from metaphor.common.logger import get_logger
-from metaphor.dbt.cloud.client import DbtAdminAPIClient
+from metaphor.common.utils import md5_digest
+from metaphor.dbt.cloud.client import DbtAdminAPIClient, DbtRun
 from metaphor.dbt.cloud.config import DbtCloudConfig
+from metaphor.dbt.cloud.run_cache import DbtRunCache
 from metaphor.dbt.config import DbtRunConfig
 from metaphor.dbt.extractor import DbtExtractor
 from metaphor.models.crawler_run_metadata import Platform
@@ -12,6 +16,22 @@ from metaphor.models.crawler_run_metadata import Platform
 logger = get_logger()
 
 
+class DbtRunArtifacts(NamedTuple):
+    """Paths of the downloaded artifacts of a run"""
+
+    run: DbtRun
+    account: Optional[str]
+    manifest: str
+    run_results: Optional[str]
+
+
+def _connector_version() -> str:
+    try:
+        return version("metaphor-connectors")
+    except PackageNotFoundError:
+        return "unknown"
+
+
 class DbtCloudExtractor(BaseExtractor):
     """
     dbt cloud metadata extractor
@@ -33,6 +53,7 @@ class DbtCloudExtractor(BaseExtractor):
         self._meta_ownerships = config.meta_ownerships
         self._meta_tags = config.meta_tags
         self._base_url = config.base_url
+        self._max_concurrency = max(config.max_concurrency, 1)
 
         self._entities: Dict[int, Collection[ENTITY_TYPES]] = {}
         self._client = DbtAdminAPIClient(
@@ -40,34 +61,85 @@ class DbtCloudExtractor(BaseExtractor):
             account_id=self._account_id,
             service_token=self._service_token,
             included_env_ids=config.environment_ids,
+            max_connections=self._max_concurrency,
+        )
+
+        # The cached entities are stale if the connector or its config changed
+        fingerprint = md5_digest(
+            repr(
+                (
+                    _connector_version(),
+                    self._account_id,
+                    self._base_url,
+                    self._meta_ownerships,
+                    self._meta_tags,
+                )
+            ).encode("utf-8")
+        )
+        self._run_cache = (
+            DbtRunCache.from_path(
+                config.run_cache_file, fingerprint, config.output.file
+            )
+            if config.run_cache_file
+            else None
         )
 
     async def extract(self) -> Collection[ENTITY_TYPES]:
         logger.info("Fetching metadata from DBT cloud")
 
-        for project_id in self._project_ids:
-            self._job_ids.update(self._client.get_project_jobs(project_id))
+        if self._run_cache is not None:
+            self._run_cache.load()
+
+        with ThreadPoolExecutor(max_workers=self._max_concurrency) as executor:
+            for jobs in executor.map(self._client.get_project_jobs, self._project_ids):
+                self._job_ids.update(jobs)
+
+            runs: Dict[int, DbtRun] = {}
+            for run in executor.map(self._get_last_run, self._job_ids):
+                if run is None:
+                    continue
+                if run.run_id in runs:
+                    logger.info(f"Found already extracted run: {run}")
+                    continue
+                runs[run.run_id] = run
 
-        for job_id in self._job_ids:
-            await self._extract_last_run(job_id)
+            new_runs = [run for run in runs.values() if not self._reuse_run(run)]
+            artifacts = list(executor.map(self._download_artifacts, new_runs))
+
+        for run_artifacts in artifacts:
+            await self._extract_run(run_artifacts)
 
         return [item for ls in self._entities.values() for item in ls]
 
-    async def _extract_last_run(self, job_id: int):
+    def commit_state(self) -> None:
+        if self._run_cache is not None:
+            self._run_cache.save()
+
+    def _get_last_run(self, job_id: int) -> Optional[DbtRun]:
         if not self._client.is_job_included(job_id):
             logger.info(f"Ignoring job ID: {job_id}")
-            return
+            return None
 
         logger.info(f"Fetching metadata for job ID: {job_id}")
 
         run = self._client.get_last_successful_run(job_id)
+        logger.info(f"Last successful run: {run}")
+        return run
 
-        if run.run_id in self._entities:
-            logger.info(f"Found already extracted run: {run}")
-            return
+    def _reuse_run(self, run: DbtRun) -> bool:
+        """Reuse the entities extracted from the run before, if cached"""
+        if self._run_cache is None:
+            return False
 
-        logger.info(f"Last successful run: {run}")
+        entities = self._run_cache.get(run.job_id, run.run_id)
+        if entities is None:
+            return False
 
+        logger.info(f"Reusing the cached entities of unchanged run: {run}")
+        self._entities[run.run_id] = entities
+        return True
+
+    def _download_artifacts(self, run: DbtRun) -> DbtRunArtifacts:
         account = self._client.get_snowflake_account(run.project_id)
         if account is not None:
             logger.info(f"Snowflake account: {account}")
@@ -76,30 +148,42 @@ class DbtCloudExtractor(BaseExtractor):
         logger.info(f"manifest.json saved to {manifest_json}")
 
         try:
-            run_results_json = self._client.get_run_artifact(run, "run_results.json")
+            run_results_json: Optional[str] = self._client.get_run_artifact(
+                run, "run_results.json"
+            )
             logger.info(f"run_results.json saved to {run_results_json}")
         except Exception:
             logger.warning("Cannot locate run_results.json")
             run_results_json = None
 
+        return DbtRunArtifacts(run, account, manifest_json, run_results_json)
+
+    async def _extract_run(self, artifacts: DbtRunArtifacts):
+        run = artifacts.run
         docs_base_url = (
             f"{self._base_url}/accounts/{self._account_id}/jobs/{run.job_id}/docs"
         )
 
         try:
             # Pass the path of the downloaded manifest file to the dbt Core extractor
-            entities = await DbtExtractor(
-                DbtRunConfig(
-                    manifest=manifest_json,
-                    run_results=run_results_json,
-                    account=account,
-                    docs_base_url=docs_base_url,
-                    output=self._output,
-                    meta_ownerships=self._meta_ownerships,
-                    meta_tags=self._meta_tags,
-                )
-            ).extract()
+            entities: List[ENTITY_TYPES] = list(
+                await DbtExtractor(
+                    DbtRunConfig(
+                        manifest=artifacts.manifest,
+                        run_results=artifacts.run_results,
+                        account=artifacts.account,
+                        docs_base_url=docs_base_url,
+                        output=self._output,
+                        meta_ownerships=self._meta_ownerships,
+                        meta_tags=self._meta_tags,
+                    )
+                ).extract()
+            )
             self._entities[run.run_id] = entities
         except Exception as e:
             logger.exception(f"Failed to parse artifacts for run {run}")
             self.extend_errors(e)
+            return
+
+        if self._run_cache is not None:
+            self._run_cache.put(run.job_id, run.run_id, entities)
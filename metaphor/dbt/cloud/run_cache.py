@@ -0,0 +1,74 @@
+import json
+from typing import Dict, List, Optional
+
+from metaphor.common.event_util import ENTITY_TYPES, EventUtil
+from metaphor.common.file_sink import FileSinkConfig
+from metaphor.common.logger import get_logger
+from metaphor.common.storage import BaseStorage, storage_for_path
+from metaphor.models.metadata_change_event import MetadataChangeEvent
+
+logger = get_logger()
+
+
+def _to_entity(event: MetadataChangeEvent) -> ENTITY_TYPES:
+    for entity in (event.dataset, event.virtual_view, event.metric):
+        if entity is not None:
+            return entity
+    raise ValueError("Unexpected entity type in dbt run cache")
+
+
+class DbtRunCache:
+    """
+    Persists the last extracted run of each job, along with the entities
+    extracted from it, in a JSON file on the local file system or S3
+
+    The entities are only reused if they were extracted with the same
+    fingerprint, i.e. connector version & config.
+    """
+
+    def __init__(self, path: str, storage: BaseStorage, fingerprint: str):
+        self._path = path
+        self._storage = storage
+        self._fingerprint = fingerprint
+        self._runs: Dict[str, dict] = {}
+
+    @staticmethod
+    def from_path(
+        path: str, fingerprint: str, file_sink_config: Optional[FileSinkConfig] = None
+    ) -> "DbtRunCache":
+        """Create a cache, using the output's S3 credentials if available"""
+        return DbtRunCache(path, storage_for_path(path, file_sink_config), fingerprint)
+
+    def load(self) -> None:
+        content = self._storage.read_file(self._path)
+        self._runs = json.loads(content) if content else {}
+        logger.info(f"Loaded {len(self._runs)} cached runs from {self._path}")
+
+    def get(self, job_id: int, run_id: int) -> Optional[List[ENTITY_TYPES]]:
+        """Returns the entities extracted from the run, if it's the cached one"""
+        cached = self._runs.get(str(job_id))
+        if (
+            cached is None
+            or cached.get("run_id") != run_id
+            or cached.get("fingerprint") != self._fingerprint
+        ):
+            return None
+
+        return [
+            _to_entity(MetadataChangeEvent.from_dict(event))
+            for event in cached.get("events", [])
+        ]
+
+    def put(self, job_id: int, run_id: int, entities: List[ENTITY_TYPES]) -> None:
+        self._runs[str(job_id)] = {
+            "run_id": run_id,
+            "fingerprint": self._fingerprint,
+            "events": [
+                EventUtil.trim_event(EventUtil.build_event(entity))
+                for entity in entities
+            ],
+        }
+
+    def save(self) -> None:
+        self._storage.write_file(self._path, json.dumps(self._runs), False)
+        logger.info(f"Saved {len(self._runs)} runs to {self._path}")
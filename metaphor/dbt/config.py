@@ -57,3 +57,11 @@ class DbtRunConfig(BaseConfig):
 
     # map meta field to tags
     meta_tags: List[MetaTag] = dataclass_field(default_factory=lambda: [])
+
+    # only validate the parts of the manifest used to extract metadata, i.e. skip
+    # the docs, exposures, semantic models, seeds, unused macros, etc.
+    lean_manifest: bool = False
+
+    # stream the manifest with ijson (requires metaphor[dbt] extra) to only load
+    # the sections used to extract metadata into memory, implies lean_manifest
+    stream_manifest: bool = False
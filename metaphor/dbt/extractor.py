@@ -1,10 +1,15 @@
 import json
-from typing import Collection, Dict, List
+from typing import Collection, Dict, List, Optional, Sequence
+
+try:
+    import ijson
+except ImportError:
+    ijson = None  # type: ignore
 
 from metaphor.common.base_extractor import BaseExtractor
 from metaphor.common.event_util import ENTITY_TYPES
 from metaphor.common.logger import add_debug_file, get_logger
-from metaphor.dbt.artifact_parser import ArtifactParser
+from metaphor.dbt.artifact_parser import MANIFEST_SECTIONS, ArtifactParser
 from metaphor.dbt.config import DbtRunConfig
 from metaphor.models.crawler_run_metadata import Platform
 from metaphor.models.metadata_change_event import (
@@ -17,6 +22,28 @@ from metaphor.models.metadata_change_event import (
 logger = get_logger()
 
 
+def load_manifest(path: str, sections: Optional[Sequence[str]] = None) -> Dict:
+    """
+    Load manifest.json, or only its given top-level sections, streamed with
+    ijson so that the whole manifest is never loaded into memory at once
+    """
+    if sections is None:
+        with open(path) as file:
+            return json.load(file)
+
+    if ijson is None:
+        raise ImportError("Streaming the manifest requires metaphor[dbt] extra")
+
+    # Each top-level section is built & discarded in turn if not needed, so at
+    # most one unused section is held in memory at a time
+    with open(path, "rb") as file:
+        return {
+            key: value
+            for key, value in ijson.kvitems(file, "", use_float=True)
+            if key in sections
+        }
+
+
 class DbtExtractor(BaseExtractor):
     """
     dbt metadata extractor
@@ -48,8 +75,10 @@ class DbtExtractor(BaseExtractor):
     async def extract(self) -> Collection[ENTITY_TYPES]:
         logger.info("Fetching metadata from DBT repo")
 
-        with open(self._manifest) as file:
-            manifest_json = json.load(file)
+        manifest_json = load_manifest(
+            self._manifest,
+            MANIFEST_SECTIONS if self._config.stream_manifest else None,
+        )
 
         manifest_metadata = manifest_json.get("metadata", {})
         platform = manifest_metadata.get("adapter_type", "").upper()
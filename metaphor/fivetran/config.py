@@ -2,6 +2,7 @@ from dataclasses import field as dataclass_field
 
 from pydantic.dataclasses import dataclass
 
+from metaphor.common.api_request import ApiRequestConfig
 from metaphor.common.base_config import BaseConfig
 from metaphor.common.dataclass import ConnectorConfig
 from metaphor.common.filter import DatasetFilter
@@ -14,3 +15,8 @@ class FivetranRunConfig(BaseConfig):
 
     # Include or exclude specific databases/schemas/tables
     filter: DatasetFilter = dataclass_field(default_factory=lambda: DatasetFilter())
+
+    # How to retry the API requests, and capture their responses
+    api_request: ApiRequestConfig = dataclass_field(
+        default_factory=lambda: ApiRequestConfig()
+    )
@@ -4,7 +4,7 @@ from typing import Collection, Dict, List, Optional, Type
 
 from requests.auth import HTTPBasicAuth
 
-from metaphor.common.api_request import ApiError, get_request
+from metaphor.common.api_request import ApiError, configure, get_request
 from metaphor.common.base_extractor import BaseExtractor
 from metaphor.common.entity_id import (
     dataset_normalized_name,
@@ -127,6 +127,7 @@ class FivetranExtractor(BaseExtractor):
 
     def __init__(self, config: FivetranRunConfig) -> None:
         super().__init__(config)
+        configure(config.api_request.retry, config.api_request.debug_capture)
         self._auth = HTTPBasicAuth(username=config.api_key, password=config.api_secret)
         self._datasets: Dict[str, Dataset] = {}
         self._source_datasets: Dict[str, Dataset] = {}
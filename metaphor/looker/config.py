@@ -1,3 +1,4 @@
+from dataclasses import field
 from typing import Dict, Optional
 
 from pydantic import model_validator
@@ -6,6 +7,7 @@ from pydantic.dataclasses import dataclass
 from metaphor.common.base_config import BaseConfig
 from metaphor.common.dataclass import ConnectorConfig
 from metaphor.common.git import GitRepoConfig
+from metaphor.common.sql_parser import SQLParserConfig
 from metaphor.common.utils import must_set_exactly_one
 from metaphor.models.metadata_change_event import DataPlatform
 
@@ -47,6 +49,18 @@ class LookerRunConfig(BaseConfig):
     verify_ssl: bool = True
     timeout: int = 120
 
+    # Max number of dashboards to fetch concurrently
+    max_concurrency: int = 10
+
+    # Max number of retries for a rate-limited request
+    max_retries: int = 5
+
+    # How to parse the SQL of derived tables
+    sql_parser: SQLParserConfig = field(default_factory=lambda: SQLParserConfig())
+
+    # Number of processes to load & resolve the LookML models, 0 to do so in this process
+    lookml_max_workers: int = 0
+
     @model_validator(mode="after")
     def have_local_or_git_dir_for_lookml(self):
         must_set_exactly_one(self.__dict__, ["lookml_dir", "lookml_git_repo"])
@@ -1,11 +1,15 @@
 import os
-from typing import Collection, Dict, Iterable, List, Sequence, Set, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Collection, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 from metaphor.common.git import clone_repo
 from metaphor.models.crawler_run_metadata import Platform
 
 try:
     import looker_sdk
+    from looker_sdk.error import SDKError
+    from looker_sdk.sdk.api40.models import Dashboard as LookerDashboard
     from looker_sdk.sdk.api40.models import DashboardElement
 except ImportError:
     print("Please install metaphor[looker] extra\n")
@@ -32,6 +36,22 @@ from metaphor.models.metadata_change_event import (
 
 logger = get_logger()
 
+# Only fetch the dashboard fields used by the extractor, see
+# https://cloud.google.com/looker/docs/reference/looker-api/latest/methods/Dashboard/dashboard
+DASHBOARD_FIELDS = (
+    "id,title,description,view_count,preferred_viewer,"
+    "dashboard_elements(id,title,type,note_text,"
+    "result_maker(vis_config,filterables(model,view)))"
+)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Whether the request failed with 429 Too Many Requests"""
+    if not isinstance(error, SDKError):
+        return False
+    message = str(error.message).lower()
+    return "429" in message or "too many requests" in message
+
 
 class LookerExtractor(BaseExtractor):
     """Looker metadata extractor"""
@@ -69,6 +89,11 @@ class LookerExtractor(BaseExtractor):
         self._lookml_dir = config.lookml_dir
         self._lookml_git_repo = config.lookml_git_repo
         self._project_source_url = config.project_source_url
+        self._sql_parser_config = config.sql_parser
+        self._lookml_max_workers = config.lookml_max_workers
+        self._max_concurrency = max(config.max_concurrency, 1)
+        self._max_retries = config.max_retries
+        self._initial_backoff = 1.0
 
         # Load config using environment variables instead from looker.ini file
         # See https://github.com/looker-open-source/sdk-codegen#environment-variable-configuration
@@ -95,7 +120,11 @@ class LookerExtractor(BaseExtractor):
         logger.info(f"Parsing LookML project at {lookml_dir}")
 
         model_map, virtual_views = parse_project(
-            lookml_dir, connections, self._project_source_url
+            lookml_dir,
+            connections,
+            self._project_source_url,
+            self._sql_parser_config,
+            self._lookml_max_workers,
         )
 
         dashboards = self._fetch_dashboards(model_map)
@@ -106,60 +135,84 @@ class LookerExtractor(BaseExtractor):
         return entities
 
     def _fetch_dashboards(self, model_map: Dict[str, Model]) -> List[Dashboard]:
+        dashboard_ids = [
+            dashboard.id for dashboard in self._sdk.all_dashboards(fields="id")
+        ]
+        logger.info(f"Fetching {len(dashboard_ids)} dashboards")
+
         dashboards: List[Dashboard] = []
-        for basic_dashboard in self._sdk.all_dashboards():
-            assert basic_dashboard.id is not None
+        with ThreadPoolExecutor(max_workers=self._max_concurrency) as executor:
+            for dashboard in executor.map(self._fetch_dashboard, dashboard_ids):
+                if dashboard is not None:
+                    dashboards.append(self._build_dashboard(dashboard, model_map))
+
+        return dashboards
+
+    def _fetch_dashboard(
+        self, dashboard_id: Optional[str]
+    ) -> Optional[LookerDashboard]:
+        assert dashboard_id is not None
 
+        backoff = self._initial_backoff
+        for attempt in range(self._max_retries + 1):
             try:
-                dashboard = self._sdk.dashboard(dashboard_id=basic_dashboard.id)
+                return self._sdk.dashboard(
+                    dashboard_id=dashboard_id, fields=DASHBOARD_FIELDS
+                )
             except Exception as error:
-                logger.error(f"Failed to fetch dashboard {basic_dashboard.id}: {error}")
-                continue
+                if not is_rate_limited(error) or attempt == self._max_retries:
+                    logger.error(f"Failed to fetch dashboard {dashboard_id}: {error}")
+                    return None
 
-            logger.info(f"Processing dashboard {basic_dashboard.id}")
+                logger.info(
+                    f"Rate limited fetching dashboard {dashboard_id}, retry in {backoff}s"
+                )
+                time.sleep(backoff)
+                backoff *= 2
 
-            dashboard_info = DashboardInfo(
-                title=dashboard.title,
-                description=dashboard.description,
-                charts=[],
-            )
+        return None
 
-            source_info = SourceInfo(
-                main_url=f"{self._base_url}/{dashboard.preferred_viewer}/{dashboard.id}",
-            )
+    def _build_dashboard(
+        self, dashboard: LookerDashboard, model_map: Dict[str, Model]
+    ) -> Dashboard:
+        logger.info(f"Processing dashboard {dashboard.id}")
 
-            # All numeric fields must be converted to "float" to meet quicktype's expectation
-            if dashboard.view_count is not None:
-                dashboard_info.view_count = float(dashboard.view_count)
+        dashboard_info = DashboardInfo(
+            title=dashboard.title,
+            description=dashboard.description,
+            charts=[],
+        )
 
-            entity_upstream = None
-            if dashboard.dashboard_elements is not None:
-                (dashboard_info.charts, entity_upstream) = self._extract_charts(
-                    dashboard.dashboard_elements, model_map
-                )
+        source_info = SourceInfo(
+            main_url=f"{self._base_url}/{dashboard.preferred_viewer}/{dashboard.id}",
+        )
 
-            assert dashboard.id is not None
-
-            # Dashboard id is guaranteed to look like `model_name::dashboard_name`
-            # Ref: https://www.googlecloudcommunity.com/gc/Technical-Tips-Tricks/How-can-I-find-the-id-of-a-LookML-dashboard/ta-p/592288
-            directory, name = dashboard.id.rsplit("::", 1)
-
-            dashboards.append(
-                Dashboard(
-                    logical_id=DashboardLogicalID(
-                        dashboard.id, DashboardPlatform.LOOKER
-                    ),
-                    dashboard_info=dashboard_info,
-                    source_info=source_info,
-                    entity_upstream=entity_upstream,
-                    structure=AssetStructure(
-                        directories=[directory],
-                        name=name,
-                    ),
-                )
+        # All numeric fields must be converted to "float" to meet quicktype's expectation
+        if dashboard.view_count is not None:
+            dashboard_info.view_count = float(dashboard.view_count)
+
+        entity_upstream = None
+        if dashboard.dashboard_elements is not None:
+            (dashboard_info.charts, entity_upstream) = self._extract_charts(
+                dashboard.dashboard_elements, model_map
             )
 
-        return dashboards
+        assert dashboard.id is not None
+
+        # Dashboard id is guaranteed to look like `model_name::dashboard_name`
+        # Ref: https://www.googlecloudcommunity.com/gc/Technical-Tips-Tricks/How-can-I-find-the-id-of-a-LookML-dashboard/ta-p/592288
+        directory, name = dashboard.id.rsplit("::", 1)
+
+        return Dashboard(
+            logical_id=DashboardLogicalID(dashboard.id, DashboardPlatform.LOOKER),
+            dashboard_info=dashboard_info,
+            source_info=source_info,
+            entity_upstream=entity_upstream,
+            structure=AssetStructure(
+                directories=[directory],
+                name=name,
+            ),
+        )
 
     def _extract_charts(
         self,
@@ -3,9 +3,11 @@ import glob
 import logging
 import operator
 import os
+import posixpath
 import re
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, Iterator, List, Optional, Pattern, Set, Tuple
 
 try:
     import lkml
@@ -20,6 +22,7 @@ from metaphor.common.entity_id import (
     to_virtual_view_entity_id,
 )
 from metaphor.common.logger import get_logger
+from metaphor.common.sql_parser import SQLParser, SQLParserConfig
 from metaphor.common.utils import unique_list
 from metaphor.looker.config import LookerConnectionConfig
 from metaphor.models.metadata_change_event import (
@@ -104,8 +107,21 @@ def _to_dataset_id(source_name: str, connection: LookerConnectionConfig) -> Enti
     return to_dataset_entity_id(full_name, connection.platform, connection.account)
 
 
+def parse_tables(sql: str) -> List[str]:
+    """The tables referred to by a query"""
+    return sql_metadata.Parser(sql).tables
+
+
+def _derived_table_sql(sql: str) -> str:
+    # strip the brackets around referenced view name
+    return re.sub(r"\${(.+\.SQL_TABLE_NAME)}", r"\1", sql)
+
+
 def _get_upstream_datasets(
-    view_name, raw_model: RawModel, connection: LookerConnectionConfig
+    view_name,
+    raw_model: RawModel,
+    connection: LookerConnectionConfig,
+    sql_parser: SQLParser[List[str]],
 ) -> Set[EntityId]:
     raw_views = raw_model.raw_views
     raw_view = raw_views.get(view_name)
@@ -125,7 +141,7 @@ def _get_upstream_datasets(
         if "sql" in derived_table:
             upstreams = set(
                 _extract_upstream_datasets_from_sql(
-                    derived_table["sql"], raw_model, connection
+                    derived_table["sql"], raw_model, connection, sql_parser
                 )
             )
 
@@ -140,7 +156,9 @@ def _get_upstream_datasets(
                 base_view_name = explore_name
 
             upstreams.update(
-                _get_upstream_datasets(base_view_name, raw_model, connection)
+                _get_upstream_datasets(
+                    base_view_name, raw_model, connection, sql_parser
+                )
             )
 
     # Set upstream via sql_table_name
@@ -159,22 +177,22 @@ def _get_upstream_datasets(
 
 
 def _extract_upstream_datasets_from_sql(
-    sql: str, raw_model: RawModel, connection: LookerConnectionConfig
+    sql: str,
+    raw_model: RawModel,
+    connection: LookerConnectionConfig,
+    sql_parser: SQLParser[List[str]],
 ) -> Set[EntityId]:
     upstreams: Set[EntityId] = set()
     try:
-        # strip the brackets around referenced view name
-        sql = re.sub(r"\${(.+\.SQL_TABLE_NAME)}", r"\1", sql)
-
         # parse SQL tables
-        tables = sql_metadata.Parser(sql).tables
+        tables = sql_parser.parse(_derived_table_sql(sql)) or []
         for table in tables:
             if table.endswith(".SQL_TABLE_NAME"):
                 # Selecting from another derived table
                 # https://docs.looker.com/data-modeling/learning-lookml/sql-and-referring-to-lookml
                 view_name = table.split(".")[0]
                 upstreams.update(
-                    _get_upstream_datasets(view_name, raw_model, connection)
+                    _get_upstream_datasets(view_name, raw_model, connection, sql_parser)
                 )
             else:
                 upstreams.add(_to_dataset_id(table, connection))
@@ -201,6 +219,7 @@ def _build_looker_view(
     raw_model: RawModel,
     connection: LookerConnectionConfig,
     url: Optional[str],
+    sql_parser: SQLParser[List[str]],
 ) -> VirtualView:
     name = raw_view["name"]
     view = LookerView(
@@ -210,7 +229,8 @@ def _build_looker_view(
 
     try:
         view.source_datasets = [
-            str(ds) for ds in _get_upstream_datasets(name, raw_model, connection)
+            str(ds)
+            for ds in _get_upstream_datasets(name, raw_model, connection, sql_parser)
         ]
     except Exception:
         logger.exception(f"Can't determine upstream datasets for view {name}")
@@ -466,6 +486,105 @@ def _to_absolute_include(include_path: str, file_path: str, base_dir: str) -> st
     return f"/{rel_dir}/{include_path}"
 
 
+# Matches zero or more directories, which aren't hidden, for "**" in a glob
+_GLOB_DIRECTORIES = r"(?:(?!\.)[^/]+/)*"
+
+
+def _glob_to_regex(pattern: str) -> Pattern:
+    """
+    Translate a recursive glob pattern, relative to the project directory, into
+    a regex matching the same relative paths as glob.glob(recursive=True)
+    """
+    regex = ""
+    segments = pattern.split("/")
+    for index, segment in enumerate(segments):
+        if segment == "**":
+            regex += _GLOB_DIRECTORIES
+            continue
+
+        # Like glob, wildcards don't match hidden files & directories
+        if segment[:1] in ("*", "?", "["):
+            regex += r"(?!\.)"
+
+        position = 0
+        while position < len(segment):
+            char = segment[position]
+            position += 1
+            if char == "*":
+                regex += "[^/]*"
+            elif char == "?":
+                regex += "[^/]"
+            elif char == "[" and "]" in segment[position + 1 :]:
+                end = segment.index("]", position + 1)
+                chars = segment[position:end]
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                regex += "[" + chars.replace("\\", "\\\\") + "]"
+                position = end + 1
+            else:
+                regex += re.escape(char)
+
+        if index < len(segments) - 1:
+            regex += "/"
+
+    return re.compile(f"{regex}\\Z")
+
+
+class LookMLFiles:
+    """
+    The LookML files of a project. The project directory is only walked once,
+    to match include patterns against, and each file is parsed at most once
+    per version, i.e. keyed by its normalized path & mtime.
+    """
+
+    def __init__(self, base_dir: str):
+        self._base_dir = base_dir
+        self._paths = sorted(self._walk())
+        self._matches: Dict[str, List[str]] = {}
+        self._parsed: Dict[Tuple[str, float], Dict] = {}
+
+    def _walk(self) -> Iterator[str]:
+        for dir_path, _, file_names in os.walk(self._base_dir):
+            rel_dir = os.path.relpath(dir_path, self._base_dir)
+            for file_name in file_names:
+                if file_name.endswith(".lkml"):
+                    rel_path = os.path.normpath(os.path.join(rel_dir, file_name))
+                    yield rel_path.replace(os.sep, "/")
+
+    def glob(self, include_path: str) -> List[str]:
+        """The paths of the files matched by an absolute include path"""
+        pattern = posixpath.normpath(include_path.lstrip("/"))
+        if not pattern.endswith(".lkml"):
+            pattern = pattern + ".lkml"
+
+        if pattern.startswith("../"):
+            # Outside of the project directory, i.e. not indexed
+            return glob.glob(f"{self._base_dir}/{pattern}", recursive=True)
+
+        matches = self._matches.get(pattern)
+        if matches is None:
+            regex = _glob_to_regex(pattern)
+            matches = [
+                os.path.join(self._base_dir, path)
+                for path in self._paths
+                if regex.match(path)
+            ]
+            self._matches[pattern] = matches
+        return matches
+
+    def load(self, file_path: str) -> Dict:
+        """Parse a LookML file, unless it's already parsed"""
+        normpath = os.path.normpath(file_path)
+        key = (normpath, os.path.getmtime(normpath))
+        root = self._parsed.get(key)
+        if root is None:
+            logger.info(f"Processing LookML file {normpath}")
+            with open(normpath) as f:
+                root = lkml.load(f)
+            self._parsed[key] = root
+        return root
+
+
 def _load_included_file(
     include_path: str,
     base_dir: str,
@@ -474,6 +593,7 @@ def _load_included_file(
     raw_explores: Dict[str, Dict],
     entity_urls: Dict[str, Optional[str]],
     processed_files: Set[str],
+    files: LookMLFiles,
 ):
     """Load all files matched by the pattern defined in include_path
 
@@ -481,11 +601,7 @@ def _load_included_file(
     corresponding URL in entity_urls. This function will also recursively load any additional
     files includes by each file.
     """
-    glob_pattern = f"{base_dir}/{include_path}"
-    if not glob_pattern.endswith(".lkml"):
-        glob_pattern = glob_pattern + ".lkml"
-
-    for file_path in glob.glob(glob_pattern, recursive=True):
+    for file_path in files.glob(include_path):
         # Skip processed files to avoid circular includes
         normpath = os.path.normpath(file_path)
         if normpath in processed_files:
@@ -493,33 +609,34 @@ def _load_included_file(
         processed_files.add(normpath)
 
         url = _get_entity_url(file_path, base_dir, projectSourceUrl)
-        with open(file_path) as f:
-            logger.info(f"Processing view file {normpath}")
-
-            root = lkml.load(f)
-            for view in root.get("views", []):
-                raw_views[view["name"]] = view
-                entity_urls[view["name"]] = url
-
-            for explore in root.get("explores", []):
-                raw_explores[explore["name"]] = explore
-                entity_urls[explore["name"]] = url
-
-            # A file can further include other files
-            # https://docs.looker.com/reference/model-params/include#using_include_in_a_view_file
-            for include_path in root.get("includes", []):
-                # Convert to absolute include
-                include_path = _to_absolute_include(include_path, file_path, base_dir)
-
-                _load_included_file(
-                    include_path,
-                    base_dir,
-                    projectSourceUrl,
-                    raw_views,
-                    raw_explores,
-                    entity_urls,
-                    processed_files,
-                )
+        root = files.load(file_path)
+
+        # The parsed views & explores are shared by the models including the
+        # file, so each model gets its own copies to annotate
+        for view in root.get("views", []):
+            raw_views[view["name"]] = dict(view)
+            entity_urls[view["name"]] = url
+
+        for explore in root.get("explores", []):
+            raw_explores[explore["name"]] = dict(explore)
+            entity_urls[explore["name"]] = url
+
+        # A file can further include other files
+        # https://docs.looker.com/reference/model-params/include#using_include_in_a_view_file
+        for include_path in root.get("includes", []):
+            # Convert to absolute include
+            include_path = _to_absolute_include(include_path, file_path, base_dir)
+
+            _load_included_file(
+                include_path,
+                base_dir,
+                projectSourceUrl,
+                raw_views,
+                raw_explores,
+                entity_urls,
+                processed_files,
+                files,
+            )
 
 
 def _load_model(
@@ -527,12 +644,12 @@ def _load_model(
     base_dir: str,
     connections: Dict[str, LookerConnectionConfig],
     projectSourceUrl: Optional[str],
+    files: LookMLFiles,
 ) -> Tuple[RawModel, Dict[str, Optional[str]], LookerConnectionConfig]:
     """
     Loads model file and extract raw Views and Explores
     """
-    with open(model_path) as f:
-        model = lkml.load(f)
+    model = files.load(model_path)
 
     logger.info(f"Processing model {model_path}")
 
@@ -554,17 +671,18 @@ def _load_model(
             raw_explores,
             entity_urls,
             set(),
+            files,
         )
 
     url = _get_entity_url(model_path, base_dir, projectSourceUrl)
 
     # Add explores & views defined in model
     for explore in model.get("explores", []):
-        raw_explores[explore["name"]] = explore
+        raw_explores[explore["name"]] = dict(explore)
         entity_urls[explore["name"]] = url
 
     for view in model.get("views", []):
-        raw_views[view["name"]] = view
+        raw_views[view["name"]] = dict(view)
         entity_urls[view["name"]] = url
 
     connection_name = model.get("connection", "").lower()
@@ -579,58 +697,124 @@ def _load_model(
     return raw_model, entity_urls, connection
 
 
+# The project's files in a worker process, see _load_resolved_model_in_worker
+_worker_files: Optional[LookMLFiles] = None
+
+
+def _init_worker(base_dir: str) -> None:
+    global _worker_files
+    _worker_files = LookMLFiles(base_dir)
+
+
+def _load_resolved_model(
+    model_path: str,
+    base_dir: str,
+    connections: Dict[str, LookerConnectionConfig],
+    projectSourceUrl: Optional[str],
+    files: LookMLFiles,
+) -> Tuple[RawModel, RawModel, Dict[str, Optional[str]], LookerConnectionConfig]:
+    raw_model, entity_urls, connection = _load_model(
+        model_path, base_dir, connections, projectSourceUrl, files
+    )
+    return raw_model, _resolve_model(raw_model), entity_urls, connection
+
+
+def _load_resolved_model_in_worker(
+    model_path: str,
+    base_dir: str,
+    connections: Dict[str, LookerConnectionConfig],
+    projectSourceUrl: Optional[str],
+) -> Tuple[RawModel, RawModel, Dict[str, Optional[str]], LookerConnectionConfig]:
+    assert _worker_files is not None, "Worker not initialized"
+    return _load_resolved_model(
+        model_path, base_dir, connections, projectSourceUrl, _worker_files
+    )
+
+
 def parse_project(
     base_dir: str,
     connections: Dict[str, LookerConnectionConfig],
     projectSourceUrl: Optional[str] = None,
+    sql_parser_config: Optional[SQLParserConfig] = None,
+    max_workers: int = 0,
 ) -> Tuple[Dict[str, Model], List[VirtualView]]:
     """
     parse the project under base_dir, returning a Model map and a list of virtual views including
     Looker Explores and Views
     https://docs.looker.com/data-modeling/getting-started/how-project-works
+
+    With max_workers set, the models are loaded & resolved by a process pool.
     """
     model_map = {}
     virtual_views = []
 
-    for model_path in glob.glob(f"{base_dir}/**/*.model.lkml", recursive=True):
-        model_name = os.path.basename(model_path)[0 : -len(".model.lkml")]
-        raw_model, entity_urls, connection = _load_model(
-            model_path, base_dir, connections, projectSourceUrl
-        )
+    files = LookMLFiles(base_dir)
+    model_paths = files.glob("/**/*.model.lkml")
+
+    if max_workers > 0:
+        with ProcessPoolExecutor(
+            max_workers, initializer=_init_worker, initargs=(base_dir,)
+        ) as executor:
+            load = functools.partial(
+                _load_resolved_model_in_worker,
+                base_dir=base_dir,
+                connections=connections,
+                projectSourceUrl=projectSourceUrl,
+            )
+            models = list(executor.map(load, model_paths))
+    else:
+        models = [
+            _load_resolved_model(
+                model_path, base_dir, connections, projectSourceUrl, files
+            )
+            for model_path in model_paths
+        ]
 
-        resolved_model = _resolve_model(raw_model)
+    with SQLParser(parse_tables, sql_parser_config) as sql_parser:
+        for model_path, (raw_model, resolved_model, entity_urls, connection) in zip(
+            model_paths, models
+        ):
+            model_name = os.path.basename(model_path)[0 : -len(".model.lkml")]
 
-        virtual_views.extend(
-            [
-                _build_looker_view(
-                    model_name,
-                    view,
-                    resolved_model,
-                    connection,
-                    entity_urls.get(view["name"]),
-                )
+            # Parse the derived tables' SQL all at once, in parallel if configured
+            sql_parser.parse_all(
+                _derived_table_sql(view["derived_table"]["sql"])
                 for view in resolved_model.raw_views.values()
-                # Exclude views that require extension
-                # https://docs.looker.com/reference/view-params/extension-for-view
-                if view.get("extension", "") != "required"
-            ]
-        )
+                if "sql" in view.get("derived_table", {})
+            )
 
-        virtual_views.extend(
-            [
-                _build_looker_explore(
-                    model_name,
-                    explore,
-                    resolved_model,
-                    entity_urls.get(explore["name"]),
-                )
-                for explore in resolved_model.raw_explores.values()
-                # Exclude explores that require extension
-                # https://docs.looker.com/reference/view-params/extension-for-view
-                if explore.get("extension", "") != "required"
-            ]
-        )
+            virtual_views.extend(
+                [
+                    _build_looker_view(
+                        model_name,
+                        view,
+                        resolved_model,
+                        connection,
+                        entity_urls.get(view["name"]),
+                        sql_parser,
+                    )
+                    for view in resolved_model.raw_views.values()
+                    # Exclude views that require extension
+                    # https://docs.looker.com/reference/view-params/extension-for-view
+                    if view.get("extension", "") != "required"
+                ]
+            )
+
+            virtual_views.extend(
+                [
+                    _build_looker_explore(
+                        model_name,
+                        explore,
+                        resolved_model,
+                        entity_urls.get(explore["name"]),
+                    )
+                    for explore in resolved_model.raw_explores.values()
+                    # Exclude explores that require extension
+                    # https://docs.looker.com/reference/view-params/extension-for-view
+                    if explore.get("extension", "") != "required"
+                ]
+            )
 
-        model_map[model_name] = Model.from_dict(raw_model)
+            model_map[model_name] = Model.from_dict(raw_model)
 
     return model_map, virtual_views
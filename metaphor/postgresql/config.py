@@ -18,3 +18,6 @@ class PostgreSQLRunConfig(BaseConfig):
     filter: DatasetFilter = field(default_factory=lambda: DatasetFilter())
 
     port: int = 5432
+
+    # Max number of databases to crawl at the same time
+    max_concurrency: int = 1
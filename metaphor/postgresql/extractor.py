@@ -1,4 +1,5 @@
-from typing import Callable, Collection, Dict, List, Optional, Tuple
+import asyncio
+from typing import Awaitable, Callable, Collection, Dict, List, Optional, Tuple
 
 try:
     import asyncpg
@@ -36,6 +37,9 @@ _ignored_schemas = [
     "catalog_history",
 ]
 
+# Max number of catalog queries to run at the same time for a database
+_CATALOG_QUERY_CONCURRENCY = 3
+
 
 class PostgreSQLExtractor(BaseExtractor):
     """PostgreSQL metadata extractor"""
@@ -56,6 +60,7 @@ class PostgreSQLExtractor(BaseExtractor):
         self._password = config.password
         self._filter = config.filter.normalize()
         self._port = config.port
+        self._max_concurrency = max(config.max_concurrency, 1)
 
         self._datasets: Dict[str, Dataset] = {}
 
@@ -68,17 +73,57 @@ class PostgreSQLExtractor(BaseExtractor):
             else list(self._filter.includes.keys())
         )
 
-        for db in databases:
-            conn = await self._connect_database(db)
-            try:
-                await self._fetch_tables(conn, db)
-                await self._fetch_columns(conn, db)
-                await self._fetch_constraints(conn, db)
-            finally:
-                await conn.close()
+        await self._crawl_databases(databases)
 
         return self._datasets.values()
 
+    async def _crawl_databases(self, databases: List[str]) -> None:
+        """Crawl at most max_concurrency databases at the same time"""
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def crawl(database: str) -> None:
+            async with semaphore:
+                await self._crawl_database(database)
+
+        await asyncio.gather(*(crawl(database) for database in databases))
+
+    async def _crawl_database(self, database: str) -> None:
+        pool = await self._create_pool(database)
+        try:
+            # Other catalog queries add to the datasets created from the tables
+            await self._run_query(pool, lambda conn: self._fetch_tables(conn, database))
+            await asyncio.gather(
+                self._run_query(pool, lambda conn: self._fetch_columns(conn, database)),
+                self._run_query(
+                    pool, lambda conn: self._fetch_constraints(conn, database)
+                ),
+            )
+        finally:
+            await pool.close()
+
+    async def _create_pool(self, database: str) -> asyncpg.Pool:
+        """
+        Create a connection pool for the catalog queries of a database. They
+        share a single connection, i.e. run one at a time, if max_concurrency is 1.
+        """
+        logger.info(f"Connecting to DB {database}")
+        return await asyncpg.create_pool(
+            min_size=1,
+            max_size=1 if self._max_concurrency == 1 else _CATALOG_QUERY_CONCURRENCY,
+            host=self._host,
+            port=self._port,
+            user=self._user,
+            password=self._password,
+            database=database,
+        )
+
+    @staticmethod
+    async def _run_query(
+        pool: asyncpg.Pool, query: Callable[[asyncpg.Connection], Awaitable]
+    ) -> None:
+        async with pool.acquire() as conn:
+            await query(conn)
+
     async def _connect_database(self, database: str) -> asyncpg.Connection:
         logger.info(f"Connecting to DB {database}")
         return await asyncpg.connect(
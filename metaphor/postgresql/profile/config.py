@@ -9,7 +9,7 @@ from metaphor.redshift.config import PostgreSQLRunConfig
 
 @dataclass(config=ConnectorConfig)
 class PostgreSQLProfileRunConfig(PostgreSQLRunConfig):
-    max_concurrency = 10
+    max_concurrency: int = 10
 
     include_views: bool = False
 
@@ -3,6 +3,7 @@ from typing import List, Optional
 
 from pydantic.dataclasses import dataclass
 
+from metaphor.common.api_request import ApiRequestConfig
 from metaphor.common.base_config import BaseConfig
 from metaphor.common.dataclass import ConnectorConfig
 
@@ -23,3 +24,6 @@ class PowerBIRunConfig(BaseConfig):
 
     # (Optional) The default snowflake account
     snowflake_account: Optional[str] = None
+
+    # (Optional) How to retry the API requests, and capture their responses
+    api_request: ApiRequestConfig = field(default_factory=lambda: ApiRequestConfig())
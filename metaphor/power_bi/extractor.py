@@ -2,6 +2,7 @@ import json
 from datetime import datetime, timezone
 from typing import Collection, Dict, List, Optional
 
+from metaphor.common.api_request import configure
 from metaphor.common.base_extractor import BaseExtractor
 from metaphor.common.entity_id import (
     EntityId,
@@ -95,6 +96,7 @@ class PowerBIExtractor(BaseExtractor):
         self._config = config
         self._tenant_id = config.tenant_id
         self._workspaces = config.workspaces
+        configure(config.api_request.retry, config.api_request.debug_capture)
 
         self._client = PowerBIClient(self._config)
         self._graph_client = GraphApiClient(self._config)
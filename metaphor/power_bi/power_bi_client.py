@@ -5,7 +5,7 @@ from urllib.parse import quote, urlencode
 
 import requests
 
-from metaphor.common.api_request import ApiError, get_request
+from metaphor.common.api_request import ApiError, get_request, get_session
 from metaphor.common.logger import get_logger
 from metaphor.common.utils import start_of_day
 from metaphor.power_bi.config import PowerBIRunConfig
@@ -329,7 +329,7 @@ class PowerBIClient:
             waiting_time = 0
             sleep_time = 1
             while True:
-                result = requests.get(url, headers=self._headers, timeout=600)
+                result = get_session(url).get(url, headers=self._headers, timeout=600)
                 if result.status_code != 200:
                     return False
                 if result.json()["status"] == "Succeeded":
@@ -1,9 +1,12 @@
 from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import AsyncIterator
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional, Tuple
 
 from asyncpg import Connection, Record
 
+# Number of access events to fetch at a time from the server-side cursor
+DEFAULT_PREFETCH = 1000
+
 REDSHIFT_USAGE_SQL_TEMPLATE = """
 SELECT DISTINCT ss.userid,
     ss.query,
@@ -47,20 +50,21 @@ class AccessEvent:
 
     @staticmethod
     def from_record(record: Record) -> "AccessEvent":
-        # To convert mock Record to a dict
-        if hasattr(record, "_asdict"):
-            record = dict(record._asdict())
-        else:
-            record = dict(record)
-
-        for k, v in record.items():
-            if isinstance(v, str):
-                record[k] = v.strip()
-
-        record["starttime"] = record["starttime"].replace(tzinfo=timezone.utc)
-        record["endtime"] = record["endtime"].replace(tzinfo=timezone.utc)
-
-        return AccessEvent(**record)
+        return AccessEvent(
+            userid=record["userid"],
+            query=record["query"],
+            usename=_strip(record["usename"]),
+            tbl=record["tbl"],
+            rows=record["rows"],
+            bytes=record["bytes"],
+            querytxt=_strip(record["querytxt"]),
+            database=_strip(record["database"]),
+            schema=_strip(record["schema"]),
+            table=_strip(record["table"]),
+            starttime=record["starttime"].replace(tzinfo=timezone.utc),
+            endtime=record["endtime"].replace(tzinfo=timezone.utc),
+            aborted=record["aborted"],
+        )
 
     def table_name(self) -> str:
         return f"{self.database}.{self.schema}.{self.table}"
@@ -70,14 +74,36 @@ class AccessEvent:
         conn: Connection,
         start_date: datetime,
         end_date: datetime,
+        prefetch: int = DEFAULT_PREFETCH,
     ) -> AsyncIterator["AccessEvent"]:
-        results = await conn.fetch(
-            REDSHIFT_USAGE_SQL_TEMPLATE.format(
-                start_time=start_date.isoformat(), end_time=end_date.isoformat()
-            )
-        )
+        """
+        Stream the access events in [start_date, end_date) through a server-side
+        cursor, one day at a time from the latest, so that only a prefetch of
+        events is held in memory
+        """
+        for start_time, end_time in _day_slices(start_date, end_date):
+            # Cursors can only be used in a transaction
+            async with conn.transaction():
+                async for record in conn.cursor(
+                    REDSHIFT_USAGE_SQL_TEMPLATE.format(
+                        start_time=start_time.isoformat(),
+                        end_time=end_time.isoformat(),
+                    ),
+                    prefetch=prefetch,
+                ):
+                    yield AccessEvent.from_record(record)
+
+
+def _strip(value: Optional[str]) -> str:
+    # CHAR columns are padded with spaces
+    return value.strip() if value is not None else ""
 
-        for record in results:
-            yield AccessEvent.from_record(record)
 
-        await conn.close()
+def _day_slices(start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+    """Split [start, end) into slices of at most a day, from the latest"""
+    slices = []
+    while end > start:
+        slice_start = max(start, end - timedelta(days=1))
+        slices.append((slice_start, end))
+        end = slice_start
+    return slices
@@ -6,6 +6,7 @@ from pydantic.dataclasses import dataclass
 from metaphor.common.dataclass import ConnectorConfig
 from metaphor.common.tag_matcher import TagMatcher
 from metaphor.postgresql.config import PostgreSQLRunConfig
+from metaphor.redshift.access_event import DEFAULT_PREFETCH
 
 
 @dataclass(config=ConnectorConfig)
@@ -16,6 +17,9 @@ class RedshiftQueryLogConfig:
     # Query log filter to exclude certain usernames
     excluded_usernames: Set[str] = field(default_factory=lambda: set())
 
+    # Number of query logs to fetch at a time from the server-side cursor
+    prefetch: int = DEFAULT_PREFETCH
+
 
 @dataclass(config=ConnectorConfig)
 class RedshiftRunConfig(PostgreSQLRunConfig):
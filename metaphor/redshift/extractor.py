@@ -1,4 +1,5 @@
-from typing import Collection, List
+import asyncio
+from typing import Collection, Dict, List, Tuple
 
 from metaphor.common.constants import BYTES_PER_MEGABYTES
 from metaphor.common.entity_id import dataset_normalized_name, to_dataset_entity_id
@@ -34,10 +35,15 @@ class RedshiftExtractor(PostgreSQLExtractor):
         self._tag_matchers = config.tag_matchers
         self._query_log_lookback_days = config.query_log.lookback_days
         self._query_log_excluded_usernames = config.query_log.excluded_usernames
+        self._query_log_prefetch = config.query_log.prefetch
         self._filter = exclude_system_databases(self._filter)
 
         self._logs: List[QueryLog] = []
 
+        # A query scanning multiple tables has an access event per table, so
+        # share the same SQL and its hash among them
+        self._query_sqls: Dict[int, Tuple[str, str]] = {}
+
     async def extract(self) -> Collection[ENTITY_TYPES]:
         logger.info(f"Fetching metadata from redshift host {self._host}")
 
@@ -47,21 +53,14 @@ class RedshiftExtractor(PostgreSQLExtractor):
             else list(self._filter.includes.keys())
         )
 
+        included = []
         for db in databases:
             if not self._filter.include_database(db):
                 logger.info(f"Skipping database {db}")
                 continue
+            included.append(db)
 
-            conn = await self._connect_database(db)
-            try:
-                await self._fetch_tables(conn, db, True)
-                await self._fetch_columns(conn, db, True)
-                await self._fetch_redshift_table_stats(conn, db)
-                await self._fetch_query_logs(conn)
-            except Exception as ex:
-                logger.exception(ex)
-            finally:
-                await conn.close()
+        await self._crawl_databases(included)
 
         datasets = list(self._datasets.values())
         tag_datasets(datasets, self._tag_matchers)
@@ -71,6 +70,32 @@ class RedshiftExtractor(PostgreSQLExtractor):
         entities.extend(chunk_query_logs(self._logs))
         return entities
 
+    async def _crawl_database(self, database: str) -> None:
+        try:
+            pool = await self._create_pool(database)
+        except Exception as ex:
+            logger.exception(ex)
+            return
+
+        try:
+            # Other catalog queries add to the datasets created from the tables
+            await self._run_query(
+                pool, lambda conn: self._fetch_tables(conn, database, True)
+            )
+            await asyncio.gather(
+                self._run_query(
+                    pool, lambda conn: self._fetch_columns(conn, database, True)
+                ),
+                self._run_query(
+                    pool, lambda conn: self._fetch_redshift_table_stats(conn, database)
+                ),
+                self._run_query(pool, self._fetch_query_logs),
+            )
+        except Exception as ex:
+            logger.exception(ex)
+        finally:
+            await pool.close()
+
     async def _fetch_redshift_table_stats(self, conn, catalog: str) -> None:
         results = await conn.fetch(
             """
@@ -102,7 +127,9 @@ class RedshiftExtractor(PostgreSQLExtractor):
         start_date = start_of_day(self._query_log_lookback_days)
         end_date = start_of_day()
 
-        async for record in AccessEvent.fetch_access_event(conn, start_date, end_date):
+        async for record in AccessEvent.fetch_access_event(
+            conn, start_date, end_date, self._query_log_prefetch
+        ):
             self._process_record(record)
 
     def _process_record(self, access_event: AccessEvent):
@@ -116,6 +143,13 @@ class RedshiftExtractor(PostgreSQLExtractor):
 
         sources = [self._convert_resource_to_queried_dataset(access_event)]
 
+        cached = self._query_sqls.get(access_event.query)
+        if cached is None:
+            querytxt = access_event.querytxt
+            cached = (querytxt, md5_digest(querytxt.encode("utf-8")))
+            self._query_sqls[access_event.query] = cached
+        sql, sql_hash = cached
+
         query_log = QueryLog(
             id=f"{DataPlatform.REDSHIFT.name}:{access_event.query}",
             query_id=str(access_event.query),
@@ -128,8 +162,8 @@ class RedshiftExtractor(PostgreSQLExtractor):
             rows_read=float(access_event.rows),
             bytes_read=float(access_event.bytes),
             sources=sources,
-            sql=access_event.querytxt,
-            sql_hash=md5_digest(access_event.querytxt.encode("utf-8")),
+            sql=sql,
+            sql_hash=sql_hash,
         )
 
         self._logs.append(query_log)
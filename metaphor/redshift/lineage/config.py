@@ -1,6 +1,9 @@
+from dataclasses import field
+
 from pydantic.dataclasses import dataclass
 
 from metaphor.common.dataclass import ConnectorConfig
+from metaphor.common.sql_parser import SQLParserConfig
 from metaphor.redshift.config import RedshiftRunConfig
 
 
@@ -14,3 +17,6 @@ class RedshiftLineageRunConfig(RedshiftRunConfig):
 
     # Whether to include self loop in lineage
     include_self_lineage: bool = True
+
+    # How to parse the queries for lineage
+    sql_parser: SQLParserConfig = field(default_factory=lambda: SQLParserConfig())
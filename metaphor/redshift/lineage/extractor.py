@@ -1,13 +1,13 @@
-from typing import Collection, Dict, List, Optional, Tuple
+from typing import Any, Collection, Dict, List, Optional, Tuple
 
 from asyncpg import Connection
-from sqllineage.core.models import Schema, Table
-from sqllineage.exceptions import SQLLineageException
+from sqllineage.core.models import Schema
 from sqllineage.runner import LineageRunner
 
 from metaphor.common.entity_id import to_dataset_entity_id
 from metaphor.common.event_util import ENTITY_TYPES
 from metaphor.common.logger import get_logger
+from metaphor.common.sql_parser import SQLParser
 from metaphor.common.utils import unique_list
 from metaphor.models.metadata_change_event import (
     DataPlatform,
@@ -22,6 +22,22 @@ from metaphor.redshift.utils import exclude_system_databases
 logger = get_logger()
 
 
+def parse_lineage(query: str) -> Dict[str, Any]:
+    """
+    The source & target tables of a query, and whether all of them have an
+    explicit schema. Runs in a worker process, so returns JSON types only.
+    """
+    parser = LineageRunner(query)
+    return {
+        "sources": [str(table) for table in parser.source_tables],
+        "targets": [str(table) for table in parser.target_tables],
+        "explicit_schema": all(
+            table.schema.raw_name != Schema.unknown
+            for table in set(parser.source_tables + parser.target_tables)
+        ),
+    }
+
+
 class RedshiftLineageExtractor(PostgreSQLExtractor):
     """Redshift lineage metadata extractor"""
 
@@ -40,6 +56,7 @@ class RedshiftLineageExtractor(PostgreSQLExtractor):
         self._enable_view_lineage = config.enable_view_lineage
         self._include_self_lineage = config.include_self_lineage
         self._filter = exclude_system_databases(self._filter)
+        self._sql_parser_config = config.sql_parser
 
     async def extract(self) -> Collection[ENTITY_TYPES]:
         logger.info(f"Fetching lineage info from redshift host {self._host}")
@@ -64,7 +81,8 @@ class RedshiftLineageExtractor(PostgreSQLExtractor):
 
         if self._enable_lineage_from_sql:
             conn = await self._connect_database(self._database)
-            await self._fetch_lineage_from_stl_query(conn)
+            with SQLParser(parse_lineage, self._sql_parser_config) as sql_parser:
+                await self._fetch_lineage_from_stl_query(conn, sql_parser)
             await conn.close()
 
         return self._datasets.values()
@@ -108,7 +126,9 @@ class RedshiftLineageExtractor(PostgreSQLExtractor):
         """
         await self._fetch_lineage(view_lineage_query, conn, db)
 
-    async def _fetch_lineage_from_stl_query(self, conn) -> None:
+    async def _fetch_lineage_from_stl_query(
+        self, conn, sql_parser: SQLParser[Dict[str, Any]]
+    ) -> None:
         sql = """
         WITH
         full_queries AS (
@@ -141,42 +161,35 @@ class RedshiftLineageExtractor(PostgreSQLExtractor):
         """
         results = await conn.fetch(sql)
 
-        for row in results:
-            query = row["querytxt"]
-            database = row["database"]
-
-            try:
-                unescaped_query = query.encode().decode("unicode-escape")
-                self._populate_lineage_from_sql(unescaped_query, database)
-            except SQLLineageException as e:
-                logger.warning(f"Cannot parse SQL. Query: {query}, Error: {e}")
-                return
+        queries = [
+            (row["querytxt"].encode().decode("unicode-escape"), row["database"])
+            for row in results
+        ]
 
-    def _populate_lineage_from_sql(self, query, database) -> None:
-        def format_table_name(table: Table, database: str) -> str:
-            return f"{database}.{str(table)}"
+        # The same statements repeat many times in ETL history
+        lineages = sql_parser.parse_all(query for query, _ in queries)
 
-        parser = LineageRunner(query)
+        for (query, database), lineage in zip(queries, lineages):
+            if lineage is not None:
+                self._populate_lineage_from_sql(query, database, lineage)
 
-        if len(parser.target_tables) != 1:
+    def _populate_lineage_from_sql(
+        self, query: str, database: str, lineage: Dict[str, Any]
+    ) -> None:
+        if len(lineage["targets"]) != 1:
             logger.warning(f"Cannot extract lineage for the query: {query}")
             return
 
-        if len(parser.source_tables) < 1:
+        if len(lineage["sources"]) < 1:
             return
 
-        if any(
-            [
-                table.schema.raw_name == Schema.unknown
-                for table in set(parser.source_tables + parser.target_tables)
-            ]
-        ):
+        if not lineage["explicit_schema"]:
             # TODO: find the default schema name
             logger.warning(f"Skip query missing explicit schema: {query}")
             return
 
-        target = format_table_name(parser.target_tables[0], database)
-        sources = [format_table_name(table, database) for table in parser.source_tables]
+        target = f"{database}.{lineage['targets'][0]}"
+        sources = [f"{database}.{table}" for table in lineage["sources"]]
 
         if (not self._include_self_lineage) and target in sources:
             return
@@ -2,6 +2,14 @@ from typing import Iterable
 
 from metaphor.s3.config import S3RunConfig
 
+try:
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
+except ImportError:
+    # Ignore this since mypy plugins are dev dependencies
+    pass
+
+PAGE_SIZE = 1000
+
 
 def list_folders(
     bucket_name: str,
@@ -16,3 +24,18 @@ def list_folders(
             if folder.endswith("/"):
                 folder = folder[:-1]
             yield folder
+
+
+def list_objects(
+    bucket_name: str,
+    prefix: str,
+    config: S3RunConfig,
+) -> Iterable["ObjectTypeDef"]:
+    s3_client = config.s3_client
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket_name,
+        Prefix=prefix,
+        PaginationConfig={"PageSize": PAGE_SIZE},
+    ):
+        yield from page.get("Contents", [])
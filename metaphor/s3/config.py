@@ -2,6 +2,7 @@ from dataclasses import field
 from functools import cached_property
 from typing import List, Union
 
+from pydantic import Field
 from pydantic.dataclasses import dataclass
 
 from metaphor.common.aws import AwsCredentials
@@ -20,6 +21,15 @@ except ImportError:
 logger = get_logger()
 
 
+@dataclass(config=ConnectorConfig)
+class SchemaInferenceConfig:
+    # Max number of bytes to read from the start of a CSV, TSV or JSON file
+    sample_bytes: int = Field(default=1024 * 1024, gt=0)
+
+    # Number of the latest files of a table to infer its schema from
+    sample_files: int = Field(default=1, gt=0)
+
+
 @dataclass(config=ConnectorConfig)
 class S3RunConfig(BaseConfig):
     aws: AwsCredentials
@@ -27,6 +37,19 @@ class S3RunConfig(BaseConfig):
     path_specs: List[PathSpec] = field(default_factory=list)
     verify_ssl: Union[bool, str] = False
 
+    # Max number of concurrent S3 listings & schema inferences
+    max_concurrency: int = 10
+
+    # The S3 Inventory reports to read the objects of the buckets from, instead
+    # of listing them. Each is the URI or local path of a manifest.json, or of
+    # the folder of an inventory's reports to read the latest one.
+    inventory_manifests: List[str] = field(default_factory=list)
+
+    # How to infer the schemas of the datasets
+    schema_inference: SchemaInferenceConfig = field(
+        default_factory=lambda: SchemaInferenceConfig()
+    )
+
     @cached_property
     def s3_client(self) -> "S3Client":
         return self.aws.get_session().client(
@@ -1,6 +1,7 @@
 import functools
 from collections import defaultdict
-from typing import Collection, Dict, Iterable, List, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Collection, Dict, Iterable, Iterator, List, Optional
 
 from more_itertools import peekable
 
@@ -9,31 +10,14 @@ from metaphor.common.event_util import ENTITY_TYPES
 from metaphor.common.logger import get_logger
 from metaphor.models.crawler_run_metadata import Platform
 from metaphor.models.metadata_change_event import Dataset, DatasetStatistics
-from metaphor.s3.boto_helpers import list_folders
+from metaphor.s3.boto_helpers import list_folders, list_objects
 from metaphor.s3.config import PathSpec, S3RunConfig
+from metaphor.s3.inventory import Inventory
 from metaphor.s3.parse_schema import parse_schema
-from metaphor.s3.path_spec import TABLE_LABEL
+from metaphor.s3.path_spec import TABLE_LABEL, dir_comp
 from metaphor.s3.table_data import FileObject, TableData
 
 logger = get_logger()
-PAGE_SIZE = 1000
-
-
-def dir_comp(left: str, right: str) -> int:
-    # Try to convert to number and compare if the directory name is a number
-    try:
-        # Strip = from the directory names, just use the column value
-        if "=" in left and "=" in right:
-            left = left.rsplit("=", 1)[-1]
-            right = right.rsplit("=", 1)[-1]
-
-        return int(left) - int(right)  # This can throw if left / right are pure strings
-
-    except Exception:
-        if left == right:
-            return 0
-        else:
-            return 1 if left > right else -1
 
 
 class S3Extractor(BaseExtractor):
@@ -50,20 +34,38 @@ class S3Extractor(BaseExtractor):
         super().__init__(config)
         self._config = config
         self._path_specs = config.path_specs
+        self._max_concurrency = max(config.max_concurrency, 1)
+
+    def _list_folders(self, bucket_name: str, prefix: str) -> List[str]:
+        return list(list_folders(bucket_name, prefix, self._config))
 
     def _resolve_templated_folders(
-        self, bucket_name: str, path_prefix: str
-    ) -> Iterable[str]:
-        folder_split: List[str] = path_prefix.split("*", 1)
-        # If the len of split is 1 it means we don't have * in the prefix
-        if len(folder_split) == 1:
-            yield path_prefix
-            return
-
-        for folder in list_folders(bucket_name, folder_split[0], self._config):
-            yield from self._resolve_templated_folders(
-                bucket_name, f"{folder}{folder_split[1]}"
-            )
+        self, executor: Executor, bucket_name: str, path_prefix: str
+    ) -> List[str]:
+        """
+        Resolve the wildcards in the prefix one level at a time, listing the
+        folders of all prefixes at the same level concurrently
+        """
+
+        def resolve(prefix: str) -> List[str]:
+            folder_split: List[str] = prefix.split("*", 1)
+            # If the len of split is 1 it means we don't have * in the prefix
+            if len(folder_split) == 1:
+                return [prefix]
+
+            return [
+                f"{folder}{folder_split[1]}"
+                for folder in self._list_folders(bucket_name, folder_split[0])
+            ]
+
+        prefixes = [path_prefix]
+        while any("*" in prefix for prefix in prefixes):
+            prefixes = [
+                resolved
+                for resolved_prefixes in executor.map(resolve, prefixes)
+                for resolved in resolved_prefixes
+            ]
+        return prefixes
 
     def get_dir_to_process(
         self, bucket_name: str, folder: str, path_spec: PathSpec
@@ -111,75 +113,139 @@ class S3Extractor(BaseExtractor):
         else:
             return folder
 
-    def _browse_path_spec(self, path_spec: PathSpec) -> Iterable[FileObject]:
+    def _list_file_objects(
+        self, prefix: str, path_spec: PathSpec
+    ) -> Iterator[FileObject]:
+        for obj in list_objects(path_spec.bucket, prefix, self._config):
+            if path_spec.allow_key(obj["Key"]):
+                yield FileObject.from_object(path_spec.bucket, obj, path_spec)
+
+    def _merge_file_objects(
+        self, file_objects: Iterable[FileObject]
+    ) -> Dict[str, TableData]:
+        # If there are overlapping files (i.e. different files under a directory
+        # that's parsed as a single dataset), they are merged. See
+        # `TableData.merge` for the implementation.
+        tables: Dict[str, TableData] = defaultdict(lambda: TableData())
+        for file_object in file_objects:
+            table_data = TableData.from_file_object(
+                file_object, self._config.schema_inference.sample_files
+            )
+            tables[table_data.guid] = tables[table_data.guid].merge(table_data)
+        return tables
+
+    def _browse_table_folder(
+        self, table_folder: str, path_spec: PathSpec
+    ) -> Dict[str, TableData]:
+        logger.debug(f"Processing folder dataset: {table_folder}")
+        directory = self.get_dir_to_process(
+            path_spec.bucket, f"{table_folder}/", path_spec
+        )
+        if not directory:
+            return {}
+
+        logger.debug(f"Found directory: {directory}")
+        return self._merge_file_objects(self._list_file_objects(directory, path_spec))
+
+    def _load_inventories(self, executor: Executor) -> Dict[str, Inventory]:
+        inventories: Dict[str, Inventory] = {}
+        for location in self._config.inventory_manifests:
+            inventory = Inventory.load(
+                self._config, location, self._path_specs, executor
+            )
+            inventories[inventory.bucket] = inventory
+        return inventories
+
+    def _browse_inventory(
+        self, inventory: Inventory, path_spec: PathSpec
+    ) -> Iterable[TableData]:
+        logger.info(f"Reading the objects of {path_spec} from the inventory")
+        return inventory.table_datas(
+            path_spec, self._config.schema_inference.sample_files
+        )
+
+    def _browse_bucket(
+        self, executor: Executor, path_spec: PathSpec
+    ) -> Iterable[TableData]:
         """
         Browses thru all eligible file objects in path spec. Resolves the wildcard characters
-        and labels and returns actual file paths.
+        and labels and returns the tables of the actual file paths.
+
+        The table folders are listed, and then each is browsed concurrently,
+        merging its files into tables as they're listed, so the objects aren't
+        all held in memory.
         """
+        bucket_name = path_spec.bucket
+        if not path_spec.labels:
+            # No label in uri, just browse the resolved path
+            tables = self._merge_file_objects(
+                self._list_file_objects(path_spec.path_prefix, path_spec)
+            )
+            logger.debug(f"Tables: {tables}")
+            return tables.values()
 
-        def yield_file_object(prefix: str):
-            for page in (
-                bucket.objects.filter(Prefix=prefix).page_size(PAGE_SIZE).pages()
-            ):
-                for obj in page:
-                    if path_spec.allow_key(obj.key):
-                        yield FileObject.from_object_summary(obj, path_spec)
+        # This branch is for directory based datasets
+        object_path = path_spec.object_path
+        for label in path_spec.labels:
+            if label != TABLE_LABEL:
+                object_path = object_path.replace(label, "*", 1)
+        path_prefix = object_path[: object_path.find(TABLE_LABEL)]
+        folders = self._resolve_templated_folders(executor, bucket_name, path_prefix)
+        table_folders = [
+            table_folder
+            for table_folders in executor.map(
+                lambda folder: self._list_folders(bucket_name, folder), folders
+            )
+            for table_folder in table_folders
+        ]
 
-        bucket_name = path_spec.bucket
-        bucket = self._config.s3_resource.Bucket(bucket_name)
-        if path_spec.labels:
-            # This branch is for directory based datasets
-            object_path = path_spec.object_path
-            for label in path_spec.labels:
-                if label != TABLE_LABEL:
-                    object_path = object_path.replace(label, "*", 1)
-            path_prefix = object_path[: object_path.find(TABLE_LABEL)]
-            for folder in self._resolve_templated_folders(bucket_name, path_prefix):
-                for f in list_folders(bucket_name, folder, self._config):
-                    logger.debug(f"Processing folder dataset: {f}")
-                    directory = self.get_dir_to_process(bucket_name, f"{f}/", path_spec)
-                    if directory:
-                        logger.debug(f"Found directory: {directory}")
-                        yield from yield_file_object(prefix=directory)
-        else:
-            # No label in uri, just return the resolved path
-            yield from yield_file_object(prefix=path_spec.path_prefix)
+        tables = defaultdict(lambda: TableData())
+        for folder_tables in executor.map(
+            lambda folder: self._browse_table_folder(folder, path_spec),
+            table_folders,
+        ):
+            for guid, table_data in folder_tables.items():
+                tables[guid] = tables[guid].merge(table_data)
+
+        logger.debug(f"Tables: {tables}")
+        return tables.values()
 
     async def extract(self) -> Collection[ENTITY_TYPES]:
-        entities = []
-        buckets = [
-            bucket.get("Name")
-            for bucket in self._config.s3_client.list_buckets()["Buckets"]
-        ]
-        logger.debug(f"Exisiting buckets: {buckets}")
-
-        for path_spec in self._path_specs:
-            if path_spec.bucket not in buckets:
-                logger.warning(
-                    f"Skipping {path_spec}: bucket {path_spec.bucket} does not exist"
-                )
-                continue
-
-            # Browse through all valid files covered by this path_spec. If there are
-            # overlapping files (i.e. different files under a directory that's parsed
-            # as a single dataset), they are merged. See `TableData.merge` for the
-            # implementation.
-            tables: Dict[str, TableData] = defaultdict(lambda: TableData())
-            for file_object in self._browse_path_spec(path_spec):
-                table_data = TableData.from_file_object(file_object)
-                tables[table_data.guid] = tables[table_data.table_path].merge(
-                    table_data
-                )
+        entities: List[ENTITY_TYPES] = []
 
-            logger.debug(f"Tables: {tables}")
-            for table_data in tables.values():
-                logger.debug(f"Initializing dataset with {table_data}")
-                dataset = self._init_dataset(table_data)
-                entities.append(dataset)
+        with ThreadPoolExecutor(max_workers=self._max_concurrency) as executor:
+            inventories = self._load_inventories(executor)
+
+            # Only list the buckets if some aren't read from inventories
+            buckets: List[Optional[str]] = []
+            if any(
+                path_spec.bucket not in inventories for path_spec in self._path_specs
+            ):
+                buckets = [
+                    bucket.get("Name")
+                    for bucket in self._config.s3_client.list_buckets()["Buckets"]
+                ]
+                logger.debug(f"Exisiting buckets: {buckets}")
+
+            for path_spec in self._path_specs:
+                inventory = inventories.get(path_spec.bucket)
+                if inventory is not None:
+                    tables = self._browse_inventory(inventory, path_spec)
+                elif path_spec.bucket in buckets:
+                    tables = self._browse_bucket(executor, path_spec)
+                else:
+                    logger.warning(
+                        f"Skipping {path_spec}: bucket {path_spec.bucket} does not exist"
+                    )
+                    continue
+
+                # Infer the schemas of the tables concurrently
+                entities.extend(executor.map(self._init_dataset, tables))
 
         return entities
 
     def _init_dataset(self, table_data: TableData) -> Dataset:
+        logger.debug(f"Initializing dataset with {table_data}")
         return Dataset(
             display_name=table_data.display_name,
             logical_id=table_data.logical_id,
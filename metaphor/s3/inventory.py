@@ -0,0 +1,606 @@
+import functools
+import json
+import os
+import posixpath
+import re
+from collections import defaultdict
+from concurrent.futures import Executor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import unquote_plus
+
+import pyarrow
+import pyarrow.compute
+import pyarrow.csv as pv
+import pyarrow.orc as po
+import pyarrow.parquet as pq
+
+from metaphor.common.logger import get_logger
+from metaphor.s3.boto_helpers import list_folders
+from metaphor.s3.config import S3RunConfig
+from metaphor.s3.path_spec import TABLE_LABEL, PathSpec, dir_comp
+from metaphor.s3.ranged_file import S3RangedFile
+from metaphor.s3.table_data import TableData
+
+logger = get_logger()
+
+# The compute functions are generated at runtime, so they're not in the stubs
+pc: Any = pyarrow.compute
+
+MANIFEST_FILE = "manifest.json"
+
+# The folders of an inventory's reports, named after their creation time
+_REPORT_FOLDER = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}-\d{2}Z")
+
+# The key, size & last_modified of the objects in an inventory
+_OBJECTS_SCHEMA = pyarrow.schema(
+    [
+        pyarrow.field("key", pyarrow.string()),
+        pyarrow.field("size", pyarrow.int64()),
+        pyarrow.field("last_modified", pyarrow.timestamp("ms", tz="UTC")),
+    ]
+)
+
+# The columns read from the inventory files, by their names in Parquet & ORC
+_COLUMN_TYPES = {
+    "key": pyarrow.string(),
+    "size": pyarrow.int64(),
+    "last_modified_date": pyarrow.timestamp("ms", tz="UTC"),
+    "is_latest": pyarrow.bool_(),
+    "is_delete_marker": pyarrow.bool_(),
+}
+
+# The characters with a special meaning in RE2 regexes
+_RE2_SPECIAL = set("\\.+*?()|[]{}^$")
+
+
+def _split_uri(uri: str) -> Tuple[str, str]:
+    bucket, key = uri[len("s3://") :].split("/", 1)
+    return bucket, key
+
+
+def _rows(table: pyarrow.Table, *names: str) -> Iterator[Tuple]:
+    """The values of the columns of a table, row by row"""
+    return zip(*(table[name].to_pylist() for name in names))
+
+
+def _column_name(name: str) -> str:
+    """The Parquet & ORC name of a CSV column, e.g. last_modified_date for LastModifiedDate"""
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name.strip()).lower()
+
+
+def _escape(text: str) -> str:
+    return "".join(f"\\{c}" if c in _RE2_SPECIAL else c for c in text)
+
+
+def _glob_to_regex(pattern: str, wildcard: str = ".*") -> str:
+    """
+    Translate a glob pattern to an RE2 regex for pyarrow.compute, matching
+    names like fnmatch.fnmatchcase
+    """
+    regex: List[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == "*":
+            if not regex or regex[-1] != wildcard:
+                regex.append(wildcard)
+        elif c == "?":
+            regex.append(".")
+        elif c == "[":
+            j = i
+            if j < n and pattern[j] == "!":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                regex.append("\\[")
+                continue
+
+            chars = pattern[i:j].replace("\\", "\\\\").replace("[", "\\[")
+            i = j + 1
+            if chars[0] == "!":
+                chars = "^" + chars[1:]
+            elif chars[0] == "^":
+                chars = "\\" + chars
+            regex.append(f"[{chars}]")
+        else:
+            regex.append(_escape(c))
+    return "".join(regex)
+
+
+def _key_regex(path_spec: PathSpec) -> str:
+    """The regex of the keys accepted by PathSpec.allow_key"""
+    pattern = path_spec.object_path
+    for match in path_spec.labels + path_spec.partitions:
+        pattern = pattern.replace(match, "*", 1)
+    return f"(?s)^{_glob_to_regex(pattern)}$"
+
+
+def _file_type_regex(path_spec: PathSpec) -> str:
+    """The regex of the keys with an extension in the path spec's file types"""
+    file_types = "|".join(
+        _escape(file_type)
+        for file_type in sorted(path_spec.file_types)
+        # The extension is after the last dot
+        if "." not in file_type
+    )
+    return f"(?s)(?:^|\\.)(?:{file_types})$"
+
+
+def _table_folder(path_spec: PathSpec) -> Tuple[str, int]:
+    """
+    The regex of the keys in a table folder, and the number of slashes before
+    the table folder's name. Each wildcard before the table is a folder, as
+    it's resolved by listing the folders one level at a time.
+    """
+    object_path = path_spec.object_path
+    for label in path_spec.labels:
+        if label != TABLE_LABEL:
+            object_path = object_path.replace(label, "*", 1)
+    prefix = object_path[: object_path.find(TABLE_LABEL)]
+    folders = "[^/]*".join(_escape(part) for part in prefix.split("*"))
+    return f"(?s)^{folders}[^/]+/", prefix.count("/")
+
+
+class Inventory:
+    """
+    The objects of a bucket, read from an S3 Inventory report to crawl the
+    bucket without listing it.
+
+    The objects are kept in a pyarrow table, and filtered & grouped into
+    tables with vectorized operations, following the same rules as the live
+    listing in S3Extractor.
+    """
+
+    def __init__(self, bucket: str, objects: pyarrow.Table):
+        self.bucket = bucket
+
+        # The key, size & last_modified of the objects
+        self.objects = objects
+
+    @staticmethod
+    def load(
+        config: S3RunConfig,
+        location: str,
+        path_specs: Sequence[PathSpec],
+        executor: Executor,
+    ) -> "Inventory":
+        """
+        Load an inventory from the manifest at an S3 URI or a local path. Only
+        the objects under the path specs' prefixes are kept.
+        """
+        manifest_location = Inventory._manifest_location(config, location)
+        logger.info(f"Reading inventory manifest {manifest_location}")
+        manifest = json.loads(Inventory._read(config, manifest_location))
+
+        bucket = manifest["sourceBucket"]
+        file_format = manifest["fileFormat"].lower()
+        if file_format not in {"csv", "parquet", "orc"}:
+            raise ValueError(f"Unsupported inventory format: {file_format}")
+
+        column_names = [
+            _column_name(name) for name in manifest.get("fileSchema", "").split(",")
+        ]
+        if file_format == "csv" and not {"size", "last_modified_date"}.issubset(
+            column_names
+        ):
+            raise ValueError(
+                f"Inventory of {bucket} must include the Size and LastModifiedDate fields"
+            )
+
+        prefixes = [
+            path_spec.path_prefix
+            for path_spec in path_specs
+            if path_spec.bucket == bucket
+        ]
+        if not prefixes:
+            logger.warning(f"Skipping the inventory of {bucket}: no path spec for it")
+            return Inventory(bucket, pyarrow.Table.from_pylist([], _OBJECTS_SCHEMA))
+
+        destination = manifest["destinationBucket"].rsplit(":", 1)[-1]
+
+        def read_file(file: dict) -> pyarrow.Table:
+            if manifest_location.startswith("s3://"):
+                source = f"s3://{destination}/{file['key']}"
+            else:
+                source = Inventory._local_path(manifest_location, file["key"])
+
+            logger.debug(f"Reading inventory file {source}")
+            if file_format == "csv":
+                table = Inventory._read_csv(config, source, column_names)
+            else:
+                table = Inventory._read_columnar(config, source, file_format)
+            return Inventory._filter_objects(table, file_format == "csv", prefixes)
+
+        objects = pyarrow.concat_tables(
+            [
+                pyarrow.Table.from_pylist([], _OBJECTS_SCHEMA),
+                *executor.map(read_file, manifest["files"]),
+            ]
+        )
+        logger.info(f"Found {len(objects)} objects of {bucket} in the inventory")
+        return Inventory(bucket, objects)
+
+    @staticmethod
+    def _manifest_location(config: S3RunConfig, location: str) -> str:
+        """
+        The manifest at the location, or the latest one if the location is a
+        folder of an inventory's reports, i.e. ends with a slash
+        """
+        if not location.endswith("/"):
+            return location
+
+        if location.startswith("s3://"):
+            bucket, prefix = _split_uri(location)
+            folders = [
+                f"s3://{bucket}/{folder}"
+                for folder in list_folders(bucket, prefix, config)
+                if _REPORT_FOLDER.fullmatch(posixpath.basename(folder))
+            ]
+        else:
+            folders = [
+                os.path.join(location, name)
+                for name in os.listdir(location)
+                if _REPORT_FOLDER.fullmatch(name)
+            ]
+
+        if not folders:
+            raise ValueError(f"No inventory report found in {location}")
+        return posixpath.join(max(folders), MANIFEST_FILE)
+
+    @staticmethod
+    def _local_path(manifest_path: str, key: str) -> str:
+        """
+        The local copy of an inventory file, looked up by its key from the
+        manifest's folder and its parents, as in a copy of the destination
+        bucket
+        """
+        folder = os.path.dirname(os.path.abspath(manifest_path))
+        while True:
+            path = os.path.join(folder, key)
+            if os.path.exists(path):
+                return path
+
+            parent = os.path.dirname(folder)
+            if parent == folder:
+                raise FileNotFoundError(f"Inventory file not found: {key}")
+            folder = parent
+
+    @staticmethod
+    def _read(config: S3RunConfig, location: str) -> bytes:
+        if location.startswith("s3://"):
+            bucket, key = _split_uri(location)
+            return config.s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+
+        with open(location, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _read_csv(
+        config: S3RunConfig, source: str, column_names: List[str]
+    ) -> pyarrow.Table:
+        if source.startswith("s3://"):
+            bucket, key = _split_uri(source)
+            file = config.s3_client.get_object(Bucket=bucket, Key=key)["Body"]
+        else:
+            file = source
+
+        with pyarrow.input_stream(
+            file, compression="gzip" if source.endswith(".gz") else None
+        ) as stream:
+            return pv.read_csv(
+                stream,
+                read_options=pv.ReadOptions(column_names=column_names),
+                convert_options=pv.ConvertOptions(
+                    include_columns=[
+                        name for name in _COLUMN_TYPES if name in column_names
+                    ],
+                    column_types=_COLUMN_TYPES,
+                ),
+            )
+
+    @staticmethod
+    def _read_columnar(
+        config: S3RunConfig, source: str, file_format: str
+    ) -> pyarrow.Table:
+        # Only the needed columns are downloaded
+        if source.startswith("s3://"):
+            bucket, key = _split_uri(source)
+            file = S3RangedFile(config.s3_client, bucket, key)
+        else:
+            file = open(source, "rb")  # type: ignore
+
+        with file:
+            if file_format == "parquet":
+                parquet_file = pq.ParquetFile(file)
+                names = parquet_file.schema_arrow.names
+                table = parquet_file.read(
+                    columns=[name for name in _COLUMN_TYPES if name in names]
+                )
+            else:
+                orc_file = po.ORCFile(file)
+                names = orc_file.schema.names
+                table = orc_file.read(
+                    columns=[name for name in _COLUMN_TYPES if name in names]
+                )
+
+        if not {"size", "last_modified_date"}.issubset(names):
+            raise ValueError(
+                f"Inventory file {source} must include the size and last_modified_date fields"
+            )
+        return table
+
+    @staticmethod
+    def _filter_objects(
+        table: pyarrow.Table, url_encoded: bool, prefixes: List[str]
+    ) -> pyarrow.Table:
+        """
+        The key, size & last_modified of the latest versions of the objects,
+        with keys starting with any of the prefixes
+        """
+        keys = table["key"].combine_chunks()
+        if url_encoded:
+            # The keys in CSV inventories are URL-encoded
+            encoded = pc.match_substring_regex(keys, "[%+]")
+            if pc.any(encoded).as_py():
+                keys = pc.replace_with_mask(
+                    keys,
+                    encoded,
+                    pyarrow.array(
+                        [
+                            unquote_plus(key)
+                            for key in pc.filter(keys, encoded).to_pylist()
+                        ],
+                        pyarrow.string(),
+                    ),
+                )
+
+        mask = functools.reduce(
+            pc.or_, (pc.starts_with(keys, prefix) for prefix in set(prefixes))
+        )
+        if "is_latest" in table.column_names:
+            mask = pc.and_(mask, pc.fill_null(table["is_latest"], True))
+        if "is_delete_marker" in table.column_names:
+            mask = pc.and_not(mask, pc.fill_null(table["is_delete_marker"], False))
+
+        return pyarrow.table(
+            [
+                keys,
+                pc.fill_null(table["size"], 0),
+                pc.cast(table["last_modified_date"], _OBJECTS_SCHEMA.field(2).type),
+            ],
+            schema=_OBJECTS_SCHEMA,
+        ).filter(mask)
+
+    def _allowed(self, objects: pyarrow.Table, path_spec: PathSpec) -> pyarrow.Table:
+        """The objects accepted by PathSpec.allow_key"""
+        keys = objects["key"]
+        return objects.filter(
+            pc.and_(
+                pc.match_substring_regex(keys, _file_type_regex(path_spec)),
+                pc.match_substring_regex(keys, _key_regex(path_spec)),
+            )
+        )
+
+    def table_datas(self, path_spec: PathSpec, max_samples: int = 1) -> List[TableData]:
+        """
+        The tables of a path spec, as those found by listing the bucket: for
+        a path spec with a {table} label, the files in the latest directory of
+        each table folder are merged into a table, otherwise each file is one
+        """
+        objects = self.objects.filter(
+            pc.starts_with(self.objects["key"], path_spec.path_prefix)
+        )
+        if not path_spec.labels:
+            # In the order they're listed
+            objects = objects.take(
+                pc.sort_indices(objects, sort_keys=[("key", "ascending")])
+            )
+            return self._file_table_datas(
+                self._allowed(objects, path_spec), max_samples
+            )
+
+        # Split the keys into their table folders & directories, without
+        # capturing groups in the regex, which are much slower to match
+        table_folder, depth = _table_folder(path_spec)
+        objects = objects.filter(pc.match_substring_regex(objects["key"], table_folder))
+        keys = objects["key"]
+        objects = objects.append_column(
+            "table",
+            pc.binary_join(
+                pc.list_slice(
+                    pc.split_pattern(keys, "/", max_splits=depth + 1), 0, depth + 1
+                ),
+                "/",
+            ),
+        ).append_column(
+            "directory",
+            pc.binary_join_element_wise(
+                pc.list_element(
+                    pc.split_pattern(keys, "/", max_splits=1, reverse=True), 0
+                ),
+                "",
+                "/",
+            ),
+        )
+
+        directories = self._latest_directories(objects, path_spec)
+        objects = objects.filter(
+            pc.is_in(objects["directory"], pyarrow.array(directories, pyarrow.string()))
+        )
+        return self._folder_table_datas(
+            self._allowed(objects, path_spec), path_spec, max_samples
+        )
+
+    def _file_table_datas(
+        self, objects: pyarrow.Table, max_samples: int
+    ) -> List[TableData]:
+        return [
+            TableData(
+                display_name=posixpath.basename(key),
+                full_path=f"s3://{self.bucket}/{key}",
+                timestamp=last_modified,
+                table_path=f"s3://{self.bucket}/{key}",
+                number_of_files=1,
+                size_in_bytes=size,
+                samples=(
+                    [(last_modified, f"s3://{self.bucket}/{key}")] if size > 0 else []
+                ),
+                max_samples=max_samples,
+            )
+            for key, size, last_modified in _rows(
+                objects, "key", "size", "last_modified"
+            )
+        ]
+
+    def _latest_directories(
+        self, objects: pyarrow.Table, path_spec: PathSpec
+    ) -> List[str]:
+        """
+        The directories to read the files of the tables from, i.e. all those
+        under the latest directory of each table folder, chosen like
+        S3Extractor.get_dir_to_process
+        """
+        pairs = objects.group_by(["table", "directory"]).aggregate([])
+        table_directories: Dict[str, List[str]] = defaultdict(list)
+        subfolders: Dict[str, Set[str]] = defaultdict(set)
+        for table, directory in _rows(pairs, "table", "directory"):
+            table_directories[table].append(directory)
+            folder = table
+            for name in directory[len(table) + 1 : -1].split("/"):
+                if name:
+                    subfolders[folder].add(f"{folder}/{name}")
+                    folder = f"{folder}/{name}"
+
+        directories: List[str] = []
+        for table, candidates in table_directories.items():
+            latest = self._latest_directory(path_spec, table, subfolders)
+            if latest is not None:
+                directories.extend(
+                    directory
+                    for directory in candidates
+                    if directory.startswith(latest)
+                )
+        return directories
+
+    def _latest_directory(
+        self, path_spec: PathSpec, table: str, subfolders: Dict[str, Set[str]]
+    ) -> Optional[str]:
+        folder = table
+        if not path_spec.allow_path(f"s3://{self.bucket}/{folder}/"):
+            return None
+
+        while True:
+            # If it's a partition column then we want to compare the value, otherwise just compare names
+            for subfolder in sorted(
+                sorted(subfolders.get(folder, ())),
+                key=functools.cmp_to_key(dir_comp),
+                reverse=True,
+            ):
+                if path_spec.allow_path(f"s3://{self.bucket}/{subfolder}/"):
+                    folder = subfolder
+                    break
+            else:
+                return f"{folder}/"
+
+    @staticmethod
+    def _first_rows(
+        objects: pyarrow.Table, sort_keys: List[Tuple[str, str]], count: int
+    ) -> pyarrow.Table:
+        """The first rows of each table, sorted by the sort keys"""
+        objects = objects.take(
+            pc.sort_indices(objects, sort_keys=[("table", "ascending")] + sort_keys)
+        )
+        objects = objects.append_column(
+            "index", pyarrow.array(range(len(objects)), pyarrow.int64())  # type: ignore
+        )
+        starts = objects.group_by(["table"]).aggregate([("index", "min")])
+        start = pc.take(
+            starts["index_min"], pc.index_in(objects["table"], starts["table"])
+        )
+        return objects.filter(pc.less(pc.subtract(objects["index"], start), count))
+
+    def _folder_table_datas(
+        self, objects: pyarrow.Table, path_spec: PathSpec, max_samples: int
+    ) -> List[TableData]:
+        objects = objects.append_column("has_data", pc.greater(objects["size"], 0))
+
+        # The latest non-empty file of each table, or the latest file if all are empty
+        latest = self._first_rows(
+            objects,
+            [
+                ("has_data", "descending"),
+                ("last_modified", "descending"),
+                ("key", "ascending"),
+            ],
+            1,
+        )
+
+        samples: Dict[str, List] = defaultdict(list)
+        sampled = self._first_rows(
+            objects.filter(objects["has_data"]),  # type: ignore
+            [("last_modified", "descending"), ("key", "descending")],
+            max_samples,
+        )
+        for table, key, last_modified in _rows(
+            sampled, "table", "key", "last_modified"
+        ):
+            samples[table].append((last_modified, f"s3://{self.bucket}/{key}"))
+
+        totals = {
+            table: (size, count)
+            for table, size, count in _rows(
+                objects.group_by(["table"]).aggregate(
+                    [("size", "sum"), ("size", "count")]
+                ),
+                "table",
+                "size_sum",
+                "size_count",
+            )
+        }
+
+        # The partitions are the same for all files in a directory
+        partitions: Dict[str, Optional[List]] = {}
+        if path_spec.partitions:
+            directories = objects.group_by(["table", "directory"]).aggregate(
+                [("key", "min")]
+            )
+            for table, key in _rows(directories, "table", "key_min"):
+                file_partitions = path_spec.extract_partitions(
+                    f"s3://{self.bucket}/{key}"
+                )
+                partitions[table] = (
+                    TableData.merge_partitions(partitions[table], file_partitions)
+                    if table in partitions
+                    else file_partitions
+                )
+
+        table_datas = []
+        for table, key, size, last_modified in _rows(
+            latest, "table", "key", "size", "last_modified"
+        ):
+            full_path = f"s3://{self.bucket}/{key}"
+            display_name, table_path = path_spec.extract_table_name_and_path(full_path)
+            table_partitions = partitions.get(table)
+            if table_partitions:
+                size, number_of_files = totals[table]
+            else:
+                number_of_files = 1
+
+            table_datas.append(
+                TableData(
+                    display_name=display_name,
+                    full_path=full_path,
+                    partitions=table_partitions,
+                    timestamp=last_modified,
+                    table_path=table_path,
+                    size_in_bytes=size,
+                    number_of_files=number_of_files,
+                    samples=samples[table],
+                    max_samples=max_samples,
+                )
+            )
+        return table_datas
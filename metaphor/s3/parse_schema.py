@@ -1,101 +1,179 @@
-from typing import List
+import io
+import posixpath
+from typing import Dict, List, Optional, Tuple
 
 import pyarrow
 import pyarrow.csv as pv
 import pyarrow.json as pj
+import pyarrow.orc as po
 import pyarrow.parquet as pq
 from fastavro import reader
-from smart_open import open
 
+from metaphor.common.logger import get_logger
 from metaphor.models.metadata_change_event import DatasetSchema, SchemaField, SchemaType
 from metaphor.s3.config import S3RunConfig
+from metaphor.s3.ranged_file import S3RangedFile
 from metaphor.s3.table_data import TableData
 
+logger = get_logger()
+
+# Numeric types from the narrowest to the widest, a wider one can hold the others
+_NUMERIC_TYPES = {
+    name: rank
+    for rank, names in enumerate(
+        [
+            ("int8", "uint8"),
+            ("int16", "uint16"),
+            ("int32", "uint32", "int"),
+            ("int64", "uint64", "long"),
+            ("halffloat", "float"),
+            ("double",),
+        ]
+    )
+    for name in names
+}
+
+
+def widen_type(left, right):
+    """
+    The type of a column with values of both types. Only named types are
+    widened, others, e.g. Avro unions & records, are kept as the left one,
+    which is the latest sample's when merging the samples' schemas.
+    """
+    if left == right:
+        return left
+    if not isinstance(left, str) or not isinstance(right, str):
+        return left
+
+    if right == "null":
+        return left
+    if left == "null":
+        return right
+
+    if left in _NUMERIC_TYPES and right in _NUMERIC_TYPES:
+        return left if _NUMERIC_TYPES[left] >= _NUMERIC_TYPES[right] else right
 
-def _parse_json(source, partition_fields: List[SchemaField]) -> DatasetSchema:
-    table: pyarrow.Table = pj.read_json(
-        source
-    )  # We're parsing the json data itself, but perhaps in the future we want to parse its schema.
-    fields = [
-        SchemaField(
-            field_path=column._name,
-            native_type=str(column.type),
-        )
-        for column in table.columns
+    return "string"
+
+
+def _arrow_fields(schema: pyarrow.Schema) -> List[SchemaField]:
+    return [
+        SchemaField(field_path=field.name, native_type=str(field.type))
+        for field in schema
     ]
 
-    return DatasetSchema(schema_type=SchemaType.JSON, fields=partition_fields + fields)
+
+def _read_prefix(file: S3RangedFile, sample_bytes: int) -> bytes:
+    """Read up to sample_bytes from the start of the file, in whole lines"""
+    data = file.read(sample_bytes) or b""
+    if len(data) < file.size:
+        # Drop the last line, which is likely cut off
+        last_line_break = data.rfind(b"\n")
+        if last_line_break >= 0:
+            data = data[: last_line_break + 1]
+    return data
 
 
-def _parse_avro(source, partition_fields: List[SchemaField]) -> DatasetSchema:
-    fields = []
-    avro_reader = reader(source)
+def _parse_json(file: S3RangedFile, sample_bytes: int) -> List[SchemaField]:
+    # We're parsing the json data itself, but perhaps in the future we want to parse its schema.
+    table = pj.read_json(io.BytesIO(_read_prefix(file, sample_bytes)))
+    return _arrow_fields(table.schema)
+
+
+def _parse_avro(file: S3RangedFile) -> List[SchemaField]:
+    # Only the header is read, which has the writer schema
+    avro_reader = reader(io.BufferedReader(file))
     if isinstance(avro_reader.writer_schema, dict):
-        fields = [
+        return [
             SchemaField(field_path=field["name"], native_type=field["type"])
             for field in avro_reader.writer_schema.get("fields", [])
         ]
-    return DatasetSchema(schema_type=SchemaType.AVRO, fields=partition_fields + fields)
+    return []
 
 
 def _parse_schemaless(
-    source, partition_fields: List[SchemaField], suffix: str
-) -> DatasetSchema:
+    file: S3RangedFile, sample_bytes: int, suffix: str
+) -> List[SchemaField]:
     parse_options = pv.ParseOptions()
     if suffix == ".tsv":
         parse_options.delimiter = "\t"
 
-    table: pyarrow.Table = pv.read_csv(source, parse_options=parse_options)
-    fields = [
-        SchemaField(
-            field_path=column._name,
-            native_type=str(column.type),
-        )
-        for column in table.columns
-    ]
-
-    return DatasetSchema(
-        schema_type=SchemaType.SCHEMALESS, fields=partition_fields + fields
+    table = pv.read_csv(
+        io.BytesIO(_read_prefix(file, sample_bytes)),
+        parse_options=parse_options,
     )
-
-
-def _parse_parquet(source, partition_fields: List[SchemaField]) -> DatasetSchema:
-    table = pq.read_table(source)
-    fields = [
-        SchemaField(
-            field_path=column._name,
-            native_type=str(column.type),
-        )
-        for column in table.columns
-    ]
-
-    return DatasetSchema(
-        schema_type=SchemaType.PARQUET, fields=partition_fields + fields
+    return _arrow_fields(table.schema)
+
+
+def _parse_parquet(file: S3RangedFile) -> List[SchemaField]:
+    # Only the footer is read, which has the schema
+    return _arrow_fields(pq.ParquetFile(file).schema_arrow)
+
+
+def _parse_orc(file: S3RangedFile) -> List[SchemaField]:
+    # Only the footer is read, which has the schema
+    return _arrow_fields(po.ORCFile(file).schema)
+
+
+def read_schema(config: S3RunConfig, path: str) -> Tuple[SchemaType, List[SchemaField]]:
+    """Infer the schema of a file, only downloading the parts needed"""
+    bucket, key = path[len("s3://") :].split("/", 1)
+    file = S3RangedFile(config.s3_client, bucket, key)
+    sample_bytes = config.schema_inference.sample_bytes
+
+    suffix = posixpath.splitext(key)[1]
+    if suffix in {".csv", ".tsv"}:
+        result = SchemaType.SCHEMALESS, _parse_schemaless(file, sample_bytes, suffix)
+    elif suffix == ".json":
+        result = SchemaType.JSON, _parse_json(file, sample_bytes)
+    elif suffix == ".avro":
+        result = SchemaType.AVRO, _parse_avro(file)
+    elif suffix == ".parquet":
+        result = SchemaType.PARQUET, _parse_parquet(file)
+    elif suffix == ".orc":
+        result = SchemaType.ORC, _parse_orc(file)
+    else:
+        raise ValueError(f"Unknown suffix: {suffix}")
+
+    logger.debug(
+        f"Inferred the schema of {path} with {file.requests} requests, "
+        f"{file.bytes_downloaded} bytes"
     )
+    return result
 
 
 def parse_schema(config: S3RunConfig, table_data: TableData) -> DatasetSchema:
+    """
+    Infer the schema of a table from its sampled files. A column's type is
+    widened across the samples, and the columns only in older samples are
+    added after those of the latest sample.
+    """
     partition_fields = (
         [part.to_schema_field() for part in table_data.partitions]
         if table_data.partitions
         else []
     )
-    with open(
-        table_data.full_path,
-        "rb",
-        transport_params={"client": config.s3_client},
-    ) as source:
-        suffix = table_data.url.suffix
-        if suffix in {".csv", ".tsv"}:
-            return _parse_schemaless(source, partition_fields, suffix)
-
-        if suffix == ".json":
-            return _parse_json(source, partition_fields)
-
-        if suffix == ".avro":
-            return _parse_avro(source, partition_fields)
 
-        if suffix == ".parquet":
-            return _parse_parquet(source, partition_fields)
+    schema_type: Optional[SchemaType] = None
+    fields: Dict[str, SchemaField] = {}
+    for path in table_data.sample_paths:
+        try:
+            sample_type, sample_fields = read_schema(config, path)
+        except Exception as error:
+            logger.error(f"Failed to infer the schema of {path}: {error}")
+            continue
+
+        schema_type = schema_type or sample_type
+        for field in sample_fields:
+            assert field.field_path is not None
+            existing = fields.get(field.field_path)
+            if existing is None:
+                fields[field.field_path] = field
+            else:
+                existing.native_type = widen_type(
+                    existing.native_type, field.native_type
+                )
 
-    assert False, f"Unknown suffix: {suffix}"
+    return DatasetSchema(
+        schema_type=schema_type, fields=partition_fields + list(fields.values())
+    )
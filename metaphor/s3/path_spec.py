@@ -1,8 +1,7 @@
 import os
 import re
-from fnmatch import fnmatch
 from functools import cached_property, reduce
-from typing import List, Optional, Set, Tuple, Union
+from typing import Callable, Dict, List, Match, Optional, Set, Tuple, Union
 
 import dateutil.parser
 import parse
@@ -10,6 +9,7 @@ import yarl
 from pydantic import BaseModel, Field, model_validator
 
 from metaphor.common.logger import get_logger
+from metaphor.common.pattern_matcher import PatternMatcher, compile_pattern
 from metaphor.models.metadata_change_event import SchemaField
 
 logger = get_logger()
@@ -17,6 +17,23 @@ logger = get_logger()
 TABLE_LABEL = "{table}"  # nosec - this ain't a password
 
 
+def dir_comp(left: str, right: str) -> int:
+    # Try to convert to number and compare if the directory name is a number
+    try:
+        # Strip = from the directory names, just use the column value
+        if "=" in left and "=" in right:
+            left = left.rsplit("=", 1)[-1]
+            right = right.rsplit("=", 1)[-1]
+
+        return int(left) - int(right)  # This can throw if left / right are pure strings
+
+    except Exception:
+        if left == right:
+            return 0
+        else:
+            return 1 if left > right else -1
+
+
 class PartitionField(BaseModel):
     """
     Represents a partition column.
@@ -81,7 +98,7 @@ class PathSpec(BaseModel):
     """
 
     file_types: Set[str] = Field(
-        default_factory=lambda: {"avro", "csv", "tsv", "parquet", "json"}
+        default_factory=lambda: {"avro", "csv", "tsv", "parquet", "orc", "json"}
     )
 
     excludes: List[str] = Field(default_factory=list)
@@ -249,15 +266,56 @@ class PathSpec(BaseModel):
             assert TABLE_LABEL in self.labels
         return self
 
+    @cached_property
+    def _key_matcher(self) -> Callable[[str], Optional[Match]]:
+        pattern = self.object_path
+        for match in self.labels + self.partitions:
+            pattern = pattern.replace(match, "*", 1)
+        return compile_pattern(pattern)
+
     def allow_key(self, key: str):
         """
         Check if the object key is accepted by this path spec's uri. Here we are comparing
         against the object path.
         """
-        pattern = self.object_path
-        for match in self.labels + self.partitions:
-            pattern = pattern.replace(match, "*", 1)
-        return fnmatch(key, pattern) and key.rsplit(".", 1)[-1] in self.file_types
+        return (
+            key.rsplit(".", 1)[-1] in self.file_types
+            and self._key_matcher(key) is not None
+        )
+
+    @cached_property
+    def _path_matchers(self) -> Dict[int, Callable[[str], Optional[Match]]]:
+        """The matchers of the directory paths, by their number of slashes"""
+        return {}
+
+    def _path_matcher(self, path_slash: int) -> Callable[[str], Optional[Match]]:
+        matcher = self._path_matchers.get(path_slash)
+        if matcher is None:
+            uri_slash = self.uri.count("/")
+            slash_to_remove = (uri_slash - path_slash) + 1
+            pattern = self.uri.rsplit("/", slash_to_remove)[0]
+            for (
+                match
+            ) in (
+                self.labels
+            ):  # Here we don't want to match the partition columns, instead we want to return the table-level directory.
+                if match in pattern:
+                    pattern = pattern.replace(match, "*", 1)
+            matcher = compile_pattern(pattern)
+            self._path_matchers[path_slash] = matcher
+        return matcher
+
+    @cached_property
+    def _exclude_matchers(self) -> List[Tuple[int, PatternMatcher[bool]]]:
+        """The excluded paths, grouped by their number of slashes"""
+        excludes: Dict[int, List[str]] = {}
+        for exclude in self.excludes:
+            exclude_pat = exclude[:-1] if exclude[-1] == "/" else exclude
+            excludes.setdefault(exclude.count("/"), []).append(exclude_pat)
+        return [
+            (exclude_slash, PatternMatcher.from_patterns(patterns))
+            for exclude_slash, patterns in excludes.items()
+        ]
 
     def allow_path(self, path: str) -> bool:
         """
@@ -271,32 +329,17 @@ class PathSpec(BaseModel):
         if path_slash > uri_slash:
             return False
 
-        slash_to_remove = (uri_slash - path_slash) + 1
-        pattern = self.uri.rsplit("/", slash_to_remove)[0]
-        for (
-            match
-        ) in (
-            self.labels
-        ):  # Here we don't want to match the partition columns, instead we want to return the table-level directory.
-            if match in pattern:
-                pattern = pattern.replace(match, "*", 1)
-        if not fnmatch(path, pattern):
+        if not self._path_matcher(path_slash)(path):
             logger.debug(f"Unmatched path: {path}")
             return False
 
-        for exclude in self.excludes:
-            exclude_slash = exclude.count("/")
+        for exclude_slash, exclude_matcher in self._exclude_matchers:
             if path_slash < exclude_slash:
                 # Can't tell
                 continue
             slash_to_remove = (path_slash - exclude_slash) + 1
-            path.rsplit("/", slash_to_remove)[0]
-            if exclude[-1] == "/":
-                exclude_pat = exclude[:-1]
-            else:
-                exclude_pat = exclude
-            if fnmatch(path.rsplit("/", slash_to_remove)[0], exclude_pat):
-                logger.debug(f"Path {path} excluded by pattern: {exclude}")
+            if exclude_matcher.match(path.rsplit("/", slash_to_remove)[0]):
+                logger.debug(f"Path {path} excluded")
                 return False
 
         return True
@@ -0,0 +1,106 @@
+import io
+import re
+from typing import List, Optional, Tuple
+
+try:
+    from mypy_boto3_s3 import S3Client
+except ImportError:
+    # Ignore this since mypy plugins are dev dependencies
+    pass
+
+# Min number of bytes to download per request
+BLOCK_SIZE = 64 * 1024
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-\d+/(\d+)")
+
+
+class S3RangedFile(io.RawIOBase):
+    """
+    A read-only, seekable file of an S3 object, which only downloads the bytes
+    being read, at least BLOCK_SIZE at a time, with range GETs.
+
+    The object's size is taken from the first response, so reading the header
+    of a file only takes one request, and its footer the same.
+    """
+
+    def __init__(self, client: "S3Client", bucket: str, key: str):
+        self._client = client
+        self._bucket = bucket
+        self._key = key
+        self._position = 0
+        self._size: Optional[int] = None
+
+        # The downloaded (offset, bytes)
+        self._segments: List[Tuple[int, bytes]] = []
+
+        # Stats of the downloads
+        self.requests = 0
+        self.bytes_downloaded = 0
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            # The footer is likely read next, download it along the way
+            self._download(f"bytes=-{BLOCK_SIZE}")
+        assert self._size is not None
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        end = self._position + len(buffer)
+        if self._size is not None:
+            end = min(end, self._size)
+        if end <= self._position:
+            return 0
+
+        data = self._read(self._position, end)
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def _read(self, start: int, end: int) -> bytes:
+        for offset, segment in self._segments:
+            if offset <= start and end <= offset + len(segment):
+                return segment[start - offset : end - offset]
+
+        offset, segment = self._download(
+            f"bytes={start}-{max(end, start + BLOCK_SIZE) - 1}"
+        )
+        return segment[start - offset : end - offset]
+
+    def _download(self, byte_range: str) -> Tuple[int, bytes]:
+        response = self._client.get_object(
+            Bucket=self._bucket, Key=self._key, Range=byte_range
+        )
+        segment = response["Body"].read()
+        self.requests += 1
+        self.bytes_downloaded += len(segment)
+
+        match = _CONTENT_RANGE.match(response.get("ContentRange", ""))
+        if match is None:
+            # The whole object is returned if the range isn't supported
+            offset, self._size = 0, len(segment)
+        else:
+            offset, self._size = int(match.group(1)), int(match.group(2))
+
+        self._segments.append((offset, segment))
+        return offset, segment
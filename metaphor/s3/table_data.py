@@ -1,6 +1,8 @@
+import heapq
+from dataclasses import field
 from datetime import datetime
 from functools import cached_property
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import yarl
 from pydantic.dataclasses import dataclass
@@ -10,7 +12,7 @@ from metaphor.models.metadata_change_event import DataPlatform, DatasetLogicalID
 from metaphor.s3.path_spec import PartitionField
 
 try:
-    from mypy_boto3_s3.service_resource import ObjectSummary
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
 except ImportError:
     pass
 from metaphor.s3.config import PathSpec
@@ -26,15 +28,15 @@ class FileObject:
     path_spec: PathSpec
 
     @classmethod
-    def from_object_summary(
-        cls, obj: "ObjectSummary", path_spec: PathSpec
+    def from_object(
+        cls, bucket_name: str, obj: "ObjectTypeDef", path_spec: PathSpec
     ) -> "FileObject":
-        s3_path = f"s3://{obj.bucket_name}/{obj.key}"
+        s3_path = f"s3://{bucket_name}/{obj['Key']}"
         logger.debug(f"Found file object, path: {s3_path}")
         return cls(
             path=s3_path,
-            last_modified=obj.last_modified,
-            size=obj.size,
+            last_modified=obj["LastModified"],
+            size=obj["Size"],
             path_spec=path_spec,
         )
 
@@ -56,6 +58,12 @@ class TableData:
 
     number_of_files: int = 0  # TODO: make use of this field
 
+    # The (last modified, path) of the latest non-empty files
+    samples: List[Tuple[datetime, str]] = field(default_factory=list)
+
+    # Max number of files to infer the schema from
+    max_samples: int = 1
+
     @property
     def guid(self) -> str:
         return self.table_path
@@ -69,8 +77,17 @@ class TableData:
             platform=DataPlatform.S3,
         )
 
+    @property
+    def sample_paths(self) -> List[str]:
+        """The files to infer the schema from, starting with the latest one"""
+        paths = [self.full_path]
+        paths.extend(path for _, path in self.samples if path != self.full_path)
+        return paths[: self.max_samples]
+
     @classmethod
-    def from_file_object(cls, file_object: FileObject) -> "TableData":
+    def from_file_object(
+        cls, file_object: FileObject, max_samples: int = 1
+    ) -> "TableData":
         logger.debug(f"Getting table data for path: {file_object.path}")
         table_name, table_path = file_object.path_spec.extract_table_name_and_path(
             file_object.path
@@ -88,6 +105,12 @@ class TableData:
             table_path=table_path,
             number_of_files=1,
             size_in_bytes=file_object.size,
+            samples=(
+                [(file_object.last_modified, file_object.path)]
+                if file_object.size > 0
+                else []
+            ),
+            max_samples=max_samples,
         )
 
     @cached_property
@@ -147,7 +170,8 @@ class TableData:
 
         If there's no partition, we use the newer of the two; otherwise we merge
         the partitions, and combine `size_in_bytes` and `number_of_files` of the
-        two TableDatas.
+        two TableDatas. The latest `max_samples` files of the two are kept as
+        samples.
         """
         if not self.table_path:
             return other
@@ -167,6 +191,9 @@ class TableData:
             size_in_bytes = other.size_in_bytes
             number_of_files = other.number_of_files
 
+        max_samples = max(self.max_samples, other.max_samples)
+        samples = heapq.nlargest(max_samples, self.samples + other.samples)
+
         partitions = TableData.merge_partitions(self.partitions, other.partitions)
         if partitions:
             size_in_bytes = self.size_in_bytes + other.size_in_bytes
@@ -180,4 +207,6 @@ class TableData:
             table_path=self.table_path,
             size_in_bytes=size_in_bytes,
             number_of_files=number_of_files,
+            samples=samples,
+            max_samples=max_samples,
         )
@@ -1,5 +1,5 @@
 from dataclasses import field
-from typing import List, Set
+from typing import List, Optional, Set
 
 from pydantic.dataclasses import dataclass
 
@@ -9,12 +9,15 @@ from metaphor.common.tag_matcher import TagMatcher
 from metaphor.snowflake.auth import SnowflakeAuthConfig
 from metaphor.snowflake.utils import DEFAULT_THREAD_POOL_SIZE
 
-# number of query logs to fetch from Snowflake in one batch
+# approximate number of query logs to fetch from Snowflake in one batch
 DEFAULT_QUERY_LOG_FETCH_SIZE = 100000
 
 # By default ignore queries larger than 512KiB
 DEFAULT_MAX_QUERY_SIZE = 512 * 1024
 
+# ACCESS_HISTORY can be up to 3 hours late
+DEFAULT_WATERMARK_OVERLAP_MINUTES = 180
+
 
 @dataclass(config=ConnectorConfig)
 class SnowflakeQueryLogConfig:
@@ -24,12 +27,22 @@ class SnowflakeQueryLogConfig:
     # Query log filter to exclude certain usernames
     excluded_usernames: Set[str] = field(default_factory=lambda: set())
 
-    # The number of query logs to fetch from Snowflake in one batch
+    # The approximate number of query logs to fetch from Snowflake in one batch.
+    # The lookback window is split into time slices of about this many queries.
     fetch_size: int = DEFAULT_QUERY_LOG_FETCH_SIZE
 
     # Queries larger than this size will not be processed
     max_query_size: int = DEFAULT_MAX_QUERY_SIZE
 
+    # Local path or s3:// URI of a file to keep the last fetched query in. If set,
+    # only the queries since the previous successful run are fetched, up to
+    # lookback_days ago.
+    watermark_file: Optional[str] = None
+
+    # Re-fetch the queries within this many minutes before the last fetched query,
+    # as query history can be late. Queries fetched before are skipped.
+    watermark_overlap_minutes: int = DEFAULT_WATERMARK_OVERLAP_MINUTES
+
 
 @dataclass(config=ConnectorConfig)
 class SnowflakeStreamsConfig:
@@ -59,3 +72,7 @@ class SnowflakeConfig(SnowflakeBaseConfig):
 
     # configs for fetching Snowflake streams
     streams: SnowflakeStreamsConfig = SnowflakeStreamsConfig()
+
+    # Crawl multiple databases at once, each on its own connection, up to
+    # max_concurrency databases at a time
+    concurrent_crawl: bool = False
@@ -1,11 +1,16 @@
-import math
-from datetime import datetime, timezone
-from typing import Collection, Dict, List, Literal, Mapping, Optional, Tuple
+import asyncio
+import copy
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Collection, Dict, List, Literal, Optional, Set, Tuple
 
 from pydantic import TypeAdapter
 
 try:
-    from snowflake.connector.cursor import DictCursor, SnowflakeCursor
+    from snowflake.connector import SnowflakeConnection
+    from snowflake.connector.cursor import SnowflakeCursor
     from snowflake.connector.errors import ProgrammingError
 except ImportError:
     print("Please install metaphor[snowflake] extra\n")
@@ -25,6 +30,7 @@ from metaphor.common.query_history import chunk_query_logs, user_id_or_email
 from metaphor.common.snowflake import normalize_snowflake_account
 from metaphor.common.tag_matcher import tag_datasets
 from metaphor.common.utils import chunks, md5_digest, safe_float, start_of_day
+from metaphor.common.watermark import QueryLogWatermark, WatermarkStore
 from metaphor.models.crawler_run_metadata import Platform
 from metaphor.models.metadata_change_event import (
     DataPlatform,
@@ -57,7 +63,7 @@ from metaphor.snowflake.utils import (
     async_execute,
     check_access_history,
     exclude_username_clause,
-    fetch_query_history_count,
+    query_history_time_slices,
     str_to_source_type,
     str_to_stream_type,
     table_type_to_materialization_type,
@@ -97,7 +103,20 @@ class SnowflakeExtractor(BaseExtractor):
         self._query_log_lookback_days = config.query_log.lookback_days
         self._query_log_fetch_size = config.query_log.fetch_size
         self._query_log_max_query_size = config.query_log.max_query_size
+        self._query_log_watermark_overlap = timedelta(
+            minutes=config.query_log.watermark_overlap_minutes
+        )
+        self._watermark_store = (
+            WatermarkStore.from_path(
+                config.query_log.watermark_file, config.output.file
+            )
+            if config.query_log.watermark_file
+            else None
+        )
+        self._watermark: Optional[QueryLogWatermark] = None
         self._max_concurrency = config.max_concurrency
+        self._table_info_concurrency = config.max_concurrency
+        self._concurrent_crawl = config.concurrent_crawl
         self._streams_enabled = config.streams.enabled
         self._streams_count_rows = config.streams.count_rows
         self._config = config
@@ -107,6 +126,11 @@ class SnowflakeExtractor(BaseExtractor):
         self._logs: List[QueryLog] = []
 
     async def extract(self) -> Collection[ENTITY_TYPES]:
+        return [entity async for entity in self.extract_stream()]
+
+    async def extract_stream(self) -> AsyncIterator[ENTITY_TYPES]:
+        """Yield the datasets one database at a time, followed by the query logs
+        and hierarchies, so only a single database is kept in memory"""
         logger.info("Fetching metadata from Snowflake")
 
         self._conn = auth.connect(self._config)
@@ -124,42 +148,146 @@ class SnowflakeExtractor(BaseExtractor):
             shared_databases = self._fetch_shared_databases(cursor)
             logger.info(f"Shared inbound databases: {shared_databases}")
 
-            for database in databases:
-                tables = self._fetch_tables(cursor, database)
-                if len(tables) == 0:
-                    logger.info(f"Skip empty database {database}")
-                    continue
-
-                logger.info(f"Include {len(tables)} tables from {database}")
-
-                self._fetch_columns(cursor, database)
+            tag_references = self._fetch_tag_references(cursor)
+            self._add_system_tags(tag_references)
 
-                try:
-                    self._fetch_table_info(tables, database in shared_databases)
-                except Exception as e:
-                    logger.exception(
-                        f"Failed to fetch table extra info for '{database}'\n{e}"
-                    )
-
-                if self._streams_enabled:
-                    for schema in self._fetch_schemas(cursor):
-                        self._fetch_streams(cursor, database, schema)
+            if self._concurrent_crawl:
+                async for datasets in self._crawl_databases_concurrently(
+                    databases, shared_databases, tag_references
+                ):
+                    for dataset in datasets:
+                        yield dataset
+            else:
+                for database in databases:
+                    for dataset in self._crawl_database(
+                        cursor, database, database in shared_databases, tag_references
+                    ):
+                        yield dataset
 
-            self._fetch_primary_keys(cursor)
-            self._fetch_unique_keys(cursor)
-            self._fetch_tags(cursor)
+            self._datasets = {}
 
             if self._query_log_lookback_days > 0:
                 self._fetch_query_logs()
+                for query_logs in chunk_query_logs(self._logs):
+                    yield query_logs
+                self._logs = []
+
+        for hierarchy in self._hierarchies.values():
+            yield hierarchy
+
+    def _crawl_database(
+        self,
+        cursor: SnowflakeCursor,
+        database: str,
+        is_shared_database: bool,
+        tag_references: List[Tuple],
+    ) -> List[Dataset]:
+        """Fetch the datasets of a database from scratch, and tag them"""
+        self._datasets = {}
+        self._fetch_database(cursor, database, is_shared_database)
+        self._append_dataset_tags(
+            [
+                tag_reference
+                for tag_reference in tag_references
+                if self._tag_reference_database(tag_reference) == database.lower()
+            ]
+        )
 
         datasets = list(self._datasets.values())
         tag_datasets(datasets, self._tag_matchers)
+        return datasets
+
+    async def _crawl_databases_concurrently(
+        self,
+        databases: List[str],
+        shared_databases: List[str],
+        tag_references: List[Tuple],
+    ) -> AsyncIterator[List[Dataset]]:
+        """
+        Crawl up to max_concurrency databases at once, each on its own connection,
+        and yield the datasets of each database as soon as it's done
+        """
+        workers = max(min(self._max_concurrency, len(databases)), 1)
+        logger.info(f"Crawling {len(databases)} databases with {workers} connections")
+        start = time.time()
+
+        # Connections are opened on demand, at most one per worker
+        connections: "queue.SimpleQueue[SnowflakeConnection]" = queue.SimpleQueue()
+
+        def crawl(database: str) -> List[Dataset]:
+            try:
+                conn = connections.get_nowait()
+            except queue.Empty:
+                conn = auth.connect(self._config)
+
+            try:
+                # Each database is fetched into a separate copy of the extractor,
+                # so the workers don't share any mutable state
+                crawler = copy.copy(self)
+                crawler._conn = conn
+                # Keep the total number of concurrent queries within max_concurrency
+                crawler._table_info_concurrency = 1
+                with conn.cursor() as cursor:
+                    return crawler._crawl_database(
+                        cursor, database, database in shared_databases, tag_references
+                    )
+            finally:
+                connections.put(conn)
+
+        loop = asyncio.get_running_loop()
+        remaining = iter(databases)
+        pending: Set["asyncio.Future[List[Dataset]]"] = set()
+
+        def submit_next(executor: ThreadPoolExecutor) -> None:
+            for database in remaining:
+                pending.add(loop.run_in_executor(executor, crawl, database))
+                return
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for _ in range(workers):
+                    submit_next(executor)
+
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        submit_next(executor)
+                        yield future.result()
+        finally:
+            while not connections.empty():
+                connections.get_nowait().close()
+
+        logger.info(f"Crawled {len(databases)} databases in {time.time() - start:.1f}s")
+
+    def _fetch_database(
+        self, cursor: SnowflakeCursor, database: str, is_shared_database: bool
+    ) -> None:
+        start = time.time()
+
+        tables = self._fetch_tables(cursor, database)
+        if len(tables) == 0:
+            logger.info(f"Skip empty database {database}")
+            return
 
-        entities: List[ENTITY_TYPES] = []
-        entities.extend(datasets)
-        entities.extend(chunk_query_logs(self._logs))
-        entities.extend(self._hierarchies.values())
-        return entities
+        logger.info(f"Include {len(tables)} tables from {database}")
+
+        self._fetch_columns(cursor, database)
+
+        try:
+            self._fetch_table_info(tables, is_shared_database)
+        except Exception as e:
+            logger.exception(f"Failed to fetch table extra info for '{database}'\n{e}")
+
+        if self._streams_enabled:
+            for schema in self._fetch_schemas(cursor):
+                self._fetch_streams(cursor, database, schema)
+
+        self._fetch_primary_keys(cursor, database)
+        self._fetch_unique_keys(cursor, database)
+
+        logger.info(f"Fetched database {database} in {time.time() - start:.1f}s")
 
     @staticmethod
     def fetch_databases(cursor: SnowflakeCursor) -> List[str]:
@@ -267,20 +395,35 @@ class SnowflakeExtractor(BaseExtractor):
     def _fetch_table_info(
         self, tables: Dict[str, DatasetInfo], is_shared_database: bool
     ) -> None:
-        dict_cursor: DictCursor = self._conn.cursor(DictCursor)  # type: ignore
-        for chunk in chunks(list(tables.items()), TABLE_INFO_FETCH_SIZE):
-            self._fetch_table_info_internal(dict_cursor, chunk, is_shared_database)
+        queries: Dict[str, QueryWithParam] = {}
+        columns: Dict[str, List[Tuple[str, str]]] = {}
+        for index, chunk in enumerate(
+            chunks(list(tables.items()), TABLE_INFO_FETCH_SIZE)
+        ):
+            query, chunk_columns = self._table_info_query(chunk, is_shared_database)
+            if query is not None:
+                queries[str(index)] = query
+                columns[str(index)] = chunk_columns
+
+        # Chunks are independent, run them concurrently
+        results = async_execute(
+            self._conn, queries, "fetch_table_info", self._table_info_concurrency
+        )
 
-        dict_cursor.close()
+        for key, rows in results.items():
+            self._parse_table_info(columns[key], rows[0])
 
-    def _fetch_table_info_internal(
-        self,
-        dict_cursor: DictCursor,
+    @staticmethod
+    def _table_info_query(
         tables: List[Tuple[str, DatasetInfo]],
         is_shared_database: bool,
-    ) -> None:
+    ) -> Tuple[Optional[QueryWithParam], List[Tuple[str, str]]]:
+        """
+        Build a query for the extra info of the tables, returns the query and
+        the (info type, normalized name) of its columns
+        """
         queries, params = [], []
-        ddl_tables, updated_time_tables = [], []
+        columns: List[Tuple[str, str]] = []
         for normalized_name, table in tables:
             fullname = to_quoted_identifier([table.database, table.schema, table.name])
             # fetch last_update_time and DDL for tables, and fetch only DDL for views
@@ -289,43 +432,45 @@ class SnowflakeExtractor(BaseExtractor):
                     f'SYSTEM$LAST_CHANGE_COMMIT_TIME(%s) as "UPDATED_{normalized_name}"'
                 )
                 params.append(fullname)
-                updated_time_tables.append(normalized_name)
+                columns.append(("UPDATED", normalized_name))
 
             # shared database doesn't support getting DDL
             if not is_shared_database:
                 queries.append(f"get_ddl('table', %s) as \"DDL_{normalized_name}\"")
                 params.append(fullname)
-                ddl_tables.append(normalized_name)
+                columns.append(("DDL", normalized_name))
 
         if not queries:
-            return
+            return None, columns
         query = f"SELECT {','.join(queries)}"
         logger.debug(query)
 
-        dict_cursor.execute(query, tuple(params))
-        results = dict_cursor.fetchone()
-        assert isinstance(results, Mapping)
+        return QueryWithParam(query, tuple(params)), columns
 
-        for normalized_name in ddl_tables:
+    def _parse_table_info(self, columns: List[Tuple[str, str]], row: Tuple) -> None:
+        for (info_type, normalized_name), value in zip(columns, row):
             dataset = self._datasets[normalized_name]
             assert dataset.schema is not None and dataset.schema.sql_schema is not None
 
-            dataset.schema.sql_schema.table_schema = results[f"DDL_{normalized_name}"]
-
-        for normalized_name in updated_time_tables:
-            dataset = self._datasets[normalized_name]
-            assert dataset.schema.sql_schema is not None
+            if info_type == "DDL":
+                dataset.schema.sql_schema.table_schema = value
+                continue
 
             # Timestamp is in nanosecond.
             # See https://docs.snowflake.com/en/sql-reference/functions/system_last_change_commit_time.html
-            timestamp = results[f"UPDATED_{normalized_name}"]
-            if timestamp > 0:
+            if value > 0:
                 dataset.statistics.last_updated = datetime.utcfromtimestamp(
-                    timestamp / 1000000000
+                    value / 1000000000
                 ).replace(tzinfo=timezone.utc)
 
-    def _fetch_unique_keys(self, cursor: SnowflakeCursor) -> None:
-        cursor.execute("SHOW UNIQUE KEYS")
+    def _fetch_unique_keys(
+        self, cursor: SnowflakeCursor, database: Optional[str] = None
+    ) -> None:
+        cursor.execute(
+            "SHOW UNIQUE KEYS"
+            if database is None
+            else f"SHOW UNIQUE KEYS IN DATABASE {database}"
+        )
 
         for entry in cursor:
             database, schema, table_name, column, constraint_name = (
@@ -356,8 +501,14 @@ class SnowflakeExtractor(BaseExtractor):
 
             field.is_unique = True
 
-    def _fetch_primary_keys(self, cursor: SnowflakeCursor) -> None:
-        cursor.execute("SHOW PRIMARY KEYS")
+    def _fetch_primary_keys(
+        self, cursor: SnowflakeCursor, database: Optional[str] = None
+    ) -> None:
+        cursor.execute(
+            "SHOW PRIMARY KEYS"
+            if database is None
+            else f"SHOW PRIMARY KEYS IN DATABASE {database}"
+        )
 
         for entry in cursor:
             database, schema, table_name, column, constraint_name = (
@@ -483,6 +634,12 @@ class SnowflakeExtractor(BaseExtractor):
                     field.tags.append(tag)
 
     def _fetch_tags(self, cursor: SnowflakeCursor) -> None:
+        tag_references = self._fetch_tag_references(cursor)
+        self._add_system_tags(tag_references)
+        self._append_dataset_tags(tag_references)
+
+    @staticmethod
+    def _fetch_tag_references(cursor: SnowflakeCursor) -> List[Tuple]:
         cursor.execute(
             """
             SELECT TAG_NAME, TAG_VALUE, DOMAIN, OBJECT_DATABASE, OBJECT_SCHEMA, OBJECT_NAME, COLUMN_NAME
@@ -495,11 +652,29 @@ class SnowflakeExtractor(BaseExtractor):
                           end asc;
             """
         )
+        return [tuple(row) for row in cursor]
 
-        for key, value, object_type, database, schema, object_name, column in cursor:
+    @staticmethod
+    def _tag_reference_database(tag_reference: Tuple) -> Optional[str]:
+        _, _, object_type, database, _, object_name, _ = tag_reference
+        name = object_name if object_type == "DATABASE" else database
+        return name.lower() if name else None
+
+    def _add_system_tags(self, tag_references: List[Tuple]) -> None:
+        for key, value, object_type, database, _, object_name, _ in tag_references:
             if object_type in {"DATABASE", "SCHEMA"}:
                 self._add_system_tag(database, object_name, object_type, key, value)
 
+    def _append_dataset_tags(self, tag_references: List[Tuple]) -> None:
+        for (
+            key,
+            value,
+            object_type,
+            database,
+            schema,
+            object_name,
+            column,
+        ) in tag_references:
             if object_type == "DATABASE":
                 key_prefix = dataset_normalized_name(db=object_name)
             elif object_type == "SCHEMA":
@@ -524,23 +699,26 @@ class SnowflakeExtractor(BaseExtractor):
         start_date = start_of_day(self._query_log_lookback_days)
         end_date = start_of_day()
 
+        if self._watermark_store is not None:
+            # Fetch everything up to now, the next run will pick up from here
+            self._watermark = self._watermark_store.load(
+                self._account, self._query_log_watermark_overlap
+            )
+            start_date = self._watermark.resume_from(start_date)
+            end_date = datetime.now(timezone.utc)
+            logger.info(f"Fetching query logs from {start_date} to {end_date}")
+
         has_access_history = check_access_history(self._conn)
         logger.info(f"Using Snowflake Enterprise edition: {has_access_history}")
 
-        count = fetch_query_history_count(
-            self._conn,
-            start_date,
-            self._query_log_excluded_usernames,
-            end_date,
-            has_access_history,
+        time_slices = query_history_time_slices(
+            self._conn, start_date, end_date, self._query_log_fetch_size
         )
-        batches = math.ceil(count / self._query_log_fetch_size)
-        logger.info(f"Total {count} queries, dividing into {batches} batches")
 
         queries = (
-            self._batch_query_for_access_logs(start_date, end_date, batches)
+            self._batch_query_for_access_logs(time_slices)
             if has_access_history
-            else self._batch_query_for_query_logs(start_date, end_date, batches)
+            else self._batch_query_for_query_logs(time_slices)
         )
 
         async_execute(
@@ -553,6 +731,10 @@ class SnowflakeExtractor(BaseExtractor):
 
         logger.info(f"Fetched {len(self._logs)} query logs")
 
+    def commit_state(self) -> None:
+        if self._watermark_store is not None and self._watermark is not None:
+            self._watermark_store.save(self._account, self._watermark)
+
     def _fetch_schemas(self, cursor: SnowflakeCursor) -> List[str]:
         cursor.execute(
             "SELECT schema_name FROM information_schema.schemata WHERE schema_name != 'INFORMATION_SCHEMA'"
@@ -653,10 +835,10 @@ class SnowflakeExtractor(BaseExtractor):
         return None
 
     def _batch_query_for_access_logs(
-        self, start_date: datetime, end_date: datetime, batches: int
-    ):
+        self, time_slices: List[Tuple[datetime, datetime]]
+    ) -> Dict[str, QueryWithParam]:
         return {
-            x: QueryWithParam(
+            str(x): QueryWithParam(
                 f"""
                 SELECT q.QUERY_ID, q.USER_NAME, QUERY_TEXT, START_TIME, TOTAL_ELAPSED_TIME, CREDITS_USED_CLOUD_SERVICES,
                   DATABASE_NAME, SCHEMA_NAME, BYTES_SCANNED, BYTES_WRITTEN, ROWS_PRODUCED, ROWS_INSERTED, ROWS_UPDATED,
@@ -665,47 +847,41 @@ class SnowflakeExtractor(BaseExtractor):
                 JOIN SNOWFLAKE.ACCOUNT_USAGE.ACCESS_HISTORY a
                   ON a.QUERY_ID = q.QUERY_ID
                 WHERE EXECUTION_STATUS = 'SUCCESS'
-                  AND START_TIME > %s AND START_TIME <= %s
-                  AND QUERY_START_TIME > %s AND QUERY_START_TIME <= %s
+                  AND START_TIME >= %s AND START_TIME < %s
+                  AND QUERY_START_TIME >= %s AND QUERY_START_TIME < %s
                   {exclude_username_clause(self._query_log_excluded_usernames)}
-                ORDER BY q.QUERY_ID
-                LIMIT {self._query_log_fetch_size} OFFSET %s
                 """,
                 (
-                    start_date,
-                    end_date,
-                    start_date,
-                    end_date,
+                    start,
+                    end,
+                    start,
+                    end,
                     *self._query_log_excluded_usernames,
-                    x * self._query_log_fetch_size,
                 ),
             )
-            for x in range(batches)
+            for x, (start, end) in enumerate(time_slices)
         }
 
     def _batch_query_for_query_logs(
-        self, start_date: datetime, end_date: datetime, batches: int
-    ):
+        self, time_slices: List[Tuple[datetime, datetime]]
+    ) -> Dict[str, QueryWithParam]:
         return {
-            x: QueryWithParam(
+            str(x): QueryWithParam(
                 f"""
                 SELECT QUERY_ID, USER_NAME, QUERY_TEXT, START_TIME, TOTAL_ELAPSED_TIME, CREDITS_USED_CLOUD_SERVICES,
                   DATABASE_NAME, SCHEMA_NAME, BYTES_SCANNED, BYTES_WRITTEN, ROWS_PRODUCED, ROWS_INSERTED, ROWS_UPDATED
                 FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY q
                 WHERE EXECUTION_STATUS = 'SUCCESS'
-                  AND START_TIME > %s AND START_TIME <= %s
+                  AND START_TIME >= %s AND START_TIME < %s
                   {exclude_username_clause(self._query_log_excluded_usernames)}
-                ORDER BY QUERY_ID
-                LIMIT {self._query_log_fetch_size} OFFSET %s
                 """,
                 (
-                    start_date,
-                    end_date,
+                    start,
+                    end,
                     *self._query_log_excluded_usernames,
-                    x * self._query_log_fetch_size,
                 ),
             )
-            for x in range(batches)
+            for x, (start, end) in enumerate(time_slices)
         }
 
     def _parse_query_logs(self, batch_number: str, query_logs: List[Tuple]) -> None:
@@ -727,6 +903,12 @@ class SnowflakeExtractor(BaseExtractor):
             *access_objects,
         ) in query_logs:
             try:
+                # Skip queries already processed by the previous run
+                if self._watermark is not None and not self._watermark.add(
+                    query_id, start_time
+                ):
+                    continue
+
                 sources = (
                     self._parse_accessed_objects(access_objects[0])
                     if len(access_objects) == 2
@@ -20,5 +20,5 @@ class SnowflakeLineageRunConfig(SnowflakeBaseConfig):
     # Whether to include self loop in lineage
     include_self_lineage: bool = True
 
-    # The number of access logs fetched in a batch, default to 100000
+    # The approximate number of access logs fetched in a batch, default to 100000
     batch_size: int = DEFAULT_BATCH_SIZE
@@ -1,5 +1,5 @@
 import logging
-import math
+from datetime import datetime, timezone
 from typing import Collection, Dict, List, Tuple, Union
 
 from pydantic import TypeAdapter
@@ -25,7 +25,11 @@ from metaphor.snowflake import auth
 from metaphor.snowflake.accessed_object import AccessedObject
 from metaphor.snowflake.extractor import DEFAULT_FILTER
 from metaphor.snowflake.lineage.config import SnowflakeLineageRunConfig
-from metaphor.snowflake.utils import QueryWithParam, async_execute
+from metaphor.snowflake.utils import (
+    QueryWithParam,
+    async_execute,
+    query_history_time_slices,
+)
 
 logger = get_logger()
 
@@ -71,37 +75,21 @@ class SnowflakeLineageExtractor(BaseExtractor):
 
         self._conn = auth.connect(self._config)
         start_date = start_of_day(self._lookback_days)
+        end_date = datetime.now(timezone.utc)
 
         with self._conn:
             cursor = self._conn.cursor()
 
             if self._enable_lineage_from_history:
                 logger.info("Fetching access and query history")
-                # Join QUERY_HISTORY & ACCESS_HISTORY to include only queries that succeeded.
-                cursor.execute(
-                    """
-                    SELECT COUNT(*)
-                    FROM
-                        SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY q,
-                        SNOWFLAKE.ACCOUNT_USAGE.ACCESS_HISTORY a
-                    WHERE q.QUERY_ID = a.QUERY_ID
-                        AND q.EXECUTION_STATUS = 'SUCCESS'
-                        AND ARRAY_SIZE(a.BASE_OBJECTS_ACCESSED) > 0
-                        AND ARRAY_SIZE(a.OBJECTS_MODIFIED) > 0
-                        AND a.QUERY_START_TIME > %s
-                    ORDER BY a.QUERY_START_TIME ASC
-                    """,
-                    (start_date,),
+                time_slices = query_history_time_slices(
+                    self._conn, start_date, end_date, self._batch_size
                 )
-                res = cursor.fetchone()
-                assert res is not None, f"Missing count: {res}"
-                count = res[0]
-                batches = math.ceil(count / self._batch_size)
-                logger.info(f"Total {count} queries, dividing into {batches} batches")
 
+                # Join QUERY_HISTORY & ACCESS_HISTORY to include only queries that succeeded.
                 queries = {
                     str(x): QueryWithParam(
-                        f"""
+                        """
                         SELECT a.BASE_OBJECTS_ACCESSED, a.OBJECTS_MODIFIED, q.QUERY_TEXT
                         FROM
                             SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY q,
@@ -110,16 +98,11 @@ class SnowflakeLineageExtractor(BaseExtractor):
                             AND q.EXECUTION_STATUS = 'SUCCESS'
                             AND ARRAY_SIZE(a.BASE_OBJECTS_ACCESSED) > 0
                             AND ARRAY_SIZE(a.OBJECTS_MODIFIED) > 0
-                            AND a.QUERY_START_TIME > %s
-                        ORDER BY a.QUERY_START_TIME ASC
-                        LIMIT {self._batch_size} OFFSET %s
+                            AND a.QUERY_START_TIME >= %s AND a.QUERY_START_TIME < %s
                         """,
-                        (
-                            start_date,
-                            x * self._batch_size,
-                        ),
+                        (start, end),
                     )
-                    for x in range(batches)
+                    for x, (start, end) in enumerate(time_slices)
                 }
                 async_execute(
                     self._conn,
@@ -4,6 +4,7 @@ from pydantic.dataclasses import dataclass
 
 from metaphor.common.column_statistics import ColumnStatistics
 from metaphor.common.dataclass import ConnectorConfig
+from metaphor.common.profile_batch import ProfileBatchConfig
 from metaphor.common.sampling import SamplingConfig
 from metaphor.snowflake.config import SnowflakeBaseConfig
 
@@ -19,3 +20,6 @@ class SnowflakeProfileRunConfig(SnowflakeBaseConfig):
     include_views: bool = False
 
     sampling: SamplingConfig = field(default_factory=lambda: SamplingConfig())
+
+    # Profile small tables in batches
+    batch: ProfileBatchConfig = field(default_factory=lambda: ProfileBatchConfig())
@@ -16,6 +16,7 @@ from metaphor.common.entity_id import (
 )
 from metaphor.common.event_util import ENTITY_TYPES
 from metaphor.common.logger import get_logger
+from metaphor.common.profile_batch import build_batch_query, split_batch_result
 from metaphor.common.sampling import SamplingConfig
 from metaphor.common.snowflake import normalize_snowflake_account
 from metaphor.common.utils import safe_float, safe_int
@@ -75,6 +76,7 @@ class SnowflakeProfileExtractor(BaseExtractor):
         self._include_views = config.include_views
         self._column_statistics = config.column_statistics
         self._sampling = config.sampling
+        self._batch = config.batch
         self._config = config
 
         self._datasets: Dict[str, Dataset] = {}
@@ -174,6 +176,7 @@ class SnowflakeProfileExtractor(BaseExtractor):
                 (column_name, data_type)
             )
 
+        batched: List[Table] = []
         for table, column_info in column_info_map.items():
             row_count = None
             dataset_info = tables.get(
@@ -182,6 +185,10 @@ class SnowflakeProfileExtractor(BaseExtractor):
             if dataset_info:
                 row_count = dataset_info.row_count
 
+            if self._batch.should_batch(row_count, len(column_info), self._sampling):
+                batched.append(table)
+                continue
+
             profile_queries[table.full_name] = QueryWithParam(
                 SnowflakeProfileExtractor._build_profiling_query(
                     column_info,
@@ -193,6 +200,18 @@ class SnowflakeProfileExtractor(BaseExtractor):
                 )
             )
 
+        # Batch names don't contain ".", so they don't conflict with table names
+        batches = {
+            f"batch-{i}": batch for i, batch in enumerate(self._batch.batches(batched))
+        }
+        for name, batch in batches.items():
+            profile_queries[name] = QueryWithParam(
+                SnowflakeProfileExtractor._build_batch_profiling_query(
+                    [(column_info_map[table], table) for table in batch],
+                    self._column_statistics,
+                )
+            )
+
         # Has to be here, otherwise patching during test would not work
         from metaphor.snowflake.utils import async_execute
 
@@ -200,59 +219,121 @@ class SnowflakeProfileExtractor(BaseExtractor):
             connection, profile_queries, "profile_columns", self._max_concurrency
         )
 
-        for full_name, profile in profiles.items():
-            # We need to make sure full_name points to an actual table,
-            # instead of view or stream table.
-            dataset = self._datasets.get(
-                normalize_full_dataset_name(full_name)
-            )  # FIXME normalized name is case insensitive, make it case sensitive so that this logic works properly
+        for name, profile in profiles.items():
+            if name in batches:
+                self._parse_batch_profiling_result(
+                    batches[name], column_info_map, profile
+                )
+            else:
+                self._parse_table_profiling_result(
+                    Table.from_name(name), column_info_map, profile[0]
+                )
 
-            if dataset:
-                SnowflakeProfileExtractor._parse_profiling_result(
-                    column_info_map[Table.from_name(full_name)],
-                    profile[0],
-                    dataset,
-                    self._column_statistics,
+    def _parse_batch_profiling_result(
+        self,
+        batch: List[Table],
+        column_info_map: Dict[Table, List[Tuple[str, str]]],
+        rows: List[Tuple],
+    ) -> None:
+        widths = [
+            len(
+                SnowflakeProfileExtractor._build_profiling_columns(
+                    column_info_map[table], self._column_statistics
                 )
+            )
+            for table in batch
+        ]
+        for index, results in split_batch_result(rows, widths):
+            self._parse_table_profiling_result(batch[index], column_info_map, results)
+
+    def _parse_table_profiling_result(
+        self,
+        table: Table,
+        column_info_map: Dict[Table, List[Tuple[str, str]]],
+        results: Tuple,
+    ) -> None:
+        # We need to make sure full_name points to an actual table,
+        # instead of view or stream table.
+        dataset = self._datasets.get(
+            normalize_full_dataset_name(table.full_name)
+        )  # FIXME normalized name is case insensitive, make it case sensitive so that this logic works properly
+
+        if dataset:
+            SnowflakeProfileExtractor._parse_profiling_result(
+                column_info_map[table],
+                results,
+                dataset,
+                self._column_statistics,
+            )
 
     @staticmethod
-    def _build_profiling_query(
+    def _build_profiling_columns(
         columns: List[Tuple[str, str]],
-        schema: str,
-        name: str,
-        row_count: int,
         column_statistics: ColumnStatistics,
-        sampling: SamplingConfig,
-    ) -> str:
-        query = ["SELECT COUNT(1)"]
+    ) -> List[str]:
+        """The select expressions to profile the columns"""
+        expressions = ["COUNT(1)"]
 
         for column, data_type in columns:
             if (
                 column_statistics.unique_count
                 and not SnowflakeProfileExtractor._is_complex(data_type)
             ):
-                query.append(f', COUNT(DISTINCT "{column}")')
+                expressions.append(f'COUNT(DISTINCT "{column}")')
 
             if column_statistics.null_count:
-                query.append(f', COUNT(1) - COUNT("{column}")')
+                expressions.append(f'COUNT(1) - COUNT("{column}")')
 
             if SnowflakeProfileExtractor._is_numeric(data_type):
                 if column_statistics.min_value:
-                    query.append(f', MIN("{column}")')
+                    expressions.append(f'MIN("{column}")')
                 if column_statistics.max_value:
-                    query.append(f', MAX("{column}")')
+                    expressions.append(f'MAX("{column}")')
                 if column_statistics.avg_value:
-                    query.append(f', AVG("{column}")')
+                    expressions.append(f'AVG("{column}")')
                 if column_statistics.std_dev:
-                    query.append(f', STDDEV(CAST("{column}" as DOUBLE))')
+                    expressions.append(f'STDDEV(CAST("{column}" as DOUBLE))')
 
-        query.append(f' FROM "{schema}"."{name}"')
+        return expressions
+
+    @staticmethod
+    def _build_profiling_query(
+        columns: List[Tuple[str, str]],
+        schema: str,
+        name: str,
+        row_count: int,
+        column_statistics: ColumnStatistics,
+        sampling: SamplingConfig,
+    ) -> str:
+        expressions = SnowflakeProfileExtractor._build_profiling_columns(
+            columns, column_statistics
+        )
+        query = [f'SELECT {", ".join(expressions)} FROM "{schema}"."{name}"']
 
         if sampling.percentage < 100 and row_count >= sampling.threshold:
             query.append(f" SAMPLE SYSTEM ({sampling.percentage})")
 
         return "".join(query)
 
+    @staticmethod
+    def _build_batch_profiling_query(
+        tables: List[Tuple[List[Tuple[str, str]], Table]],
+        column_statistics: ColumnStatistics,
+    ) -> str:
+        """Profile multiple tables, each of (columns, table), in a single query"""
+        return build_batch_query(
+            [
+                (
+                    SnowflakeProfileExtractor._build_profiling_columns(
+                        columns, column_statistics
+                    ),
+                    f'FROM "{table.schema}"."{table.name}"',
+                )
+                for columns, table in tables
+            ],
+            "TO_VARCHAR({})",
+        )
+
     @staticmethod
     def _parse_profiling_result(
         columns: List[Tuple[str, str]],
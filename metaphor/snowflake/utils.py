@@ -1,14 +1,17 @@
+import asyncio
 import logging
+import threading
 import time
 from concurrent import futures
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import Callable, Dict, List, Optional, Set, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 from snowflake.connector import SnowflakeConnection
 from snowflake.connector.cursor import SnowflakeCursor
 
+from metaphor.common.utils import time_slices
 from metaphor.models.metadata_change_event import (
     MaterializationType,
     SnowflakeStreamSourceType,
@@ -20,6 +23,10 @@ logger.setLevel(logging.INFO)
 
 DEFAULT_THREAD_POOL_SIZE = 10
 DEFAULT_SLEEP_TIME = 0.1  # 0.1 s
+MAX_SLEEP_TIME = 5  # 5 s
+
+# Number of rows passed to a results processor at a time
+DEFAULT_RESULTS_CHUNK_SIZE = 10000
 
 
 class SnowflakeTableType(Enum):
@@ -82,24 +89,148 @@ def to_quoted_identifier(parts: List[Optional[str]]) -> str:
     return ".".join([f"""\"{part.replace('"', '""')}\"""" for part in parts if part])
 
 
+def get_results(cursor: SnowflakeCursor) -> SnowflakeCursor:
+    """Prepare the cursor of a finished async query for fetching the results"""
+    query_id = cursor.sfqid
+    assert query_id, "Invalid query id None"
+    cursor.get_results_from_sfqid(query_id)
+    return cursor
+
+
+@dataclass
+class _PendingQuery:
+    cursor: SnowflakeCursor
+    future: "futures.Future[SnowflakeCursor]"
+    interval: float
+    next_poll: float
+
+
+class QueryWaiter:
+    """
+    Waits for Snowflake async queries to finish, polling all of them from a
+    single thread. Each query is polled with exponential backoff, so many
+    long-running queries don't flood Snowflake with status requests.
+    """
+
+    def __init__(
+        self,
+        conn: SnowflakeConnection,
+        min_interval: float = DEFAULT_SLEEP_TIME,
+        max_interval: float = MAX_SLEEP_TIME,
+    ):
+        self._conn = conn
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._condition = threading.Condition()
+        self._pending: Dict[str, _PendingQuery] = {}
+        self._poller: Optional[threading.Thread] = None
+
+    def submit(self, query: QueryWithParam) -> "futures.Future[SnowflakeCursor]":
+        """
+        Start running a query, returns a future resolved with the cursor once
+        the query has finished. Call get_results() on the cursor before
+        fetching the results.
+        """
+        cursor = self._conn.cursor()
+        if query.params is not None:
+            logger.debug(f"Query {query.query} params {query.params}")
+            cursor.execute_async(query.query, query.params)
+        else:
+            cursor.execute_async(query.query)
+
+        query_id = cursor.sfqid
+        assert query_id, "Invalid query id None"
+
+        future: "futures.Future[SnowflakeCursor]" = futures.Future()
+        with self._condition:
+            self._pending[query_id] = _PendingQuery(
+                cursor,
+                future,
+                self._min_interval,
+                time.monotonic() + self._min_interval,
+            )
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, daemon=True)
+                self._poller.start()
+            self._condition.notify()
+
+        return future
+
+    async def run(self, query: QueryWithParam) -> SnowflakeCursor:
+        """Run a query and wait for it without blocking the event loop"""
+        cursor = await asyncio.wrap_future(self.submit(query))
+        return await asyncio.get_running_loop().run_in_executor(
+            None, get_results, cursor
+        )
+
+    def _poll(self) -> None:
+        while True:
+            with self._condition:
+                if not self._pending:
+                    self._poller = None
+                    return
+
+                now = time.monotonic()
+                due = [
+                    (query_id, pending)
+                    for query_id, pending in self._pending.items()
+                    if pending.next_poll <= now
+                ]
+                if not due:
+                    next_poll = min(p.next_poll for p in self._pending.values())
+                    self._condition.wait(next_poll - now)
+                    continue
+
+            for query_id, pending in due:
+                self._check(query_id, pending)
+
+    def _check(self, query_id: str, pending: _PendingQuery) -> None:
+        try:
+            running = self._conn.is_still_running(self._conn.get_query_status(query_id))
+        except Exception as e:
+            self._resolve(query_id)
+            pending.future.set_exception(e)
+            return
+
+        if running:
+            pending.interval = min(pending.interval * 2, self._max_interval)
+            pending.next_poll = time.monotonic() + pending.interval
+            return
+
+        self._resolve(query_id)
+        pending.future.set_result(pending.cursor)
+
+    def _resolve(self, query_id: str) -> None:
+        with self._condition:
+            del self._pending[query_id]
+
+
 def async_query(conn: SnowflakeConnection, query: QueryWithParam) -> SnowflakeCursor:
     """Executing a snowflake query asynchronously"""
-    cursor = conn.cursor()
-    if query.params is not None:
-        logger.debug(f"Query {query.query} params {query.params}")
-        cursor.execute_async(query.query, query.params)
-    else:
-        cursor.execute_async(query.query)
+    return get_results(QueryWaiter(conn).submit(query).result())
 
-    query_id = cursor.sfqid
-    assert query_id, "Invalid query id None"
 
-    # Wait for the query to finish running.
-    while conn.is_still_running(conn.get_query_status(query_id)):
-        time.sleep(DEFAULT_SLEEP_TIME)
+def fetch_in_chunks(
+    cursor: SnowflakeCursor, chunk_size: int = DEFAULT_RESULTS_CHUNK_SIZE
+) -> Iterator[List]:
+    """
+    Iterate through the results of a query a chunk at a time. Unlike fetchall,
+    result batches are downloaded on demand, so only a few batches are held in
+    memory at any time.
+    """
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
 
-    cursor.get_results_from_sfqid(query_id)
-    return cursor
+
+def _log_errors(chunks: Iterator[List], message: str) -> Iterator[List]:
+    """Iterate through the chunks, logging an error fetching them"""
+    try:
+        yield from chunks
+    except Exception:
+        logger.exception(message)
 
 
 def async_execute(
@@ -110,32 +241,50 @@ def async_execute(
     results_processor: Optional[Callable[[str, List], None]] = None,
 ) -> Dict[str, List]:
     """
-    Executing snowflake query with a set of parameters using thread pool
+    Executing snowflake queries concurrently, at most max_workers at a time
     If results_processor is not provided, will return Dict[key, result_tuples],
-    Otherwise, apply the results_processor to the result_tuples
+    Otherwise, stream the result_tuples to the results_processor in chunks,
+    i.e. it can be called multiple times for the same key
     """
     workers = max_workers if max_workers is not None else DEFAULT_THREAD_POOL_SIZE
-    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
-        future_map = {
-            executor.submit(async_query, conn, query): key
-            for key, query in queries.items()
-        }
-
-        results_map = {}
-        for future in futures.as_completed(future_map):
-            key = future_map[future]
+    waiter = QueryWaiter(conn)
+    remaining = iter(queries.items())
+    future_map: Dict["futures.Future[SnowflakeCursor]", str] = {}
+
+    def submit_next() -> None:
+        for key, query in remaining:
+            try:
+                future_map[waiter.submit(query)] = key
+                return
+            except Exception:
+                logger.exception(f"Error executing {query_name} for {key}")
+
+    # Keep at most max_workers queries running
+    for _ in range(workers):
+        submit_next()
+
+    results_map = {}
+    while future_map:
+        done, _ = futures.wait(future_map, return_when=futures.FIRST_COMPLETED)
+        for future in done:
+            key = future_map.pop(future)
+            submit_next()
+
             try:
-                results = future.result().fetchall()
+                cursor = get_results(future.result())
+                if results_processor is None:
+                    results_map[key] = cursor.fetchall()
+                    continue
             except Exception:
                 logger.exception(f"Error executing {query_name} for {key}")
                 continue
 
-            if results_processor is None:
-                results_map[key] = results
-            else:
-                results_processor(key, results)
+            # Errors raised by the processor are not caught
+            chunks = fetch_in_chunks(cursor)
+            for rows in _log_errors(chunks, f"Error executing {query_name} for {key}"):
+                results_processor(key, rows)
 
-        return results_map
+    return results_map
 
 
 def exclude_username_clause(excluded_usernames: Set[str]) -> str:
@@ -168,54 +317,57 @@ def check_access_history(
     return len(result) > 0
 
 
-def fetch_query_history_count(
+# Granularity of the query history estimate used for time slicing
+QUERY_HISTORY_BUCKET = timedelta(hours=1)
+
+
+def fetch_query_history_estimate(
     conn: SnowflakeConnection,
     start_date: datetime,
-    excluded_usernames: Set[str],
-    end_date: datetime = datetime.now(),
-    has_access_history: bool = True,
-) -> int:
+    end_date: datetime,
+    bucket: timedelta = QUERY_HISTORY_BUCKET,
+) -> Dict[int, int]:
     """
-    Fetch query history count
+    Estimate the number of queries in each bucket of [start_date, end_date),
+    keyed by the bucket's index counting from start_date
+
+    Only START_TIME is read, which is much cheaper than counting the filtered
+    (and joined) query history. The counts are an upper bound of the rows
+    actually fetched.
     """
     cursor = conn.cursor()
-    if has_access_history:
-        cursor.execute(
-            f"""
-            SELECT COUNT(1)
-            FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY q
-            JOIN SNOWFLAKE.ACCOUNT_USAGE.ACCESS_HISTORY a
-              ON a.QUERY_ID = q.QUERY_ID
-            WHERE EXECUTION_STATUS = 'SUCCESS'
-              and START_TIME > %s and START_TIME <= %s
-              and QUERY_START_TIME > %s AND QUERY_START_TIME <= %s
-              {exclude_username_clause(excluded_usernames)}
-            """,
-            (
-                start_date,
-                end_date,
-                start_date,
-                end_date,
-                *excluded_usernames,
-            ),
-        )
-    else:
-        cursor.execute(
-            f"""
-            SELECT COUNT(1)
-            FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY q
-            WHERE EXECUTION_STATUS = 'SUCCESS'
-              and START_TIME > %s and START_TIME <= %s
-              {exclude_username_clause(excluded_usernames)}
-            """,
-            (
-                start_date,
-                end_date,
-                *excluded_usernames,
-            ),
-        )
+    cursor.execute(
+        """
+        SELECT FLOOR(TIMESTAMPDIFF(SECOND, %s, START_TIME) / %s), COUNT(1)
+        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+        WHERE START_TIME >= %s AND START_TIME < %s
+        GROUP BY 1
+        """,
+        (
+            start_date,
+            int(bucket.total_seconds()),
+            start_date,
+            end_date,
+        ),
+    )
+    return {int(index): count for index, count in cursor}
+
 
-    result = cursor.fetchone()
-    if result is not None:
-        return result[0]
-    return 0
+def query_history_time_slices(
+    conn: SnowflakeConnection,
+    start_date: datetime,
+    end_date: datetime,
+    slice_size: int,
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Split [start_date, end_date) into time slices with roughly slice_size
+    queries each, so each slice can be fetched with a single query
+    """
+    estimate = fetch_query_history_estimate(conn, start_date, end_date)
+    slices = time_slices(
+        start_date, end_date, estimate, slice_size, QUERY_HISTORY_BUCKET
+    )
+    logger.info(
+        f"Estimated {sum(estimate.values())} queries, dividing into {len(slices)} time slices"
+    )
+    return slices
@@ -1,3 +1,4 @@
+import itertools
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -15,12 +16,16 @@ from tests.bigquery.test_extractor import (
     mock_table,
     mock_table_full,
 )
+from tests.bigquery.test_information_schema import mock_information_schema
 from tests.test_utils import load_json
 
 
 def mock_list_entries(mock_build_log_client, entries):
+    # Entries are listed in time slices, return them for only one of the slices
+    calls = itertools.count()
+
     def side_effect(page_size, filter_):
-        return entries
+        return entries if next(calls) == 0 else []
 
     mock_build_log_client.return_value.list_entries.side_effect = side_effect
 
@@ -126,3 +131,65 @@ async def test_view_extractor(
     assert events == load_json(
         f"{test_root_dir}/bigquery/lineage/data/view_result.json"
     )
+
+
+@patch("metaphor.bigquery.lineage.extractor.build_client")
+@patch("metaphor.bigquery.lineage.extractor.build_logging_client")
+@patch("metaphor.bigquery.lineage.extractor.get_credentials")
+@pytest.mark.asyncio
+async def test_view_extractor_bulk_metadata(
+    mock_get_credentials: MagicMock,
+    mock_build_logging_client: MagicMock,
+    mock_build_client: MagicMock,
+    test_root_dir: str,
+):
+    config = BigQueryLineageRunConfig(
+        output=OutputConfig(),
+        key_path="fake_file",
+        project_ids=["fake_project"],
+        bulk_metadata=True,
+        enable_lineage_from_log=False,
+    )
+
+    extractor = BigQueryLineageExtractor(config)
+
+    mock_get_credentials.return_value = "fake_credentials"
+
+    client = mock_build_client.return_value
+    client.project = "project1"
+    client.get_dataset.return_value.location = "US"
+
+    mock_list_datasets(mock_build_client, [mock_dataset("dataset1")])
+
+    mock_information_schema(
+        client,
+        {
+            "TABLES": [
+                ("dataset1", "table1", "VIEW", None, None, "select * from `foo`"),
+                ("dataset1", "table2", "MATERIALIZED VIEW", None, None, None),
+                ("dataset1", "table3", "VIEW", None, None, "select * from foo"),
+                ("dataset1", "table4", "BASE TABLE", None, None, None),
+            ],
+        },
+    )
+
+    mock_get_table(
+        mock_build_client,
+        {
+            ("dataset1", "table2"): mock_table_full(
+                dataset_id="dataset1",
+                table_id="table2",
+                table_type="MATERIALIZED_VIEW",
+                description="description",
+                view_query=None,
+                mview_query="select * from `Foo`",
+            ),
+        },
+    )
+
+    events = [EventUtil.trim_event(e) for e in await extractor.extract()]
+
+    assert events == load_json(
+        f"{test_root_dir}/bigquery/lineage/data/view_result.json"
+    )
+    client.get_table.assert_called_once()
@@ -1,9 +1,12 @@
+import re
 from unittest.mock import MagicMock, patch
 
+import google.cloud.bigquery as bigquery
 from google.cloud.bigquery import DatasetReference, TableReference
 
 from metaphor.bigquery.profile.extractor import BigQueryProfileExtractor
 from metaphor.common.column_statistics import ColumnStatistics
+from metaphor.common.profile_batch import ProfileBatchConfig
 from metaphor.common.sampling import SamplingConfig
 from metaphor.models.metadata_change_event import (
     DataPlatform,
@@ -240,3 +243,97 @@ def test_extractor_class(mock_get_credentials: MagicMock, test_root_dir):
         f"{test_root_dir}/bigquery/profile/config.yml"
     )
     assert extractor is not None
+
+
+def test_build_batch_profiling_query():
+    id_field = SchemaField(
+        field_path="id",
+        field_name="id",
+        native_type="STRING",
+        nullable=False,
+        subfields=None,
+    )
+    price_field = SchemaField(
+        field_path="price",
+        field_name="price",
+        native_type="INT",
+        nullable=True,
+        subfields=None,
+    )
+    dataset_ref = DatasetReference("project", "dataset_id")
+
+    assert BigQueryProfileExtractor._build_batch_profiling_query(
+        [
+            (DatasetSchema(fields=[id_field]), TableReference(dataset_ref, "t1")),
+            (
+                DatasetSchema(fields=[id_field, price_field]),
+                TableReference(dataset_ref, "t2"),
+            ),
+        ],
+        ColumnStatistics(),
+    ) == (
+        "SELECT 0, CAST(COUNT(1) AS STRING), CAST(COUNTIF(`id` is NULL) AS STRING), "
+        "NULL, NULL, NULL FROM `project.dataset_id.t1` UNION ALL "
+        "SELECT 1, CAST(COUNT(1) AS STRING), CAST(COUNTIF(`id` is NULL) AS STRING), "
+        "CAST(COUNTIF(`price` is NULL) AS STRING), CAST(MIN(`price`) AS STRING), "
+        "CAST(MAX(`price`) AS STRING) FROM `project.dataset_id.t2`"
+    )
+
+
+@patch("metaphor.bigquery.profile.extractor.get_credentials")
+def test_profile_in_batches(mock_get_credentials: MagicMock, test_root_dir):
+    mock_get_credentials.return_value = MagicMock(project_id="job_project")
+    extractor = BigQueryProfileExtractor.from_config_file(
+        f"{test_root_dir}/bigquery/profile/config.yml"
+    )
+    extractor._batch = ProfileBatchConfig(enabled=True, max_rows=100, max_tables=2)
+
+    dataset_ref = DatasetReference("project", "dataset_id")
+    tables = [TableReference(dataset_ref, f"t{i}") for i in range(4)]
+    row_counts = {"t0": 10, "t1": 20, "t2": 1000, "t3": 30}
+
+    def get_table(table: TableReference):
+        bq_table = MagicMock()
+        bq_table.table_type = "TABLE"
+        bq_table.description = None
+        bq_table.num_rows = row_counts[table.table_id]
+        bq_table.schema = [
+            bigquery.SchemaField(name="id", field_type="STRING", mode="REQUIRED")
+        ]
+        return bq_table
+
+    # A table's result is [row count, null count of id], as strings if batched
+    results = {
+        "t0": [(0, "10", "0"), (1, "20", "1")],
+        "t2": [(1000, 3)],
+        "t3": [(0, "30", "2")],
+    }
+    queries = []
+
+    def query(sql, project=None, job_config=None):
+        queries.append(sql)
+        table_ids = re.findall(r"`project\.dataset_id\.(\w+)`", sql)
+        query_job = MagicMock()
+        query_job.result.return_value = results[table_ids[0]]
+        return query_job
+
+    extractor._client = MagicMock()
+    extractor._client.get_table.side_effect = get_table
+    extractor._client.query.side_effect = query
+
+    extractor.profile(tables)
+
+    # t0 & t1 in a batch, t3 in another, t2 on its own
+    assert len(queries) == 3
+    assert [
+        (
+            dataset.logical_id.name,
+            dataset.field_statistics.field_statistics[0].null_value_count,
+        )
+        for dataset in extractor._datasets
+    ] == [
+        ("project.dataset_id.t2", 3.0),
+        ("project.dataset_id.t0", 0.0),
+        ("project.dataset_id.t1", 1.0),
+        ("project.dataset_id.t3", 2.0),
+    ]
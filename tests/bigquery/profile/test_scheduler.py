@@ -0,0 +1,103 @@
+import threading
+import time
+from typing import List
+from unittest.mock import MagicMock
+
+from google.cloud.bigquery import DatasetReference, TableReference
+
+from metaphor.bigquery.profile.config import ScanBudgetConfig
+from metaphor.bigquery.profile.scheduler import (
+    ProfiledTable,
+    ProfileJob,
+    ProfileJobScheduler,
+)
+from metaphor.models.metadata_change_event import Dataset, DatasetSchema
+
+
+def make_job(table_id: str) -> ProfileJob:
+    return ProfileJob(
+        sql=f"SELECT COUNT(1) FROM {table_id}",
+        tables=[
+            ProfiledTable(
+                table=TableReference(DatasetReference("p", "d"), table_id),
+                schema=DatasetSchema(),
+                dataset=Dataset(),
+            )
+        ],
+    )
+
+
+class FakeClient:
+    """Jobs scan 100 bytes per character of the table name"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.queries: List[str] = []
+
+    def query(self, sql, job_config=None, project=None):
+        job = MagicMock()
+        table_id = sql.split(" ")[-1]
+        if table_id == "error":
+            raise ValueError("boom")
+
+        if job_config is not None and job_config.dry_run:
+            job.total_bytes_processed = (
+                None if table_id == "unknown" else len(table_id) * 100
+            )
+            return job
+
+        with self.lock:
+            self.queries.append(table_id)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+        def result():
+            time.sleep(0.01)
+            with self.lock:
+                self.running -= 1
+
+        job.result.side_effect = result
+        job.slot_millis = 10
+        job.total_bytes_billed = len(table_id) * 100
+        return job
+
+
+def test_run_caps_in_flight_jobs():
+    client = FakeClient()
+    scheduler = ProfileJobScheduler(client, "job_project", 2, ScanBudgetConfig())  # type: ignore
+
+    jobs = [make_job(f"t{i}") for i in range(6)] + [make_job("error")]
+    processed = []
+
+    def process_result(job, query_job):
+        processed.append(job.tables[0].table.table_id)
+        return job.tables[0].table.table_id != "t5"
+
+    done = scheduler.run(jobs, process_result)
+
+    assert [job.tables[0].table.table_id for job in done] == [f"t{i}" for i in range(5)]
+    assert sorted(processed) == [f"t{i}" for i in range(6)]
+    assert client.max_running == 2
+    assert done[0].slot_millis == 10
+    assert done[0].bytes_billed == 200
+
+
+def test_run_with_scan_budget():
+    client = FakeClient()
+    scheduler = ProfileJobScheduler(
+        client,  # type: ignore
+        "job_project",
+        1,
+        ScanBudgetConfig(max_bytes_per_table=500, max_total_bytes=600),
+    )
+
+    jobs = [
+        make_job(table_id) for table_id in ["long", "a", "toolong", "unknown", "bb"]
+    ]
+    done = scheduler.run(jobs, lambda job, query_job: True)
+
+    # Cheapest first, "toolong" over the per-table budget, "long" over the total
+    assert client.queries == ["a", "bb"]
+    assert [job.estimated_bytes for job in done] == [100, 200]
@@ -0,0 +1,185 @@
+import re
+from collections import namedtuple
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import google.cloud.bigquery as bigquery
+import pytest
+from google.api_core import exceptions
+
+from metaphor.bigquery.audit_log import (
+    JobQueryFetcher,
+    is_quota_error,
+    list_entries,
+    split_time_range,
+)
+
+start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+end = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+
+def test_split_time_range():
+    assert split_time_range(start, end, 1) == [(start, end)]
+    assert split_time_range(start, end, 0) == [(start, end)]
+
+    slices = split_time_range(start, end, 3)
+    assert len(slices) == 3
+    assert slices[0][0] == start and slices[-1][1] == end
+    assert all(slices[i][1] == slices[i + 1][0] for i in range(2))
+
+
+Entry = namedtuple("Entry", ["insert_id", "timestamp"])
+
+
+def mock_logging_client(entries_by_hour):
+    logging_client = MagicMock()
+
+    def list_entries(page_size, filter_):
+        assert filter_.startswith("FILTER AND")
+        slice_start = datetime.fromisoformat(
+            re.search(r'timestamp>="([^"]+)"', filter_).group(1)
+        )
+        slice_end = datetime.fromisoformat(
+            re.search(r'timestamp<"([^"]+)"', filter_).group(1)
+        )
+        for hour, entry in entries_by_hour:
+            timestamp = start.replace(hour=hour)
+            if slice_start <= timestamp < slice_end:
+                if isinstance(entry, Exception):
+                    raise entry
+                if callable(entry):
+                    entry()
+                    continue
+                yield Entry(entry, timestamp)
+
+    logging_client.list_entries.side_effect = list_entries
+    return logging_client
+
+
+def test_list_entries():
+    logging_client = mock_logging_client([(hour, f"e{hour}") for hour in range(24)])
+
+    entries = list(list_entries(logging_client, "FILTER", start, end, 2, 4))
+    assert sorted(entry.insert_id for entry in entries) == sorted(
+        f"e{hour}" for hour in range(24)
+    )
+    assert logging_client.list_entries.call_count == 4
+
+    # Stop early
+    assert (
+        len(
+            list(
+                zip(range(3), list_entries(logging_client, "FILTER", start, end, 1, 4))
+            )
+        )
+        == 3
+    )
+
+
+def test_list_entries_error():
+    logging_client = mock_logging_client([(1, "e1"), (20, ValueError("boom"))])
+
+    with pytest.raises(ValueError):
+        list(list_entries(logging_client, "FILTER", start, end, 10, 4))
+
+
+def test_list_entries_quota_error():
+    quota_errors = iter([exceptions.ResourceExhausted("quota")] * 2)
+
+    def fail_twice():
+        error = next(quota_errors, None)
+        if error is not None:
+            raise error
+
+    # Entries with the same timestamp are read before and after the errors
+    logging_client = mock_logging_client(
+        [(1, "e1"), (2, "e2"), (2, "e2b"), (2, fail_twice), (3, "e3")]
+    )
+    entries = list(
+        list_entries(logging_client, "FILTER", start, end, 10, 1, initial_backoff=0.01)
+    )
+    assert [entry.insert_id for entry in entries] == ["e1", "e2", "e2b", "e3"]
+    assert logging_client.list_entries.call_count == 3
+
+    # Resume from the timestamp of the last entry read
+    resumed = logging_client.list_entries.call_args.kwargs["filter_"]
+    assert f'timestamp>="{start.replace(hour=2).isoformat()}"' in resumed
+
+    # Give up after max_retries
+    logging_client = mock_logging_client(
+        [(1, "e1"), (2, exceptions.ResourceExhausted("quota"))]
+    )
+    with pytest.raises(exceptions.ResourceExhausted):
+        list(
+            list_entries(
+                logging_client,
+                "FILTER",
+                start,
+                end,
+                10,
+                1,
+                max_retries=2,
+                initial_backoff=0.01,
+            )
+        )
+    assert logging_client.list_entries.call_count == 3
+
+
+def test_is_quota_error():
+    assert is_quota_error(exceptions.TooManyRequests("slow down"))
+    assert is_quota_error(
+        exceptions.Forbidden("quota", errors=[{"reason": "rateLimitExceeded"}])
+    )
+    assert not is_quota_error(
+        exceptions.Forbidden("denied", errors=[{"reason": "accessDenied"}])
+    )
+    assert not is_quota_error(exceptions.NotFound("not found"))
+
+
+def test_job_query_fetcher():
+    client = MagicMock()
+    attempts = {}
+
+    def get_job(job_id, project):
+        attempts[job_id] = attempts.get(job_id, 0) + 1
+        if job_id == "missing":
+            raise exceptions.NotFound("not found")
+        if job_id == "throttled" and attempts[job_id] < 3:
+            raise exceptions.TooManyRequests("slow down")
+
+        job = MagicMock(spec=bigquery.QueryJob)
+        job.query = f"full query of {job_id}"
+        return job
+
+    client.get_job.side_effect = get_job
+    fetcher = JobQueryFetcher(client, 4, initial_backoff=0.01)
+
+    assert fetcher.fetch(
+        [
+            "projects/p/jobs/j1",
+            "projects/p/jobs/throttled",
+            "projects/p/jobs/j1",
+            "projects/p/jobs/missing",
+            "invalid",
+        ]
+    ) == {
+        "projects/p/jobs/j1": "full query of j1",
+        "projects/p/jobs/throttled": "full query of throttled",
+        "projects/p/jobs/missing": None,
+        "invalid": None,
+    }
+    assert attempts == {"j1": 1, "throttled": 3, "missing": 1}
+
+    # Jobs are fetched only once
+    assert fetcher.fetch(["projects/p/jobs/j1"]) == {
+        "projects/p/jobs/j1": "full query of j1"
+    }
+    assert attempts["j1"] == 1
+
+    # Give up after max_retries
+    fetcher = JobQueryFetcher(client, 1, max_retries=1, initial_backoff=0.01)
+    attempts.clear()
+    assert fetcher.fetch(["projects/p/jobs/throttled"]) == {
+        "projects/p/jobs/throttled": None
+    }
+    assert attempts == {"throttled": 2}
@@ -1,3 +1,4 @@
+import itertools
 from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
@@ -6,9 +7,12 @@ from google.cloud.bigquery.schema import SchemaField
 
 from metaphor.bigquery.config import BigQueryQueryLogConfig
 from metaphor.bigquery.extractor import BigQueryExtractor, BigQueryRunConfig
+from metaphor.bigquery.logEvent import JobChangeEvent
+from metaphor.bigquery.utils import BigQueryResource
 from metaphor.common.base_config import OutputConfig
 from metaphor.common.event_util import EventUtil
 from tests.bigquery.load_entries import load_entries
+from tests.bigquery.test_information_schema import mock_information_schema
 from tests.test_utils import load_json
 
 
@@ -79,8 +83,11 @@ def mock_get_table(mock_build_client, tables):
 
 
 def mock_list_entries(mock_build_log_client, entries):
+    # Entries are listed in time slices, return them for only one of the slices
+    calls = itertools.count()
+
     def side_effect(page_size, filter_):
-        return entries
+        return entries if next(calls) == 0 else []
 
     mock_build_log_client.return_value.list_entries.side_effect = side_effect
 
@@ -194,3 +201,140 @@ async def test_extractor(
     events = [EventUtil.trim_event(e) for e in await extractor.extract()]
 
     assert events == load_json(f"{test_root_dir}/bigquery/expected.json")
+
+
+@patch("metaphor.bigquery.extractor.build_client")
+@patch("metaphor.bigquery.extractor.build_logging_client")
+@patch("metaphor.bigquery.extractor.get_credentials")
+@pytest.mark.asyncio
+async def test_extractor_bulk_metadata(
+    mock_get_credentials: MagicMock,
+    mock_build_logging_client: MagicMock,
+    mock_build_client: MagicMock,
+    test_root_dir,
+):
+    config = BigQueryRunConfig(
+        output=OutputConfig(),
+        key_path="fake_file",
+        project_ids=["fake_project"],
+        bulk_metadata=True,
+        query_log=BigQueryQueryLogConfig(),
+    )
+
+    extractor = BigQueryExtractor(config)
+
+    mock_get_credentials.return_value = "fake_credential"
+
+    client = mock_build_client.return_value
+    client.project = "project1"
+    client.get_dataset.return_value.location = "US"
+
+    mock_list_datasets(mock_build_client, [mock_dataset("dataset1")])
+
+    modified = datetime(2000, 1, 2, tzinfo=timezone.utc)
+    mock_information_schema(
+        client,
+        {
+            "TABLES": [
+                ("dataset1", "table1", "BASE TABLE", None, '"description"', None),
+                (
+                    "dataset1",
+                    "table2",
+                    "VIEW",
+                    None,
+                    '"description"',
+                    "select * from FOO",
+                ),
+                ("dataset1", "table3", "MATERIALIZED VIEW", "ddl", None, None),
+            ],
+            "TABLE_STORAGE": [
+                ("dataset1", "table1", 100, 5 * 1024 * 1024, modified),
+                ("dataset1", "table2", 1000, 512 * 1024, modified),
+            ],
+            "COLUMN_FIELD_PATHS": [
+                ("dataset1", "table1", "f1", "f1", "STRING", "YES", "d1"),
+                ("dataset1", "table1", "f2", "f2", "INT64", "NO", "d2"),
+                ("dataset1", "table2", "f1", "f1", "ARRAY<FLOAT>", "NO", "d1"),
+                (
+                    "dataset1",
+                    "table2",
+                    "f2",
+                    "f2",
+                    "STRUCT<sf1 INT, sf2 STRING NOT NULL>",
+                    "NO",
+                    "d2",
+                ),
+                ("dataset1", "table2", "f2", "f2.sf1", None, None, "d3"),
+                ("dataset1", "table2", "f2", "f2.sf2", None, None, "d4"),
+            ],
+        },
+    )
+
+    # Materialized view definitions are only available from get_table
+    mock_get_table(
+        mock_build_client,
+        {
+            ("dataset1", "table3"): mock_table_full(
+                dataset_id="dataset1",
+                table_id="table3",
+                table_type="MATERIALIZED_VIEW",
+                description="description",
+                mview_query="select 1",
+            ),
+        },
+    )
+
+    mock_list_entries(mock_build_logging_client, [])
+
+    events = [EventUtil.trim_event(e) for e in await extractor.extract()]
+
+    # Same as fetching the tables one by one
+    assert events[:2] == load_json(f"{test_root_dir}/bigquery/expected.json")[:2]
+    assert events[2]["logicalId"]["name"] == "project1.dataset1.table3"
+    assert events[2]["schema"]["sqlSchema"] == {
+        "materialization": "MATERIALIZED_VIEW",
+        "tableSchema": "ddl",
+    }
+    assert len(events) == 3
+    client.get_table.assert_called_once()
+
+
+@patch("metaphor.bigquery.extractor.get_credentials")
+def test_build_query_logs_fetches_truncated_queries(mock_get_credentials: MagicMock):
+    extractor = BigQueryExtractor(
+        BigQueryRunConfig(
+            output=OutputConfig(),
+            key_path="fake_file",
+            project_ids=["fake_project"],
+        )
+    )
+
+    def job_change(job_name: str, truncated: bool) -> JobChangeEvent:
+        return JobChangeEvent(
+            job_name=job_name,
+            job_type="QUERY",
+            timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            start_time=None,
+            end_time=None,
+            user_email="foo@bar.com",
+            query="select ...",
+            query_truncated=truncated,
+            statementType="SELECT",
+            source_tables=[BigQueryResource("p", "d", "t")],
+            destination_table=None,
+            default_dataset=None,
+            input_bytes=None,
+            output_bytes=None,
+            output_rows=None,
+        )
+
+    fetcher = MagicMock()
+    fetcher.fetch.side_effect = lambda job_names: {
+        job_name: "select full" for job_name in job_names
+    }
+
+    logs = extractor._build_query_logs(
+        [job_change("j1", True), job_change("j2", False)], fetcher
+    )
+    assert [log.sql for log in logs] == ["select full", "select ..."]
+    assert logs[0].sql_hash == logs[1].sql_hash
@@ -0,0 +1,138 @@
+import re
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from google.cloud.bigquery.schema import SchemaField
+
+from metaphor.bigquery.information_schema import (
+    _parse_option_value,
+    dataset_locations,
+    fetch_tables,
+    parse_column,
+)
+
+
+def mock_information_schema(client: MagicMock, rows: dict) -> None:
+    """Return the rows of the INFORMATION_SCHEMA view selected from"""
+
+    def query(sql, job_config, location, project):
+        match = re.search(r"FROM \S+\.INFORMATION_SCHEMA\.(\w+)", sql)
+        assert match is not None, f"Unexpected query {sql}"
+        return MagicMock(result=MagicMock(return_value=rows.get(match.group(1), [])))
+
+    client.query.side_effect = query
+
+
+def test_parse_column():
+    assert parse_column("c", "INT64", True, {}) == SchemaField("c", "INTEGER")
+    assert parse_column("c", "STRING(10)", False, {"c": "desc"}) == SchemaField(
+        "c", "STRING", "REQUIRED", description="desc"
+    )
+    assert parse_column("c", "ARRAY<BOOL>", False, {}) == SchemaField(
+        "c", "BOOLEAN", "REPEATED"
+    )
+    assert parse_column(
+        "c",
+        "ARRAY<STRUCT<a NUMERIC(10, 2), `b c` STRUCT<d FLOAT64 NOT NULL>, e RANGE<DATE>>>",
+        True,
+        {"c.b c.d": "nested"},
+    ) == SchemaField(
+        "c",
+        "RECORD",
+        "REPEATED",
+        fields=[
+            SchemaField("a", "NUMERIC"),
+            SchemaField(
+                "b c",
+                "RECORD",
+                fields=[
+                    SchemaField("d", "FLOAT", "REQUIRED", description="nested"),
+                ],
+            ),
+            SchemaField("e", "RANGE"),
+        ],
+    )
+
+    with pytest.raises(ValueError):
+        parse_column("c", "STRUCT<a INT64", True, {})
+
+
+def test_parse_option_value():
+    assert _parse_option_value(None) is None
+    assert _parse_option_value('"say \\"hi\\"\\nbye"') == 'say "hi"\nbye'
+    assert _parse_option_value("'single'") == "'single'"
+
+
+def test_dataset_locations():
+    client = MagicMock()
+    client.get_dataset.side_effect = lambda ref: MagicMock(
+        location="EU" if ref.dataset_id == "eu" else "US"
+    )
+
+    refs = [MagicMock(dataset_id=dataset_id) for dataset_id in ["a", "eu", "b"]]
+    assert dataset_locations(client, refs) == {"US": ["a", "b"], "EU": ["eu"]}
+
+
+def test_fetch_tables():
+    client = MagicMock()
+    client.project = "project"
+    modified = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+    mock_information_schema(
+        client,
+        {
+            "TABLES": [
+                ("ds", "t1", "BASE TABLE", "CREATE TABLE t1", '"table"', None),
+                ("ds", "v1", "VIEW", "CREATE VIEW v1", None, "SELECT 1"),
+                (
+                    "ds",
+                    "m1",
+                    "MATERIALIZED VIEW",
+                    "CREATE MATERIALIZED VIEW",
+                    None,
+                    None,
+                ),
+                ("ds", "t2", "BASE TABLE", "CREATE TABLE t2", None, None),
+            ],
+            "TABLE_STORAGE": [
+                ("ds", "t1", 10, 100, modified),
+                ("ds", "gone", 10, 100, modified),
+            ],
+            "COLUMN_FIELD_PATHS": [
+                ("ds", "t1", "a", "a", "INT64", "NO", "column a"),
+                ("ds", "t1", "b", "b", "STRUCT<c STRING>", "YES", None),
+                ("ds", "t1", "b", "b.c", None, None, "field c"),
+                ("ds", "t2", "a", "a", "STRUCT<", "YES", None),
+            ],
+        },
+    )
+
+    tables = fetch_tables(client, "job_project", "US", ["ds"])
+
+    _, kwargs = client.query.call_args
+    assert kwargs["location"] == "US"
+    assert kwargs["project"] == "job_project"
+    assert "`project`.`region-us`.INFORMATION_SCHEMA" in client.query.call_args[0][0]
+
+    t1 = tables[("ds", "t1")]
+    assert t1.complete
+    assert t1.table_type == "TABLE"
+    assert t1.description == "table"
+    assert t1.ddl == "CREATE TABLE t1"
+    assert (t1.num_rows, t1.num_bytes, t1.modified) == (10, 100, modified)
+    assert t1.schema == [
+        SchemaField("a", "INTEGER", "REQUIRED", description="column a"),
+        SchemaField(
+            "b", "RECORD", fields=[SchemaField("c", "STRING", description="field c")]
+        ),
+    ]
+
+    v1 = tables[("ds", "v1")]
+    assert v1.complete
+    assert v1.view_query == "SELECT 1"
+    assert v1.num_rows is None
+
+    # Fetched using get_table instead
+    assert not tables[("ds", "m1")].complete
+    assert not tables[("ds", "t2")].complete
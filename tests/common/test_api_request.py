@@ -1,27 +1,40 @@
 from typing import Dict
 from unittest.mock import MagicMock, patch
+from zipfile import ZipFile
 
 from pydantic import BaseModel
 
-from metaphor.common.api_request import ApiError, get_request
+from metaphor.common.api_request import (
+    DEBUG_ARCHIVE,
+    PREVIOUS_DEBUG_ARCHIVE,
+    ApiError,
+    ApiRequestConfig,
+    DebugCapturePolicy,
+    RetryPolicy,
+    _DebugArchive,
+    configure,
+    get_request,
+)
 
 
 class DummyResult(BaseModel):
     foo: str
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_get_request_200(mock_get: MagicMock):
     mock_response = MagicMock()
     mock_response.status_code = 200
     mock_response.json.return_value = {"foo": "bar"}
+    mock_response.content = b'{"foo": "bar"}'
     mock_get.return_value = mock_response
 
     result = get_request("http://test.com", {}, DummyResult)
     assert result.foo == "bar"
+    assert mock_response.json.call_count == 1
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_get_request_not_200(mock_get: MagicMock):
     mock_response = MagicMock()
     mock_response.status_code = 404
@@ -32,3 +45,148 @@ def test_get_request_not_200(mock_get: MagicMock):
         assert False, "ApiError not thrown"
     except ApiError:
         assert True
+
+
+def _response(status_code: int, headers: Dict[str, str] = {}) -> MagicMock:
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers
+    response.json.return_value = {"foo": "bar"}
+    response.content = b'{"foo": "bar"}'
+    return response
+
+
+@patch("time.sleep")
+@patch("requests.Session.get")
+def test_get_request_retry(mock_get: MagicMock, mock_sleep: MagicMock):
+    mock_get.side_effect = [
+        _response(429, {"Retry-After": "7"}),
+        _response(503),
+        _response(200),
+    ]
+
+    result = get_request("http://test.com", {}, DummyResult)
+    assert result.foo == "bar"
+    assert mock_get.call_count == 3
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [7, 2]
+
+
+@patch("time.sleep")
+@patch("requests.Session.get")
+def test_get_request_retries_exhausted(mock_get: MagicMock, mock_sleep: MagicMock):
+    mock_get.return_value = _response(500)
+
+    try:
+        get_request(
+            "http://test.com", {}, DummyResult, retry_policy=RetryPolicy(max_retries=1)
+        )
+        assert False, "ApiError not thrown"
+    except ApiError as error:
+        assert error.status_code == 500
+    assert mock_get.call_count == 2
+
+
+def test_retry_policy_delay():
+    policy = RetryPolicy(backoff_factor=0.5, max_backoff=3)
+    assert [policy.delay(retries, None) for retries in range(5)] == [
+        0.5,
+        1,
+        2,
+        3,
+        3,
+    ]
+    assert policy.delay(0, _response(429, {"Retry-After": "120"})) == 120
+    assert (
+        policy.delay(
+            0, _response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        )
+        == 0
+    )
+    assert policy.delay(1, _response(429, {"Retry-After": "invalid"})) == 1
+
+
+@patch("metaphor.common.api_request.add_debug_file")
+def test_debug_archive_sampled(mock_add_debug_file: MagicMock):
+    archive = _DebugArchive(DebugCapturePolicy(sample_rate=0.25))
+    for i in range(8):
+        archive.capture(f"http://test.com/path/{i}", b"content")
+    archive.close()
+
+    mock_add_debug_file.assert_called_once_with(f"{archive.directory}/{DEBUG_ARCHIVE}")
+    with ZipFile(f"{archive.directory}/{DEBUG_ARCHIVE}") as zip_file:
+        names = zip_file.namelist()
+    assert len(names) == 2
+    assert all(name.startswith("path__") for name in names)
+
+
+@patch("metaphor.common.api_request.add_debug_file")
+def test_debug_archive_off(mock_add_debug_file: MagicMock):
+    archive = _DebugArchive(DebugCapturePolicy(sample_rate=0))
+    archive.capture("http://test.com/path", b"content")
+
+    assert archive.directory is None
+    mock_add_debug_file.assert_not_called()
+
+
+@patch("metaphor.common.api_request.add_debug_file")
+def test_debug_archive_rolling(mock_add_debug_file: MagicMock):
+    archive = _DebugArchive(
+        DebugCapturePolicy(max_response_bytes=4, max_archive_bytes=10)
+    )
+    for i in range(5):
+        archive.capture(f"http://test.com/{i}", b"0123456789")
+    archive.close()
+
+    assert mock_add_debug_file.call_count == 2
+    with ZipFile(f"{archive.directory}/{DEBUG_ARCHIVE}") as zip_file:
+        assert [zip_file.read(name) for name in zip_file.namelist()] == [b"0123"]
+    with ZipFile(f"{archive.directory}/{PREVIOUS_DEBUG_ARCHIVE}") as zip_file:
+        assert [zip_file.read(name) for name in zip_file.namelist()] == [
+            b"0123",
+            b"0123",
+        ]
+
+
+@patch("metaphor.common.api_request.add_debug_file")
+def test_debug_archive_many_captures(mock_add_debug_file: MagicMock):
+    archive = _DebugArchive(DebugCapturePolicy())
+    for i in range(5000):
+        archive.capture(f"http://test.com/path/{i}", b'{"foo": "bar"}')
+
+    # The archive is written to while open, and can be read once closed
+    assert archive.archive is not None
+    archive.close()
+    assert archive.archive is None
+
+    with ZipFile(f"{archive.directory}/{DEBUG_ARCHIVE}") as zip_file:
+        assert len(zip_file.namelist()) == 5000
+
+    # Captures after closing are appended to the archive
+    archive.capture("http://test.com/path/last", b"{}")
+    archive.close()
+    with ZipFile(f"{archive.directory}/{DEBUG_ARCHIVE}") as zip_file:
+        assert len(zip_file.namelist()) == 5001
+    mock_add_debug_file.assert_called_once()
+
+
+@patch("metaphor.common.api_request.add_debug_file")
+@patch("requests.Session.get")
+def test_configure(mock_get: MagicMock, mock_add_debug_file: MagicMock):
+    mock_get.return_value = _response(503)
+    config = ApiRequestConfig(
+        retry=RetryPolicy(max_retries=0),
+        debug_capture=DebugCapturePolicy(sample_rate=0),
+    )
+    configure(config.retry, config.debug_capture)
+    try:
+        try:
+            get_request("http://test.com", {}, DummyResult)
+            assert False, "ApiError not thrown"
+        except ApiError:
+            assert mock_get.call_count == 1
+
+        mock_get.return_value = _response(200)
+        assert get_request("http://test.com", {}, DummyResult).foo == "bar"
+        mock_add_debug_file.assert_not_called()
+    finally:
+        configure(RetryPolicy(), DebugCapturePolicy())
@@ -1,4 +1,6 @@
-from metaphor.common.event_util import EventUtil
+import pytest
+
+from metaphor.common.event_util import EventUtil, _compiled_validator
 from metaphor.models.metadata_change_event import (
     Dashboard,
     Dataset,
@@ -9,6 +11,7 @@ from metaphor.models.metadata_change_event import (
     Metric,
     Pipeline,
     QueryAttributions,
+    QueryLog,
     QueryLogs,
     UserActivity,
     VirtualView,
@@ -62,3 +65,22 @@ def test_trim_event():
     assert event_utils.trim_event(
         Hierarchy(logical_id=HierarchyLogicalID(path=["a", "b"]))
     ) == {"logicalId": {"path": ["a", "b"]}}
+
+
+@pytest.mark.parametrize("validator", ["jsonschema", "compiled"])
+def test_validate_message(validator):
+    event_utils = EventUtil(validator)
+
+    valid = event_utils.trim_event(
+        MetadataChangeEvent(query_logs=QueryLogs(logs=[QueryLog(id="1", duration=1.0)]))
+    )
+    assert event_utils.validate_message(valid) == valid
+
+    invalid = {"queryLogs": {"logs": [{"id": "1", "duration": "1"}]}}
+    assert event_utils.validate_message(invalid) is None
+
+
+def test_compiled_validator():
+    # Fails if the MCE schema starts using a keyword the compiler doesn't
+    # support, which would otherwise silently fall back to jsonschema
+    assert _compiled_validator() is not None
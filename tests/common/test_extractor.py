@@ -1,3 +1,4 @@
+import threading
 from typing import Collection
 
 import pytest
@@ -43,6 +44,21 @@ def test_dummy_extractor():
     ]
 
 
+def test_dummy_extractor_stream():
+    entities = [Dashboard(), Dataset(), VirtualView()]
+    config = DummyRunConfig(dummy_attr=0, output=OutputConfig())
+
+    handled = []
+
+    def handler(entity: ENTITY_TYPES) -> None:
+        # Handlers may block, so they must not run on the event loop thread
+        assert threading.current_thread() is not threading.main_thread()
+        handled.append(entity)
+
+    assert DummyExtractor(config, entities).run_stream_async(handler) == 3
+    assert handled == entities
+
+
 class InvalidExtractor(BaseExtractor):
     @staticmethod
     def from_config_file(config_file: str) -> "InvalidExtractor":
@@ -1,12 +1,21 @@
+import gzip
+import json
 import tempfile
 from datetime import datetime
-from os import path
+from os import listdir, path
+from unittest.mock import patch
 from zipfile import ZipFile
 
+import pytest
 from freezegun import freeze_time
 
 from metaphor.common.event_util import EventUtil
-from metaphor.common.file_sink import FileSink, FileSinkConfig
+from metaphor.common.file_sink import (
+    FileSink,
+    FileSinkConfig,
+    encode_record,
+    join_records,
+)
 from metaphor.common.logger import add_debug_file
 from metaphor.models.crawler_run_metadata import CrawlerRunMetadata, RunStatus
 from metaphor.models.metadata_change_event import (
@@ -87,6 +96,170 @@ def test_file_sink_split(test_root_dir):
     assert messages[4:5] == events_from_json(f"{directory}/946684800/5-of-5.json")
 
 
+def test_encode_records():
+    records = [
+        {"dataset": {"logicalId": {"name": "foo", "platform": "BIGQUERY"}}},
+        {"queryLogs": {"logs": [{"id": "1", "duration": 1.5, "sql": "\u00e9"}]}},
+    ]
+
+    encoded = join_records(encode_record(record) for record in records)
+    assert encoded == json.dumps(records).encode()
+
+
+def test_encode_records_orjson():
+    pytest.importorskip("orjson")
+
+    records = [
+        {"dataset": {"logicalId": {"name": "foo", "platform": "BIGQUERY"}}},
+        {"queryLogs": {"logs": [{"id": "1", "duration": 1.5, "sql": "\u00e9"}]}},
+    ]
+    encoded = join_records(encode_record(record, "orjson") for record in records)
+    assert json.loads(encoded) == records
+
+    # NaN is encoded as null
+    assert encode_record({"value": float("nan")}, "orjson") == b'{"value":null}'
+
+    # Falls back to json.dumps for integers beyond 64 bits
+    assert (
+        encode_record({"value": 2**64}, "orjson")
+        == b'{"value": 18446744073709551616}'
+    )
+
+
+def test_file_sink_orjson_missing():
+    with patch("metaphor.common.file_sink.orjson", None):
+        with pytest.raises(ValueError):
+            FileSink(FileSinkConfig(directory="/tmp", json_encoder="orjson"))
+
+
+@freeze_time("2000-01-01")
+def test_file_sink_stream(test_root_dir):
+    directory = tempfile.mkdtemp()
+
+    messages = [
+        MetadataChangeEvent(
+            dataset=Dataset(
+                logical_id=DatasetLogicalID(
+                    name=f"foo{i}", platform=DataPlatform.BIGQUERY
+                )
+            )
+        )
+        for i in range(5)
+    ]
+
+    # At most 2 messages in each file
+    sink = FileSink(FileSinkConfig(directory=directory, batch_size_count=2))
+    sink.open_stream()
+    for message in messages:
+        assert sink.write_event(message) is True
+
+    # Nothing is finalized until the stream is closed
+    assert not path.exists(f"{directory}/946684800/1-of-3.json")
+    assert path.exists(f"{directory}/946684800/.staging/1.json.part")
+
+    assert sink.close_stream() is True
+    assert messages[0:2] == events_from_json(f"{directory}/946684800/1-of-3.json")
+    assert messages[2:4] == events_from_json(f"{directory}/946684800/2-of-3.json")
+    assert messages[4:5] == events_from_json(f"{directory}/946684800/3-of-3.json")
+    assert not path.exists(f"{directory}/946684800/.staging")
+
+
+@freeze_time("2000-01-01")
+def test_file_sink_stream_split_by_size(test_root_dir):
+    directory = tempfile.mkdtemp()
+
+    messages = [
+        MetadataChangeEvent(
+            dataset=Dataset(
+                logical_id=DatasetLogicalID(
+                    name=f"foo{i}", platform=DataPlatform.BIGQUERY
+                )
+            )
+        )
+        for i in range(3)
+    ]
+
+    # Set batch_size_bytes so small that only one message can be fit in each file
+    sink = FileSink(FileSinkConfig(directory=directory, batch_size_bytes=10))
+    sink.open_stream()
+    for message in messages:
+        sink.write_event(message)
+    assert sink.close_stream() is True
+
+    assert messages[0:1] == events_from_json(f"{directory}/946684800/1-of-3.json")
+    assert messages[1:2] == events_from_json(f"{directory}/946684800/2-of-3.json")
+    assert messages[2:3] == events_from_json(f"{directory}/946684800/3-of-3.json")
+
+
+@freeze_time("2000-01-01")
+def test_file_sink_stream_abort(test_root_dir):
+    directory = tempfile.mkdtemp()
+
+    sink = FileSink(FileSinkConfig(directory=directory, batch_size_count=1))
+    sink.open_stream()
+    sink.write_event(MetadataChangeEvent(dataset=Dataset(display_name="foo")))
+    sink.write_event(MetadataChangeEvent(dataset=Dataset(display_name="bar")))
+    sink.abort_stream()
+
+    assert sink.close_stream() is False
+    assert listdir(f"{directory}/946684800") == []
+
+
+@freeze_time("2000-01-01")
+@pytest.mark.parametrize("streaming", [False, True])
+def test_file_sink_gzip_concurrent(test_root_dir, streaming):
+    directory = tempfile.mkdtemp()
+
+    messages = [
+        MetadataChangeEvent(
+            dataset=Dataset(
+                logical_id=DatasetLogicalID(
+                    name=f"foo{i}", platform=DataPlatform.BIGQUERY
+                )
+            )
+        )
+        for i in range(7)
+    ]
+
+    sink = FileSink(
+        FileSinkConfig(
+            directory=directory,
+            batch_size_count=2,
+            compression="gzip",
+            upload_concurrency=3,
+        )
+    )
+    if streaming:
+        sink.open_stream()
+        for message in messages:
+            sink.write_event(message)
+        assert sink.close_stream() is True
+    else:
+        assert sink.sink(messages) is True
+
+    for part in range(4):
+        with open(f"{directory}/946684800/{part+1}-of-4.json.gz", "rb") as f:
+            content = json.loads(gzip.decompress(f.read()))
+        assert messages[part * 2 : part * 2 + 2] == [
+            MetadataChangeEvent.from_dict(event) for event in content
+        ]
+
+
+@freeze_time("2000-01-01")
+def test_file_sink_zstd(test_root_dir):
+    zstandard = pytest.importorskip("zstandard")
+    directory = tempfile.mkdtemp()
+
+    messages = [MetadataChangeEvent(dataset=Dataset(display_name="foo"))]
+
+    sink = FileSink(FileSinkConfig(directory=directory, compression="zstd"))
+    assert sink.sink(messages) is True
+
+    with open(f"{directory}/946684800/1-of-1.json.zst", "rb") as f:
+        content = zstandard.ZstdDecompressor().decompressobj().decompress(f.read())
+    assert messages == [MetadataChangeEvent.from_dict(e) for e in json.loads(content)]
+
+
 @freeze_time("2000-01-01")
 def test_sink_metadata(test_root_dir):
     directory = tempfile.mkdtemp()
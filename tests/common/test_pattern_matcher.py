@@ -0,0 +1,44 @@
+from fnmatch import fnmatchcase
+
+from metaphor.common.pattern_matcher import PatternMatcher
+
+PATTERNS = [
+    "foo",
+    "foo*",
+    "foo?bar",
+    "fo[a-z]",
+    "f[!o]o",
+    "*bar",
+    "*",
+    "bar",
+    "[",
+    "a[",
+    "",
+]
+
+NAMES = ["foo", "foobar", "foo_bar", "fob", "fxo", "bar", "baz", "[", "a[", "", "f"]
+
+
+def test_matches_like_fnmatch():
+    matcher = PatternMatcher({pattern: index for index, pattern in enumerate(PATTERNS)})
+
+    for name in NAMES:
+        expected = [
+            index
+            for index, pattern in enumerate(PATTERNS)
+            if fnmatchcase(name, pattern)
+        ]
+        assert sorted(matcher.matches(name)) == expected, name
+        assert list(matcher.matches(name, ordered=True)) == expected, name
+        assert matcher.match(name) == bool(expected), name
+
+
+def test_from_patterns():
+    matcher = PatternMatcher.from_patterns(["db_*", "prod"])
+
+    assert matcher.match("db_1")
+    assert matcher.match("prod")
+    assert not matcher.match("db")
+    assert not matcher.match("production")
+
+    assert not PatternMatcher.from_patterns([]).match("db")
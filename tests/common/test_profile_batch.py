@@ -0,0 +1,65 @@
+import math
+
+import pytest
+from pydantic import ValidationError
+
+from metaphor.common.profile_batch import (
+    ProfileBatchConfig,
+    build_batch_query,
+    split_batch_result,
+)
+from metaphor.common.sampling import SamplingConfig
+
+
+def test_profile_batch_config():
+    assert ProfileBatchConfig(max_tables=10)
+
+    with pytest.raises(ValidationError):
+        ProfileBatchConfig(max_tables=0)
+
+
+def test_should_batch():
+    config = ProfileBatchConfig(enabled=True, max_rows=100, max_columns=5)
+    sampling = SamplingConfig()
+
+    assert config.should_batch(100, 5, sampling)
+    assert not config.should_batch(None, 5, sampling)
+    assert not config.should_batch(101, 5, sampling)
+    assert not config.should_batch(100, 6, sampling)
+
+    # Tables that would be sampled keep their own query
+    assert not config.should_batch(100, 5, SamplingConfig(percentage=1, threshold=50))
+    assert config.should_batch(10, 5, SamplingConfig(percentage=1, threshold=50))
+
+    assert not ProfileBatchConfig().should_batch(0, 1, sampling)
+
+
+def test_batches():
+    config = ProfileBatchConfig(enabled=True, max_tables=2)
+    assert list(config.batches(range(5))) == [[0, 1], [2, 3], [4]]
+    assert list(config.batches([])) == []
+
+
+def test_build_batch_query():
+    assert build_batch_query(
+        [
+            (["COUNT(1)", "MIN(a)"], "FROM t1"),
+            (["COUNT(1)"], "FROM t2"),
+        ],
+        "CAST({} AS STRING)",
+    ) == (
+        "SELECT 0, CAST(COUNT(1) AS STRING), CAST(MIN(a) AS STRING) FROM t1 "
+        "UNION ALL SELECT 1, CAST(COUNT(1) AS STRING), NULL FROM t2"
+    )
+
+
+def test_split_batch_result():
+    rows = [(1, "5", None), (0, "3", "1")]
+    assert list(split_batch_result(rows, [2, 1])) == [(1, (5,)), (0, (3, 1))]
+
+    # Values are parsed back exactly, whatever the other tables' types
+    rows = [(0, "9007199254740993", "-2.5", "1e+20", "inf", "NaN")]
+    [(_, results)] = split_batch_result(rows, [5])
+    assert results[:4] == (9007199254740993, -2.5, 1e20, float("inf"))
+    assert isinstance(results[0], int)
+    assert math.isnan(results[4])
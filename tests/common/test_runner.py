@@ -1,15 +1,20 @@
-from typing import Collection, List
+import os
+import tempfile
+from typing import AsyncIterator, Collection, List
 
 from metaphor.common.base_config import BaseConfig, OutputConfig
 from metaphor.common.base_extractor import BaseExtractor
 from metaphor.common.event_util import ENTITY_TYPES
+from metaphor.common.file_sink import FileSinkConfig
 from metaphor.common.runner import run_connector
 from metaphor.models.crawler_run_metadata import RunStatus
 from metaphor.models.metadata_change_event import (
     DataPlatform,
     Dataset,
     DatasetLogicalID,
+    MetadataChangeEvent,
 )
+from tests.test_utils import load_json
 
 
 def test_run_connector() -> None:
@@ -49,3 +54,115 @@ def test_run_connector() -> None:
     assert dummy_connector.stacktrace
     assert "ValueError: 1" in dummy_connector.stacktrace
     assert "ValueError: 2" in dummy_connector.stacktrace
+
+
+def test_run_connector_streaming() -> None:
+    class DummyStreamingConnector(BaseExtractor):
+        @staticmethod
+        def from_config_file(config_file: str) -> "DummyStreamingConnector":
+            return DummyStreamingConnector(BaseConfig.from_yaml_file(config_file))
+
+        def __init__(self, config: BaseConfig) -> None:
+            super().__init__(config)
+
+        async def extract(self) -> Collection[ENTITY_TYPES]:
+            return [entity async for entity in self.extract_stream()]
+
+        async def extract_stream(self) -> AsyncIterator[ENTITY_TYPES]:
+            for i in range(5):
+                logical_id = DatasetLogicalID(
+                    name=str(i), platform=DataPlatform.BIGQUERY
+                )
+                yield Dataset(logical_id=logical_id)
+
+    directory = tempfile.mkdtemp()
+    events, run_metadata = run_connector(
+        DummyStreamingConnector(BaseConfig(output=OutputConfig())),
+        "dummy_connector",
+        "dummy connector",
+        file_sink_config=FileSinkConfig(
+            directory=directory, streaming=True, batch_size_count=2, write_logs=False
+        ),
+    )
+
+    assert events == []
+    assert run_metadata.status is RunStatus.SUCCESS
+    assert run_metadata.entity_count == 5.0
+
+    (output_dir,) = os.listdir(directory)
+    assert sorted(os.listdir(f"{directory}/{output_dir}")) == [
+        "1-of-3.json",
+        "2-of-3.json",
+        "3-of-3.json",
+    ]
+    names = [
+        MetadataChangeEvent.from_dict(event).dataset.logical_id.name
+        for part in range(3)
+        for event in load_json(f"{directory}/{output_dir}/{part+1}-of-3.json")
+    ]
+    assert names == ["0", "1", "2", "3", "4"]
+
+
+def test_run_connector_streaming_failure() -> None:
+    class DummyFailingConnector(BaseExtractor):
+        @staticmethod
+        def from_config_file(config_file: str) -> "DummyFailingConnector":
+            return DummyFailingConnector(BaseConfig.from_yaml_file(config_file))
+
+        def __init__(self, config: BaseConfig) -> None:
+            super().__init__(config)
+
+        async def extract(self) -> Collection[ENTITY_TYPES]:
+            return [entity async for entity in self.extract_stream()]
+
+        async def extract_stream(self) -> AsyncIterator[ENTITY_TYPES]:
+            yield Dataset(logical_id=DatasetLogicalID(name="0"))
+            yield Dataset(logical_id=DatasetLogicalID(name="1"))
+            raise ValueError("boom")
+
+    directory = tempfile.mkdtemp()
+    _, run_metadata = run_connector(
+        DummyFailingConnector(BaseConfig(output=OutputConfig())),
+        "dummy_connector",
+        "dummy connector",
+        file_sink_config=FileSinkConfig(
+            directory=directory, streaming=True, batch_size_count=1, write_logs=False
+        ),
+    )
+
+    assert run_metadata.status is RunStatus.FAILURE
+    assert run_metadata.entity_count == 0.0
+
+    (output_dir,) = os.listdir(directory)
+    assert os.listdir(f"{directory}/{output_dir}") == []
+
+
+def test_run_connector_commit_state() -> None:
+    class DummyStatefulConnector(BaseExtractor):
+        @staticmethod
+        def from_config_file(config_file: str) -> "DummyStatefulConnector":
+            return DummyStatefulConnector(BaseConfig.from_yaml_file(config_file), False)
+
+        def __init__(self, config: BaseConfig, fail: bool) -> None:
+            super().__init__(config)
+            self.fail = fail
+            self.committed = False
+
+        async def extract(self) -> Collection[ENTITY_TYPES]:
+            if self.fail:
+                raise ValueError("boom")
+            return [Dataset(logical_id=DatasetLogicalID(name="0"))]
+
+        def commit_state(self) -> None:
+            self.committed = True
+
+    directory = tempfile.mkdtemp()
+    for fail in [False, True]:
+        connector = DummyStatefulConnector(BaseConfig(output=OutputConfig()), fail)
+        run_connector(
+            connector,
+            "dummy_connector",
+            "dummy connector",
+            file_sink_config=FileSinkConfig(directory=directory, write_logs=False),
+        )
+        assert connector.committed is not fail
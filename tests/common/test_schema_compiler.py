@@ -0,0 +1,88 @@
+import pytest
+
+from metaphor.common.schema_compiler import compile_schema
+
+
+def test_types():
+    validate = compile_schema({"type": "number"})
+    assert validate(1)
+    assert validate(1.5)
+    assert not validate(True)
+    assert not validate("1")
+
+    validate = compile_schema({"type": ["null", "string"]})
+    assert validate(None)
+    assert validate("a")
+    assert not validate(1)
+
+    validate = compile_schema({"type": "integer"})
+    assert validate(1)
+    assert validate(1.0)
+    assert not validate(1.5)
+    assert not validate(False)
+
+
+def test_objects_and_arrays():
+    validate = compile_schema(
+        {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "tags": {"type": "array", "items": {"enum": ["a", "b"]}},
+            },
+            "patternProperties": {"^[0-9]+$": {"type": "boolean"}},
+            "additionalProperties": False,
+        }
+    )
+    assert validate({})
+    assert validate({"name": "foo", "tags": ["a", "b"], "1": True})
+    assert not validate({"name": 1})
+    assert not validate({"tags": ["c"]})
+    assert not validate({"1": "true"})
+    assert not validate({"other": 1})
+    assert not validate([])
+
+
+def test_refs():
+    validate = compile_schema(
+        {
+            "definitions": {
+                "Node": {
+                    "type": "object",
+                    "properties": {
+                        "value": {"const": 1},
+                        "children": {
+                            "type": "array",
+                            "items": {"$ref": "#/definitions/Node"},
+                        },
+                    },
+                }
+            },
+            "properties": {
+                # siblings of $ref are ignored
+                "root": {"$ref": "#/definitions/Node", "type": "string"},
+            },
+        }
+    )
+    assert validate({"root": {"value": 1, "children": [{"children": []}]}})
+    assert not validate({"root": {"children": [{"value": True}]}})
+
+
+def test_combinators():
+    validate = compile_schema({"anyOf": [{"type": "string"}, {"type": "null"}]})
+    assert validate("a")
+    assert validate(None)
+    assert not validate(1)
+
+    validate = compile_schema({"oneOf": [{"type": "number"}, {"enum": [1, "a"]}]})
+    assert validate(2)
+    assert validate("a")
+    assert not validate(1)
+
+
+def test_unsupported_keyword():
+    with pytest.raises(NotImplementedError):
+        compile_schema({"type": "string", "minLength": 1})
+
+    with pytest.raises(NotImplementedError):
+        compile_schema({"$ref": "https://example.com/schema.json"})
@@ -0,0 +1,90 @@
+import time
+from typing import List
+
+from metaphor.common.sql_parser import (
+    SQLParser,
+    SQLParserConfig,
+    normalize_sql,
+    sql_hash,
+)
+
+calls: List[str] = []
+
+
+def parse_words(sql: str) -> List[str]:
+    calls.append(sql)
+    if sql.startswith("fail"):
+        raise ValueError("invalid SQL")
+    if sql.startswith("slow"):
+        time.sleep(10)
+    return sql.split()
+
+
+def test_normalize_sql():
+    assert (
+        normalize_sql("  SELECT *\t FROM  foo -- comment\n\n  WHERE a = 1 ;\n")
+        == "SELECT * FROM foo -- comment\nWHERE a = 1"
+    )
+    assert sql_hash("SELECT 1;") == sql_hash(" SELECT  1 ")
+    assert sql_hash("SELECT 1") != sql_hash("SELECT 2")
+
+
+def test_parse_in_process():
+    calls.clear()
+    parser = SQLParser(parse_words)
+
+    assert parser.parse_all(["a  b", "fail", "a b;", "c"]) == [
+        ["a", "b"],
+        None,
+        ["a", "b"],
+        ["c"],
+    ]
+    assert parser.parse("fail ") is None
+    assert parser.parse("c") == ["c"]
+
+    # Each normalized query is parsed once, even if it failed
+    assert calls == ["a b", "fail", "c"]
+
+
+def test_lru_cache():
+    calls.clear()
+    parser = SQLParser(parse_words, SQLParserConfig(cache_size=2))
+
+    parser.parse_all(["a", "b"])
+    parser.parse("a")
+    parser.parse("c")
+    parser.parse("a")
+    parser.parse("b")
+
+    # b is evicted by c, a is recently used
+    assert calls == ["a", "b", "c", "b"]
+
+
+def test_disk_cache(tmp_path):
+    calls.clear()
+    config = SQLParserConfig(cache_path=str(tmp_path / "cache.db"))
+
+    with SQLParser(parse_words, config) as parser:
+        assert parser.parse_all(["a b", "fail"]) == [["a", "b"], None]
+
+    with SQLParser(parse_words, config) as parser:
+        assert parser.parse_all(["a b", "fail"]) == [["a", "b"], None]
+
+    assert calls == ["a b", "fail"]
+
+
+def test_parse_in_pool():
+    config = SQLParserConfig(max_workers=2, timeout=1)
+    with SQLParser(parse_words, config) as parser:
+        start = time.time()
+        assert parser.parse_all(["a", "slow", "fail", "b c", "d"]) == [
+            ["a"],
+            None,
+            None,
+            ["b", "c"],
+            ["d"],
+        ]
+        assert time.time() - start < 5
+
+        # The pool is replaced after the timeout
+        assert parser.parse("e") == ["e"]
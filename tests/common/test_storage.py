@@ -31,6 +31,15 @@ def test_local_storage(test_root_dir):
     _, temp_file = tempfile.mkstemp(suffix=".tmp")
     assert len(storage.list_files(os.path.dirname(temp_file), ".tmp")) > 0
 
+    moved_file = f"{temp_file}.moved"
+    storage.move_file(temp_file, moved_file)
+    assert not os.path.exists(temp_file)
+    assert os.path.exists(moved_file)
+
+    storage.write_file(moved_file, b"foo", True)
+    assert storage.read_file(moved_file) == b"foo"
+    assert storage.read_file(temp_file) is None
+
 
 @patch("metaphor.common.storage.boto3.Session")
 @patch("metaphor.common.storage.assume_role")
@@ -50,3 +59,42 @@ def test_s3_storage_configs(mock_assume_role, mock_session_class, test_root_dir)
     )
 
     mock_assume_role.assert_called_with(ANY, "arn")
+
+
+@patch("metaphor.common.storage.boto3.Session")
+def test_s3_storage_delete_files(mock_session_class):
+    mock_client = MagicMock()
+    mock_client.delete_objects.return_value = {}
+    mock_session_class.return_value.client.return_value = mock_client
+
+    storage = S3Storage()
+    storage.delete_files(
+        [f"s3://foo/{i}.json" for i in range(1500)] + ["s3://bar/baz.json"]
+    )
+
+    # Keys are grouped by bucket, at most 1000 keys per request
+    assert [
+        (c.kwargs["Bucket"], len(c.kwargs["Delete"]["Objects"]))
+        for c in mock_client.delete_objects.call_args_list
+    ] == [("foo", 1000), ("foo", 500), ("bar", 1)]
+    mock_client.delete_object.assert_not_called()
+
+
+@patch("metaphor.common.storage.open")
+@patch("metaphor.common.storage.boto3.Session")
+def test_s3_storage_write_encoded_file(mock_session_class, mock_open):
+    storage = S3Storage()
+    storage.write_file("s3://foo/1-of-1.json.gz", b"payload", True, "gzip")
+
+    _, kwargs = mock_open.call_args
+    assert kwargs["compression"] == "disable"
+    assert kwargs["transport_params"]["client_kwargs"] == {
+        "S3.Client.put_object": {
+            "ACL": "bucket-owner-full-control",
+            "ContentEncoding": "gzip",
+        },
+        "S3.Client.create_multipart_upload": {
+            "ACL": "bucket-owner-full-control",
+            "ContentEncoding": "gzip",
+        },
+    }
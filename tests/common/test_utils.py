@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pytest
 import pytz
@@ -17,6 +17,7 @@ from metaphor.common.utils import (
     safe_parse_ISO8601,
     safe_str,
     start_of_day,
+    time_slices,
     unique_list,
 )
 
@@ -109,6 +110,34 @@ def test_chunk_by_size():
     ]
 
 
+def test_time_slices():
+    start = datetime(2020, 1, 1)
+    end = datetime(2020, 1, 1, 6)
+
+    def hours(*offsets):
+        return start + timedelta(hours=sum(offsets))
+
+    # No estimate, single slice
+    assert time_slices(start, end, {}, 100) == [(start, end)]
+
+    # Quiet buckets are merged, busy ones are split
+    assert time_slices(start, end, {0: 40, 1: 40, 2: 40, 3: 250}, 100) == [
+        (hours(0), hours(2)),
+        (hours(2), hours(3)),
+        (hours(3), hours(3, 1 / 3)),
+        (hours(3, 1 / 3), hours(3, 2 / 3)),
+        (hours(3, 2 / 3), hours(4)),
+        (hours(4), hours(6)),
+    ]
+
+    # The last bucket is truncated at the end of the range
+    assert time_slices(start, hours(1.5), {0: 10, 1: 200}, 100) == [
+        (hours(0), hours(1)),
+        (hours(1), hours(1.25)),
+        (hours(1.25), hours(1.5)),
+    ]
+
+
 def test_unique_list():
     assert unique_list(["a", "b", "c"]) == ["a", "b", "c"]
     assert unique_list(["a", "a", "c"]) == ["a", "c"]
@@ -0,0 +1,59 @@
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from metaphor.common.watermark import QueryLogWatermark, WatermarkStore
+
+t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_query_log_watermark():
+    default_start = t0 - timedelta(days=1)
+    watermark = QueryLogWatermark(timedelta(hours=1))
+    assert watermark.resume_from(default_start) == default_start
+
+    assert watermark.add("q1", t0) is True
+    assert watermark.add("q2", t0 + timedelta(hours=2)) is True
+    assert watermark.add("q3", t0 + timedelta(hours=1, minutes=30)) is True
+    assert watermark.add("q2", t0 + timedelta(hours=2)) is False
+
+    assert watermark.start_time == t0 + timedelta(hours=2)
+    assert watermark.resume_from(default_start) == t0 + timedelta(hours=1)
+
+    # Only the queries to be fetched again are kept
+    assert watermark.to_dict() == {
+        "startTime": "2024-01-01T02:00:00+00:00",
+        "queryIds": {
+            "q2": "2024-01-01T02:00:00+00:00",
+            "q3": "2024-01-01T01:30:00+00:00",
+        },
+    }
+
+    # Never go back further than the lookback window
+    assert watermark.resume_from(t0 + timedelta(hours=3)) == t0 + timedelta(hours=3)
+
+
+def test_watermark_store():
+    path = f"{tempfile.mkdtemp()}/watermark.json"
+    store = WatermarkStore.from_path(path)
+    overlap = timedelta(hours=1)
+
+    watermark = store.load("account1", overlap)
+    assert watermark.start_time is None
+
+    # Nothing is saved until a query is fetched
+    store.save("account1", watermark)
+    assert store.load("account1", overlap).start_time is None
+
+    watermark.add("q1", t0)
+    store.save("account1", watermark)
+
+    other = QueryLogWatermark(overlap)
+    other.add("q2", t0 + timedelta(hours=1))
+    store.save("account2", other)
+
+    loaded = store.load("account1", overlap)
+    assert loaded.start_time == t0
+    assert loaded.add("q1", t0) is False
+    assert loaded.add("q2", t0) is True
+
+    assert store.load("account2", overlap).start_time == t0 + timedelta(hours=1)
@@ -1,3 +1,4 @@
+import json
 from typing import Dict
 from unittest.mock import patch
 
@@ -12,6 +13,15 @@ class Response:
     def json(self) -> Dict:
         return self._json
 
+    def iter_content(self, chunk_size: int):
+        yield json.dumps(self._json).encode()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
 
 @patch("metaphor.dbt.cloud.client.requests")
 def test_get_last_successful_run(mock_requests):
@@ -21,7 +31,7 @@ def test_get_last_successful_run(mock_requests):
         service_token="service_token",
     )
 
-    mock_requests.get.return_value = Response(
+    mock_requests.Session.return_value.get.return_value = Response(
         200,
         {
             "data": [
@@ -46,7 +56,7 @@ def test_get_last_successful_run(mock_requests):
     assert run.run_id == 2
     assert run.job_id == 8888
 
-    mock_requests.get.assert_called_once_with(
+    mock_requests.Session.return_value.get.assert_called_once_with(
         "http://base.url/api/v2/accounts/1111/runs/",
         params={
             "job_definition_id": 2222,
@@ -54,11 +64,8 @@ def test_get_last_successful_run(mock_requests):
             "limit": 50,
             "offset": 0,
         },
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": "Token service_token",
-        },
         timeout=600,
+        stream=False,
     )
 
 
@@ -70,7 +77,7 @@ def test_get_snowflake_account(mock_requests):
         service_token="service_token",
     )
 
-    mock_requests.get.return_value = Response(
+    mock_requests.Session.return_value.get.return_value = Response(
         200,
         {
             "data": {
@@ -85,14 +92,11 @@ def test_get_snowflake_account(mock_requests):
     account = client.get_snowflake_account(2222)
     assert account == "snowflake_account"
 
-    mock_requests.get.assert_called_once_with(
+    mock_requests.Session.return_value.get.assert_called_once_with(
         "http://base.url/api/v2/accounts/1111/projects/2222",
         params=None,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": "Token service_token",
-        },
         timeout=600,
+        stream=False,
     )
 
 
@@ -103,7 +107,7 @@ def test_get_project_jobs(mock_requests):
         account_id=1111,
         service_token="service_token",
     )
-    mock_requests.get.return_value = Response(
+    mock_requests.Session.return_value.get.return_value = Response(
         200,
         {
             "data": [
@@ -128,20 +132,27 @@ def test_get_run_artifact(mock_requests):
         service_token="service_token",
     )
 
-    mock_requests.get.return_value = Response(200, {"artifact": "json"})
+    mock_requests.Session.return_value.get.return_value = Response(
+        200, {"artifact": "json"}
+    )
 
     run = DbtRun(run_id=2222, project_id=3333, job_id=4444)
     path = client.get_run_artifact(run, "manifest.json")
     assert path.endswith("/3333-4444-manifest.json")
+    with open(path) as f:
+        assert json.load(f) == {"artifact": "json"}
 
-    mock_requests.get.assert_called_once_with(
+    mock_requests.Session.return_value.get.assert_called_once_with(
         "http://base.url/api/v2/accounts/1111/runs/2222/artifacts/manifest.json",
         params=None,
-        headers={
+        timeout=600,
+        stream=True,
+    )
+    mock_requests.Session.return_value.headers.update.assert_called_once_with(
+        {
             "Content-Type": "application/json",
             "Authorization": "Token service_token",
-        },
-        timeout=600,
+        }
     )
 
 
@@ -185,7 +196,7 @@ def test_job_is_included(mock_requests):
             )
         return Response(404, {})
 
-    mock_requests.get = mock_get
+    mock_requests.Session.return_value.get = mock_get
 
     for i in range(1, 4):
         included = client.is_job_included(i)
@@ -6,6 +6,12 @@ from metaphor.common.base_config import OutputConfig
 from metaphor.dbt.cloud.client import DbtRun
 from metaphor.dbt.cloud.config import DbtCloudConfig
 from metaphor.dbt.cloud.extractor import DbtCloudExtractor
+from metaphor.dbt.config import DbtRunConfig, MetaTag
+from metaphor.models.metadata_change_event import (
+    DataPlatform,
+    Dataset,
+    DatasetLogicalID,
+)
 
 
 @patch("metaphor.dbt.cloud.extractor.DbtAdminAPIClient")
@@ -94,3 +100,67 @@ async def test_extractor_bad_source(
     extractor = DbtCloudExtractor(config)
     await extractor.extract()
     assert not extractor._entities
+
+
+@patch("metaphor.dbt.cloud.extractor.DbtAdminAPIClient")
+@patch("metaphor.dbt.cloud.extractor.DbtExtractor")
+@pytest.mark.asyncio
+async def test_extractor_run_cache(
+    mock_dbt_extractor_class: MagicMock, mock_client_class: MagicMock, tmp_path
+):
+    runs = {
+        2222: DbtRun(run_id=3333, project_id=4444, job_id=2222),
+        8888: DbtRun(run_id=7777, project_id=4444, job_id=8888),
+    }
+    mock_client = MagicMock()
+    mock_client.get_last_successful_run = MagicMock(side_effect=runs.get)
+    mock_client.is_job_included = MagicMock(return_value=True)
+    mock_client.get_snowflake_account = MagicMock(return_value=None)
+    mock_client.get_run_artifact = MagicMock(return_value="tempfile")
+    mock_client_class.return_value = mock_client
+
+    def fake_dbt_extractor(config: DbtRunConfig):
+        async def fake_extract():
+            return [
+                Dataset(
+                    logical_id=DatasetLogicalID(
+                        name=config.docs_base_url, platform=DataPlatform.SNOWFLAKE
+                    )
+                )
+            ]
+
+        mock_dbt_extractor = MagicMock()
+        mock_dbt_extractor.extract.side_effect = fake_extract
+        return mock_dbt_extractor
+
+    mock_dbt_extractor_class.side_effect = fake_dbt_extractor
+
+    def run_config(**kwargs):
+        return DbtCloudConfig(
+            output=OutputConfig(),
+            account_id=1111,
+            job_ids={2222, 8888},
+            service_token="service_token",
+            run_cache_file=str(tmp_path / "runs.json"),
+            **kwargs,
+        )
+
+    extractor = DbtCloudExtractor(run_config())
+    entities = await extractor.extract()
+    extractor.commit_state()
+    assert mock_dbt_extractor_class.call_count == 2
+
+    # Only the changed run is downloaded & parsed again
+    runs[8888] = DbtRun(run_id=9999, project_id=4444, job_id=8888)
+    mock_client.get_run_artifact.reset_mock()
+    extractor = DbtCloudExtractor(run_config())
+    reused = await extractor.extract()
+    assert sorted(reused, key=str) == sorted(entities, key=str)
+    assert mock_dbt_extractor_class.call_count == 3
+    assert mock_client.get_run_artifact.call_count == 2
+    assert sorted(extractor._entities.keys()) == [3333, 9999]
+
+    # A run isn't reused once the config changes
+    extractor = DbtCloudExtractor(run_config(meta_tags=[MetaTag("pii", "PII")]))
+    await extractor.extract()
+    assert mock_dbt_extractor_class.call_count == 5
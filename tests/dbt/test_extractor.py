@@ -5,6 +5,7 @@ from metaphor.common.event_util import EventUtil
 from metaphor.dbt.artifact_parser import ArtifactParser
 from metaphor.dbt.config import DbtRunConfig, MetaOwnership, MetaTag
 from metaphor.dbt.extractor import DbtExtractor
+from metaphor.dbt.generated.dbt_manifest_v11 import WritableManifest as DbtManifestV11
 from tests.test_utils import load_json
 
 
@@ -89,8 +90,48 @@ async def test_ride_share(test_root_dir):
     )
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "project",
+    [
+        "trial_v4",
+        "trial_v5",
+        "trial_v6",
+        "trial_v7",
+        "trial_v8",
+        "trial_v9",
+        "jaffle_v10",
+        "jaffle_v11",
+        "ride_share",
+    ],
+)
+@pytest.mark.parametrize("stream_manifest", [False, True])
+async def test_lean_manifest(test_root_dir, project, stream_manifest):
+    if stream_manifest:
+        # Streaming requires the optional ijson package
+        pytest.importorskip("ijson")
+
+    project_source_url = (
+        "https://github.com/MetaphorData/dbt/tree/main/jaffle-sl-template"
+        if project.startswith("jaffle")
+        else f"https://github.com/MetaphorData/dbt/tree/main/{project.split('_v')[0]}"
+    )
+    await _test_project(
+        f"{test_root_dir}/dbt/data/{project}",
+        "http://localhost:8080",
+        project_source_url,
+        lean_manifest=True,
+        stream_manifest=stream_manifest,
+    )
+
+
 async def _test_project(
-    data_dir, docs_base_url=None, project_source_url=None, useCatalog=False
+    data_dir,
+    docs_base_url=None,
+    project_source_url=None,
+    useCatalog=False,
+    lean_manifest=False,
+    stream_manifest=False,
 ):
     manifest = data_dir + "/manifest.json"
     run_results = data_dir + "/run_results.json"
@@ -105,6 +146,8 @@ async def _test_project(
         project_source_url=project_source_url,
         meta_ownerships=[MetaOwnership(meta_key="owner", ownership_type="Maintainer")],
         meta_tags=[MetaTag(meta_key="pii", tag_type="PII")],
+        lean_manifest=lean_manifest,
+        stream_manifest=stream_manifest,
     )
     extractor = DbtExtractor(config)
     events = [EventUtil.trim_event(e) for e in await extractor.extract()]
@@ -144,3 +187,46 @@ def test_sanitize_manifest_strip_null_tests_depends_on(test_root_dir):
             }
         }
     }
+
+
+def test_trim_manifest():
+    manifest = {
+        "metadata": {"dbt_schema_version": "v11"},
+        "nodes": {
+            "model.a": {
+                "resource_type": "model",
+                "depends_on": {"macros": ["macro.used"], "nodes": []},
+            },
+            "seed.b": {"resource_type": "seed", "depends_on": {"macros": []}},
+            "test.c": {
+                "resource_type": "test",
+                "depends_on": {"macros": ["macro.test_only"], "nodes": ["model.a"]},
+            },
+        },
+        "macros": {"macro.used": {}, "macro.test_only": {}, "macro.unused": {}},
+        "docs": {"doc.a": {}},
+        "parent_map": {"model.a": []},
+        "group_map": None,
+    }
+
+    assert ArtifactParser.trim_manifest(manifest, DbtManifestV11) == {
+        "metadata": {"dbt_schema_version": "v11"},
+        "nodes": {
+            "model.a": manifest["nodes"]["model.a"],
+            "test.c": manifest["nodes"]["test.c"],
+        },
+        "macros": {"macro.used": {}},
+        "docs": {},
+        "parent_map": {},
+        "group_map": None,
+        # Required sections that were not loaded
+        "sources": {},
+        "exposures": {},
+        "metrics": {},
+        "groups": {},
+        "selectors": {},
+        "disabled": {},
+        "child_map": {},
+        "saved_queries": {},
+        "semantic_models": {},
+    }
@@ -1,3 +1,8 @@
+from metaphor.common.api_request import (
+    ApiRequestConfig,
+    DebugCapturePolicy,
+    RetryPolicy,
+)
 from metaphor.common.base_config import OutputConfig
 from metaphor.fivetran.config import FivetranRunConfig
 
@@ -9,4 +14,8 @@ def test_yaml_config(test_root_dir):
         api_key="key",
         api_secret="secret",
         output=OutputConfig(),
+        api_request=ApiRequestConfig(
+            retry=RetryPolicy(max_retries=5, status_codes=frozenset({429, 503})),
+            debug_capture=DebugCapturePolicy(sample_rate=0.1),
+        ),
     )
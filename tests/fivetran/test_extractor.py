@@ -1,3 +1,4 @@
+import json
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -21,12 +22,13 @@ class MockResponse:
     def __init__(self, json_data, status_code=200):
         self.json_data = json_data
         self.status_code = status_code
+        self.content = json.dumps(json_data).encode()
 
     def json(self):
         return self.json_data
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 @pytest.mark.asyncio
 async def test_extractor(mock_get: MagicMock, test_root_dir: str):
     mock_get.side_effect = [
@@ -1,6 +1,7 @@
 from types import SimpleNamespace
 from unittest.mock import MagicMock
 
+from looker_sdk.error import SDKError
 from looker_sdk.sdk.api40.models import (
     Dashboard,
     DashboardElement,
@@ -11,7 +12,7 @@ from looker_sdk.sdk.api40.models import (
 from metaphor.common.base_config import OutputConfig
 from metaphor.common.event_util import EventUtil
 from metaphor.looker.config import LookerConnectionConfig, LookerRunConfig
-from metaphor.looker.extractor import LookerExtractor
+from metaphor.looker.extractor import DASHBOARD_FIELDS, LookerExtractor
 from metaphor.looker.lookml_parser import Explore, Model
 from tests.test_utils import load_json
 
@@ -37,7 +38,8 @@ def test_fetch_dashboards(test_root_dir) -> None:
         SimpleNamespace(id="1"),
     ]
 
-    def mock_dashboard(dashboard_id: str):
+    def mock_dashboard(dashboard_id: str, fields: str):
+        assert fields == DASHBOARD_FIELDS
         return Dashboard(
             id="model1::1",
             title="first",
@@ -77,3 +79,41 @@ def test_fetch_dashboards(test_root_dir) -> None:
     assert len(dashboards) == 1
     events = [EventUtil.trim_event(e) for e in dashboards]
     assert events == load_json(f"{test_root_dir}/looker/expected.json")
+
+
+def test_fetch_dashboards_rate_limited() -> None:
+    config = LookerRunConfig(
+        output=OutputConfig(),
+        base_url="http://test",
+        client_id="id",
+        client_secret="secret",
+        lookml_dir=".",
+        connections={},
+        max_retries=2,
+    )
+    extractor = LookerExtractor(config)
+    extractor._initial_backoff = 0
+    extractor._sdk = MagicMock()
+    extractor._sdk.all_dashboards.return_value = [
+        SimpleNamespace(id=id) for id in ["1", "2", "3", "4"]
+    ]
+
+    attempts = {"1": 0, "2": 0, "3": 0, "4": 0}
+
+    def mock_dashboard(dashboard_id: str, fields: str):
+        attempts[dashboard_id] += 1
+        if dashboard_id == "2" and attempts[dashboard_id] < 3:
+            raise SDKError("Too Many Requests")
+        if dashboard_id == "3":
+            raise SDKError("429 Too Many Requests")
+        if dashboard_id == "4":
+            raise SDKError("Not found")
+        return Dashboard(id=f"model1::{dashboard_id}", title=dashboard_id)
+
+    extractor._sdk.dashboard = mock_dashboard
+    dashboards = extractor._fetch_dashboards({})
+
+    # Retried until it succeeds, or runs out of retries, only if rate limited
+    assert [d.logical_id.dashboard_id for d in dashboards] == ["model1::1", "model1::2"]
+    assert attempts == {"1": 1, "2": 3, "3": 3, "4": 1}
+    extractor._sdk.all_dashboards.assert_called_once_with(fields="id")
@@ -1,6 +1,12 @@
+import glob
+import os
+from unittest.mock import patch
+
+import lkml
+
 from metaphor.common.entity_id import EntityId
 from metaphor.looker.config import LookerConnectionConfig
-from metaphor.looker.lookml_parser import Explore, Model, parse_project
+from metaphor.looker.lookml_parser import Explore, LookMLFiles, Model, parse_project
 from metaphor.models.metadata_change_event import (
     AssetStructure,
     DataPlatform,
@@ -992,3 +998,90 @@ def test_explore_extension(test_root_dir):
             entity_upstream=EntityUpstream(source_entities=[str(virtual_view3)]),
         ),
     ]
+
+
+def test_files_glob(tmp_path):
+    for path in [
+        "a.model.lkml",
+        "views/b.view.lkml",
+        "views/nested/c.view.lkml",
+        "views/.hidden.view.lkml",
+        ".git/d.view.lkml",
+        "other/e.explore.lkml",
+        "other/f.txt",
+    ]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text("")
+
+    files = LookMLFiles(str(tmp_path))
+    for include_path in [
+        "/**/*.model.lkml",
+        "/**/*.view",
+        "/views/*.view",
+        "/views/**/*.view.lkml",
+        "/views/./nested/../b.view",
+        "/*/[a-c].view",
+        "/*/[!b].view",
+        "/other/?.explore",
+        "/**/*",
+        "/missing/*.view",
+    ]:
+        pattern = (
+            include_path if include_path.endswith(".lkml") else include_path + ".lkml"
+        )
+        expected = glob.glob(f"{tmp_path}/{pattern}", recursive=True)
+        assert sorted(os.path.normpath(p) for p in files.glob(include_path)) == sorted(
+            os.path.normpath(p) for p in expected
+        ), include_path
+
+
+def test_shared_view(test_root_dir):
+    with patch(
+        "metaphor.looker.lookml_parser.lkml.load", side_effect=lkml.load
+    ) as mock_load:
+        _, virtual_views = parse_project(
+            f"{test_root_dir}/looker/shared_view", connection_map
+        )
+
+    # Both models & the view file included by them
+    assert mock_load.call_count == 3
+
+    # The view is resolved with each model's own connection
+    upstreams = {
+        virtual_view.logical_id.name: virtual_view.looker_view.source_datasets
+        for virtual_view in virtual_views
+        if virtual_view.looker_view is not None
+    }
+    assert upstreams == {
+        "snowflake.view1": [
+            str(
+                EntityId(
+                    EntityType.DATASET,
+                    DatasetLogicalID(
+                        name="db.schema1.table1",
+                        platform=DataPlatform.SNOWFLAKE,
+                        account="account",
+                    ),
+                )
+            )
+        ],
+        "bigquery.view1": [
+            str(
+                EntityId(
+                    EntityType.DATASET,
+                    DatasetLogicalID(
+                        name="db.schema1.table1",
+                        platform=DataPlatform.BIGQUERY,
+                    ),
+                )
+            )
+        ],
+    }
+
+
+def test_max_workers(test_root_dir):
+    for project in ["complex_includes", "shared_view", "view_extension"]:
+        base_dir = f"{test_root_dir}/looker/{project}"
+        assert parse_project(base_dir, connection_map, max_workers=2) == parse_project(
+            base_dir, connection_map
+        )
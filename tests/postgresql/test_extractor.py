@@ -1,3 +1,12 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Tuple
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from metaphor.common.base_config import OutputConfig
+from metaphor.postgresql.config import PostgreSQLRunConfig
 from metaphor.postgresql.extractor import PostgreSQLExtractor
 
 
@@ -38,3 +47,80 @@ def test_parse_format_type():
     assert PostgreSQLExtractor._parse_format_type(
         "character varying", "character varying(10)"
     ) == (None, 10)
+
+
+class MockPool:
+    """Hands out the database name as the connection"""
+
+    def __init__(self, database: str):
+        self.database = database
+        self.closed = False
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.database
+
+    async def close(self):
+        self.closed = True
+
+
+class CrawlTracker:
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.calls: List[Tuple[str, str]] = []
+
+    def fetch(self, name: str):
+        async def fetch(conn, catalog, *args):
+            assert conn == catalog
+            self.calls.append((name, catalog))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            await asyncio.sleep(0.01)
+            self.running -= 1
+
+        return fetch
+
+
+@pytest.mark.asyncio
+@patch("asyncpg.create_pool")
+async def test_crawl_databases_concurrently(mock_create_pool: MagicMock):
+    crawl = CrawlTracker()
+    pools: List[MockPool] = []
+
+    async def create_pool(database: str, **kwargs) -> MockPool:
+        assert kwargs["max_size"] == 3
+        pools.append(MockPool(database))
+        return pools[-1]
+
+    mock_create_pool.side_effect = create_pool
+
+    extractor = PostgreSQLExtractor(
+        PostgreSQLRunConfig(
+            host="host",
+            database="db",
+            user="user",
+            password="password",
+            max_concurrency=2,
+            output=OutputConfig(),
+        )
+    )
+    extractor._fetch_tables = crawl.fetch("tables")  # type: ignore
+    extractor._fetch_columns = crawl.fetch("columns")  # type: ignore
+    extractor._fetch_constraints = crawl.fetch("constraints")  # type: ignore
+
+    await extractor._crawl_databases(["db1", "db2", "db3"])
+
+    assert sorted(crawl.calls) == sorted(
+        (name, db)
+        for name in ["tables", "columns", "constraints"]
+        for db in ["db1", "db2", "db3"]
+    )
+
+    # Tables are fetched before the other catalog queries of a database
+    for db in ["db1", "db2", "db3"]:
+        assert crawl.calls.index(("tables", db)) < crawl.calls.index(("columns", db))
+
+    # 2 databases, each running columns & constraints queries concurrently
+    assert crawl.max_running == 4
+    assert all(pool.closed for pool in pools)
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -18,6 +19,7 @@ class MockResponse:
     def __init__(self, json_data, status_code=200):
         self.json_data = json_data
         self.status_code = status_code
+        self.content = json.dumps(json_data).encode()
 
     def json(self):
         return self.json_data
@@ -26,7 +28,7 @@ class MockResponse:
         return
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 @patch("msal.ConfidentialClientApplication")
 @pytest.mark.asyncio
 async def test_get_user_subscriptions(
@@ -70,7 +72,7 @@ async def test_get_user_subscriptions(
     )
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 @patch("msal.ConfidentialClientApplication")
 @pytest.mark.asyncio
 async def test_get_export_dataflow(
@@ -97,7 +99,7 @@ async def test_get_export_dataflow(
     assert dataflow == load_json(f"{test_root_dir}/power_bi/data/dataflow_1.json")
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 @patch("requests.post")
 @patch("msal.ConfidentialClientApplication")
 @pytest.mark.asyncio
@@ -136,7 +138,7 @@ async def test_get_workspace_info(
     assert len(workspaces) == 1
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 @patch("msal.ConfidentialClientApplication")
 @pytest.mark.asyncio
 async def test_get_activities(
@@ -171,7 +173,7 @@ async def test_get_activities(
     ]
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 @patch("msal.ConfidentialClientApplication")
 @pytest.mark.asyncio
 async def test_get_refresh_schedule(
@@ -221,7 +223,7 @@ async def test_get_refresh_schedule(
     )
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 @patch("msal.ConfidentialClientApplication")
 @pytest.mark.asyncio
 async def test_get_direct_query_refresh_schedule(
@@ -264,7 +266,7 @@ async def test_get_direct_query_refresh_schedule(
     )
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 @patch("msal.ConfidentialClientApplication")
 @pytest.mark.asyncio
 async def test_get_transactions(
@@ -0,0 +1,203 @@
+import re
+from datetime import datetime, timezone
+from typing import List
+
+import pytest
+
+from metaphor.common.base_config import OutputConfig
+from metaphor.common.entity_id import to_dataset_entity_id
+from metaphor.common.utils import md5_digest
+from metaphor.models.metadata_change_event import DataPlatform, QueriedDataset, QueryLog
+from metaphor.redshift.access_event import AccessEvent, _day_slices
+from metaphor.redshift.config import RedshiftQueryLogConfig, RedshiftRunConfig
+from metaphor.redshift.extractor import RedshiftExtractor
+
+
+def make_record(query: int, table: str, start_time: datetime) -> dict:
+    return {
+        "userid": 1,
+        "query": query,
+        "usename": "user   ",
+        "tbl": 100,
+        "rows": 10,
+        "bytes": 1000,
+        "querytxt": f"SELECT * FROM {table}   ",
+        "database": "db  ",
+        "schema": "public  ",
+        "table": f"{table}  ",
+        "starttime": start_time,
+        "endtime": start_time.replace(second=30),
+        "aborted": 0,
+    }
+
+
+class MockCursor:
+    def __init__(self, records: List[dict]):
+        self._records = iter(records)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._records)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class MockTransaction:
+    def __init__(self, conn: "MockConnection"):
+        self._conn = conn
+
+    async def __aenter__(self):
+        self._conn.in_transaction = True
+
+    async def __aexit__(self, *args):
+        self._conn.in_transaction = False
+
+
+class MockConnection:
+    """Returns the records whose start time is within each query's time range"""
+
+    def __init__(self, records: List[dict]):
+        self.records = records
+        self.in_transaction = False
+        self.queries: List[str] = []
+        self.prefetches: List[int] = []
+
+    def transaction(self):
+        return MockTransaction(self)
+
+    def cursor(self, query: str, prefetch: int):
+        assert self.in_transaction
+        self.queries.append(query)
+        self.prefetches.append(prefetch)
+        start, end = [
+            datetime.fromisoformat(time)
+            for time in re.findall(r"ss\.starttime [<>=]+ '([^']+)'", query)
+        ]
+        return MockCursor(
+            [
+                record
+                for record in self.records
+                if start <= record["starttime"].replace(tzinfo=timezone.utc) < end
+            ]
+        )
+
+
+def test_day_slices():
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2023, 1, 3, 12, tzinfo=timezone.utc)
+
+    assert _day_slices(start, end) == [
+        (datetime(2023, 1, 2, 12, tzinfo=timezone.utc), end),
+        (
+            datetime(2023, 1, 1, 12, tzinfo=timezone.utc),
+            datetime(2023, 1, 2, 12, tzinfo=timezone.utc),
+        ),
+        (start, datetime(2023, 1, 1, 12, tzinfo=timezone.utc)),
+    ]
+    assert _day_slices(end, start) == []
+
+
+@pytest.mark.asyncio
+async def test_fetch_access_event():
+    day1 = datetime(2023, 1, 1, 10)
+    day2 = datetime(2023, 1, 2, 10)
+    conn = MockConnection([make_record(1, "t1", day1), make_record(2, "t2", day2)])
+
+    events = [
+        event
+        async for event in AccessEvent.fetch_access_event(
+            conn,  # type: ignore
+            datetime(2023, 1, 1, tzinfo=timezone.utc),
+            datetime(2023, 1, 3, tzinfo=timezone.utc),
+            prefetch=10,
+        )
+    ]
+
+    # One query per day, from the latest
+    assert len(conn.queries) == 2
+    assert "'2023-01-02T00:00:00+00:00'" in conn.queries[0]
+    assert "'2023-01-01T00:00:00+00:00'" in conn.queries[1]
+    assert conn.prefetches == [10, 10]
+
+    assert events == [
+        AccessEvent(
+            userid=1,
+            query=2,
+            usename="user",
+            tbl=100,
+            rows=10,
+            bytes=1000,
+            querytxt="SELECT * FROM t2",
+            database="db",
+            schema="public",
+            table="t2",
+            starttime=day2.replace(tzinfo=timezone.utc),
+            endtime=day2.replace(second=30, tzinfo=timezone.utc),
+            aborted=0,
+        ),
+        AccessEvent(
+            userid=1,
+            query=1,
+            usename="user",
+            tbl=100,
+            rows=10,
+            bytes=1000,
+            querytxt="SELECT * FROM t1",
+            database="db",
+            schema="public",
+            table="t1",
+            starttime=day1.replace(tzinfo=timezone.utc),
+            endtime=day1.replace(second=30, tzinfo=timezone.utc),
+            aborted=0,
+        ),
+    ]
+
+
+def test_process_record():
+    extractor = RedshiftExtractor(
+        RedshiftRunConfig(
+            host="",
+            database="",
+            user="",
+            password="",
+            output=OutputConfig(),
+            query_log=RedshiftQueryLogConfig(excluded_usernames={"bot"}),
+        )
+    )
+
+    start_time = datetime(2023, 1, 1, 10)
+    record = make_record(1, "t1", start_time)
+    extractor._process_record(AccessEvent.from_record(record))
+    extractor._process_record(
+        AccessEvent.from_record({**record, "table": "t2", "querytxt": "ignored"})
+    )
+    extractor._process_record(AccessEvent.from_record({**record, "usename": "bot"}))
+
+    assert len(extractor._logs) == 2
+    assert extractor._logs[0] == QueryLog(
+        id="REDSHIFT:1",
+        query_id="1",
+        platform=DataPlatform.REDSHIFT,
+        start_time=start_time.replace(tzinfo=timezone.utc),
+        duration=30.0,
+        user_id="user",
+        rows_read=10.0,
+        bytes_read=1000.0,
+        sources=[
+            QueriedDataset(
+                id=str(to_dataset_entity_id("db.public.t1", DataPlatform.REDSHIFT)),
+                database="db",
+                schema="public",
+                table="t1",
+            )
+        ],
+        sql="SELECT * FROM t1",
+        sql_hash=md5_digest(b"SELECT * FROM t1"),
+    )
+
+    # The same query shares the SQL
+    assert extractor._logs[1].sql is extractor._logs[0].sql
+    assert extractor._logs[1].sources[0].table == "t2"
@@ -0,0 +1,105 @@
+import io
+import os
+import re
+from datetime import datetime, timezone
+from typing import List, Optional
+
+
+class LocalS3Client:
+    """
+    A stand-in for the S3 client, serving the objects from a local directory,
+    where each subdirectory is a bucket
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.ranges: List[str] = []
+
+    def list_buckets(self):
+        return {
+            "Buckets": [
+                {"Name": name}
+                for name in sorted(os.listdir(self.root))
+                if os.path.isdir(os.path.join(self.root, name))
+            ]
+        }
+
+    def get_object(self, Bucket: str, Key: str, Range: str = ""):
+        with open(os.path.join(self.root, Bucket, Key), "rb") as f:
+            content = f.read()
+
+        self.ranges.append(Range)
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", Range)
+        if match is None:
+            return {"Body": io.BytesIO(content)}
+
+        size = len(content)
+        if match.group(1) == "":
+            start, end = max(size - int(match.group(2)), 0), size - 1
+        else:
+            start, end = int(match.group(1)), min(int(match.group(2)), size - 1)
+
+        return {
+            "Body": io.BytesIO(content[start : end + 1]),
+            "ContentRange": f"bytes {start}-{end}/{size}",
+        }
+
+    def get_paginator(self, operation: str) -> "LocalListObjectsPaginator":
+        assert operation == "list_objects_v2"
+        return LocalListObjectsPaginator(self.root)
+
+
+class LocalListObjectsPaginator:
+    def __init__(self, root: str):
+        self.root = root
+
+    def _keys(self, bucket: str) -> List[str]:
+        bucket_dir = os.path.join(self.root, bucket)
+        return sorted(
+            os.path.relpath(os.path.join(dir_path, name), bucket_dir).replace(
+                os.sep, "/"
+            )
+            for dir_path, _, names in os.walk(bucket_dir)
+            for name in names
+        )
+
+    def paginate(
+        self,
+        Bucket: str,
+        Prefix: str = "",
+        Delimiter: Optional[str] = None,
+        PaginationConfig: Optional[dict] = None,
+    ):
+        page_size = (PaginationConfig or {}).get("PageSize", 1000)
+
+        entries: List[dict] = []
+        prefixes = set()
+        for key in self._keys(Bucket):
+            if not key.startswith(Prefix):
+                continue
+
+            if Delimiter and Delimiter in key[len(Prefix) :]:
+                prefix = key[: key.index(Delimiter, len(Prefix)) + 1]
+                if prefix not in prefixes:
+                    prefixes.add(prefix)
+                    entries.append({"Prefix": prefix})
+                continue
+
+            stat = os.stat(os.path.join(self.root, Bucket, key))
+            entries.append(
+                {
+                    "Key": key,
+                    # In whole seconds, like S3
+                    "LastModified": datetime.fromtimestamp(
+                        int(stat.st_mtime), timezone.utc
+                    ),
+                    "Size": stat.st_size,
+                }
+            )
+
+        for start in range(0, max(len(entries), 1), page_size):
+            page = entries[start : start + page_size]
+            yield {
+                "Contents": [entry for entry in page if "Key" in entry],
+                "CommonPrefixes": [entry for entry in page if "Prefix" in entry],
+            }
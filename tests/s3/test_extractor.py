@@ -6,6 +6,7 @@ from testcontainers.minio import MinioContainer
 from metaphor.common.event_util import EventUtil
 from metaphor.s3.config import S3RunConfig
 from metaphor.s3.extractor import S3Extractor
+from tests.s3.local_client import LocalS3Client
 from tests.test_utils import ignore_datetime_values, load_json
 
 
@@ -29,6 +30,22 @@ async def test_extractor(minio_container: MinioContainer, test_root_dir: str) ->
     assert ignore_datetime_values(events) == ignore_datetime_values(load_json(expected))
 
 
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+@pytest.mark.asyncio
+async def test_extractor_local_client(test_root_dir: str, max_concurrency: int) -> None:
+    config = S3RunConfig.from_yaml_file(f"{test_root_dir}/s3/config.yml")
+    config.max_concurrency = max_concurrency
+    config.s3_client = LocalS3Client(f"{test_root_dir}/s3/data")  # type: ignore
+    extractor = S3Extractor(config)
+    events = [EventUtil.trim_event(entity) for entity in await extractor.extract()]
+    expected = f"{test_root_dir}/s3/expected.json"
+
+    # The last modified times have no fractional seconds, unlike those from minio
+    assert ignore_datetime_values(events, "%Y-%m-%dT%H:%M:%S%z") == (
+        ignore_datetime_values(load_json(expected))
+    )
+
+
 @pytest.mark.asyncio
 async def test_extractor_merge_files(
     minio_container: MinioContainer, test_root_dir
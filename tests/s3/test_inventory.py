@@ -0,0 +1,239 @@
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+from typing import List
+from urllib.parse import quote_plus
+
+import pyarrow
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+from metaphor.common.event_util import EventUtil
+from metaphor.s3.config import PathSpec, S3RunConfig
+from metaphor.s3.extractor import S3Extractor
+from metaphor.s3.inventory import Inventory, _glob_to_regex
+from tests.s3.local_client import LocalS3Client
+from tests.test_utils import ignore_datetime_values, load_json
+
+CSV_SCHEMA = "Bucket, Key, Size, LastModifiedDate, IsLatest, IsDeleteMarker"
+
+
+class InventoryOnlyS3Client(LocalS3Client):
+    """A local S3 client that fails listing the objects"""
+
+    def get_paginator(self, operation: str):
+        raise AssertionError("The objects are listed")
+
+
+def _local_objects(bucket_dir: str) -> List[dict]:
+    objects = []
+    for dir_path, _, names in os.walk(bucket_dir):
+        for name in names:
+            path = os.path.join(dir_path, name)
+            stat = os.stat(path)
+            objects.append(
+                {
+                    "key": os.path.relpath(path, bucket_dir).replace(os.sep, "/"),
+                    "size": stat.st_size,
+                    "last_modified_date": datetime.fromtimestamp(
+                        int(stat.st_mtime), timezone.utc
+                    ),
+                    "is_latest": True,
+                    "is_delete_marker": False,
+                }
+            )
+    return objects
+
+
+def _write_inventory(
+    root: str, bucket: str, objects: List[dict], file_format: str
+) -> str:
+    """Write an inventory as delivered to the destination bucket, return its folder"""
+    folder = f"inventory/{bucket}/config"
+    os.makedirs(f"{root}/{folder}/data")
+
+    files = []
+    # Split the objects into two files
+    for index, chunk in enumerate([objects[::2], objects[1::2]]):
+        if file_format == "csv":
+            key = f"{folder}/data/{index}.csv.gz"
+            with gzip.open(f"{root}/{key}", "wt") as f:
+                for obj in chunk:
+                    last_modified = obj["last_modified_date"].strftime(
+                        "%Y-%m-%dT%H:%M:%S.000Z"
+                    )
+                    f.write(
+                        f'"{bucket}","{quote_plus(obj["key"], safe="/")}",'
+                        f'"{obj["size"]}","{last_modified}",'
+                        f'"{str(obj["is_latest"]).lower()}",'
+                        f'"{str(obj["is_delete_marker"]).lower()}"\n'
+                    )
+        else:
+            key = f"{folder}/data/{index}.parquet"
+            pq.write_table(
+                pyarrow.Table.from_pylist(
+                    [{"bucket": bucket, **obj} for obj in chunk],
+                    pyarrow.schema(
+                        [
+                            pyarrow.field("bucket", pyarrow.string()),
+                            pyarrow.field("key", pyarrow.string()),
+                            pyarrow.field("size", pyarrow.int64()),
+                            pyarrow.field(
+                                "last_modified_date", pyarrow.timestamp("ms", "UTC")
+                            ),
+                            pyarrow.field("is_latest", pyarrow.bool_()),
+                            pyarrow.field("is_delete_marker", pyarrow.bool_()),
+                        ]
+                    ),
+                ),
+                f"{root}/{key}",
+            )
+        files.append({"key": key, "size": 0, "MD5checksum": ""})
+
+    os.makedirs(f"{root}/{folder}/2024-01-01T00-00Z")
+    with open(f"{root}/{folder}/2024-01-01T00-00Z/manifest.json", "w") as f:
+        json.dump(
+            {
+                "sourceBucket": bucket,
+                "destinationBucket": "arn:aws:s3:::inventory",
+                "version": "2016-11-30",
+                "fileFormat": "CSV" if file_format == "csv" else "Parquet",
+                "fileSchema": CSV_SCHEMA if file_format == "csv" else "",
+                "files": files,
+            },
+            f,
+        )
+    return f"{root}/{folder}/"
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+@pytest.mark.asyncio
+async def test_extractor_inventory(
+    test_root_dir: str, tmp_path, file_format: str
+) -> None:
+    data_root = f"{test_root_dir}/s3/data"
+    config = S3RunConfig.from_yaml_file(f"{test_root_dir}/s3/config.yml")
+    config.inventory_manifests = [
+        _write_inventory(
+            str(tmp_path),
+            bucket,
+            _local_objects(f"{data_root}/{bucket}"),
+            file_format,
+        )
+        for bucket in ["bucket", "folders_as_datasets", "partitioned"]
+    ]
+    # Read a manifest by its path too
+    config.inventory_manifests[0] += "2024-01-01T00-00Z/manifest.json"
+
+    # Only the schemas are read from S3
+    config.s3_client = InventoryOnlyS3Client(data_root)  # type: ignore
+
+    extractor = S3Extractor(config)
+    events = [EventUtil.trim_event(entity) for entity in await extractor.extract()]
+
+    assert ignore_datetime_values(events, "%Y-%m-%dT%H:%M:%S%z") == (
+        ignore_datetime_values(load_json(f"{test_root_dir}/s3/expected.json"))
+    )
+
+
+def test_inventory_versions(test_root_dir: str, tmp_path) -> None:
+    def obj(
+        key: str,
+        size: int,
+        day: int,
+        is_latest: bool = True,
+        is_delete_marker: bool = False,
+    ) -> dict:
+        return {
+            "key": key,
+            "size": size,
+            "last_modified_date": datetime(2024, 1, day, tzinfo=timezone.utc),
+            "is_latest": is_latest,
+            "is_delete_marker": is_delete_marker,
+        }
+
+    objects = [
+        obj("table/old.csv", 10, 1),
+        obj("table/new.csv", 20, 2),
+        obj("table/new.csv", 30, 1, is_latest=False),
+        obj("table/deleted.csv", 0, 3, is_delete_marker=True),
+        obj("file with spaces+plus.csv", 40, 1),
+    ]
+    config = S3RunConfig.from_yaml_file(f"{test_root_dir}/s3/config.yml")
+    config.path_specs = []
+    config.inventory_manifests = [
+        _write_inventory(str(tmp_path), "bucket", objects, "csv")
+    ]
+
+    file_spec = PathSpec(uri="s3://bucket/*.csv")
+    table_spec = PathSpec(uri="s3://bucket/{table}/*.csv")
+    with ThreadPoolExecutor() as executor:
+        inventory = Inventory.load(
+            config, config.inventory_manifests[0], [file_spec, table_spec], executor
+        )
+
+    assert sorted(inventory.objects["key"].to_pylist()) == [
+        "file with spaces+plus.csv",
+        "table/new.csv",
+        "table/old.csv",
+    ]
+
+    files = inventory.table_datas(file_spec)
+    assert sorted(
+        (table_data.display_name, table_data.size_in_bytes) for table_data in files
+    ) == [
+        ("file with spaces+plus.csv", 40),
+        ("new.csv", 20),
+        ("old.csv", 10),
+    ]
+
+    [table] = inventory.table_datas(table_spec, max_samples=2)
+    assert table.display_name == "table"
+    assert table.table_path == "s3://bucket/table"
+    assert table.full_path == "s3://bucket/table/new.csv"
+    assert table.size_in_bytes == 20
+    assert table.sample_paths == [
+        "s3://bucket/table/new.csv",
+        "s3://bucket/table/old.csv",
+    ]
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "a/*/b/*.csv",
+        "a/*",
+        "a?c/[bc]*",
+        "a/[!b]/*",
+        "a/[]]/*",
+        "a/[/x",
+        "a.b/(c)+{d}|$/*",
+        "*",
+    ],
+)
+def test_glob_to_regex(pattern: str) -> None:
+    names = [
+        "a/x/b/1.csv",
+        "a/x/y/b/1.csv",
+        "a/x/b/1.tsv",
+        "abc/b",
+        "abc/cd",
+        "abc/d",
+        "a/b/c",
+        "a/c/d",
+        "a/]/c",
+        "a/[/x",
+        "a.b/(c)+{d}|$/e",
+        "axb/(c)+{d}|$/e",
+        "a\nb",
+        "",
+    ]
+    regex = f"(?s)^{_glob_to_regex(pattern)}$"
+    matches = pc.match_substring_regex(  # type: ignore
+        pyarrow.array(names), regex
+    ).to_pylist()
+    assert matches == [fnmatchcase(name, pattern) for name in names]
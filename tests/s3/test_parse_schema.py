@@ -0,0 +1,214 @@
+from datetime import datetime
+from typing import Any, Dict
+
+import pyarrow
+import pyarrow.orc as po
+import pyarrow.parquet as pq
+import pytest
+from fastavro import writer
+
+from metaphor.common.aws import AwsCredentials
+from metaphor.common.base_config import OutputConfig
+from metaphor.models.metadata_change_event import DatasetSchema, SchemaField, SchemaType
+from metaphor.s3.config import S3RunConfig, SchemaInferenceConfig
+from metaphor.s3.parse_schema import parse_schema, read_schema, widen_type
+from metaphor.s3.ranged_file import BLOCK_SIZE
+from metaphor.s3.table_data import TableData
+from tests.s3.local_client import LocalS3Client
+
+
+def _config(client: LocalS3Client, **kwargs) -> S3RunConfig:
+    config = S3RunConfig(
+        output=OutputConfig(),
+        aws=AwsCredentials(
+            access_key_id="key", secret_access_key="secret", region_name="region"
+        ),
+        endpoint_url="http://localhost:9000",
+        schema_inference=SchemaInferenceConfig(**kwargs),
+    )
+    config.s3_client = client  # type: ignore
+    return config
+
+
+def _large_table(rows: int) -> pyarrow.Table:
+    return pyarrow.table(
+        {
+            "id": pyarrow.array(range(rows), pyarrow.int64()),
+            "name": pyarrow.array([f"name {i}" for i in range(rows)]),
+            "score": pyarrow.array([i / 3 for i in range(rows)]),
+        }
+    )
+
+
+@pytest.mark.parametrize("suffix", ["parquet", "orc"])
+def test_read_schema_from_footer(tmp_path, suffix: str) -> None:
+    (tmp_path / "bucket").mkdir()
+    path = str(tmp_path / "bucket" / f"large.{suffix}")
+    table = _large_table(200000)
+    if suffix == "parquet":
+        pq.write_table(table, path)
+    else:
+        po.write_table(table, path)
+
+    client = LocalS3Client(str(tmp_path))
+    schema_type, fields = read_schema(_config(client), f"s3://bucket/large.{suffix}")
+
+    assert schema_type == (
+        SchemaType.PARQUET if suffix == "parquet" else SchemaType.ORC
+    )
+    assert fields == [
+        SchemaField(field_path="id", native_type="int64"),
+        SchemaField(field_path="name", native_type="string"),
+        SchemaField(field_path="score", native_type="double"),
+    ]
+
+    # Only the footer is downloaded
+    assert client.ranges == [f"bytes=-{BLOCK_SIZE}"]
+
+
+def test_read_schema_from_prefix(tmp_path) -> None:
+    (tmp_path / "bucket").mkdir()
+    with open(tmp_path / "bucket" / "large.csv", "w") as f:
+        f.write("id,name,score\n")
+        for i in range(200000):
+            f.write(f"{i},name {i},{i / 3}\n")
+
+    client = LocalS3Client(str(tmp_path))
+    _, fields = read_schema(
+        _config(client, sample_bytes=100000), "s3://bucket/large.csv"
+    )
+
+    assert fields == [
+        SchemaField(field_path="id", native_type="int64"),
+        SchemaField(field_path="name", native_type="string"),
+        SchemaField(field_path="score", native_type="double"),
+    ]
+    assert client.ranges == ["bytes=0-99999"]
+
+
+def test_read_schema_from_header(test_root_dir) -> None:
+    client = LocalS3Client(f"{test_root_dir}/s3/data")
+    schema_type, fields = read_schema(
+        _config(client), "s3://bucket/directory/foo/bar/weather.avro"
+    )
+
+    assert schema_type == SchemaType.AVRO
+    assert fields == [
+        SchemaField(field_path="station", native_type="string"),
+        SchemaField(field_path="time", native_type="long"),
+        SchemaField(field_path="temp", native_type="int"),
+    ]
+    assert client.ranges == [f"bytes=0-{BLOCK_SIZE - 1}"]
+
+
+def test_widen_type() -> None:
+    assert widen_type("int64", "int64") == "int64"
+    assert widen_type("null", "int64") == "int64"
+    assert widen_type("int32", "null") == "int32"
+    assert widen_type("int32", "int64") == "int64"
+    assert widen_type("double", "int64") == "double"
+    assert widen_type("int", "long") == "long"
+    assert widen_type("int64", "string") == "string"
+    assert widen_type("timestamp[s]", "int64") == "string"
+    assert widen_type(["null", "long"], "long") == ["null", "long"]
+    assert widen_type("long", {"type": "array", "items": "long"}) == "long"
+
+
+def test_parse_schema_with_samples(tmp_path) -> None:
+    (tmp_path / "bucket").mkdir()
+    files = {
+        "1.csv": "a,b\n1,x\n",
+        "2.csv": "a,b,c\n1.5,2,3\n",
+        "3.csv": "a,b\n1,\n",
+        "4.csv": "",
+    }
+    for name, content in files.items():
+        (tmp_path / "bucket" / name).write_text(content)
+
+    config = _config(LocalS3Client(str(tmp_path)), sample_files=3)
+
+    table_data = TableData()
+    for day, name in enumerate(files, 1):
+        table_data = table_data.merge(
+            TableData(
+                display_name="table",
+                full_path=f"s3://bucket/{name}",
+                timestamp=datetime(2024, 1, day),
+                table_path="s3://bucket",
+                size_in_bytes=len(files[name]),
+                samples=(
+                    [(datetime(2024, 1, day), f"s3://bucket/{name}")]
+                    if files[name]
+                    else []
+                ),
+                max_samples=3,
+            )
+        )
+
+    # The latest non-empty files
+    assert table_data.sample_paths == [
+        "s3://bucket/3.csv",
+        "s3://bucket/2.csv",
+        "s3://bucket/1.csv",
+    ]
+
+    assert parse_schema(config, table_data) == DatasetSchema(
+        schema_type=SchemaType.SCHEMALESS,
+        fields=[
+            SchemaField(field_path="a", native_type="double"),
+            SchemaField(field_path="b", native_type="string"),
+            SchemaField(field_path="c", native_type="int64"),
+        ],
+    )
+
+
+def test_parse_schema_failed(tmp_path) -> None:
+    (tmp_path / "bucket").mkdir()
+    (tmp_path / "bucket" / "empty.csv").write_text("")
+
+    config = _config(LocalS3Client(str(tmp_path)))
+    table_data = TableData(full_path="s3://bucket/empty.csv", table_path="s3://bucket")
+
+    assert parse_schema(config, table_data) == DatasetSchema(fields=[])
+
+
+def test_parse_schema_avro_unions(tmp_path) -> None:
+    (tmp_path / "bucket").mkdir()
+    schemas: Dict[str, Dict[str, Any]] = {
+        "1.avro": {"a": "long", "b": ["null", "string"]},
+        "2.avro": {"a": ["null", "long"], "b": ["null", "string"]},
+        "3.avro": {"a": {"type": "array", "items": "long"}, "b": "string"},
+    }
+    for name, types in schemas.items():
+        with open(tmp_path / "bucket" / name, "wb") as f:
+            writer(
+                f,
+                {
+                    "type": "record",
+                    "name": "test",
+                    "fields": [
+                        {"name": field, "type": type_} for field, type_ in types.items()
+                    ],
+                },
+                [],
+            )
+
+    config = _config(LocalS3Client(str(tmp_path)), sample_files=3)
+    table_data = TableData(
+        full_path="s3://bucket/3.avro",
+        table_path="s3://bucket",
+        samples=[
+            (datetime(2024, 1, day), f"s3://bucket/{name}")
+            for day, name in enumerate(schemas, 1)
+        ],
+        max_samples=3,
+    )
+
+    # The latest sample's types are kept
+    assert parse_schema(config, table_data) == DatasetSchema(
+        schema_type=SchemaType.AVRO,
+        fields=[
+            SchemaField(field_path="a", native_type={"type": "array", "items": "long"}),
+            SchemaField(field_path="b", native_type="string"),
+        ],
+    )
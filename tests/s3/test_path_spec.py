@@ -0,0 +1,41 @@
+from metaphor.s3.path_spec import PathSpec
+
+
+def test_allow_key() -> None:
+    path_spec = PathSpec(
+        uri="s3://bucket/{table}/{partition_key[0]}={partition[0]}/*.parquet",
+        file_types={"parquet"},
+    )
+
+    assert path_spec.allow_key("foo/k=v/1.parquet")
+    assert not path_spec.allow_key("foo/k=v/1.csv")
+    assert not path_spec.allow_key("foo/1.parquet")
+
+
+def test_allow_path() -> None:
+    path_spec = PathSpec(
+        uri="s3://bucket/*/{dept}/{table}/*/*.csv",
+        excludes=[
+            "s3://bucket/*/ignored/",
+            "s3://bucket/a/b/skipped/",
+            "s3://bucket/*/*/c*/",
+        ],
+    )
+
+    assert path_spec.allow_path("s3://bucket/a/")
+    assert path_spec.allow_path("s3://bucket/a/b/")
+    assert path_spec.allow_path("s3://bucket/a/b/table/")
+    assert path_spec.allow_path("s3://bucket/a/b/table/x/")
+
+    # Deeper than the uri
+    assert not path_spec.allow_path("s3://bucket/a/b/table/x/y/z/")
+
+    # Excluded, along with all the paths below
+    assert not path_spec.allow_path("s3://bucket/a/ignored/")
+    assert not path_spec.allow_path("s3://bucket/a/ignored/table/")
+    assert not path_spec.allow_path("s3://bucket/a/b/skipped/")
+    assert not path_spec.allow_path("s3://bucket/a/b/c1/x/")
+    assert path_spec.allow_path("s3://bucket/a/b/skipped_not/")
+
+    # Not in the bucket
+    assert not path_spec.allow_path("s3://other/a/b/")
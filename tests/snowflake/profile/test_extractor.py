@@ -4,6 +4,7 @@ from metaphor.common.base_config import OutputConfig
 from metaphor.common.entity_id import dataset_normalized_name
 from metaphor.common.event_util import EventUtil
 from metaphor.common.filter import DatasetFilter
+from metaphor.common.profile_batch import ProfileBatchConfig
 from metaphor.common.sampling import SamplingConfig
 from metaphor.models.metadata_change_event import (
     DataPlatform,
@@ -631,3 +632,76 @@ def test_parse_profiling_result():
             account="a", name="foo", platform=DataPlatform.SNOWFLAKE
         ),
     )
+
+
+@patch("metaphor.snowflake.auth.connect")
+@patch("metaphor.snowflake.utils.async_execute")
+def test_fetch_columns_in_batches(
+    mock_async_execute: MagicMock, mock_connect: MagicMock
+):
+    def show_column(table: str, column: str):
+        return (table, "PUBLIC", column, "TEXT", "", "", "", "", "", "DB", "")
+
+    connection = mock_connect()
+    connection.cursor.return_value.__iter__.return_value = iter(
+        [
+            show_column("A", "ID"),
+            show_column("B", "ID"),
+            show_column("B", "NAME"),
+            show_column("C", "ID"),
+        ]
+    )
+
+    # A & B are profiled in a batch, C is too large
+    mock_async_execute.return_value = {
+        "batch-0": [(1, "4", "2", "1", "0", "0"), (0, "3", "3", "0", None, None)],
+        "DB.PUBLIC.C": [(1000, 10, 0)],
+    }
+
+    extractor = SnowflakeProfileExtractor(
+        SnowflakeProfileRunConfig(
+            account="snowflake_account",
+            user="user",
+            password="password",
+            output=OutputConfig(),
+            column_statistics=ColumnStatistics(null_count=True, unique_count=True),
+            batch=ProfileBatchConfig(enabled=True, max_rows=100),
+        )
+    )
+
+    tables = {}
+    for name, row_count in [("A", 3), ("B", 4), ("C", 1000)]:
+        normalized_name = dataset_normalized_name("DB", "PUBLIC", name)
+        extractor._datasets[normalized_name] = extractor._init_dataset(
+            "snowflake_account", normalized_name
+        )
+        tables[normalized_name] = DatasetInfo(
+            "DB", "PUBLIC", name, "BASE TABLE", row_count
+        )
+
+    extractor._fetch_columns_async(connection, tables)
+
+    queries = mock_async_execute.call_args.args[1]
+    assert queries["batch-0"].query == (
+        'SELECT 0, TO_VARCHAR(COUNT(1)), TO_VARCHAR(COUNT(DISTINCT "ID")), '
+        'TO_VARCHAR(COUNT(1) - COUNT("ID")), NULL, NULL FROM "PUBLIC"."A" UNION ALL '
+        'SELECT 1, TO_VARCHAR(COUNT(1)), TO_VARCHAR(COUNT(DISTINCT "ID")), '
+        'TO_VARCHAR(COUNT(1) - COUNT("ID")), TO_VARCHAR(COUNT(DISTINCT "NAME")), '
+        'TO_VARCHAR(COUNT(1) - COUNT("NAME")) FROM "PUBLIC"."B"'
+    )
+    assert queries["DB.PUBLIC.C"].query == (
+        'SELECT COUNT(1), COUNT(DISTINCT "ID"), COUNT(1) - COUNT("ID") '
+        'FROM "PUBLIC"."C"'
+    )
+
+    assert {
+        name: [
+            (field.field_path, field.distinct_value_count, field.null_value_count)
+            for field in dataset.field_statistics.field_statistics
+        ]
+        for name, dataset in extractor._datasets.items()
+    } == {
+        "db.public.a": [("ID", 3.0, 0.0)],
+        "db.public.b": [("ID", 2.0, 1.0), ("NAME", 0.0, 0.0)],
+        "db.public.c": [("ID", 10.0, 0.0)],
+    }
@@ -1,5 +1,7 @@
+import asyncio
 import json
-from datetime import datetime, timezone
+import tempfile
+from datetime import datetime, timedelta, timezone
 from typing import Any, List, Optional, Tuple
 from unittest.mock import MagicMock, patch
 
@@ -137,37 +139,54 @@ def test_fetch_columns(mock_connect: MagicMock):
     assert dataset.schema.fields[0].description == "comment1"
 
 
+@patch("metaphor.snowflake.extractor.async_execute")
 @patch("metaphor.snowflake.auth.connect")
-def test_fetch_table_info(mock_connect: MagicMock):
+def test_fetch_table_info(mock_connect: MagicMock, mock_async_execute: MagicMock):
     table_info = DatasetInfo(
         database=database, schema=schema, name=table_name, type=table_type
     )
+    view_name = "view1"
+    normalized_view_name = dataset_normalized_name(database, schema, view_name)
+    view_info = DatasetInfo(
+        database=database,
+        schema=schema,
+        name=view_name,
+        type=SnowflakeTableType.VIEW.value,
+    )
 
-    mock_conn = MagicMock()
-    mock_cursor = MagicMock()
-
-    mock_conn.cursor.return_value = mock_cursor
-
-    mock_cursor.fetchone.return_value = {
-        f"DDL_{normalized_name}": "ddl",
-        f"UPDATED_{normalized_name}": 1,
-    }
+    mock_async_execute.return_value = {"0": [(1, "ddl", "view ddl")]}
 
     extractor = SnowflakeExtractor(make_snowflake_config())
-
-    extractor._conn = mock_conn
+    extractor._conn = MagicMock()
 
     dataset = extractor._init_dataset(
         database, schema, table_name, table_type, "", None, None
     )
     extractor._datasets[normalized_name] = dataset
+    view = extractor._init_dataset(
+        database, schema, view_name, SnowflakeTableType.VIEW.value, "", None, None
+    )
+    extractor._datasets[normalized_view_name] = view
+
+    extractor._fetch_table_info(
+        {normalized_name: table_info, normalized_view_name: view_info}, False
+    )
 
-    extractor._fetch_table_info({normalized_name: table_info}, False)
+    queries = mock_async_execute.call_args.args[1]
+    assert list(queries.keys()) == ["0"]
+    assert queries["0"].params == (
+        '"db"."schema"."table1"',
+        '"db"."schema"."table1"',
+        '"db"."schema"."view1"',
+    )
+    assert mock_async_execute.call_args.args[3] == extractor._max_concurrency
 
     assert dataset.schema.sql_schema.table_schema == "ddl"
     assert dataset.statistics.last_updated == datetime.utcfromtimestamp(0).replace(
         tzinfo=timezone.utc
     )
+    assert view.schema.sql_schema.table_schema == "view ddl"
+    assert view.statistics.last_updated is None
 
 
 @patch("metaphor.snowflake.auth.connect")
@@ -735,6 +754,49 @@ def test_parse_query_logs(mock_connect: MagicMock):
     ]
 
 
+@patch("metaphor.snowflake.auth.connect")
+def test_parse_query_logs_with_watermark(mock_connect: MagicMock) -> None:
+    directory = tempfile.mkdtemp()
+    config = make_snowflake_config()
+    config.query_log = SnowflakeQueryLogConfig(
+        watermark_file=f"{directory}/watermark.json", watermark_overlap_minutes=60
+    )
+
+    def query_log(query_id: str, start_time: datetime) -> Tuple[Any, ...]:
+        return (query_id, "USER", "SELECT 1", start_time, 1000, 0, "DB", "SCHEMA") + (
+            0,
+        ) * 5
+
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    extractor = SnowflakeExtractor(config)
+    assert extractor._watermark_store is not None
+    extractor._watermark = extractor._watermark_store.load(
+        "snowflake_account", timedelta(hours=1)
+    )
+    extractor._parse_query_logs(
+        "0", [query_log("id1", t0), query_log("id2", t0 + timedelta(hours=2))]
+    )
+    assert [log.query_id for log in extractor._logs] == ["id1", "id2"]
+    extractor.commit_state()
+
+    # The next run re-fetches the overlap window, but skips the processed queries
+    extractor = SnowflakeExtractor(config)
+    assert extractor._watermark_store is not None
+    extractor._watermark = extractor._watermark_store.load(
+        "snowflake_account", timedelta(hours=1)
+    )
+    assert extractor._watermark.resume_from(t0) == t0 + timedelta(hours=1)
+    extractor._parse_query_logs(
+        "0",
+        [
+            query_log("id2", t0 + timedelta(hours=2)),
+            query_log("id3", t0 + timedelta(hours=2)),
+        ],
+    )
+    assert [log.query_id for log in extractor._logs] == ["id3"]
+
+
 @patch("metaphor.snowflake.auth.connect")
 def test_fetch_schemas(mock_connect: MagicMock) -> None:
     mock_cursor = MagicMock()
@@ -823,3 +885,124 @@ def test_fetch_streams(mock_connect: MagicMock) -> None:
         stale=True,
         stale_after=datetime.fromisoformat("2023-01-01 12:00:00+00:00"),
     )
+
+
+@patch("metaphor.snowflake.auth.connect")
+def test_batch_query_for_query_logs(mock_connect: MagicMock) -> None:
+    extractor = SnowflakeExtractor(make_snowflake_config())
+    extractor._query_log_excluded_usernames = {"foo"}
+
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    t1 = datetime(2024, 1, 1, 1, tzinfo=timezone.utc)
+    t2 = datetime(2024, 1, 1, 2, tzinfo=timezone.utc)
+
+    queries = extractor._batch_query_for_query_logs([(t0, t1), (t1, t2)])
+    assert list(queries.keys()) == ["0", "1"]
+    assert queries["1"].params == (t1, t2, "foo")
+    assert "OFFSET" not in queries["1"].query
+
+    queries = extractor._batch_query_for_access_logs([(t0, t1)])
+    assert queries["0"].params == (t0, t1, t0, t1, "foo")
+    assert "OFFSET" not in queries["0"].query
+
+
+@patch("metaphor.snowflake.auth.connect")
+def test_extract_stream(mock_connect: MagicMock) -> None:
+    extractor = SnowflakeExtractor(make_snowflake_config())
+    extractor._query_log_lookback_days = 0
+
+    def fetch_tables(cursor, database):
+        extractor._datasets[
+            dataset_normalized_name(database, schema, table_name)
+        ] = extractor._init_dataset(
+            database, schema, table_name, table_type, "", None, None
+        )
+        return {"table": DatasetInfo(database, schema, table_name, table_type)}
+
+    tag_references = [
+        ("foo", "bar", "DATABASE", None, None, "DB1", None),
+        ("key", "value", "TABLE", "DB2", schema, table_name, None),
+    ]
+
+    with patch.multiple(
+        extractor,
+        fetch_databases=MagicMock(return_value=["db1", "db2"]),
+        _fetch_shared_databases=MagicMock(return_value=[]),
+        _fetch_tag_references=MagicMock(return_value=tag_references),
+        _fetch_tables=MagicMock(side_effect=fetch_tables),
+        _fetch_columns=MagicMock(),
+        _fetch_table_info=MagicMock(),
+        _fetch_primary_keys=MagicMock(),
+        _fetch_unique_keys=MagicMock(),
+    ):
+
+        async def collect() -> List[Any]:
+            entities = []
+            async for entity in extractor.extract_stream():
+                # Only the database being yielded is kept in memory
+                assert len(extractor._datasets) <= 1
+                entities.append(entity)
+            return entities
+
+        entities = asyncio.run(collect())
+
+    assert [entity.logical_id.name for entity in entities[:2]] == [
+        "db1.schema.table1",
+        "db2.schema.table1",
+    ]
+    assert entities[0].schema.tags == ["foo=bar"]
+    assert entities[1].schema.tags == ["key=value"]
+    assert entities[2].logical_id == HierarchyLogicalID(
+        path=[DataPlatform.SNOWFLAKE.value, "db1"]
+    )
+    assert len(entities) == 3
+
+
+@patch("metaphor.snowflake.auth.connect")
+def test_extract_stream_concurrent_crawl(mock_connect: MagicMock) -> None:
+    mock_connect.side_effect = lambda _: MagicMock()
+    config = make_snowflake_config()
+    config.concurrent_crawl = True
+    config.max_concurrency = 2
+    extractor = SnowflakeExtractor(config)
+    extractor._query_log_lookback_days = 0
+
+    databases = [f"db{i}" for i in range(5)]
+    crawled: List[Tuple[str, Any]] = []
+
+    def fetch_tables(self, cursor, database):
+        # Each database is fetched into its own datasets & connection
+        assert self is not extractor and self._datasets == {}
+        assert self._conn is not extractor._conn
+        crawled.append((database, self._conn))
+        self._datasets[
+            dataset_normalized_name(database, schema, table_name)
+        ] = self._init_dataset(database, schema, table_name, table_type, "", None, None)
+        return {}
+
+    with patch.multiple(
+        SnowflakeExtractor,
+        fetch_databases=MagicMock(return_value=databases),
+        _fetch_shared_databases=MagicMock(return_value=[]),
+        _fetch_tag_references=MagicMock(
+            return_value=[("key", "value", "TABLE", "DB3", schema, table_name, None)]
+        ),
+    ), patch.object(SnowflakeExtractor, "_fetch_tables", autospec=True) as mock_fetch:
+        mock_fetch.side_effect = fetch_tables
+        entities = asyncio.run(extractor.extract())
+
+    assert sorted(entity.logical_id.name for entity in entities) == [
+        f"{database}.schema.table1" for database in databases
+    ]
+    assert [
+        entity.schema.tags
+        for entity in entities
+        if entity.logical_id.name == "db3.schema.table1"
+    ] == [["key=value"]]
+
+    # At most max_concurrency connections besides the main one, all closed
+    connections = {id(conn): conn for _, conn in crawled}
+    assert sorted(database for database, _ in crawled) == databases
+    assert 1 <= len(connections) <= 2
+    for conn in connections.values():
+        conn.close.assert_called_once()
@@ -1,7 +1,153 @@
-from metaphor.snowflake.utils import to_quoted_identifier
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict
+from unittest.mock import MagicMock
+
+import pytest
+
+from metaphor.snowflake.utils import (
+    QueryWaiter,
+    QueryWithParam,
+    async_execute,
+    fetch_query_history_estimate,
+    query_history_time_slices,
+    to_quoted_identifier,
+)
 
 
 def test_to_quoted_identifier():
     assert to_quoted_identifier([None, "", "a", "b", "c"]) == '"a"."b"."c"'
 
     assert to_quoted_identifier(["db", "sc", 'ta"@BLE']) == '"db"."sc"."ta""@BLE"'
+
+
+def test_query_history_time_slices():
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    end = start + timedelta(hours=3)
+
+    conn = MagicMock()
+    cursor = conn.cursor.return_value
+    cursor.__iter__.return_value = iter([(Decimal(0), 10), (Decimal(2), 30)])
+
+    assert fetch_query_history_estimate(conn, start, end) == {0: 10, 2: 30}
+    assert cursor.execute.call_args[0][1] == (start, 3600, start, end)
+
+    cursor.__iter__.return_value = iter([(Decimal(0), 10), (Decimal(2), 30)])
+    assert query_history_time_slices(conn, start, end, 20) == [
+        (start, start + timedelta(hours=2)),
+        (start + timedelta(hours=2), start + timedelta(hours=2.5)),
+        (start + timedelta(hours=2.5), end),
+    ]
+
+
+class FakeConnection:
+    """Queries finish after being polled for a number of times"""
+
+    def __init__(self, polls: int = 2) -> None:
+        self.polls = polls
+        self.status_checks: Dict[str, int] = {}
+        self.running = 0
+        self.max_running = 0
+
+    def cursor(self) -> MagicMock:
+        cursor = MagicMock()
+
+        def execute_async(query: str, params=None) -> None:
+            cursor.sfqid = query
+            self.status_checks[query] = 0
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            rows = [(query, i) for i in range(5)]
+            cursor.fetchall.return_value = rows
+            cursor.fetchmany.side_effect = [rows[0:2], rows[2:4], rows[4:5], []]
+
+        cursor.execute_async.side_effect = execute_async
+        return cursor
+
+    def get_query_status(self, query_id: str) -> str:
+        if query_id == "error":
+            raise ValueError("boom")
+
+        self.status_checks[query_id] += 1
+        if self.status_checks[query_id] < self.polls:
+            return "RUNNING"
+
+        self.running -= 1
+        return "SUCCESS"
+
+    @staticmethod
+    def is_still_running(status: str) -> bool:
+        return status == "RUNNING"
+
+
+def test_async_execute():
+    queries = {
+        "a": QueryWithParam("foo"),
+        "b": QueryWithParam("bar"),
+        "c": QueryWithParam("error"),
+    }
+
+    conn = FakeConnection()
+    results = async_execute(conn, queries, max_workers=1)  # type: ignore
+    assert results == {
+        "a": [("foo", i) for i in range(5)],
+        "b": [("bar", i) for i in range(5)],
+    }
+    assert conn.max_running == 1
+
+    # Results are passed to the processor in chunks
+    chunks = []
+    assert (
+        async_execute(
+            FakeConnection(),  # type: ignore
+            queries,
+            results_processor=lambda k, r: chunks.append((k, r)),
+        )
+        == {}
+    )
+    assert sorted((key, len(rows)) for key, rows in chunks) == [
+        ("a", 1),
+        ("a", 2),
+        ("a", 2),
+        ("b", 1),
+        ("b", 2),
+        ("b", 2),
+    ]
+
+    # Errors raised by the processor are not swallowed
+    def failing_processor(key: str, rows: list) -> None:
+        raise RuntimeError(key)
+
+    with pytest.raises(RuntimeError):
+        async_execute(
+            FakeConnection(),  # type: ignore
+            {"a": QueryWithParam("foo")},
+            results_processor=failing_processor,
+        )
+
+
+def test_query_waiter():
+    conn = FakeConnection(polls=4)
+    waiter = QueryWaiter(conn, min_interval=0.01, max_interval=0.02)  # type: ignore
+
+    async def run() -> Any:
+        return await asyncio.gather(
+            waiter.run(QueryWithParam("foo")),
+            waiter.run(QueryWithParam("bar")),
+            waiter.run(QueryWithParam("error")),
+            return_exceptions=True,
+        )
+
+    foo, bar, error = asyncio.run(run())
+    assert foo.sfqid == "foo"
+    assert bar.sfqid == "bar"
+    foo.get_results_from_sfqid.assert_called_once_with("foo")
+    assert isinstance(error, ValueError)
+    assert conn.status_checks == {"foo": 4, "bar": 4, "error": 0}
+
+    # The poller thread stops when there's nothing to wait for
+    poller = waiter._poller
+    if poller is not None:
+        poller.join(timeout=5)
+    assert waiter._poller is None